@@ -102,6 +102,35 @@ async def _check_services_status() -> Dict[str, Any]:
             services_status["mcp"] = {"status": "unhealthy", "message": str(e)}
             logger.debug(f"❌ [API] MCP layer status: unhealthy - {e}")
         
+        # 外部API（OpenAIなど）のサーキット状態・カウンター（APIプロセス内の呼び出し分）
+        try:
+            from mcp_servers.resilience import get_resilience_metrics
+            providers = get_resilience_metrics()
+            degraded = [name for name, metrics in providers.items() if metrics["state"] != "closed"]
+            services_status["external_providers"] = {
+                "status": "degraded" if degraded else "healthy",
+                "message": f"Circuit not closed: {', '.join(degraded)}" if degraded else "All circuits closed",
+                "providers": providers
+            }
+        except Exception as e:
+            services_status["external_providers"] = {"status": "unknown", "message": str(e)}
+            logger.debug(f"❌ [API] External provider status: unknown - {e}")
+        
+        # LLMのトークン数・コスト（APIプロセス内の呼び出し分）
+        # /health は認証不要のため、ユーザー別の集計は含めない（ユーザー別は 💰 [Tokens] ログで集計する）
+        try:
+            from mcp_servers.token_accounting import get_token_ledger
+            usage = get_token_ledger().get_metrics()
+            usage.pop("by_user", None)
+            services_status["llm_usage"] = {
+                "status": "healthy",
+                "message": f"{usage['total']['calls']} calls, ${usage['total']['cost_usd']:.4f}",
+                "usage": usage
+            }
+        except Exception as e:
+            services_status["llm_usage"] = {"status": "unknown", "message": str(e)}
+            logger.debug(f"❌ [API] LLM usage: unknown - {e}")
+        
         logger.debug(f"📊 [API] Services status check completed: {len(services_status)} services checked")
         return services_status
         
@@ -14,7 +14,7 @@ from ..models import RecipeAdoptionRequest, RecipeAdoptionResponse, SavedRecipe,
 from mcp_servers.recipe_history_crud import RecipeHistoryCRUD
 from mcp_servers.utils import get_authenticated_client
 from mcp_servers.inventory_crud import InventoryCRUD
-from services.session.models.components.ingredient_mapper import IngredientMapperComponent
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key
 
 router = APIRouter()
 logger = GenericLogger("api", "recipe")
@@ -236,16 +236,13 @@ async def get_ingredient_delete_candidates(
         logger.debug(f"🔍 [API] Retrieved {len(inventory_items)} inventory items")
         
         # 7. 食材名でマッチングして削除候補リストを作成
-        # 食材名の正規化用（既存のIngredientMapperComponentを活用）
-        ingredient_mapper = IngredientMapperComponent(GenericLogger("api", "ingredient_mapper"))
-        
         candidates = []
         matched_inventory_ids = set()  # 重複防止用
         
         # 在庫名を正規化してインデックスを作成（ループ外で一度だけ作成）
         inventory_normalized = {}
         for inv_item in inventory_items:
-            normalized = ingredient_mapper.normalize_ingredient_name(inv_item.get("item_name", ""))
+            normalized = normalize_ingredient_key(inv_item.get("item_name", ""))
             if normalized not in inventory_normalized:
                 inventory_normalized[normalized] = []
             inventory_normalized[normalized].append(inv_item)
@@ -259,7 +256,7 @@ async def get_ingredient_delete_candidates(
         
         # レシピ食材を在庫名にマッピング
         for ingredient_name in unique_ingredients:
-            normalized_ingredient = ingredient_mapper.normalize_ingredient_name(ingredient_name)
+            normalized_ingredient = normalize_ingredient_key(ingredient_name)
             logger.debug(f"🔍 [API] Processing ingredient '{ingredient_name}' (normalized: '{normalized_ingredient}')")
             
             matched = False
@@ -385,10 +382,7 @@ async def delete_ingredients(
         inventory_items = inventory_result.get("data", [])
         logger.debug(f"🔍 [API] Retrieved {len(inventory_items)} inventory items")
         
-        # 4. 食材名の正規化用
-        ingredient_mapper = IngredientMapperComponent(GenericLogger("api", "ingredient_mapper"))
-        
-        # 5. リクエストの食材名で在庫を検索して更新
+        # 4. リクエストの食材名で在庫を検索して更新（食材名は共通の正規化キーで比較）
         deleted_count = 0
         updated_count = 0
         failed_items = []
@@ -433,10 +427,10 @@ async def delete_ingredients(
                 else:
                     # 食材名で検索（複数在庫がある場合はすべて更新）
                     matched_items = []
-                    normalized_item_name = ingredient_mapper.normalize_ingredient_name(item_name)
+                    normalized_item_name = normalize_ingredient_key(item_name)
                     
                     for inv_item in inventory_items:
-                        normalized_inv = ingredient_mapper.normalize_ingredient_name(inv_item.get("item_name", ""))
+                        normalized_inv = normalize_ingredient_key(inv_item.get("item_name", ""))
                         if normalized_item_name == normalized_inv or \
                            normalized_item_name in normalized_inv or \
                            normalized_inv in normalized_item_name:
@@ -484,7 +478,7 @@ async def delete_ingredients(
                 failed_items.append(f"{ingredient_item.item_name} (エラー: {str(e)})")
                 logger.error(f"❌ [API] Error processing ingredient: {ingredient_item.item_name}, error: {e}")
         
-        # 6. レシピ履歴のingredients_deletedフラグを更新
+        # 5. レシピ履歴のingredients_deletedフラグを更新
         crud = RecipeHistoryCRUD()
         update_result = await crud.update_ingredients_deleted(
             client=client,
@@ -106,6 +106,24 @@ class SSESender:
         except Exception as e:
             self.logger.error(f"❌ [SSE] Failed to send progress: {e}")
     
+    async def send_partial(self, session_id: str, partial_data: Dict[str, Any]):
+        """提案候補を1件送信（最終レスポンスの前に逐次表示するため）"""
+        try:
+            event_data = {
+                "type": "partial",
+                "sse_session_id": session_id,
+                "timestamp": datetime.now().isoformat(),
+                "task_id": partial_data.get("task_id", ""),
+                "category": partial_data.get("category"),
+                "candidate": partial_data.get("candidate", {})
+            }
+            
+            await self._send_to_session(session_id, event_data)
+            self.logger.debug(f"📨 [SSE] Sent partial candidate to session {session_id}")
+            
+        except Exception as e:
+            self.logger.error(f"❌ [SSE] Failed to send partial: {e}")
+    
     async def send_complete(self, session_id: str, response_text: str, menu_data: Optional[Dict[str, Any]] = None, confirmation_data: Optional[Dict[str, Any]] = None):
         """完了メッセージを送信"""
         try:
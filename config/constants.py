@@ -13,3 +13,22 @@ DEFAULT_RECIPE_IMAGE_URL = os.getenv(
     "http://localhost:8000/static/no-photo.png"
 )
 
+# 調味料キーワードリスト（ベクトルDB構築時の食材除外・RAG検索のクエリ計画で使用）
+SEASONING_KEYWORDS = [
+    # 基本調味料
+    '醤油', 'しょうゆ', '砂糖', '塩', '胡椒', 'こしょう', '酒', 'みりん', '酢',
+    # 油類
+    '油', 'ごま油', 'サラダ油', 'バター', 'マーガリン', 'オリーブオイル',
+    # 発酵調味料
+    '味噌', 'みそ', 'だし', 'コンソメ', 'ブイヨン',
+    # ソース類
+    'ケチャップ', 'マヨネーズ', 'マスタード', 'ウスターソース', 'オイスターソース',
+    # 香辛料
+    'わさび', 'からし', 'しょうが', 'にんにく', 'ねぎ', 'みつば', 'しそ', '大葉',
+    # その他
+    '片栗粉', '小麦粉', 'パン粉', 'ベーキングパウダー', '重曹',
+    # 追加の調味料
+    '薄力粉', 'グラニュー糖', '中華スープのもと', '白ワイン', '赤ワイン',
+    '一味唐辛子', '鶏がらスープの素', '鶏がらスープのもと', '鶏がらスープ',
+    'ウェイパー', '合わせ調味料'
+]
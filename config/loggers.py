@@ -94,20 +94,21 @@ def log_execution_time_async(func):
     return wrapper
 
 
-def log_prompt_with_tokens(prompt: str, max_tokens: int = 4000, logger_name: str = "llm", show_full_prompt: bool = False):
-    """プロンプトとトークン数情報をログに記録"""
+def log_prompt_with_tokens(prompt: str, max_tokens: int = 4000, logger_name: str = "llm", show_full_prompt: bool = False, model: str = ""):
+    """プロンプトとトークン数情報をログに記録（トークン数はモデルのトークナイザーで計測）"""
+    from mcp_servers.token_accounting import count_tokens
     logger = get_logger(logger_name)
     
-    estimated_tokens = len(prompt) // 4
+    estimated_tokens = count_tokens(prompt, model)
     token_usage_ratio = estimated_tokens / max_tokens
     
-    logger.debug(f"🔤 [PROMPT] 予想トークン数: {estimated_tokens}/{max_tokens} ({token_usage_ratio:.1%})")
+    logger.debug(f"🔤 [PROMPT] トークン数: {estimated_tokens}/{max_tokens} ({token_usage_ratio:.1%})")
     
     # トークン数超過警告
-    if token_usage_ratio > 0.8:
-        logger.warning(f"⚠️ [PROMPT] トークン数が80%を超過: {token_usage_ratio:.1%}")
-    elif token_usage_ratio > 1.0:
+    if token_usage_ratio > 1.0:
         logger.error(f"❌ [PROMPT] トークン数が上限を超過: {token_usage_ratio:.1%}")
+    elif token_usage_ratio > 0.8:
+        logger.warning(f"⚠️ [PROMPT] トークン数が80%を超過: {token_usage_ratio:.1%}")
     
     # プロンプト内容の表示制御
     if show_full_prompt:
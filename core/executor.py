@@ -10,6 +10,7 @@ from typing import List, Dict, Any, Set, Optional
 from .models import Task, TaskStatus, TaskChainManager, ExecutionResult
 from .exceptions import TaskExecutionError, CircularDependencyError, AmbiguityDetected
 from .service_coordinator import ServiceCoordinator
+from mcp_servers.candidate_stream import decode_candidate_event
 from config.loggers import GenericLogger
 
 
@@ -206,6 +207,7 @@ class TaskExecutor:
         """Execute a single task with data injection."""
         try:
             self.logger.info(f"🚀 [EXECUTOR] タスク {task.id} を開始します: {task.service}.{task.method}")
+            plan_type = None
             
             # 利用回数制限チェック（献立提案機能）
             if task.service == "recipe_service" and task.method == "generate_menu_plan":
@@ -245,6 +247,9 @@ class TaskExecutor:
                 increment_result = await subscription_service.increment_usage(user_id, "menu_step", client)
                 if not increment_result.get("success"):
                     self.logger.warning(f"⚠️ [EXECUTOR] menu_step 利用回数のインクリメントに失敗しました: {increment_result.get('error')}")
+                
+                # 提案の高速モード（レイテンシ予算）はプランごとに決まるため、プランをツールへ渡す
+                plan_type = limit_info.get("plan_type")
             
             # Inject data from previous tasks
             injected_params = self._inject_data(task.parameters, previous_results)
@@ -263,6 +268,8 @@ class TaskExecutor:
             # Phase 3A: sse_session_idをparametersに追加（generate_proposalsのみ）
             if task_chain_manager and task_chain_manager.sse_session_id and task.method == "generate_proposals":
                 injected_params["sse_session_id"] = task_chain_manager.sse_session_id
+            if plan_type and task.method == "generate_proposals":
+                injected_params["plan_type"] = plan_type
             
             # RAG検索結果のURLを利用してWeb検索をスキップする処理
             # search_recipes_from_webの場合、task3の結果からrag_resultsを構築
@@ -305,8 +312,15 @@ class TaskExecutor:
                         injected_params["rag_results"] = rag_results
                         self.logger.debug(f"🔍 [EXECUTOR] URL付きRAG候補{len(rag_results)}件のrag_resultsを追加しました")
             
+            # 提案タスクは候補が揃うたびにSSEの partial イベントで送信（最終レスポンスを待たない）
+            progress_handler = None
+            if task_chain_manager and task_chain_manager.sse_session_id and task.method == "generate_proposals":
+                progress_handler = self._build_candidate_progress_handler(
+                    task, task_chain_manager, injected_params.get("category")
+                )
+            
             result = await self.service_coordinator.execute_service(
-                task.service, task.method, injected_params, token
+                task.service, task.method, injected_params, token, progress_handler=progress_handler
             )
             
             self.logger.debug(f"📤 [EXECUTOR] Task {task.id} output result: {result}")
@@ -317,6 +331,15 @@ class TaskExecutor:
             self.logger.error(f"❌ [EXECUTOR] タスク {task.id} が失敗しました: {str(e)}")
             raise
     
+    def _build_candidate_progress_handler(self, task: Task, task_chain_manager: TaskChainManager, category: Optional[str]):
+        """MCPツールの進捗通知から提案候補を取り出してSSEへ転送する関数を作成"""
+        async def on_progress(progress: float, total: Optional[float], message: Optional[str]) -> None:
+            candidate = decode_candidate_event(message)
+            if candidate is not None:
+                task_chain_manager.send_partial(task.id, candidate, category)
+        
+        return on_progress
+    
     def _inject_data(self, parameters: Dict[str, Any], previous_results: Dict[str, Any]) -> Dict[str, Any]:
         """Inject data from previous task results into parameters (辞書構造対応版)."""
         injected = parameters.copy()
@@ -374,6 +397,11 @@ class TaskExecutor:
                         
                         if isinstance(inventory_data, dict) and inventory_data.get("success"):
                             items = inventory_data.get("result", {}).get("data", [])
+                            # 賞味期限の近い順に並べる（期限なしは末尾、RAG検索のクエリ計画で優先度に使用）
+                            items = sorted(
+                                items,
+                                key=lambda item: (item.get("expiry_date") is None, item.get("expiry_date") or "")
+                            )
                             item_names = [item.get("item_name") for item in items if item.get("item_name")]
                             injected[key] = item_names
                             self.logger.debug(f"🔗 [EXECUTOR] Injected {len(item_names)} items from {task_ref} to {key}")
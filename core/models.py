@@ -172,6 +172,30 @@ class TaskChainManager:
                 logger = logging.getLogger("core.models")
                 logger.error(f"❌ [TaskChainManager] SSE progress send failed: {e}")
     
+    def send_partial(self, task_id: str, candidate: Dict[str, Any], category: Optional[str] = None) -> None:
+        """Send a proposal candidate via SSE as soon as it is available."""
+        if self.sse_session_id:
+            try:
+                from api.utils.sse_manager import get_sse_sender
+                sse_sender = get_sse_sender()
+                
+                partial_data = {
+                    "task_id": task_id,
+                    "category": category,
+                    "candidate": candidate
+                }
+                self.logger.debug(f"📨 [TaskChainManager] Sending partial candidate: {candidate.get('title', '')} ({candidate.get('source', '')})")
+                
+                # 進捗送信と同様にタスクとしてスケジュール（送信順は保たれる）
+                import asyncio
+                asyncio.get_running_loop().create_task(sse_sender.send_partial(
+                    self.sse_session_id,
+                    partial_data
+                ))
+            except Exception as e:
+                # SSE送信エラーはログに記録するが、処理は継続
+                self.logger.error(f"❌ [TaskChainManager] SSE partial send failed: {e}")
+    
     def send_complete(self, final_response: str, menu_data: Optional[Dict[str, Any]] = None, confirmation_data: Optional[Dict[str, Any]] = None) -> None:
         """Send completion notification via SSE."""
         self.logger.debug(f"🔍 [TaskChainManager] send_completeメソッドが呼び出されました")
@@ -6,7 +6,7 @@ Core LayerとService Layerの橋渡しを担当
 ToolRouterの一元管理とサービス呼び出しの調整を提供
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable, Awaitable
 from services.tool_router import ToolRouter
 from config.loggers import GenericLogger
 
@@ -19,8 +19,15 @@ class ServiceCoordinator:
         self.tool_router = ToolRouter()
         self.logger = GenericLogger("core", "service_coordinator")
     
-    async def execute_service(self, service: str, method: str, parameters: Dict[str, Any], token: str) -> Any:
-        """サービスメソッドの実行"""
+    async def execute_service(
+        self,
+        service: str,
+        method: str,
+        parameters: Dict[str, Any],
+        token: str,
+        progress_handler: Optional[Callable[[float, Optional[float], Optional[str]], Awaitable[None]]] = None
+    ) -> Any:
+        """サービスメソッドの実行（progress_handler はツールの進捗通知を受け取る）"""
         try:
             # Phase 3A: 提案タスク実行前に主要食材をセッションに保存
             if service == "recipe_service" and method == "generate_proposals":
@@ -71,6 +78,9 @@ class ServiceCoordinator:
                             
                             parameters["excluded_recipes"] = all_excluded
                             self.logger.debug(f"📝 [ServiceCoordinator] Added {len(proposed_titles)} proposed {category} recipes to excluded list (total: {len(all_excluded)} recipes)")
+                            
+                            # 追加提案（同じカテゴリの提案済みがある）はLLMのレスポンスキャッシュを使わずに再生成
+                            parameters["fresh"] = True
                         else:
                             self.logger.debug(f"📝 [ServiceCoordinator] No proposed {category} recipes found in session")
                 
@@ -78,7 +88,9 @@ class ServiceCoordinator:
                 self.logger.debug(f"🔧 [ServiceCoordinator] Passing sse_session_id to MCP tool for session-based exclusion")
             
             # ToolRouterのroute_service_methodを使用してサービス名・メソッド名からMCPツールをルーティング
-            result = await self.tool_router.route_service_method(service, method, parameters, token)
+            result = await self.tool_router.route_service_method(
+                service, method, parameters, token, progress_handler=progress_handler
+            )
             
             # Check for ambiguity detection
             if isinstance(result, dict) and result.get("status") == "ambiguity_detected":
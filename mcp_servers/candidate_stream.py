@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+提案候補の逐次配信
+
+LLMのストリーミング出力（{"candidates": [{...}, {...}]} 形式のJSON）を受け取りながら、
+配列の要素が閉じた時点で1件ずつ取り出す増分パーサーと、MCPの進捗通知で候補を
+API側（SSE）へ送るためのメッセージ形式を提供する。
+
+    parser = IncrementalCandidateParser()
+    async for delta in stream:
+        for candidate in parser.feed(delta):
+            ...  # 完成した候補をすぐに送る
+
+MCPサーバー（別プロセス）からは Context.report_progress の message に
+encode_candidate_event の結果を載せ、API側の progress_handler で
+decode_candidate_event して TaskChainManager.send_partial に渡す。
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+from config.loggers import GenericLogger
+
+logger = GenericLogger("mcp", "candidate_stream", initialize_logging=False)
+
+# 進捗通知メッセージのイベント名
+CANDIDATE_EVENT = "candidate"
+
+
+class IncrementalCandidateParser:
+    """ストリーミング中のJSONから候補配列の要素を逐次取り出すパーサー"""
+
+    def __init__(self, array_key: str = "candidates"):
+        """
+        初期化
+
+        Args:
+            array_key: 候補配列のキー
+        """
+        self._marker = f'"{array_key}"'
+        self._buffer = ""
+        # 走査済みの位置
+        self._pos = 0
+        # 配列の開始（"[" の次）を見つけたか / 配列が閉じたか
+        self._in_array = False
+        self._done = False
+        # 走査中の要素の状態
+        self._object_start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        出力の断片を追加し、新たに完成した候補を返す
+
+        Args:
+            text: ストリーミングで受け取った断片
+
+        Returns:
+            この断片で閉じた候補（辞書）のリスト
+        """
+        if self._done or not text:
+            return []
+        self._buffer += text
+        if not self._in_array and not self._find_array_start():
+            return []
+
+        completed = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = i
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self._decode(buffer[self._object_start:i + 1])
+                    if candidate is not None:
+                        completed.append(candidate)
+                    self._object_start = None
+            elif char == "]" and self._depth == 0:
+                self._done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return completed
+
+    def _find_array_start(self) -> bool:
+        """候補配列の "[" を探す（見つかれば走査位置をその次に進める）"""
+        marker = self._buffer.find(self._marker)
+        if marker < 0:
+            return False
+        bracket = self._buffer.find("[", marker + len(self._marker))
+        if bracket < 0:
+            return False
+        self._in_array = True
+        self._pos = bracket + 1
+        return True
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            candidate = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ [Stream] 候補のJSONを解析できませんでした: {e}")
+            return None
+        return candidate if isinstance(candidate, dict) else None
+
+
+def encode_candidate_event(candidate: Dict[str, Any]) -> str:
+    """候補を進捗通知のメッセージに変換"""
+    return json.dumps({"event": CANDIDATE_EVENT, "candidate": candidate}, ensure_ascii=False)
+
+
+def decode_candidate_event(message: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    進捗通知のメッセージから候補を取り出す
+
+    Returns:
+        候補（候補イベント以外のメッセージの場合は None）
+    """
+    if not message:
+        return None
+    try:
+        payload = json.loads(message)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(payload, dict) or payload.get("event") != CANDIDATE_EVENT:
+        return None
+    candidate = payload.get("candidate")
+    return candidate if isinstance(candidate, dict) else None
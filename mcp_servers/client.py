@@ -5,11 +5,12 @@ This module provides the MCP client for tool communication with authentication.
 """
 
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
 from config.loggers import GenericLogger
+from mcp_servers.token_accounting import attribution_meta
 
 # .envファイルを読み込み
 load_dotenv()
@@ -120,8 +121,18 @@ class MCPClient:
         
         return self.mcp_clients[server_name]
     
-    async def call_tool(self, tool_name: str, parameters: Dict[str, Any], token: str) -> Dict[str, Any]:
-        """FastMCPクライアントでツールを呼び出し（stdio接続）"""
+    async def call_tool(
+        self,
+        tool_name: str,
+        parameters: Dict[str, Any],
+        token: str,
+        progress_handler: Optional[Callable[[float, Optional[float], Optional[str]], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        FastMCPクライアントでツールを呼び出し（stdio接続）
+        
+        progress_handler を指定すると、ツール実行中の進捗通知（提案候補の逐次配信など）を受け取る。
+        """
         self.logger.debug(f"🔧 [MCP] Calling tool")
         self.logger.debug(f"🔍 [MCP] Tool name: {tool_name}")
         self.logger.debug(f"📝 [MCP] Parameters: {parameters}")
@@ -145,9 +156,12 @@ class MCPClient:
             parameters_with_token = parameters.copy()
             parameters_with_token['token'] = token
 
-            # stdio接続でツールを呼び出し
+            # stdio接続でツールを呼び出し（トークン集計のパターンは _meta で引き継ぐ）
             async with mcp_client:
-                call_result = await mcp_client.call_tool(tool_name, parameters_with_token)
+                call_result = await mcp_client.call_tool(
+                    tool_name, parameters_with_token, progress_handler=progress_handler,
+                    meta=attribution_meta() or None
+                )
             
             # CallToolResultから実際のデータを抽出
             if hasattr(call_result, 'structured_content') and call_result.structured_content:
@@ -12,6 +12,7 @@ from typing import Callable, Any, Dict
 from supabase import Client
 from mcp_servers.utils import get_authenticated_client
 from config.loggers import GenericLogger
+from mcp_servers.token_accounting import attribution_from_meta, token_attribution
 
 logger = GenericLogger("mcp", "recipe_decorators", initialize_logging=False)
 
@@ -52,6 +53,15 @@ def authenticated_tool(func: Callable) -> Callable:
     return wrapper
 
 
+def _request_attribution() -> Dict[str, str]:
+    """呼び出し元（APIプロセス）から _meta で渡された集計先（MCPリクエスト外では空）"""
+    try:
+        from fastmcp.server.dependencies import get_context
+        return attribution_from_meta(get_context().request_context.meta)
+    except Exception:
+        return {}
+
+
 def logged_tool(func: Callable) -> Callable:
     """
     ログ出力を自動化するデコレータ
@@ -78,7 +88,9 @@ def logged_tool(func: Callable) -> Callable:
         logger.debug(f"🔍 [RECIPE] パラメータ: {log_params}")
         
         try:
-            result = await func(*args, **kwargs)
+            # ツール内のLLM呼び出しのトークン数をツール・ユーザー・パターン別に集計（MCPサーバーは別プロセスのため）
+            with token_attribution(operation=func_name, user_id=kwargs.get("user_id"), **_request_attribution()):
+                result = await func(*args, **kwargs)
             
             if isinstance(result, dict):
                 if result.get("success"):
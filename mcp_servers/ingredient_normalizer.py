@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+食材名の正規化（RAG・セッション・OCR・APIルートで共通）
+
+- normalize_ingredient_key: 比較用キー（NFKC → 小文字 → カタカナをひらがなに統一 → 空白・記号除去 → 別名の統一）
+- to_katakana: ひらがなをカタカナに変換（ベクトル検索クエリ用の表記）
+- clean_product_name: OCRで読み取った商品名からサイズ・状態・ブランド・説明の表記を除去
+
+いずれも str.translate と事前コンパイル済みの正規表現で処理し、結果をLRUキャッシュする。
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Tuple
+
+# カタカナ（ァ〜ヶ）→ ひらがな（ぁ〜ゖ）の変換表
+_KATAKANA_TO_HIRAGANA = str.maketrans({chr(code): chr(code - 0x60) for code in range(0x30A1, 0x30F7)})
+# ひらがな（ぁ〜ん）→ カタカナ（ァ〜ン）の変換表
+_HIRAGANA_TO_KATAKANA = str.maketrans({chr(code): chr(code + 0x60) for code in range(ord('ぁ'), ord('ん') + 1)})
+
+# 比較時に除去する空白と記号（NFKC後の半角記号も含む）
+_SEPARATOR_PATTERN = re.compile(r'[\s　\-－\(\)（）・，、。．,.]+')
+
+# 食材名の別名（正規化キーが同じになるよう代表表記に統一）
+INGREDIENT_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "鶏もも肉": ("鶏腿肉", "とりもも肉", "鳥もも肉"),
+    "鶏むね肉": ("鶏胸肉", "とりむね肉", "鳥むね肉"),
+    "鶏ひき肉": ("鶏挽肉", "鶏挽き肉", "鶏ミンチ"),
+    "豚ひき肉": ("豚挽肉", "豚挽き肉", "豚ミンチ"),
+    "牛ひき肉": ("牛挽肉", "牛挽き肉", "牛ミンチ"),
+    "合いびき肉": ("合い挽き肉", "合挽肉", "合挽き肉", "合びき肉", "あいびき肉"),
+    "たまねぎ": ("玉ねぎ", "玉葱"),
+    "にんじん": ("人参",),
+    "じゃがいも": ("じゃが芋", "馬鈴薯"),
+    "さつまいも": ("さつま芋", "薩摩芋"),
+    "ねぎ": ("葱",),
+    "長ねぎ": ("長葱", "白ねぎ", "白葱"),
+    "しょうが": ("生姜",),
+    "にんにく": ("大蒜",),
+    "きゅうり": ("胡瓜",),
+    "なす": ("茄子", "なすび"),
+    "ほうれん草": ("ほうれんそう", "菠薐草"),
+    "小松菜": ("こまつな",),
+    "白菜": ("はくさい",),
+    "大根": ("だいこん",),
+    "しいたけ": ("椎茸",),
+    "卵": ("玉子", "たまご", "鶏卵"),
+    "醤油": ("しょうゆ", "しょう油"),
+    "ごま": ("胡麻",),
+    "豆腐": ("とうふ",),
+}
+
+
+def _base_key(name: str) -> str:
+    """別名統一前の比較用キー"""
+    normalized = unicodedata.normalize("NFKC", name).lower()
+    normalized = normalized.translate(_KATAKANA_TO_HIRAGANA)
+    return _SEPARATOR_PATTERN.sub('', normalized)
+
+
+# 別名の正規化キー → 代表表記の正規化キー
+_ALIAS_KEYS: Dict[str, str] = {
+    _base_key(alias): _base_key(canonical)
+    for canonical, aliases in INGREDIENT_ALIASES.items()
+    for alias in aliases
+}
+# 別名を部分文字列として1回で置換（長い別名を優先。「新玉ねぎ」なども代表表記に揃う）
+_ALIAS_PATTERN = re.compile(
+    '|'.join(re.escape(alias) for alias in sorted(_ALIAS_KEYS, key=len, reverse=True))
+)
+
+
+@lru_cache(maxsize=8192)
+def normalize_ingredient_key(name: str) -> str:
+    """
+    食材名を比較用キーに正規化
+
+    全角英数字・半角カナはNFKCで統一し、カタカナはひらがなに、
+    空白と記号は除去、別名（部分文字列を含む）は代表表記のキーに統一する。
+
+    Args:
+        name: 食材名
+
+    Returns:
+        比較用キー（空の場合は空文字列）
+    """
+    if not name:
+        return ""
+    return _ALIAS_PATTERN.sub(lambda match: _ALIAS_KEYS[match.group(0)], _base_key(name))
+
+
+@lru_cache(maxsize=8192)
+def to_katakana(text: str) -> str:
+    """ひらがなをカタカナに変換"""
+    if not text:
+        return ""
+    return text.translate(_HIRAGANA_TO_KATAKANA)
+
+
+# OCR商品名の除去パターン（適用順を保持）
+_PRODUCT_NAME_PATTERNS = tuple(
+    re.compile(pattern, flags=re.IGNORECASE)
+    for pattern in (
+        # サイズ表記を削除（末尾）
+        r'\s*バラ\s*$',
+        r'\s*大\s*$',
+        r'\s*小\s*$',
+        r'\s*中\s*$',
+        r'\s*特大\s*$',
+        r'\s*特小\s*$',
+        # 状態表記を削除（先頭・末尾）
+        r'^生\s*',
+        r'^国産\s*',
+        r'\s*国産\s*$',
+        r'^成分無調整\s*',
+        r'\s*成分無調整\s*$',
+        # ブランド名を削除（先頭）
+        r'^新ＢＰ\s*',
+        r'^ＢＰ\s*',
+        r'^新\s*',
+        # 商品説明を削除（中間・末尾）
+        r'\s*コクのある\s*',
+        r'\s*もっちり\s*',
+        r'\s*仕込み\s*',
+    )
+)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def clean_product_name(item_name: str) -> str:
+    """
+    OCRで読み取った商品名から食材名のみを抽出
+
+    Args:
+        item_name: 商品名
+
+    Returns:
+        サイズ・状態・ブランド・説明の表記を除去した食材名
+    """
+    if not item_name:
+        return item_name
+
+    normalized = item_name.strip()
+    for pattern in _PRODUCT_NAME_PATTERNS:
+        normalized = pattern.sub('', normalized)
+
+    # 余分な空白を削除
+    return _WHITESPACE_PATTERN.sub(' ', normalized).strip()
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+LLMゲートウェイ（プロセス共通のOpenAIクライアント）
+
+LLMClient・RecipeLLM・LLMConstraintSolver・OCRService・RecipeEmbeddingsService・
+OpenAIEmbeddings が個別にOpenAIクライアント（= HTTPコネクションプール）を作ると、
+TLSハンドシェイクとプールのウォームアップが重複し、全体の同時実行数やタイムアウトも
+統一できない。本モジュールはプロセスで1つの調整済みHTTPクライアント
+（keep-alive・HTTP/2・コネクション上限・タイムアウト）を保持し、全呼び出し元で共有する。
+
+    gateway = get_llm_gateway()
+    client = gateway.client_for("recipe")          # AsyncOpenAIと同じ呼び出し形式
+    model = gateway.model_for("recipe", "gpt-4o-mini")
+    response = await client.chat.completions.create(model=model, messages=[...])
+
+用途（purpose）ごとに LLM_MODEL_<PURPOSE> でモデルを切り替えられ、
+呼び出しごとのレイテンシとトークン数を用途別に集計する（get_metrics）。
+同じユーザー・用途・引数の呼び出しが同時に実行中の場合は1回のAPI呼び出しの結果を共有する
+（single-flight、ストリーミングを除く）。
+stream_chat_completion は本文の差分を逐次返す（候補の逐次表示用）。
+全ての呼び出しのトークン数（事前のトークナイザー計測と usage）とコストは
+token_accounting の TokenLedger に記録する。
+API呼び出しは resilience の ProviderGuard("openai") を通し、同時実行数（LLM_MAX_CONCURRENCY）・
+用途別の適応タイムアウト・サーキットブレーカーを適用する（open の間は ProviderUnavailableError）。
+
+環境変数:
+    LLM_HTTP2=true                    # HTTP/2を使用
+    LLM_HTTP_MAX_CONNECTIONS=20       # 同時接続数の上限
+    LLM_HTTP_MAX_KEEPALIVE=10         # keep-aliveで保持する接続数
+    LLM_HTTP_KEEPALIVE_EXPIRY=60      # keep-alive接続の保持秒数
+    LLM_HTTP_CONNECT_TIMEOUT=5        # 接続タイムアウト（秒）
+    LLM_HTTP_TIMEOUT=60               # 読み込み・書き込みタイムアウト（秒）
+    LLM_MAX_CONCURRENCY=16            # プロセス全体の同時API呼び出し数
+    LLM_MODEL_<PURPOSE>=...           # 用途別のモデル（例: LLM_MODEL_OCR=gpt-4o）
+"""
+
+import os
+import time
+import asyncio
+import threading
+import importlib.util
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+import httpx
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from config.loggers import GenericLogger
+from mcp_servers.resilience import ProviderTimeoutError, get_provider_guard
+from mcp_servers.single_flight import SingleFlight, build_flight_key
+from mcp_servers.token_accounting import (
+    count_input_tokens, count_message_tokens, get_token_attribution, get_token_ledger
+)
+
+load_dotenv()
+
+logger = GenericLogger("mcp", "llm_gateway", initialize_logging=False)
+
+DEFAULT_HTTP2 = True
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_CONCURRENCY = 16
+# 適応タイムアウトの最小値（秒）。最大値は LLM_HTTP_TIMEOUT
+DEFAULT_MIN_CALL_TIMEOUT = 10.0
+# 用途ごとに保持するレイテンシの件数（p50/p95の計算用）
+LATENCY_WINDOW = 1000
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class PurposeMetrics:
+    """用途1つ分の呼び出し統計"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, latency_ms: float, usage: Any = None, error: bool = False) -> None:
+        self.calls += 1
+        self.latencies_ms.append(latency_ms)
+        if error:
+            self.errors += 1
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = list(self.latencies_ms)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_p50_ms": _percentile(latencies, 50),
+            "latency_p95_ms": _percentile(latencies, 95),
+        }
+
+
+class _ChatCompletions:
+    def __init__(self, gateway: "LLMGateway", purpose: str):
+        self._gateway = gateway
+        self._purpose = purpose
+
+    async def create(self, **kwargs):
+        return await self._gateway.chat_completion(self._purpose, **kwargs)
+
+
+class _Chat:
+    def __init__(self, gateway: "LLMGateway", purpose: str):
+        self.completions = _ChatCompletions(gateway, purpose)
+
+
+class _Embeddings:
+    def __init__(self, gateway: "LLMGateway", purpose: str):
+        self._gateway = gateway
+        self._purpose = purpose
+
+    async def create(self, **kwargs):
+        return await self._gateway.create_embeddings(self._purpose, **kwargs)
+
+
+class GatewayClient:
+    """用途を固定したクライアント（AsyncOpenAI の chat.completions / embeddings と同じ呼び出し形式）"""
+
+    def __init__(self, gateway: "LLMGateway", purpose: str):
+        self.purpose = purpose
+        self.chat = _Chat(gateway, purpose)
+        self.embeddings = _Embeddings(gateway, purpose)
+
+
+class LLMGateway:
+    """プロセス共通のOpenAIクライアントと呼び出し統計"""
+
+    def __init__(self, api_key: Optional[str] = None):
+        """
+        初期化（HTTPクライアントは最初の呼び出し時に作成）
+
+        Args:
+            api_key: OpenAI APIキー。未指定時は OPENAI_API_KEY
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.http2 = _env_flag("LLM_HTTP2", DEFAULT_HTTP2)
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("⚠️ [LLM Gateway] h2 がインストールされていないため HTTP/1.1 を使用します (pip install 'httpx[http2]')")
+            self.http2 = False
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY))
+        )
+        self.timeout = httpx.Timeout(
+            float(os.getenv("LLM_HTTP_TIMEOUT", DEFAULT_TIMEOUT)),
+            connect=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+        )
+        self.max_concurrency = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+
+        self._lock = threading.RLock()
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self._sync_http_client: Optional[httpx.Client] = None
+        self._openai_client: Optional[AsyncOpenAI] = None
+        # プロバイダーの同時実行数・適応タイムアウト・サーキットブレーカー
+        self.guard = get_provider_guard(
+            "openai",
+            max_concurrency=self.max_concurrency,
+            min_timeout=DEFAULT_MIN_CALL_TIMEOUT,
+            max_timeout=self.timeout.read
+        )
+        self._metrics: Dict[str, PurposeMetrics] = {}
+        # 同時実行中の同一リクエストの集約
+        self.single_flight = SingleFlight("llm_gateway")
+        # トークン数・コストの集計
+        self.token_ledger = get_token_ledger()
+
+    @property
+    def async_http_client(self) -> httpx.AsyncClient:
+        """共有の非同期HTTPクライアント（OpenAIEmbeddings の http_async_client にも渡す）"""
+        if self._async_http_client is None:
+            with self._lock:
+                if self._async_http_client is None:
+                    self._async_http_client = httpx.AsyncClient(
+                        http2=self.http2, limits=self.limits, timeout=self.timeout
+                    )
+        return self._async_http_client
+
+    @property
+    def sync_http_client(self) -> httpx.Client:
+        """共有の同期HTTPクライアント（OpenAIEmbeddings の同期呼び出し用）"""
+        if self._sync_http_client is None:
+            with self._lock:
+                if self._sync_http_client is None:
+                    self._sync_http_client = httpx.Client(
+                        http2=self.http2, limits=self.limits, timeout=self.timeout
+                    )
+        return self._sync_http_client
+
+    @property
+    def openai_client(self) -> AsyncOpenAI:
+        """共有HTTPクライアントを使うAsyncOpenAI"""
+        if self._openai_client is None:
+            with self._lock:
+                if self._openai_client is None:
+                    self._openai_client = AsyncOpenAI(
+                        api_key=self.api_key,
+                        http_client=self.async_http_client,
+                        timeout=self.timeout
+                    )
+                    logger.info(
+                        f"📡 [LLM Gateway] OpenAIクライアントを初期化: http2={self.http2}, "
+                        f"max_connections={self.limits.max_connections}, "
+                        f"max_concurrency={self.max_concurrency}"
+                    )
+        return self._openai_client
+
+    def client_for(self, purpose: str) -> GatewayClient:
+        """用途を固定したクライアントを取得"""
+        return GatewayClient(self, purpose)
+
+    def model_for(self, purpose: str, default: str) -> str:
+        """用途のモデル（LLM_MODEL_<PURPOSE> → 呼び出し元の既定値）"""
+        return os.getenv(f"LLM_MODEL_{purpose.upper()}") or default
+
+    def _record(self, purpose: str, model: str, start: float, usage: Any = None, error: bool = False) -> None:
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._metrics.setdefault(purpose, PurposeMetrics()).record(latency_ms, usage, error)
+        if error:
+            logger.warning(f"⚠️ [LLM Gateway] {purpose} ({model}) 失敗: {latency_ms:.0f}ms")
+        else:
+            logger.debug(
+                f"📡 [LLM Gateway] {purpose} ({model}): {latency_ms:.0f}ms, "
+                f"tokens={getattr(usage, 'prompt_tokens', 0)}+{getattr(usage, 'completion_tokens', 0) or 0}"
+            )
+
+    @staticmethod
+    def _flight_scope(purpose: str) -> str:
+        """single-flightのスコープ（用途 + ユーザー。異なるユーザーの同一プロンプトは集約しない）"""
+        return f"{purpose}:{get_token_attribution().get('user_id', '')}"
+
+    async def _with_timeout(self, operation: str, coro):
+        """用途別の適応タイムアウトを適用して待つ"""
+        timeout = self.guard.timeout_for(operation)
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            raise ProviderTimeoutError(f"openai: {operation} が {timeout:.1f}秒以内に完了しませんでした")
+
+    async def chat_completion(self, purpose: str, **kwargs):
+        """
+        チャット補完（chat.completions.create と同じ引数）
+
+        同じユーザー・用途・引数の呼び出しが実行中の場合はその結果を共有する（ストリーミングを除く）。
+
+        Args:
+            purpose: 用途（統計の集計単位）
+            **kwargs: chat.completions.create の引数
+
+        Returns:
+            ChatCompletion
+        """
+        if kwargs.get("stream"):
+            return await self._chat_completion(purpose, **kwargs)
+        key = build_flight_key("chat.completions", kwargs, self._flight_scope(purpose))
+        return await self.single_flight.do(key, lambda: self._chat_completion(purpose, **kwargs))
+
+    async def _chat_completion(self, purpose: str, **kwargs):
+        model = kwargs.get("model", "")
+        estimated_prompt_tokens = count_message_tokens(kwargs.get("messages", []), model)
+        operation = f"chat:{purpose}"
+        async with self.guard.slot(operation):
+            start = time.perf_counter()
+            try:
+                response = await self._with_timeout(operation, self.openai_client.chat.completions.create(**kwargs))
+            except Exception:
+                self._record(purpose, model, start, error=True)
+                raise
+        self._record(purpose, model, start, getattr(response, "usage", None))
+        self.token_ledger.record(purpose, model, estimated_prompt_tokens, getattr(response, "usage", None))
+        return response
+
+    async def stream_chat_completion(
+        self,
+        purpose: str,
+        on_usage: Optional[Callable[[Any], None]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        ストリーミングのチャット補完（本文の差分を受信順に返す）
+
+        同時実行数の枠は最後の差分を受け取るまで保持し、統計には完了までのレイテンシと
+        最終チャンクの usage を記録する。
+
+        Args:
+            purpose: 用途（統計の集計単位）
+            on_usage: 最後まで受信した後に最終チャンクの usage（なければNone）を渡す関数
+            **kwargs: chat.completions.create の引数（stream は自動で指定）
+
+        Yields:
+            本文の差分
+        """
+        model = kwargs.get("model", "")
+        estimated_prompt_tokens = count_message_tokens(kwargs.get("messages", []), model)
+        kwargs = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+        usage = None
+        # ストリームは全体の長さが出力量で変わるため適応タイムアウトは適用しない（HTTPの読み込みタイムアウトのみ）
+        async with self.guard.slot(f"stream:{purpose}"):
+            start = time.perf_counter()
+            first_delta_ms = None
+            try:
+                stream = await self.openai_client.chat.completions.create(**kwargs)
+                async with stream:
+                    async for chunk in stream:
+                        if getattr(chunk, "usage", None) is not None:
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if first_delta_ms is None:
+                                first_delta_ms = (time.perf_counter() - start) * 1000
+                                logger.debug(f"📡 [LLM Gateway] {purpose} ({model}) 最初の差分まで {first_delta_ms:.0f}ms")
+                            yield delta
+            except Exception:
+                self._record(purpose, model, start, error=True)
+                raise
+        self._record(purpose, model, start, usage)
+        self.token_ledger.record(purpose, model, estimated_prompt_tokens, usage)
+        if on_usage is not None:
+            on_usage(usage)
+
+    async def create_embeddings(self, purpose: str, **kwargs):
+        """
+        埋め込み（embeddings.create と同じ引数、同一ユーザー・同一引数の同時呼び出しは結果を共有）
+
+        Args:
+            purpose: 用途（統計の集計単位）
+            **kwargs: embeddings.create の引数
+
+        Returns:
+            CreateEmbeddingResponse
+        """
+        key = build_flight_key("embeddings", kwargs, self._flight_scope(purpose))
+        return await self.single_flight.do(key, lambda: self._create_embeddings(purpose, **kwargs))
+
+    async def _create_embeddings(self, purpose: str, **kwargs):
+        model = kwargs.get("model", "")
+        estimated_prompt_tokens = count_input_tokens(kwargs.get("input"), model)
+        operation = f"embeddings:{purpose}"
+        async with self.guard.slot(operation):
+            start = time.perf_counter()
+            try:
+                response = await self._with_timeout(operation, self.openai_client.embeddings.create(**kwargs))
+            except Exception:
+                self._record(purpose, model, start, error=True)
+                raise
+        self._record(purpose, model, start, getattr(response, "usage", None))
+        self.token_ledger.record(purpose, model, estimated_prompt_tokens, getattr(response, "usage", None))
+        return response
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """用途 → 呼び出し数・エラー数・トークン数・レイテンシ p50/p95（ms）（サーキットの状態は get_resilience_metrics）"""
+        return {purpose: metrics.to_dict() for purpose, metrics in self._metrics.items()}
+
+    async def aclose(self) -> None:
+        """共有HTTPクライアントを閉じる"""
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+        if self._sync_http_client is not None:
+            self._sync_http_client.close()
+        self._async_http_client = None
+        self._sync_http_client = None
+        self._openai_client = None
+
+
+# グローバルインスタンス（プロセスで1つ）
+_llm_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """LLMゲートウェイのシングルトンを取得"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        _llm_gateway = LLMGateway()
+    return _llm_gateway
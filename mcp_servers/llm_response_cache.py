@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+LLMレスポンスキャッシュ
+
+チャット補完のリクエスト（モデル・メッセージ・temperature・max_tokens）のハッシュをキーに、
+レスポンス本文をTTL・件数上限付きで保持する。リトライ・二重タップ・同じ在庫とカテゴリでの
+再生成など、直前と同一のプロンプトはAPIを呼ばずにキャッシュから返す。
+
+メモリ（LRU）を1段目、SQLite（LLM_RESPONSE_CACHE_PATH 指定時のみ）を2段目とし、
+SQLiteはプロセス再起動やMCPサーバーの複数プロセス間でも共有される。
+
+除外レシピ（excluded_recipes）はプロンプトに含まれるため、追加提案で除外が変われば
+別のキーになる。呼び出し元が fresh=True を指定した場合は読み込みを省略して再生成し、
+結果でエントリを更新する。
+期限切れのエントリもメモリの件数上限までは残し、API障害時のフォールバック（get_stale）に使う。
+
+環境変数:
+    LLM_RESPONSE_CACHE_TTL=600      # 有効期限（秒）
+    LLM_RESPONSE_CACHE_SIZE=512     # メモリの最大エントリ数（0で無効）
+    LLM_RESPONSE_CACHE_PATH=        # SQLiteファイルのパス（未設定時はメモリのみ）
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from config.loggers import GenericLogger
+
+logger = GenericLogger("mcp", "llm_response_cache", initialize_logging=False)
+
+# キャッシュ設定（環境変数で上書き可能）
+DEFAULT_TTL_SECONDS = 600.0
+DEFAULT_MAX_ENTRIES = 512
+
+
+def build_response_cache_key(model: str, messages: List[Dict[str, Any]], **params: Any) -> str:
+    """
+    チャット補完リクエストのキャッシュキー（SHA-256）を作成
+
+    Args:
+        model: モデル名
+        messages: メッセージリスト
+        **params: temperature・max_tokens などの生成パラメータ
+
+    Returns:
+        16進のハッシュ文字列
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """TTL・件数上限（LRU）付きのLLMレスポンスキャッシュ（メモリ + 任意のSQLite）"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        sqlite_path: Optional[str] = None
+    ):
+        """
+        初期化
+
+        Args:
+            ttl_seconds: 有効期限（秒）。未指定時は LLM_RESPONSE_CACHE_TTL（既定600秒）
+            max_entries: メモリの最大エントリ数。未指定時は LLM_RESPONSE_CACHE_SIZE（既定512件）
+            sqlite_path: SQLiteファイルのパス。未指定時は LLM_RESPONSE_CACHE_PATH（空ならメモリのみ）
+        """
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("LLM_RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        if max_entries is None:
+            max_entries = int(os.getenv("LLM_RESPONSE_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+        if sqlite_path is None:
+            sqlite_path = os.getenv("LLM_RESPONSE_CACHE_PATH", "")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # キー → (登録時刻（UNIX秒）, レスポンス本文, 節約できるトークン数)
+        self._entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path and max_entries > 0:
+            self._db = self._open_sqlite(sqlite_path)
+
+        self.memory_hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stale_hits = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def _open_sqlite(path: str) -> Optional[sqlite3.Connection]:
+        """SQLiteを開く（失敗時はメモリのみで動作）"""
+        try:
+            db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, content TEXT NOT NULL, tokens INTEGER NOT NULL)"
+            )
+            logger.info(f"💾 [LLM Cache] SQLiteキャッシュを使用します: {path}")
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ [LLM Cache] SQLiteキャッシュを開けないためメモリのみで動作します ({path}): {e}")
+            return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, fresh: bool = False) -> Optional[str]:
+        """
+        キャッシュ済みのレスポンス本文を取得
+
+        Args:
+            key: build_response_cache_key で作成したキー
+            fresh: Trueの場合は読み込まない（再生成させる）
+
+        Returns:
+            レスポンス本文（キャッシュなし・期限切れ・fresh指定時はNone）
+        """
+        if self.max_entries <= 0:
+            return None
+        if fresh:
+            self.bypasses += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self.tokens_saved += entry[2]
+                return entry[1]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT created_at, content, tokens FROM llm_responses WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ [LLM Cache] SQLiteの読み込みに失敗しました: {e}")
+                    row = None
+                if row is not None and now - row[0] <= self.ttl_seconds:
+                    self._store_memory(key, row[0], row[1], row[2])
+                    self.sqlite_hits += 1
+                    self.tokens_saved += row[2]
+                    return row[1]
+
+            self.misses += 1
+            return None
+
+    def get_stale(self, key: str) -> Optional[str]:
+        """
+        有効期限を問わずレスポンス本文を取得（APIが失敗したときのフォールバック用）
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            レスポンス本文（エントリがない場合はNone）
+        """
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            content = entry[1] if entry is not None else None
+            if content is None and self._db is not None:
+                try:
+                    row = self._db.execute("SELECT content FROM llm_responses WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ [LLM Cache] SQLiteの読み込みに失敗しました: {e}")
+                    row = None
+                content = row[0] if row is not None else None
+            if content is not None:
+                self.stale_hits += 1
+            return content
+
+    def put(self, key: str, content: str, usage: Any = None) -> None:
+        """
+        レスポンス本文を登録
+
+        Args:
+            key: キャッシュキー
+            content: レスポンス本文
+            usage: APIレスポンスの usage（ヒット時に節約したトークン数の集計に使用）
+        """
+        if self.max_entries <= 0 or content is None:
+            return
+        tokens = getattr(usage, "total_tokens", 0) or 0
+        created_at = time.time()
+        with self._lock:
+            self._store_memory(key, created_at, content, tokens)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_responses (key, created_at, content, tokens) VALUES (?, ?, ?, ?)",
+                        (key, created_at, content, tokens)
+                    )
+                    # 期限切れの行を削除
+                    self._db.execute("DELETE FROM llm_responses WHERE created_at < ?", (created_at - self.ttl_seconds,))
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ [LLM Cache] SQLiteへの書き込みに失敗しました: {e}")
+
+    def _store_memory(self, key: str, created_at: float, content: str, tokens: int) -> None:
+        self._entries[key] = (created_at, content, tokens)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """エントリを削除（解析できなかったレスポンスを再利用しないため）"""
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ [LLM Cache] SQLiteからの削除に失敗しました: {e}")
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_responses")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """ヒット数・ミス数・ヒット率・節約したトークン数"""
+        hits = self.memory_hits + self.sqlite_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "sqlite_hits": self.sqlite_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+# グローバルインスタンス（プロセスで1つ）
+_llm_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """LLMレスポンスキャッシュのシングルトンを取得"""
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        _llm_response_cache = LLMResponseCache()
+    return _llm_response_cache
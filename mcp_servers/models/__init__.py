@@ -7,10 +7,24 @@ from mcp_servers.models.recipe_models import (
     MenuResult,
     WebSearchResult
 )
+from mcp_servers.models.llm_output_models import (
+    PlannerTask,
+    PlannerResponse,
+    DishOutput,
+    MenuTitlesOutput,
+    CandidatesOutput,
+    MenuSelectionOutput
+)
 
 __all__ = [
     "RecipeProposal",
     "MenuResult",
-    "WebSearchResult"
+    "WebSearchResult",
+    "PlannerTask",
+    "PlannerResponse",
+    "DishOutput",
+    "MenuTitlesOutput",
+    "CandidatesOutput",
+    "MenuSelectionOutput"
 ]
 
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+LLM output models - LLMの構造化出力（JSONスキーマ）の型定義
+
+各LLM呼び出しの応答形式をPydanticモデルで定義する。response_format の JSONスキーマは
+これらのモデルから生成し（mcp_servers.structured_output 参照）、応答は model_validate_json で
+一度のJSONデコードと検証により型付きの結果に変換する。
+
+フィールドの既定値は検証時のみ使用する（送信するスキーマでは全フィールドが必須）。
+"""
+
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class PlannerTask(BaseModel):
+    """タスク分解の1タスク"""
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = Field(default=None, description="タスクID（task1, task2, ...）")
+    service: str = Field(..., description="サービス名")
+    method: str = Field(..., description="メソッド名")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="メソッドの引数")
+    dependencies: List[str] = Field(default_factory=list, description="依存するタスクID")
+
+
+class PlannerResponse(BaseModel):
+    """タスク分解の応答"""
+    model_config = ConfigDict(extra="allow")
+
+    tasks: List[PlannerTask] = Field(default_factory=list, description="タスクリスト")
+
+
+class DishOutput(BaseModel):
+    """料理1品（タイトルと使用食材）"""
+    model_config = ConfigDict(extra="forbid")
+
+    title: str = Field(default="", description="レシピタイトル")
+    ingredients: List[str] = Field(default_factory=list, description="このレシピで使用する食材")
+
+
+class MenuTitlesOutput(BaseModel):
+    """献立タイトル生成（主菜・副菜・汁物）の応答"""
+    model_config = ConfigDict(extra="forbid")
+
+    main_dish: DishOutput = Field(default_factory=DishOutput, description="主菜")
+    side_dish: DishOutput = Field(default_factory=DishOutput, description="副菜")
+    soup: DishOutput = Field(default_factory=DishOutput, description="汁物")
+    ingredients_used: List[str] = Field(default_factory=list, description="献立全体で使用する食材")
+
+    def to_menu_data(self) -> Dict[str, Any]:
+        """RecipeLLM.generate_menu_titles の data 形式に変換"""
+        return {
+            "main_dish": self.main_dish.title,
+            "side_dish": self.side_dish.title,
+            "soup": self.soup.title,
+            "main_dish_ingredients": list(self.main_dish.ingredients),
+            "side_dish_ingredients": list(self.side_dish.ingredients),
+            "soup_ingredients": list(self.soup.ingredients),
+            "ingredients_used": list(self.ingredients_used),
+        }
+
+
+class CandidatesOutput(BaseModel):
+    """候補生成（主菜・副菜・汁物・その他）の応答"""
+    model_config = ConfigDict(extra="forbid")
+
+    candidates: List[DishOutput] = Field(default_factory=list, description="候補")
+
+
+class MenuSelectionOutput(BaseModel):
+    """献立候補からの選択（LLMConstraintSolver）の応答"""
+    model_config = ConfigDict(extra="forbid")
+
+    main_dish: DishOutput = Field(default_factory=DishOutput, description="主菜")
+    side_dish: DishOutput = Field(default_factory=DishOutput, description="副菜")
+    soup: DishOutput = Field(default_factory=DishOutput, description="汁物")
+    selection_reason: str = Field(default="", description="選択理由")
@@ -8,8 +8,8 @@ OpenAI Embeddings APIを使用してレシピテキストの埋め込みを生
 
 import os
 from typing import List, Dict, Any
-from openai import OpenAI
 from dotenv import load_dotenv
+from mcp_servers.llm_gateway import get_llm_gateway
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,11 +20,12 @@ class RecipeEmbeddingsService:
     def __init__(self):
         """初期化"""
         load_dotenv()
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        gateway = get_llm_gateway()
+        self.client = gateway.client_for("embedding")
         # 環境変数から埋め込みモデルを取得
-        self.model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+        self.model = gateway.model_for("embedding", os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"))
         
-        if not self.client.api_key:
+        if not gateway.api_key:
             raise ValueError("OPENAI_API_KEYが設定されていません")
     
     async def generate_recipe_embedding(self, recipe_text: str) -> List[float]:
@@ -38,7 +39,7 @@ class RecipeEmbeddingsService:
             埋め込みベクトル
         """
         try:
-            response = self.client.embeddings.create(
+            response = await self.client.embeddings.create(
                 model=self.model,
                 input=recipe_text
             )
@@ -61,7 +62,7 @@ class RecipeEmbeddingsService:
             # 食材リストを文字列に結合
             ingredients_text = " ".join(ingredients)
             
-            response = self.client.embeddings.create(
+            response = await self.client.embeddings.create(
                 model=self.model,
                 input=ingredients_text
             )
@@ -81,7 +82,7 @@ class RecipeEmbeddingsService:
             埋め込みベクトル
         """
         try:
-            response = self.client.embeddings.create(
+            response = await self.client.embeddings.create(
                 model=self.model,
                 input=query
             )
@@ -6,11 +6,17 @@ This module provides LLM-based recipe title generation functionality.
 
 import os
 import asyncio
-from typing import Dict, Any, List, Optional
-from openai import AsyncOpenAI
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from dotenv import load_dotenv
 
 from config.loggers import GenericLogger, log_prompt_with_tokens
+from mcp_servers.llm_gateway import get_llm_gateway
+from mcp_servers.llm_response_cache import build_response_cache_key, get_llm_response_cache
+from mcp_servers.candidate_stream import IncrementalCandidateParser
+from mcp_servers.models.llm_output_models import CandidatesOutput, MenuTitlesOutput
+from mcp_servers.structured_output import json_schema_response_format, parse_structured, structured_output_enabled
+from mcp_servers.token_accounting import count_message_tokens, count_tokens
 
 # .envファイルを読み込み
 load_dotenv()
@@ -24,18 +30,122 @@ class RecipeLLM:
         
         # 環境変数から設定を取得
         self.api_key = os.getenv('OPENAI_API_KEY')
-        self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+        self.gateway = get_llm_gateway()
+        gateway = self.gateway
+        self.model = gateway.model_for("recipe", os.getenv('OPENAI_MODEL', 'gpt-4o-mini'))
         self.temperature = float(os.getenv('OPENAI_TEMPERATURE', '0.8'))
         
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY is required")
         
-        # OpenAIクライアントを初期化
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        # OpenAIクライアントを初期化（プロセス共通のLLMゲートウェイを使用）
+        self.client = gateway.client_for("recipe")
+        # 同一プロンプトのレスポンスキャッシュ（リトライ・二重タップ対策）
+        self.response_cache = get_llm_response_cache()
+        # JSONスキーマで応答形式を固定するか（LLM_STRUCTURED_OUTPUT）
+        self.structured_output = structured_output_enabled()
         
         self.logger.debug(f"🤖 [LLM] Initialized")
         self.logger.debug(f"🔍 [LLM] Model: {self.model}, temperature: {self.temperature}")
     
+    async def _complete(
+        self,
+        prompt: str,
+        max_tokens: int,
+        fresh: bool = False,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, str]:
+        """
+        チャット補完（同一プロンプトはレスポンスキャッシュから返す）
+        
+        Args:
+            prompt: プロンプト
+            max_tokens: 最大トークン数
+            fresh: Trueの場合はキャッシュを読まずに再生成（結果でキャッシュを更新）
+            on_delta: 指定時はストリーミングで呼び出し、本文の差分ごとに呼ぶ
+                      （キャッシュヒット時は本文全体で1回呼ぶ）
+            response_format: 応答形式（JSONスキーマ）。None の場合は指定しない
+        
+        Returns:
+            (レスポンス本文, キャッシュキー)
+        """
+        messages = [{"role": "user", "content": prompt}]
+        params: Dict[str, Any] = {"temperature": self.temperature, "max_tokens": max_tokens}
+        if response_format is not None:
+            params["response_format"] = response_format
+        cache_key = build_response_cache_key(self.model, messages, **params)
+        cached = self.response_cache.get(cache_key, fresh=fresh)
+        if cached is not None:
+            self.logger.debug(f"⚡ [LLM] Response cache hit")
+            if on_delta is not None:
+                await on_delta(cached)
+            return cached, cache_key
+        
+        delivered = False
+        forward = None
+        if on_delta is not None:
+            async def forward(delta: str) -> None:
+                nonlocal delivered
+                delivered = True
+                await on_delta(delta)
+        
+        try:
+            return await self._request_completion(messages, params, cache_key, forward), cache_key
+        except Exception as e:
+            # API障害時（サーキット open・タイムアウトを含む）は期限切れのキャッシュがあれば使う
+            # （ストリーミングで差分を送信済みの場合は本文が混ざるため使わない）
+            stale = None if delivered else self.response_cache.get_stale(cache_key)
+            if stale is None:
+                raise
+            self.logger.warning(f"⚠️ [LLM] API呼び出しに失敗したため期限切れのキャッシュを使用します: {e}")
+            if on_delta is not None:
+                await on_delta(stale)
+            return stale, cache_key
+    
+    async def _request_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        params: Dict[str, Any],
+        cache_key: str,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
+        """APIを呼び出してレスポンス本文を取得し、キャッシュに登録"""
+        if on_delta is not None:
+            parts = []
+            usage = None
+            
+            def capture_usage(value: Any) -> None:
+                nonlocal usage
+                usage = value
+            
+            async for delta in self.gateway.stream_chat_completion(
+                "recipe",
+                on_usage=capture_usage,
+                model=self.model,
+                messages=messages,
+                **params
+            ):
+                parts.append(delta)
+                await on_delta(delta)
+            content = "".join(parts)
+            if getattr(usage, "total_tokens", None) is None:
+                # 最終チャンクに usage がない場合はプロンプトと本文のトークン数で代用
+                usage = SimpleNamespace(
+                    total_tokens=count_message_tokens(messages, self.model) + count_tokens(content, self.model)
+                )
+            self.response_cache.put(cache_key, content, usage)
+            return content
+        
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **params
+        )
+        content = response.choices[0].message.content
+        self.response_cache.put(cache_key, content, getattr(response, "usage", None))
+        return content
+    
     # 食材重複抑止機能
     # - プロンプト内で「食材の重複を避ける」と明示的に指示
     # - LLMが1回の推論で主菜・副菜・汁物の3品構成を生成
@@ -46,7 +156,8 @@ class RecipeLLM:
         self, 
         inventory_items: List[str], 
         menu_type: str,
-        excluded_recipes: List[str] = None
+        excluded_recipes: List[str] = None,
+        fresh: bool = False
     ) -> Dict[str, Any]:
         """
         LLM推論による独創的な献立タイトル生成
@@ -55,6 +166,7 @@ class RecipeLLM:
             inventory_items: 在庫食材リスト
             menu_type: 献立のタイプ
             excluded_recipes: 除外するレシピタイトル
+            fresh: Trueの場合はレスポンスキャッシュを使わずに再生成
         
         Returns:
             生成された献立タイトルの候補リスト
@@ -73,18 +185,19 @@ class RecipeLLM:
             prompt = self._build_menu_prompt(inventory_items, menu_type, excluded_recipes)
             
             # プロンプトロギング
-            log_prompt_with_tokens(prompt, max_tokens=1000, logger_name="mcp.recipe_llm")
+            log_prompt_with_tokens(prompt, max_tokens=1000, logger_name="mcp.recipe_llm", model=self.model)
             
-            # LLM呼び出し
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=1000
+            # LLM呼び出し（同一プロンプトはキャッシュから返す）
+            response_format = json_schema_response_format(MenuTitlesOutput) if self.structured_output else None
+            content, cache_key = await self._complete(
+                prompt, max_tokens=1000, fresh=fresh, response_format=response_format
             )
             
             # レスポンスを解析
-            menu_titles = self._parse_menu_response(response.choices[0].message.content)
+            menu_titles = self._parse_menu_response(content)
+            if not any(menu_titles.get(field) for field in ("main_dish", "side_dish", "soup")):
+                # 解析できなかったレスポンスは再利用しない
+                self.response_cache.discard(cache_key)
             
             self.logger.debug(f"✅ [LLM] Generated menu titles")
             self.logger.debug(f"📊 [LLM] Generated {len(menu_titles)} menu titles")
@@ -153,6 +266,12 @@ ingredients_usedは献立全体で使用される食材のリストです。
             # デバッグ: レスポンス内容をログに記録
             self.logger.debug(f"🔍 [LLM] Parsing response content (length: {len(response_content)}): {response_content[:1000]}")
             
+            # 構造化出力: スキーマどおりのJSONを1回のデコードで変換
+            if self.structured_output:
+                parsed = parse_structured(response_content, MenuTitlesOutput)
+                if parsed is not None:
+                    return parsed.to_menu_data()
+            
             # まず、マークダウンコードブロック内のJSONを抽出
             json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_content, re.DOTALL)
             if json_match:
@@ -404,7 +523,9 @@ ingredients_usedは献立全体で使用される食材のリストです。
         used_ingredients: List[str] = None,  # 副菜・汁物用（主菜で使った食材）
         excluded_recipes: List[str] = None,
         count: int = 2,
-        category_detail_keyword: str = None  # otherカテゴリ用
+        category_detail_keyword: str = None,  # otherカテゴリ用
+        fresh: bool = False,
+        on_candidate: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         汎用候補生成メソッド（主菜・副菜・汁物・その他対応）
@@ -418,6 +539,8 @@ ingredients_usedは献立全体で使用される食材のリストです。
             excluded_recipes: 除外レシピ
             count: 生成件数
             category_detail_keyword: category_detailのキーワード（otherカテゴリ用）
+            fresh: Trueの場合はレスポンスキャッシュを使わずに再生成
+            on_candidate: 指定時はストリーミングで生成し、候補が1件完成するごとに呼ぶ
         """
         try:
             # カテゴリ別のプロンプトを構築
@@ -431,18 +554,28 @@ ingredients_usedは献立全体で使用される食材のリストです。
             self.logger.debug(f"🔍 [LLM] Count: {count}")
             
             # プロンプトロギング
-            log_prompt_with_tokens(prompt, max_tokens=1000, logger_name="mcp.recipe_llm")
+            log_prompt_with_tokens(prompt, max_tokens=1000, logger_name="mcp.recipe_llm", model=self.model)
             
-            # LLM呼び出し
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=1000
+            # LLM呼び出し（同一プロンプトはキャッシュから返す）
+            on_delta = None
+            if on_candidate is not None:
+                parser = IncrementalCandidateParser()
+                
+                async def on_delta(delta: str) -> None:
+                    for candidate in parser.feed(delta):
+                        self._ensure_candidate_ingredients(candidate)
+                        await on_candidate(candidate)
+            
+            response_format = json_schema_response_format(CandidatesOutput) if self.structured_output else None
+            content, cache_key = await self._complete(
+                prompt, max_tokens=1000, fresh=fresh, on_delta=on_delta, response_format=response_format
             )
             
-            # レスポンスを解析
-            candidates = self._parse_candidate_response(response.choices[0].message.content)
+            # レスポンスを解析（逐次送信した候補と同じ内容を全文から確定する）
+            candidates = self._parse_candidate_response(content)
+            if not candidates:
+                # 解析できなかったレスポンスは再利用しない
+                self.response_cache.discard(cache_key)
             
             self.logger.debug(f"✅ [LLM] Generated {category} candidates")
             self.logger.debug(f"📊 [LLM] Generated {len(candidates)} {category} candidates")
@@ -534,12 +667,28 @@ ingredients_usedは献立全体で使用される食材のリストです。
 """
         return prompt
 
+    def _ensure_candidate_ingredients(self, candidate: Dict[str, Any]) -> None:
+        """候補にingredientsがない場合は空リストを設定"""
+        if "ingredients" not in candidate:
+            self.logger.warning(f"⚠️ [LLM] Candidate '{candidate.get('title', 'N/A')}' missing 'ingredients' field, setting to empty list")
+            candidate["ingredients"] = []  # デフォルト値
+        else:
+            ingredients = candidate.get("ingredients", [])
+            self.logger.debug(f"✅ [LLM] Candidate '{candidate.get('title', 'N/A')}' has {len(ingredients)} ingredients: {ingredients}")
+
     def _parse_candidate_response(self, response_content: str) -> List[Dict[str, Any]]:
         """LLMレスポンスを解析して候補を抽出（汎用版）"""
         try:
             import json
             import re
             
+            # 構造化出力: スキーマどおりのJSONを1回のデコードで変換
+            if self.structured_output:
+                parsed = parse_structured(response_content, CandidatesOutput)
+                if parsed is not None:
+                    self.logger.debug(f"🔍 [LLM] Parsed {len(parsed.candidates)} candidates from structured output")
+                    return [candidate.model_dump() for candidate in parsed.candidates]
+            
             # JSON部分を抽出
             json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
             if json_match:
@@ -551,13 +700,8 @@ ingredients_usedは献立全体で使用される食材のリストです。
                 self.logger.debug(f"🔍 [LLM] Parsed {len(candidates)} candidates from LLM response")
                 
                 # ingredientsが含まれていることを確認
-                for i, candidate in enumerate(candidates):
-                    if "ingredients" not in candidate:
-                        self.logger.warning(f"⚠️ [LLM] Candidate {i+1} ('{candidate.get('title', 'N/A')}') missing 'ingredients' field, setting to empty list")
-                        candidate["ingredients"] = []  # デフォルト値
-                    else:
-                        ingredients = candidate.get("ingredients", [])
-                        self.logger.debug(f"✅ [LLM] Candidate {i+1} ('{candidate.get('title', 'N/A')}') has {len(ingredients)} ingredients: {ingredients}")
+                for candidate in candidates:
+                    self._ensure_candidate_ingredients(candidate)
                 
                 return candidates
             
@@ -568,5 +712,17 @@ ingredients_usedは献立全体で使用される食材のリストです。
             return []
 
 
+# グローバルLLMクライアントインスタンス
+_recipe_llm: Optional[RecipeLLM] = None
+
+
+def get_recipe_llm() -> RecipeLLM:
+    """LLMクライアントのシングルトン取得"""
+    global _recipe_llm
+    if _recipe_llm is None:
+        _recipe_llm = RecipeLLM()
+    return _recipe_llm
+
+
 if __name__ == "__main__":
     print("✅ Recipe LLM module loaded successfully")
@@ -15,12 +15,15 @@ from typing import Dict, Any, List, Optional, Union
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_context
 
-from mcp_servers.recipe_llm import RecipeLLM
-from mcp_servers.recipe_rag import RecipeRAGClient
+from mcp_servers.recipe_llm import get_recipe_llm
+from mcp_servers.recipe_rag import get_recipe_rag_client
 from mcp_servers.utils import get_authenticated_client
 from mcp_servers.decorators import authenticated_tool, logged_tool, error_handled_tool
-from mcp_servers.services.recipe_service import RecipeService
+from mcp_servers.services.recipe_service import RecipeService, get_proposal_latency_budget
+from mcp_servers.candidate_stream import encode_candidate_event
+from mcp_servers.token_accounting import preload_encodings
 from config.loggers import GenericLogger
 
 # .envファイルを読み込み
@@ -29,9 +32,9 @@ load_dotenv()
 # MCPサーバー初期化
 mcp = FastMCP("Recipe MCP Server")
 
-# 処理クラスのインスタンス
-llm_client = RecipeLLM()
-rag_client = RecipeRAGClient()
+# 処理クラスのインスタンス（RecipeServiceと共有するシングルトン）
+llm_client = get_recipe_llm()
+rag_client = get_recipe_rag_client()
 recipe_service = RecipeService()
 logger = GenericLogger("mcp", "recipe_server", initialize_logging=False)
 
@@ -278,6 +281,8 @@ async def generate_proposals(
     sse_session_id: str = None,
     token: str = None,
     category_detail_keyword: Optional[str] = None,
+    plan_type: Optional[str] = None,
+    fresh: bool = False,
     client: Any = None
 ) -> Dict[str, Any]:
     """
@@ -287,6 +292,8 @@ async def generate_proposals(
         category: "main", "sub", "soup", "other"
         used_ingredients: すでに使った食材（副菜・汁物で使用）
         menu_category: 献立カテゴリ（汁物の判断に使用）
+        plan_type: ユーザーのプラン（free, pro, ultimate）。高速モードのレイテンシ予算の決定に使用
+        fresh: Trueの場合はLLMのレスポンスキャッシュを使わずに再生成（追加提案）
         client: 認証済みSupabaseクライアント（デコレータが自動注入）
     """
     return await recipe_service.generate_proposals(
@@ -297,12 +304,44 @@ async def generate_proposals(
         main_ingredient=main_ingredient,
         used_ingredients=used_ingredients,
         excluded_recipes=excluded_recipes,
-        category_detail_keyword=category_detail_keyword
+        category_detail_keyword=category_detail_keyword,
+        on_candidate=_build_candidate_reporter() if sse_session_id else None,
+        latency_budget=get_proposal_latency_budget(plan_type),
+        late_result_key=sse_session_id,
+        fresh=fresh
     )
 
 
+def _build_candidate_reporter():
+    """
+    完成した候補をMCPの進捗通知で呼び出し元（API側のSSE）へ送る関数を作成
+    
+    Returns:
+        候補を受け取る非同期関数（リクエストコンテキスト外の場合は None）
+    """
+    try:
+        ctx = get_context()
+    except RuntimeError:
+        return None
+    sent = 0
+    
+    async def report(candidate: Dict[str, Any]) -> None:
+        nonlocal sent
+        sent += 1
+        await ctx.report_progress(progress=sent, message=encode_candidate_event(candidate))
+    
+    return report
 
 
 if __name__ == "__main__":
     logger.debug("🚀 レシピMCPサーバーを起動中")
+    # 初回リクエストでストア読み込みが発生しないよう起動時にウォームアップ
+    try:
+        rag_client.warm_up(
+            run_dummy_query=os.getenv("RAG_WARMUP_DUMMY_QUERY", "false").lower() == "true"
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ [RECIPE] RAGウォームアップに失敗しました（初回検索時に読み込みます）: {e}")
+    # トークン計測のエンコーディング（初回はダウンロードが発生しうる）をリクエスト前に読み込む
+    preload_encodings([llm_client.model, rag_client.llm_model])
     mcp.run()
@@ -5,6 +5,6 @@ Recipe RAG パッケージ
 レシピRAG検索機能を提供するパッケージ
 """
 
-from .client import RecipeRAGClient
+from .client import RecipeRAGClient, get_recipe_rag_client
 
-__all__ = ["RecipeRAGClient"]
+__all__ = ["RecipeRAGClient", "get_recipe_rag_client"]
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+RAG候補キャッシュ
+
+実際に実行する検索クエリ計画（plan_query の結果）と検索条件をキーに、
+スコアリング・ソート済みの候補リストを保持する。
+除外レシピ（excluded_recipes）はキーに含めず、取得時の後段フィルタで適用するため、
+同じ在庫・主要食材・カテゴリでの「もっと見る」は検索処理を省略できる。
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
+from .ingredient_index import normalize_title
+from .query_planner import QueryPlan
+
+# キャッシュ設定（環境変数で上書き可能）
+DEFAULT_TTL_SECONDS = 600.0
+DEFAULT_MAX_ENTRIES = 256
+
+CacheKey = Tuple[Any, ...]
+
+
+def build_candidate_cache_key(
+    category: str,
+    query_plan: QueryPlan,
+    menu_type: str,
+    main_ingredient: Optional[str] = None,
+    category_detail_keyword: Optional[str] = None
+) -> CacheKey:
+    """
+    候補キャッシュのキーを作成
+
+    食材は検索で実際に使う計画（クエリ食材の並び・二次食材）をそのまま使う。
+    上限件数で切り詰めた結果は入力順に依存し、表記揺れの食材もベクトル検索のクエリ文字列は
+    異なるため、正規化・ソートした集合ではなく実行するクエリ計画で区別する。
+
+    Args:
+        category: "main", "sub", "soup", "other"
+        query_plan: 検索クエリ計画（plan_query の結果）
+        menu_type: 献立タイプ
+        main_ingredient: 主要食材
+        category_detail_keyword: category_detailのキーワード
+
+    Returns:
+        キャッシュキー
+    """
+    return (
+        category,
+        tuple(query_plan.primary_items),
+        tuple(query_plan.secondary_items),
+        main_ingredient or "",
+        menu_type or "",
+        category_detail_keyword or "",
+    )
+
+
+class CandidateCache:
+    """TTL・件数上限（LRU）付きのRAG候補キャッシュ"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            ttl_seconds: 有効期限（秒）。未指定時は RAG_CANDIDATE_CACHE_TTL（既定600秒）
+            max_entries: 最大エントリ数。未指定時は RAG_CANDIDATE_CACHE_SIZE（既定256件）
+        """
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("RAG_CANDIDATE_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        if max_entries is None:
+            max_entries = int(os.getenv("RAG_CANDIDATE_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # キー → (登録時刻, 候補リスト, 全件取得済みか)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[Dict[str, Any]], bool]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        """有効期限内のエントリがあるか"""
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds
+
+    def get(
+        self,
+        key: CacheKey,
+        excluded_titles: Set[str],
+        limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        キャッシュ済み候補から除外レシピを取り除いて上位limit件を取得
+
+        Args:
+            key: キャッシュキー
+            excluded_titles: 除外する正規化タイトルの集合
+            limit: 取得件数
+
+        Returns:
+            候補リスト（キャッシュなし・期限切れ・除外後に件数不足の場合はNone）
+        """
+        entry = self._entries.get(key)
+        if entry is None or self.max_entries <= 0:
+            self.misses += 1
+            return None
+
+        stored_at, candidates, is_complete = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        results = [
+            dict(candidate) for candidate in candidates
+            if normalize_title(candidate.get("title", "")) not in excluded_titles
+        ][:limit]
+
+        # 除外で件数が不足し、さらに下位の候補がありうる場合は再検索させる
+        if len(results) < limit and not is_complete:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return results
+
+    def put(self, key: CacheKey, candidates: List[Dict[str, Any]], is_complete: bool) -> None:
+        """
+        候補リストを登録
+
+        Args:
+            key: キャッシュキー
+            candidates: 除外レシピ適用前のスコア順候補リスト
+            is_complete: 検索条件に該当する候補をすべて含むか
+        """
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), [dict(candidate) for candidate in candidates], is_complete)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        self._entries.clear()
@@ -7,15 +7,16 @@ Recipe RAG クライアント
 """
 
 import os
+import time
 from typing import List, Dict, Any, Optional
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import logging
 
 # ロガーの設定
 from config.loggers import GenericLogger
+from mcp_servers.llm_gateway import get_llm_gateway
 logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
 
 # ルートロガーを取得してハンドラーを設定
@@ -25,9 +26,33 @@ if not root_logger.handlers:
     setup_logging(initialize=False)  # ローテーションなし
 
 # 機能モジュールのインポート
-from .search import RecipeSearchEngine
+from .search import RecipeSearchEngine, normalize_excluded_titles
 from .menu_format import MenuFormatter
 from .llm_solver import LLMConstraintSolver
+from .title_index import RecipeTitleIndex
+from .cache import CandidateCache, build_candidate_cache_key
+from .query_planner import plan_query
+from .embedding_batcher import EmbeddingBatcher
+from .lexical_embeddings import (
+    CharNgramEmbeddings,
+    LEXICAL_BACKEND,
+    LEXICAL_COLLECTION_NAME,
+    OPENAI_BACKEND,
+    get_embedding_backend,
+)
+
+# 候補キャッシュに保持する件数（limitに対する倍率）
+CANDIDATE_CACHE_DEPTH = 4
+
+
+def _get_rss_mb() -> float:
+    """プロセスの常駐メモリ（RSS, MB）を取得（取得できない場合は0.0）"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
 
 
 class RecipeRAGClient:
@@ -44,41 +69,51 @@ class RecipeRAGClient:
         self.vector_db_path_other = os.getenv("CHROMA_PERSIST_DIRECTORY_OTHER", "./recipe_vector_db_other_2")
         
         # 環境変数から埋め込みモデルを取得
-        embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
-        self.embeddings = OpenAIEmbeddings(model=embedding_model)
+        gateway = get_llm_gateway()
+        embedding_model = gateway.model_for("embedding", os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"))
+        # HTTPコネクションプールはLLMゲートウェイと共有
+        self.embeddings = OpenAIEmbeddings(
+            model=embedding_model,
+            http_client=gateway.sync_http_client,
+            http_async_client=gateway.async_http_client
+        )
+        # 同時実行中の検索のクエリ埋め込みを1回のAPI呼び出しにまとめる（4カテゴリで共有）
+        self.embedding_batcher = EmbeddingBatcher(self.embeddings)
         self._vectorstores = None
+        # カテゴリ → 埋め込みバックエンド（openai / char_ngram、ベクトルストア読み込み時に決定）
+        self._embedding_backends: Dict[str, str] = {}
         
         # LLMクライアントの初期化
-        self.llm_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-        self.llm_client = AsyncOpenAI()
+        self.llm_model = gateway.model_for("menu_solver", os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+        self.llm_client = gateway.client_for("menu_solver")
         
         # 機能モジュールの初期化
         self._search_engine = None
         self._menu_formatter = None
         self._llm_solver = None
+        # タイトル → URL のインデックス（Web検索の前に参照）
+        self._title_index: Optional[RecipeTitleIndex] = None
+        
+        # スコア順候補リストのキャッシュ（除外レシピは取得時に後段フィルタ）
+        self._candidate_cache = CandidateCache()
+        
+        # ベクトルストアごとの読み込み統計（warm_upで報告）
+        self._load_stats: Dict[str, Dict[str, float]] = {}
     
     def _get_vectorstores(self) -> Dict[str, Chroma]:
         """4つのベクトルストアの取得（遅延初期化）"""
         if self._vectorstores is None:
             try:
-                self._vectorstores = {
-                    "main": Chroma(
-                        persist_directory=self.vector_db_path_main,
-                        embedding_function=self.embeddings
-                    ),
-                    "sub": Chroma(
-                        persist_directory=self.vector_db_path_sub,
-                        embedding_function=self.embeddings
-                    ),
-                    "soup": Chroma(
-                        persist_directory=self.vector_db_path_soup,
-                        embedding_function=self.embeddings
-                    ),
-                    "other": Chroma(
-                        persist_directory=self.vector_db_path_other,
-                        embedding_function=self.embeddings
-                    )
-                }
+                vectorstores = {}
+                for category, path in self._get_vector_db_paths().items():
+                    start_time = time.perf_counter()
+                    rss_before = _get_rss_mb()
+                    vectorstores[category] = self._open_vectorstore(category, path)
+                    self._load_stats[category] = {
+                        "open_seconds": time.perf_counter() - start_time,
+                        "open_rss_mb": _get_rss_mb() - rss_before
+                    }
+                self._vectorstores = vectorstores
                 logger.debug(f"4つのベクトルストアを読み込みました")
                 logger.debug(f"🔍 [RAG] 主菜: {self.vector_db_path_main}")
                 logger.debug(f"🔍 [RAG] 副菜: {self.vector_db_path_sub}")
@@ -89,18 +124,134 @@ class RecipeRAGClient:
                 raise
         return self._vectorstores
     
+    def _get_vector_db_paths(self) -> Dict[str, str]:
+        """カテゴリ → ベクトルDBのディレクトリ"""
+        return {
+            "main": self.vector_db_path_main,
+            "sub": self.vector_db_path_sub,
+            "soup": self.vector_db_path_soup,
+            "other": self.vector_db_path_other
+        }
+    
+    def _open_vectorstore(self, category: str, path: str) -> Chroma:
+        """カテゴリの埋め込みバックエンドに応じたベクトルストアを開く"""
+        backend = get_embedding_backend(category)
+        if backend == LEXICAL_BACKEND:
+            if CharNgramEmbeddings.exists(path):
+                self._embedding_backends[category] = LEXICAL_BACKEND
+                logger.info(f"🔤 [RAG] {category}: 文字n-gram埋め込みを使用します")
+                return Chroma(
+                    persist_directory=path,
+                    collection_name=LEXICAL_COLLECTION_NAME,
+                    embedding_function=CharNgramEmbeddings.load(path)
+                )
+            logger.warning(
+                f"⚠️ [RAG] {category}: 文字n-gram埋め込みが構築されていないためOpenAI埋め込みを使用します "
+                f"(scripts/build_lexical_vector_db.py を実行してください)"
+            )
+        self._embedding_backends[category] = OPENAI_BACKEND
+        return Chroma(
+            persist_directory=path,
+            embedding_function=self.embeddings
+        )
+    
     def _get_search_engines(self) -> Dict[str, RecipeSearchEngine]:
         """4つの検索エンジンの取得（遅延初期化）"""
         if not hasattr(self, '_search_engines') or self._search_engines is None:
             vectorstores = self._get_vectorstores()
+            vector_db_paths = self._get_vector_db_paths()
+            # 文字n-gram埋め込みはプロセス内で計算するため、バッチディスパッチャを通さない
             self._search_engines = {
-                "main": RecipeSearchEngine(vectorstores["main"]),
-                "sub": RecipeSearchEngine(vectorstores["sub"]),
-                "soup": RecipeSearchEngine(vectorstores["soup"]),
-                "other": RecipeSearchEngine(vectorstores["other"])
+                category: RecipeSearchEngine(
+                    vectorstores[category],
+                    self.embedding_batcher if self._embedding_backends.get(category) == OPENAI_BACKEND else None,
+                    persist_directory=vector_db_paths[category]
+                )
+                for category in ("main", "sub", "soup", "other")
             }
+            # 食材トークンインデックスを事前構築（失敗時は検索時に遅延登録）
+            for category, engine in self._search_engines.items():
+                start_time = time.perf_counter()
+                rss_before = _get_rss_mb()
+                try:
+                    document_count = engine.load_index()
+                except Exception as e:
+                    logger.warning(f"⚠️ [RAG] 食材トークンインデックスの構築に失敗しました ({category}): {e}")
+                    continue
+                stats = self._load_stats.setdefault(category, {})
+                stats["documents"] = document_count
+                stats["index_seconds"] = time.perf_counter() - start_time
+                stats["index_rss_mb"] = _get_rss_mb() - rss_before
         return self._search_engines
     
+    def warm_up(self, run_dummy_query: bool = False) -> Dict[str, Dict[str, float]]:
+        """
+        ベクトルストアと食材インデックスを事前に読み込む（サーバー起動時に呼び出す）
+        
+        Args:
+            run_dummy_query: Trueの場合、各ストアでダミー検索を1回実行（埋め込みAPIを呼び出す）
+        
+        Returns:
+            カテゴリ → 読み込み統計（秒・MB・ドキュメント数）
+        """
+        start_time = time.perf_counter()
+        search_engines = self._get_search_engines()
+        self._get_title_index()
+        
+        if run_dummy_query:
+            for category, engine in search_engines.items():
+                query_start = time.perf_counter()
+                try:
+                    engine.vectorstore.similarity_search("ウォームアップ", k=1)
+                    self._load_stats.setdefault(category, {})["query_seconds"] = time.perf_counter() - query_start
+                except Exception as e:
+                    logger.warning(f"⚠️ [RAG] ウォームアップ検索に失敗しました ({category}): {e}")
+        
+        for category, stats in self._load_stats.items():
+            logger.info(
+                f"🔥 [RAG] {category}: "
+                f"open={stats.get('open_seconds', 0.0):.2f}s, "
+                f"index={stats.get('index_seconds', 0.0):.2f}s ({int(stats.get('documents', 0))}件), "
+                f"query={stats.get('query_seconds', 0.0):.2f}s, "
+                f"RSS +{stats.get('open_rss_mb', 0.0) + stats.get('index_rss_mb', 0.0):.1f}MB"
+            )
+        logger.info(f"🔥 [RAG] ウォームアップ完了: {time.perf_counter() - start_time:.2f}s, RSS {_get_rss_mb():.1f}MB")
+        return self._load_stats
+    
+    def _get_title_index(self) -> RecipeTitleIndex:
+        """タイトルインデックスの取得（遅延初期化、4つのベクトルストアの登録済みドキュメントから構築）"""
+        if self._title_index is None:
+            start_time = time.perf_counter()
+            title_index = RecipeTitleIndex()
+            for category, engine in self._get_search_engines().items():
+                title_index.add_documents(engine.get_indexed_documents(), category)
+            self._title_index = title_index
+            logger.info(
+                f"🔖 [RAG] タイトルインデックスを構築: {len(title_index)}件 "
+                f"({time.perf_counter() - start_time:.2f}s)"
+            )
+        return self._title_index
+    
+    def lookup_recipe_by_title(self, title: str) -> Optional[Dict[str, Any]]:
+        """
+        料理名に一致する（またはほぼ一致する）コーパス内のレシピを検索
+        
+        Args:
+            title: 料理名
+        
+        Returns:
+            {"title", "url", "category", "category_detail", "similarity"}（見つからない場合は None）
+        """
+        try:
+            match = self._get_title_index().lookup(title)
+        except Exception as e:
+            logger.warning(f"⚠️ [RAG] タイトルインデックスの検索に失敗しました: {e}")
+            return None
+        if match is None:
+            return None
+        logger.debug(f"🔖 [RAG] タイトル一致: '{title}' → '{match.title}' ({match.similarity:.2f})")
+        return match.to_dict()
+    
     def _get_menu_formatter(self) -> MenuFormatter:
         """メニューフォーマッターの取得（遅延初期化）"""
         if self._menu_formatter is None:
@@ -188,7 +339,8 @@ class RecipeRAGClient:
         self,
         rag_results: List[Dict[str, Any]],
         inventory_items: List[str],
-        menu_type: str
+        menu_type: str,
+        main_ingredient: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         RAG検索結果を献立形式に変換
@@ -197,20 +349,22 @@ class RecipeRAGClient:
             rag_results: RAG検索結果のリスト
             inventory_items: 在庫食材リスト
             menu_type: 献立のタイプ
+            main_ingredient: 主要食材（主菜で使われる組み合わせを優先）
         
         Returns:
             献立形式の辞書
         """
         menu_formatter = self._get_menu_formatter()
         return await menu_formatter.convert_rag_results_to_menu_format(
-            rag_results, inventory_items, menu_type
+            rag_results, inventory_items, menu_type, main_ingredient
         )
     
     async def convert_categorized_results_to_menu_format(
         self,
         categorized_results: Dict[str, List[Dict[str, Any]]],
         inventory_items: List[str],
-        menu_type: str
+        menu_type: str,
+        main_ingredient: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         3ベクトルDB検索結果を献立形式に変換（最適化版）
@@ -219,13 +373,14 @@ class RecipeRAGClient:
             categorized_results: カテゴリ別検索結果
             inventory_items: 在庫食材リスト
             menu_type: 献立のタイプ
+            main_ingredient: 主要食材（主菜で使われる組み合わせを優先）
         
         Returns:
             献立形式の辞書
         """
         menu_formatter = self._get_menu_formatter()
         return await menu_formatter.convert_categorized_results_to_menu_format(
-            categorized_results, inventory_items, menu_type
+            categorized_results, inventory_items, menu_type, main_ingredient
         )
     
     async def search_main_dish_candidates(
@@ -264,6 +419,14 @@ class RecipeRAGClient:
         
         return ingredients
 
+    def _attach_ingredients(self, results: List[Dict[str, Any]]) -> None:
+        """各結果に使用食材リストを含める"""
+        for result in results:
+            if "ingredients" not in result:
+                # contentフィールドから食材を抽出
+                content = result.get("content", "")
+                result["ingredients"] = self._extract_ingredients_from_content(content)
+    
     async def search_candidates(
         self,
         ingredients: List[str],
@@ -325,18 +488,34 @@ class RecipeRAGClient:
                 logger.info(f"⚠️ [RAG] {category}カテゴリでは主要食材'{main_ingredient}'を無視します")
                 rag_main_ingredient = None
             
-            # RAG検索（除外レシピを渡す）
-            results = await search_engine.search_similar_recipes(
-                search_query, menu_type, excluded_recipes, limit, rag_main_ingredient, category_detail_keyword
+            # キャッシュ済みの候補から除外レシピを取り除いて返す（「もっと見る」で検索を省略）
+            # キーは検索で実行するクエリ計画（使用済み食材の除外・上限件数の適用後）
+            cache_key = build_candidate_cache_key(
+                category, plan_query(search_query, rag_main_ingredient), menu_type,
+                rag_main_ingredient, category_detail_keyword
             )
+            excluded_titles = normalize_excluded_titles(excluded_recipes)
+            results = self._candidate_cache.get(cache_key, excluded_titles, limit)
+            if results is not None:
+                logger.debug(f"⚡ [RAG] {category}候補をキャッシュから取得: {len(results)}件")
+                return results
             
-            # 各結果に使用食材リストを含める
-            for result in results:
-                if "ingredients" not in result:
-                    # contentフィールドから食材を抽出
-                    content = result.get("content", "")
-                    ingredients = self._extract_ingredients_from_content(content)
-                    result["ingredients"] = ingredients
+            if cache_key not in self._candidate_cache:
+                # 除外レシピなしで多めに検索してキャッシュし、除外は後段で適用
+                cache_depth = limit * CANDIDATE_CACHE_DEPTH
+                candidates = await search_engine.search_similar_recipes(
+                    search_query, menu_type, None, cache_depth, rag_main_ingredient, category_detail_keyword
+                )
+                self._attach_ingredients(candidates)
+                self._candidate_cache.put(cache_key, candidates, is_complete=len(candidates) < cache_depth)
+                results = self._candidate_cache.get(cache_key, excluded_titles, limit)
+            
+            if results is None:
+                # 除外レシピで件数が不足する場合はRAG検索（除外レシピを渡す）
+                results = await search_engine.search_similar_recipes(
+                    search_query, menu_type, excluded_recipes, limit, rag_main_ingredient, category_detail_keyword
+                )
+                self._attach_ingredients(results)
             
             logger.debug(f"✅ [RAG] {category}候補を発見")
             logger.debug(f"📊 [RAG] {category}候補{len(results)}件を発見")
@@ -344,4 +523,16 @@ class RecipeRAGClient:
             
         except Exception as e:
             logger.error(f"❌ [RAG] {category}候補の検索に失敗: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+# グローバルRAGクライアントインスタンス
+_recipe_rag_client: Optional[RecipeRAGClient] = None
+
+
+def get_recipe_rag_client() -> RecipeRAGClient:
+    """RAGクライアントのシングルトン取得（ベクトルストアをプロセス内で共有）"""
+    global _recipe_rag_client
+    if _recipe_rag_client is None:
+        _recipe_rag_client = RecipeRAGClient()
+    return _recipe_rag_client
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+埋め込みリクエストのマイクロバッチ
+
+同時に実行される複数の検索（ユーザー・カテゴリをまたぐ）のクエリ文字列を
+短い時間窓（既定8ms）または最大件数まで集め、1回の埋め込みAPI呼び出しに
+まとめてから各コルーチンに結果を返す。
+"""
+
+import os
+import asyncio
+from typing import List, Dict, Optional, Set, Tuple
+from config.loggers import GenericLogger
+from mcp_servers.token_accounting import count_input_tokens, get_token_ledger
+
+logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
+
+# バッチ設定（環境変数で上書き可能）
+DEFAULT_WINDOW_MS = 8.0
+DEFAULT_MAX_BATCH_SIZE = 64
+
+
+class EmbeddingBatcher:
+    """クエリ埋め込みをまとめて取得するディスパッチャ"""
+
+    def __init__(
+        self,
+        embeddings,
+        window_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None
+    ):
+        """
+        初期化
+
+        Args:
+            embeddings: LangChainのEmbeddings（aembed_documents を使用）
+            window_ms: 集約する時間窓（ミリ秒）。未指定時は RAG_EMBEDDING_BATCH_WINDOW_MS
+            max_batch_size: 1回の呼び出しの最大件数。未指定時は RAG_EMBEDDING_BATCH_SIZE
+        """
+        if window_ms is None:
+            window_ms = float(os.getenv("RAG_EMBEDDING_BATCH_WINDOW_MS", DEFAULT_WINDOW_MS))
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", DEFAULT_MAX_BATCH_SIZE))
+        self.embeddings = embeddings
+        self.window_seconds = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(max_batch_size, 1)
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # 送信中タスクの参照（ガベージコレクションによる中断を防ぐ）
+        self._tasks: Set[asyncio.Task] = set()
+        self.batch_count = 0
+        self.text_count = 0
+
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        クエリ文字列の埋め込みを取得（時間窓内の他のクエリとまとめて送信）
+
+        Args:
+            text: クエリ文字列
+
+        Returns:
+            埋め込みベクトル
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(loop, immediate=True)
+        elif self._flush_handle is None:
+            self._schedule_flush(loop, immediate=False)
+
+        return await future
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, immediate: bool) -> None:
+        """送信を予約（即時または時間窓の経過後）"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if immediate:
+            batch, self._pending = self._pending, []
+            self._start_dispatch(loop, batch)
+        else:
+            self._flush_handle = loop.call_later(self.window_seconds, self._flush, loop)
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        """時間窓の経過時に溜まったクエリを送信"""
+        self._flush_handle = None
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self._start_dispatch(loop, batch)
+
+    def _start_dispatch(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """送信タスクを開始"""
+        task = loop.create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """1回の埋め込みAPI呼び出しで取得し、待機中のコルーチンに結果を返す"""
+        # 同じ文字列は1回だけ埋め込む
+        unique_texts: Dict[str, int] = {}
+        for text, _ in batch:
+            unique_texts.setdefault(text, len(unique_texts))
+
+        try:
+            vectors = await self.embeddings.aembed_documents(list(unique_texts))
+        except Exception as e:
+            logger.warning(f"⚠️ [RAG] 埋め込みのバッチ取得に失敗しました ({len(batch)}件): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # LangChainの埋め込みは usage を返さないため、トークナイザーの計測値で記録
+        model = getattr(self.embeddings, "model", "")
+        if model:
+            get_token_ledger().record("embedding", model, count_input_tokens(list(unique_texts), model))
+
+        self.batch_count += 1
+        self.text_count += len(batch)
+        logger.debug(f"📦 [RAG] 埋め込みをバッチ取得: {len(batch)}件（ユニーク{len(unique_texts)}件）")
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors[unique_texts[text]])
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+食材トークンインデックス
+
+ベクトルストア内レシピの食材文字列を事前に正規化・トークン化して保持し、
+検索時のマッチングスコア計算を集合演算と部分文字列マップで行う機能と、
+食材の転置インデックス（BM25）による語彙検索を提供
+"""
+
+import heapq
+import math
+import numpy as np
+from typing import List, Dict, Any, Tuple, FrozenSet, Optional, Set
+from langchain_core.documents import Document
+from config.loggers import GenericLogger
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+
+logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
+
+# スコア計算の重み（_calculate_match_score と同じ値）
+MAIN_INGREDIENT_WEIGHT = 5.0
+PARTIAL_MATCH_RATIO = 0.5
+# クエリ計画で上限外となった二次食材のボーナス（全二次食材が一致した場合の加点）
+SECONDARY_BONUS_WEIGHT = 0.1
+
+# BM25パラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def extract_recipe_ingredients(content: str) -> str:
+    """page_contentからレシピの食材部分を抽出"""
+    parts = content.split(' | ')
+    return parts[0] if len(parts) > 0 else ""
+
+
+def normalize_title(title: str) -> str:
+    """タイトルを正規化（大文字小文字を無視、前後の空白を除去）"""
+    return title.strip().lower()
+
+
+def _substrings(text: str) -> FrozenSet[str]:
+    """文字列の全部分文字列（空文字列を含む）"""
+    length = len(text)
+    return frozenset(
+        text[start:end]
+        for start in range(length)
+        for end in range(start + 1, length + 1)
+    ) | {""}
+
+
+class IngredientTokenIndex:
+    """レシピ食材の正規化トークンインデックス（カテゴリ単位）"""
+
+    def __init__(self):
+        """初期化"""
+        # 食材文字列 → 正規化トークン集合
+        self._token_sets: Dict[str, FrozenSet[str]] = {}
+        # 正規化トークン → 部分文字列集合（部分一致判定用の包含マップ）
+        self._substrings: Dict[str, FrozenSet[str]] = {}
+        self.is_loaded = False
+
+        # 転置インデックス（load_from_vectorstore で構築）
+        self._documents: List[Document] = []
+        self._doc_lengths: List[int] = []
+        self._avg_doc_length = 0.0
+        # ドキュメント番号 → 正規化タイトル / category_detail（フィルタ用）
+        self._title_keys: List[str] = []
+        self._category_details: List[str] = []
+        # 正規化タイトル → 元のタイトル（メタデータフィルタ用）
+        self._titles_by_key: Dict[str, Set[str]] = {}
+        # 正規化トークン → ドキュメント番号リスト
+        self._postings: Dict[str, List[int]] = {}
+        # 部分文字列 → その部分文字列を含む語彙トークン（部分一致の展開用）
+        self._vocabulary_by_substring: Dict[str, Set[str]] = {}
+
+    @property
+    def recipe_count(self) -> int:
+        """登録済みの食材文字列数"""
+        return len(self._token_sets)
+
+    @property
+    def document_count(self) -> int:
+        """インデックスに登録したドキュメント数"""
+        return len(self._documents)
+
+    @property
+    def vocabulary_size(self) -> int:
+        """正規化トークンの語彙数"""
+        return len(self._substrings)
+
+    def load_from_vectorstore(self, vectorstore) -> int:
+        """
+        ベクトルストアの全ドキュメントからインデックスを構築
+
+        Args:
+            vectorstore: Chromaベクトルストア
+
+        Returns:
+            登録したドキュメント数
+        """
+        return self.load_from_data(vectorstore.get(include=["documents", "metadatas"]))
+
+    def load_from_data(self, data: Dict[str, Any]) -> int:
+        """
+        ベクトルストアの get() の結果からインデックスを構築
+
+        Args:
+            data: documents / metadatas を含む get() の結果（ドキュメント番号は並び順）
+
+        Returns:
+            登録したドキュメント数
+        """
+        documents = data.get("documents") or []
+        metadatas = data.get("metadatas") or [None] * len(documents)
+
+        self._documents = []
+        self._doc_lengths = []
+        self._title_keys = []
+        self._category_details = []
+        self._titles_by_key = {}
+        self._postings = {}
+        self._vocabulary_by_substring = {}
+
+        for doc_id, (content, metadata) in enumerate(zip(documents, metadatas)):
+            content = content or ""
+            metadata = metadata or {}
+            tokens = self.get_tokens(extract_recipe_ingredients(content))
+            self._documents.append(Document(page_content=content, metadata=metadata))
+            self._doc_lengths.append(len(tokens))
+
+            title = metadata.get('title', '')
+            title_key = normalize_title(title or extract_recipe_ingredients(content))
+            self._title_keys.append(title_key)
+            self._category_details.append(metadata.get('category_detail', '') or '')
+            if title:
+                self._titles_by_key.setdefault(title_key, set()).add(title)
+            for token in tokens:
+                self._postings.setdefault(token, []).append(doc_id)
+
+        for token in self._postings:
+            for substring in self.get_substrings(token):
+                self._vocabulary_by_substring.setdefault(substring, set()).add(token)
+
+        self._avg_doc_length = (
+            sum(self._doc_lengths) / len(self._doc_lengths) if self._doc_lengths else 0.0
+        )
+        self.is_loaded = True
+        logger.debug(f"📚 [RAG] 食材トークンインデックスを構築: {len(documents)}件, 語彙{self.vocabulary_size}件")
+        return len(documents)
+
+    def get_tokens(self, recipe_ingredients: str) -> FrozenSet[str]:
+        """
+        食材文字列の正規化トークン集合を取得（未登録の場合は登録）
+
+        Args:
+            recipe_ingredients: レシピの食材文字列（スペース区切り）
+
+        Returns:
+            正規化トークン集合
+        """
+        tokens = self._token_sets.get(recipe_ingredients)
+        if tokens is None:
+            tokens = frozenset(normalize_ingredient_key(word) for word in recipe_ingredients.split())
+            for token in tokens:
+                if token not in self._substrings:
+                    self._substrings[token] = _substrings(token)
+            self._token_sets[recipe_ingredients] = tokens
+        return tokens
+
+    def get_substrings(self, token: str) -> FrozenSet[str]:
+        """正規化トークンの部分文字列集合を取得"""
+        substrings = self._substrings.get(token)
+        if substrings is None:
+            substrings = _substrings(token)
+            self._substrings[token] = substrings
+        return substrings
+
+    def _idf(self, token: str) -> float:
+        """BM25のIDF"""
+        document_count = len(self._documents)
+        df = len(self._postings.get(token, ()))
+        return math.log(1.0 + (document_count - df + 0.5) / (df + 0.5))
+
+    def _expand_term(self, term: str) -> Dict[str, float]:
+        """
+        クエリ食材を語彙トークンに展開（_calculate_match_score と同じ部分一致規則）
+
+        Returns:
+            語彙トークン → 重み比率（完全一致 1.0 / 部分一致 PARTIAL_MATCH_RATIO）
+        """
+        expanded: Dict[str, float] = {}
+        # 語彙トークンがクエリ食材を含む
+        for token in self._vocabulary_by_substring.get(term, ()):
+            expanded[token] = PARTIAL_MATCH_RATIO
+        # クエリ食材が語彙トークンを含む
+        for substring in self.get_substrings(term):
+            if substring in self._postings:
+                expanded[substring] = PARTIAL_MATCH_RATIO
+        if term in self._postings:
+            expanded[term] = 1.0
+        return expanded
+
+    def matching_category_details(self, keyword: str) -> List[str]:
+        """keywordを含むcategory_detailの値一覧（メタデータフィルタ用）"""
+        return sorted({detail for detail in self._category_details if keyword in detail})
+
+    def titles_for_keys(self, title_keys: Set[str]) -> List[str]:
+        """正規化タイトルに対応する元のタイトル一覧（メタデータフィルタ用）"""
+        titles = set()
+        for key in title_keys:
+            titles.update(self._titles_by_key.get(key, ()))
+        return sorted(titles)
+
+    def get_document(self, doc_id: int) -> Document:
+        """ドキュメント番号からドキュメントを取得"""
+        return self._documents[doc_id]
+
+    def build_mask(
+        self,
+        category_detail_keyword: Optional[str],
+        excluded_titles: Optional[Set[str]]
+    ) -> Optional[np.ndarray]:
+        """
+        フィルタ後に検索対象となるドキュメントのマスクを作成（ベクトルインデックス用）
+
+        Returns:
+            ドキュメント番号順のboolマスク（フィルタなしの場合はNone）
+        """
+        if not category_detail_keyword and not excluded_titles:
+            return None
+        return np.fromiter(
+            (not self._is_masked(doc_id, category_detail_keyword, excluded_titles)
+             for doc_id in range(len(self._documents))),
+            dtype=bool,
+            count=len(self._documents)
+        )
+
+    def _is_masked(
+        self,
+        doc_id: int,
+        category_detail_keyword: Optional[str],
+        excluded_titles: Optional[Set[str]]
+    ) -> bool:
+        """フィルタで除外されるドキュメントか"""
+        if excluded_titles and self._title_keys[doc_id] in excluded_titles:
+            return True
+        if category_detail_keyword and category_detail_keyword not in self._category_details[doc_id]:
+            return True
+        return False
+
+    def lexical_search(
+        self,
+        weighted_terms: Dict[str, float],
+        k: int,
+        category_detail_keyword: Optional[str] = None,
+        excluded_titles: Optional[Set[str]] = None
+    ) -> List[Document]:
+        """
+        転置インデックスによる食材の語彙検索（BM25）
+
+        Args:
+            weighted_terms: 食材名 → クエリ内の重み
+            k: 取得件数
+            category_detail_keyword: category_detailに含まれるべきキーワード
+            excluded_titles: 除外する正規化タイトルの集合
+
+        Returns:
+            BM25スコア順のドキュメントリスト
+        """
+        if not self._documents or k <= 0:
+            return []
+
+        masked: Dict[int, bool] = {}
+
+        scores: Dict[int, float] = {}
+        for term, weight in weighted_terms.items():
+            normalized_term = normalize_ingredient_key(term)
+            if not normalized_term:
+                continue
+            # 1つのクエリ食材がドキュメント内の複数トークンにマッチしても最大値のみ加算
+            term_scores: Dict[int, float] = {}
+            for token, ratio in self._expand_term(normalized_term).items():
+                idf = self._idf(token)
+                for doc_id in self._postings[token]:
+                    is_masked = masked.get(doc_id)
+                    if is_masked is None:
+                        is_masked = self._is_masked(doc_id, category_detail_keyword, excluded_titles)
+                        masked[doc_id] = is_masked
+                    if is_masked:
+                        continue
+                    length_norm = 1.0 - BM25_B + BM25_B * self._doc_lengths[doc_id] / self._avg_doc_length
+                    token_score = weight * ratio * idf * (BM25_K1 + 1.0) / (1.0 + BM25_K1 * length_norm)
+                    if token_score > term_scores.get(doc_id, 0.0):
+                        term_scores[doc_id] = token_score
+            for doc_id, token_score in term_scores.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + token_score
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self._documents[doc_id] for doc_id, _ in top]
+
+    def create_matcher(
+        self,
+        inventory_items: List[str],
+        main_ingredient: Optional[str] = None,
+        secondary_items: Optional[List[str]] = None
+    ) -> "InventoryMatcher":
+        """検索1回分の在庫食材マッチャーを作成"""
+        return InventoryMatcher(self, inventory_items, main_ingredient, secondary_items)
+
+
+class InventoryMatcher:
+    """検索1回分の在庫食材（正規化はクエリごとに1回のみ）"""
+
+    def __init__(
+        self,
+        index: IngredientTokenIndex,
+        inventory_items: List[str],
+        main_ingredient: Optional[str] = None,
+        secondary_items: Optional[List[str]] = None
+    ):
+        """
+        初期化
+
+        Args:
+            index: 食材トークンインデックス
+            inventory_items: 在庫食材リスト（重複除去済み）
+            main_ingredient: 主要食材
+            secondary_items: 二次食材リスト（スコアのボーナスにのみ使用）
+        """
+        self._index = index
+        self.inventory_items = inventory_items
+        self.secondary_items = secondary_items or []
+        # 在庫インデックスは inventory_items → secondary_items の順で採番
+        self._all_items = list(inventory_items) + self.secondary_items
+        self._primary_count = len(inventory_items)
+        self.main_ingredient = main_ingredient
+        self.normalized_main = normalize_ingredient_key(main_ingredient) if main_ingredient else ""
+
+        self._normalized_items: List[str] = []
+        self._weights: List[Tuple[float, float]] = []  # (完全一致の重み, 部分一致の重み)
+        # 正規化名 → 在庫インデックス（完全一致 / 在庫名がトークンに含まれる判定用）
+        self._items_by_name: Dict[str, List[int]] = {}
+        # 在庫名の部分文字列 → 在庫インデックス（トークンが在庫名に含まれる判定用）
+        self._items_by_substring: Dict[str, List[int]] = {}
+
+        for i, item in enumerate(self._all_items):
+            normalized = normalize_ingredient_key(item)
+            is_main = bool(main_ingredient) and normalized == self.normalized_main and i < self._primary_count
+            weight = MAIN_INGREDIENT_WEIGHT if is_main else 1.0
+            self._normalized_items.append(normalized)
+            self._weights.append((weight, weight * PARTIAL_MATCH_RATIO))
+            self._items_by_name.setdefault(normalized, []).append(i)
+            for substring in _substrings(normalized):
+                self._items_by_substring.setdefault(substring, []).append(i)
+
+        # トークン → (完全一致した在庫, 部分一致した在庫) のクエリ内メモ
+        self._token_matches: Dict[str, Tuple[FrozenSet[int], FrozenSet[int]]] = {}
+
+    def _match_token(self, token: str) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+        """トークン1つに対する在庫の完全一致・部分一致を取得"""
+        matches = self._token_matches.get(token)
+        if matches is None:
+            exact = frozenset(self._items_by_name.get(token, ()))
+            # トークンが在庫名に含まれる
+            partial = set(self._items_by_substring.get(token, ()))
+            # 在庫名がトークンに含まれる
+            for substring in self._index.get_substrings(token):
+                partial.update(self._items_by_name.get(substring, ()))
+            matches = (exact, frozenset(partial))
+            self._token_matches[token] = matches
+        return matches
+
+    def score(self, recipe_ingredients: str) -> Tuple[float, List[str]]:
+        """
+        マッチングスコアを計算（二次食材がない場合は _calculate_match_score と同じ結果を返す）
+
+        Args:
+            recipe_ingredients: レシピの食材文字列
+
+        Returns:
+            (マッチングスコア, マッチした食材リスト)
+        """
+        if not recipe_ingredients or not self.inventory_items:
+            return 0.0, []
+
+        exact_items = set()
+        partial_items = set()
+        for token in self._index.get_tokens(recipe_ingredients):
+            exact, partial = self._match_token(token)
+            exact_items.update(exact)
+            partial_items.update(partial)
+        partial_items.difference_update(exact_items)
+
+        matched_count = 0.0
+        secondary_count = 0.0
+        matched_indices = sorted(exact_items | partial_items)
+        for i in matched_indices:
+            exact_weight, partial_weight = self._weights[i]
+            weight = exact_weight if i in exact_items else partial_weight
+            if i < self._primary_count:
+                matched_count += weight
+            else:
+                secondary_count += weight
+        matched_items = [self._all_items[i] for i in matched_indices]
+
+        # スコア計算: マッチした食材数 / 在庫食材数
+        if self.main_ingredient and self.main_ingredient in self.inventory_items:
+            other_ingredients_count = len(self.inventory_items) - 1
+            max_possible_score = MAIN_INGREDIENT_WEIGHT + other_ingredients_count
+            match_score = matched_count / max_possible_score if max_possible_score > 0 else 0.0
+        else:
+            total_inventory = len(self.inventory_items)
+            match_score = matched_count / total_inventory if total_inventory > 0 else 0.0
+
+        # 二次食材は小さなボーナスとして加点
+        if secondary_count:
+            match_score += SECONDARY_BONUS_WEIGHT * secondary_count / len(self.secondary_items)
+
+        return match_score, matched_items
+
+    def has_main_ingredient(self, recipe_ingredients: str, matched_ingredients: List[str]) -> bool:
+        """正規化による主要食材判定（_has_main_ingredient_normalized と同じ結果を返す）"""
+        normalized_main = self.normalized_main
+        for token in self._index.get_tokens(recipe_ingredients):
+            if normalized_main in token:
+                return True
+
+        normalized_by_item = dict(zip(self._all_items, self._normalized_items))
+        for matched in matched_ingredients:
+            normalized = normalized_by_item.get(matched)
+            if normalized is None:
+                normalized = normalize_ingredient_key(matched)
+            if normalized_main in normalized:
+                return True
+
+        return False
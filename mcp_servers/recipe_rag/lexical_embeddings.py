@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+文字n-gram TF-IDF 埋め込み（オフライン埋め込みバックエンド）
+
+レシピの食材リスト（スペース区切り）を食材名ごとに正規化し、文字n-gramを
+ハッシュトリックで固定次元に割り当てた TF-IDF ベクトル（L2正規化済み）に変換する。
+IDFはベクトルDB構築時にコーパスから学習し、ベクトルDBのディレクトリに保存する。
+クエリの埋め込みはプロセス内で計算するため、OpenAI埋め込みAPIの往復が不要になる。
+
+カテゴリごとに環境変数で選択する:
+    RAG_EMBEDDING_BACKEND_MAIN=char_ngram   # 主菜のみ文字n-gram
+    RAG_EMBEDDING_BACKEND=char_ngram        # 全カテゴリの既定値（未設定時は openai）
+
+文字n-gram用のベクトルは同じディレクトリの別コレクション（LEXICAL_COLLECTION_NAME）に
+scripts/build_lexical_vector_db.py で構築する。
+"""
+
+import os
+import json
+import math
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config.loggers import GenericLogger
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+
+logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
+
+OPENAI_BACKEND = "openai"
+LEXICAL_BACKEND = "char_ngram"
+SUPPORTED_BACKENDS = (OPENAI_BACKEND, LEXICAL_BACKEND)
+
+# 文字n-gram用のコレクション名・モデルファイル名（ベクトルDBのディレクトリ内）
+LEXICAL_COLLECTION_NAME = "recipes_char_ngram"
+LEXICAL_MODEL_FILE_NAME = "char_ngram_embeddings.json"
+
+DEFAULT_DIMENSIONS = 4096
+DEFAULT_NGRAM_RANGE = (1, 3)
+
+
+def get_embedding_backend(category: str) -> str:
+    """
+    カテゴリの埋め込みバックエンドを環境変数から取得
+
+    RAG_EMBEDDING_BACKEND_<CATEGORY> → RAG_EMBEDDING_BACKEND → "openai" の順に参照する
+    """
+    backend = os.getenv(f"RAG_EMBEDDING_BACKEND_{category.upper()}") or os.getenv("RAG_EMBEDDING_BACKEND") or OPENAI_BACKEND
+    backend = backend.strip().lower()
+    if backend not in SUPPORTED_BACKENDS:
+        logger.warning(f"⚠️ [RAG] 未対応の埋め込みバックエンドです ({category}): {backend}")
+        return OPENAI_BACKEND
+    return backend
+
+
+class CharNgramEmbeddings(Embeddings):
+    """文字n-gram TF-IDF 埋め込み（ハッシュトリックによる固定次元の密ベクトル）"""
+
+    def __init__(
+        self,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        ngram_range: Sequence[int] = DEFAULT_NGRAM_RANGE,
+        idf: Optional[List[float]] = None
+    ):
+        """
+        初期化
+
+        Args:
+            dimensions: ベクトルの次元数（n-gramのハッシュ先の数）
+            ngram_range: n-gramの長さの範囲（最小, 最大）
+            idf: 次元ごとのIDF（未学習の場合はNone = 全て1.0）
+        """
+        self.dimensions = dimensions
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.idf = list(idf) if idf is not None else [1.0] * dimensions
+
+    def _bucket_counts(self, text: str) -> Dict[int, int]:
+        """テキストの文字n-gramをハッシュ先の次元ごとに数える（食材名をまたぐn-gramは作らない）"""
+        min_n, max_n = self.ngram_range
+        counts: Dict[int, int] = {}
+        for word in text.split():
+            key = normalize_ingredient_key(word)
+            for n in range(min_n, max_n + 1):
+                for start in range(len(key) - n + 1):
+                    # Pythonのhash()はプロセスごとに変わるため、構築時と一致するcrc32を使う
+                    bucket = zlib.crc32(key[start:start + n].encode('utf-8')) % self.dimensions
+                    counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def fit(self, texts: Sequence[str]) -> "CharNgramEmbeddings":
+        """
+        コーパスからIDFを学習（平滑化IDF: log((1 + N) / (1 + df)) + 1）
+
+        Args:
+            texts: レシピの食材リスト（ベクトルDBのドキュメント）
+
+        Returns:
+            self
+        """
+        document_frequency = [0] * self.dimensions
+        for text in texts:
+            for bucket in self._bucket_counts(text):
+                document_frequency[bucket] += 1
+        total = len(texts)
+        self.idf = [math.log((1 + total) / (1 + df)) + 1.0 for df in document_frequency]
+        return self
+
+    def _embed(self, text: str) -> List[float]:
+        """TF-IDFベクトル（サブリニアTF・L2正規化）"""
+        weights = {
+            bucket: (1.0 + math.log(count)) * self.idf[bucket]
+            for bucket, count in self._bucket_counts(text).items()
+        }
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if weights:
+            # 非ゼロ要素のみで正規化
+            norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+            vector[list(weights)] = [weight / norm for weight in weights.values()]
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def save(self, directory: str) -> Path:
+        """学習済みモデルをベクトルDBのディレクトリに保存"""
+        path = Path(directory) / LEXICAL_MODEL_FILE_NAME
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dimensions": self.dimensions,
+                "ngram_range": list(self.ngram_range),
+                "idf": self.idf,
+            }, f)
+        return path
+
+    @classmethod
+    def load(cls, directory: str) -> "CharNgramEmbeddings":
+        """ベクトルDBのディレクトリから学習済みモデルを読み込む"""
+        with open(Path(directory) / LEXICAL_MODEL_FILE_NAME, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(dimensions=data["dimensions"], ngram_range=data["ngram_range"], idf=data["idf"])
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """学習済みモデルがベクトルDBのディレクトリに存在するか"""
+        return (Path(directory) / LEXICAL_MODEL_FILE_NAME).exists()
@@ -3,11 +3,14 @@
 LLM制約解決機能
 
 LLMを使用した食材重複抑止の制約解決機能を提供
+（献立の選択は LocalMenuSolver がローカルで行い、本機能は同点時のタイブレークにのみ使用）
 """
 
 from typing import List, Dict, Any
-from openai import AsyncOpenAI
 from config.loggers import GenericLogger
+from mcp_servers.llm_gateway import GatewayClient
+from mcp_servers.models.llm_output_models import MenuSelectionOutput
+from mcp_servers.structured_output import json_schema_response_format, parse_structured, structured_output_enabled
 
 logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
 
@@ -15,7 +18,7 @@ logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
 class LLMConstraintSolver:
     """LLM制約解決エンジン"""
     
-    def __init__(self, llm_client: AsyncOpenAI, llm_model: str):
+    def __init__(self, llm_client: GatewayClient, llm_model: str):
         """初期化"""
         self.llm_client = llm_client
         self.llm_model = llm_model
@@ -44,11 +47,15 @@ class LLMConstraintSolver:
             # LLMプロンプトを生成
             prompt = self._create_constraint_solving_prompt(menu_candidates, inventory_items, menu_type)
             
-            # LLMに問い合わせ
+            # LLMに問い合わせ（構造化出力時は応答形式をJSONスキーマで固定）
+            params = {}
+            if structured_output_enabled():
+                params["response_format"] = json_schema_response_format(MenuSelectionOutput)
             response = await self.llm_client.chat.completions.create(
                 model=self.llm_model,
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.3  # 一貫性を重視
+                temperature=0.3,  # 一貫性を重視
+                **params
             )
             
             # レスポンスを解析
@@ -112,6 +119,12 @@ class LLMConstraintSolver:
             import json
             import re
             
+            # 構造化出力: スキーマどおりのJSONを1回のデコードで変換
+            if structured_output_enabled():
+                parsed = parse_structured(llm_response, MenuSelectionOutput)
+                if parsed is not None:
+                    return parsed.model_dump()
+            
             # JSON部分を抽出
             json_match = re.search(r'\{.*\}', llm_response, re.DOTALL)
             if json_match:
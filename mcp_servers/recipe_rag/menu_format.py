@@ -5,8 +5,9 @@
 RAG検索結果を献立形式（主菜・副菜・汁物）に変換する機能を提供
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from config.loggers import GenericLogger
+from .menu_solver import LocalMenuSolver
 
 logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
 
@@ -14,15 +15,23 @@ logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
 class MenuFormatter:
     """献立フォーマッター"""
     
-    def __init__(self, llm_solver):
-        """初期化"""
+    def __init__(self, llm_solver, menu_solver: Optional[LocalMenuSolver] = None):
+        """
+        初期化
+
+        Args:
+            llm_solver: LLM制約解決エンジン（同点時のタイブレークにのみ使用）
+            menu_solver: 献立のローカルソルバー（未指定時は環境変数の設定で作成）
+        """
         self.llm_solver = llm_solver
+        self.menu_solver = menu_solver or LocalMenuSolver()
     
     async def convert_rag_results_to_menu_format(
         self,
         rag_results: List[Dict[str, Any]],
         inventory_items: List[str],
-        menu_type: str
+        menu_type: str,
+        main_ingredient: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         RAG検索結果を献立形式（主菜・副菜・汁物）に変換
@@ -31,6 +40,7 @@ class MenuFormatter:
             rag_results: RAG検索結果のリスト
             inventory_items: 在庫食材リスト
             menu_type: 献立のタイプ
+            main_ingredient: 主要食材（主菜で使われる組み合わせを優先）
         
         Returns:
             献立形式の辞書
@@ -45,57 +55,7 @@ class MenuFormatter:
             # レシピをカテゴリ別に分類
             categorized_recipes = self._categorize_recipes(rag_results)
             
-            # 各カテゴリから最適なレシピを選択して献立を構成
-            selected_menu = {
-                "main_dish": {"title": "", "ingredients": []},
-                "side_dish": {"title": "", "ingredients": []},
-                "soup": {"title": "", "ingredients": []}
-            }
-            
-            used_ingredients = set()
-            
-            # 各カテゴリから最適なレシピを選択
-            for category in ["main_dish", "side_dish", "soup"]:
-                recipes = categorized_recipes.get(category, [])
-                
-                if recipes:
-                    # 食材重複を避けながら最適なレシピを選択
-                    best_recipe = self._select_best_recipe(
-                        recipes, used_ingredients, inventory_items
-                    )
-                    
-                    if best_recipe:
-                        title = best_recipe.get("title", "")
-                        recipe_ingredients = self._extract_recipe_ingredients(best_recipe)
-                        
-                        selected_menu[category] = {
-                            "title": title,
-                            "ingredients": recipe_ingredients
-                        }
-                        
-                        # 使用済み食材を記録
-                        used_ingredients.update(recipe_ingredients)
-            
-            # 候補も生成（複数提案用）
-            candidates = self._generate_menu_candidates(categorized_recipes)
-            
-            # LLMによる制約解決で最適な献立を選択
-            if candidates and len(candidates) >= 1:
-                llm_selected_menu = await self.llm_solver.solve_menu_constraints_with_llm(
-                    candidates, inventory_items, menu_type
-                )
-                # LLMが有効な結果を返した場合はそれを使用
-                if llm_selected_menu and any(llm_selected_menu.get(field, {}).get("title") for field in ["main_dish", "side_dish", "soup"]):
-                    selected_menu = llm_selected_menu
-            
-            result = {
-                "candidates": candidates,
-                "selected": selected_menu
-            }
-            
-            logger.debug(f"📊 [RAG] 選択された献立: {selected_menu}")
-            
-            return result
+            return await self._solve_menu(categorized_recipes, inventory_items, menu_type, main_ingredient)
             
         except Exception as e:
             logger.error(f"❌ [RAG] 献立形式変換エラー: {e}")
@@ -104,6 +64,55 @@ class MenuFormatter:
             logger.error(f"❌ [RAG] 献立タイプ: {menu_type}")
             raise
     
+    async def _solve_menu(
+        self,
+        categorized_recipes: Dict[str, List[Dict[str, Any]]],
+        inventory_items: List[str],
+        menu_type: str,
+        main_ingredient: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        カテゴリ別レシピの全組み合わせを採点して献立を選択
+        
+        食材重複・在庫カバー・主要食材の使用をローカルで厳密に評価するため、
+        LLMは最高スコアが同点の場合のタイブレーク（有効時）にのみ使用する。
+        
+        Args:
+            categorized_recipes: カテゴリ別レシピ辞書（main_dish / side_dish / soup）
+            inventory_items: 在庫食材リスト
+            menu_type: 献立のタイプ
+            main_ingredient: 主要食材
+        
+        Returns:
+            {"candidates": 上位の献立候補, "selected": 選択された献立}
+        """
+        solutions = self.menu_solver.solve(
+            categorized_recipes, inventory_items, self._extract_recipe_ingredients, main_ingredient
+        )
+        best = await self.menu_solver.select(solutions, inventory_items, menu_type, self.llm_solver)
+        
+        if best is None:
+            selected_menu = {
+                "main_dish": {"title": "", "ingredients": []},
+                "side_dish": {"title": "", "ingredients": []},
+                "soup": {"title": "", "ingredients": []}
+            }
+        else:
+            selected_menu = best.menu
+            logger.debug(
+                f"📊 [RAG] 献立スコア: {best.score:.1f}（在庫カバー {best.coverage}, "
+                f"食材重複 {best.overlap}, 主要食材 {best.uses_main_ingredient}）"
+            )
+        
+        result = {
+            "candidates": [solution.menu for solution in solutions],
+            "selected": selected_menu
+        }
+        
+        logger.debug(f"📊 [RAG] 選択された献立: {selected_menu}")
+        
+        return result
+    
     def _categorize_recipes(self, rag_results: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """
         レシピをカテゴリ別に分類
@@ -143,43 +152,6 @@ class MenuFormatter:
         
         return categorized
     
-    def _select_best_recipe(
-        self, 
-        recipes: List[Dict[str, Any]], 
-        used_ingredients: set, 
-        inventory_items: List[str]
-    ) -> Dict[str, Any]:
-        """
-        最適なレシピを選択
-        
-        Args:
-            recipes: レシピリスト
-            used_ingredients: 使用済み食材セット
-            inventory_items: 在庫食材リスト
-        
-        Returns:
-            最適なレシピ
-        """
-        best_recipe = None
-        best_score = -1
-        
-        for recipe in recipes:
-            # レシピの食材を抽出
-            recipe_ingredients = self._extract_recipe_ingredients(recipe)
-            
-            # 重複スコアを計算（重複が少ないほど高スコア）
-            overlap_count = len(set(recipe_ingredients) & used_ingredients)
-            inventory_match_count = len(set(recipe_ingredients) & set(inventory_items))
-            
-            # スコア計算: 在庫マッチ数 - 重複数
-            score = inventory_match_count - overlap_count
-            
-            if score > best_score:
-                best_score = score
-                best_recipe = recipe
-        
-        return best_recipe
-    
     def _extract_recipe_ingredients(self, recipe: Dict[str, Any]) -> List[str]:
         """
         レシピから食材を抽出
@@ -226,57 +198,12 @@ class MenuFormatter:
         
         return []
     
-    def _generate_menu_candidates(
-        self, 
-        categorized_recipes: Dict[str, List[Dict[str, Any]]]
-    ) -> List[Dict[str, Any]]:
-        """
-        献立候補を生成
-        
-        Args:
-            categorized_recipes: カテゴリ別レシピ辞書
-        
-        Returns:
-            献立候補リスト
-        """
-        candidates = []
-        
-        # 最大3つの候補を生成
-        for i in range(min(3, len(categorized_recipes.get("main_dish", [])))):
-            candidate = {
-                "main_dish": {"title": "", "ingredients": []},
-                "side_dish": {"title": "", "ingredients": []},
-                "soup": {"title": "", "ingredients": []}
-            }
-            
-            used_ingredients = set()
-            
-            # 各カテゴリからレシピを選択
-            for category in ["main_dish", "side_dish", "soup"]:
-                recipes = categorized_recipes.get(category, [])
-                if recipes and i < len(recipes):
-                    recipe = recipes[i]
-                    title = recipe.get("title", "")
-                    
-                    # レシピの食材を抽出
-                    ingredients = self._extract_recipe_ingredients(recipe)
-                    
-                    candidate[category] = {
-                        "title": title,
-                        "ingredients": ingredients
-                    }
-                    
-                    used_ingredients.update(ingredients)
-            
-            candidates.append(candidate)
-        
-        return candidates
-    
     async def convert_categorized_results_to_menu_format(
         self,
         categorized_results: Dict[str, List[Dict[str, Any]]],
         inventory_items: List[str],
-        menu_type: str
+        menu_type: str,
+        main_ingredient: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         3ベクトルDB検索結果を献立形式に変換（最適化版）
@@ -285,6 +212,7 @@ class MenuFormatter:
             categorized_results: カテゴリ別検索結果
             inventory_items: 在庫食材リスト
             menu_type: 献立のタイプ
+            main_ingredient: 主要食材（主菜で使われる組み合わせを優先）
         
         Returns:
             献立形式の辞書
@@ -304,60 +232,7 @@ class MenuFormatter:
                 "soup": categorized_results.get("soup", [])
             }
             
-            # 各カテゴリから最適なレシピを選択して献立を構成
-            selected_menu = {
-                "main_dish": {"title": "", "ingredients": []},
-                "side_dish": {"title": "", "ingredients": []},
-                "soup": {"title": "", "ingredients": []}
-            }
-            
-            used_ingredients = set()
-            
-            # 各カテゴリから最適なレシピを選択
-            for category in ["main_dish", "side_dish", "soup"]:
-                recipes = categorized_recipes.get(category, [])
-                
-                if recipes:
-                    # 食材重複を避けながら最適なレシピを選択
-                    best_recipe = self._select_best_recipe(
-                        recipes, used_ingredients, inventory_items
-                    )
-                    
-                    if best_recipe:
-                        title = best_recipe.get("title", "")
-                        recipe_ingredients = self._extract_recipe_ingredients(best_recipe)
-                        
-                        selected_menu[category] = {
-                            "title": title,
-                            "ingredients": recipe_ingredients
-                        }
-                        
-                        # 使用済み食材を記録
-                        used_ingredients.update(recipe_ingredients)
-            
-            # 候補も生成（複数提案用）
-            candidates = self._generate_menu_candidates(categorized_recipes)
-            
-            # 3ベクトルDBなら事前分類済みなので、LLM制約解決は簡素化
-            # 必要に応じてLLMによる最終調整のみ実行
-            if candidates and len(candidates) >= 1:
-                # シンプルな選択ロジック（LLM呼び出しを削減）
-                if not self._is_menu_balanced(selected_menu):
-                    llm_selected_menu = await self.llm_solver.solve_menu_constraints_with_llm(
-                        candidates, inventory_items, menu_type
-                    )
-                    # LLMが有効な結果を返した場合はそれを使用
-                    if llm_selected_menu and any(llm_selected_menu.get(field, {}).get("title") for field in ["main_dish", "side_dish", "soup"]):
-                        selected_menu = llm_selected_menu
-            
-            result = {
-                "candidates": candidates,
-                "selected": selected_menu
-            }
-            
-            logger.debug(f"📊 [RAG] 選択された献立: {selected_menu}")
-            
-            return result
+            return await self._solve_menu(categorized_recipes, inventory_items, menu_type, main_ingredient)
             
         except Exception as e:
             logger.error(f"❌ [RAG] カテゴリ別献立形式変換エラー: {e}")
@@ -365,21 +240,3 @@ class MenuFormatter:
             logger.error(f"❌ [RAG] 在庫食材: {inventory_items}")
             logger.error(f"❌ [RAG] 献立タイプ: {menu_type}")
             raise
-    
-    def _is_menu_balanced(self, menu: Dict[str, Any]) -> bool:
-        """
-        献立がバランス良く構成されているかチェック
-        
-        Args:
-            menu: 献立辞書
-        
-        Returns:
-            バランスが取れているかどうか
-        """
-        # 各カテゴリにレシピが存在するかチェック
-        has_main = bool(menu.get("main_dish", {}).get("title"))
-        has_side = bool(menu.get("side_dish", {}).get("title"))
-        has_soup = bool(menu.get("soup", {}).get("title"))
-        
-        # 最低2つのカテゴリがあればバランス良好とみなす
-        return sum([has_main, has_side, has_soup]) >= 2
\ No newline at end of file
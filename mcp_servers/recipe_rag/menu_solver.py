@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+献立制約のローカル厳密解
+
+主菜・副菜・汁物の各カテゴリ上位N件の全組み合わせを採点し、最適な献立を決定的に選択する。
+LLM制約解決（LLMConstraintSolver）の往復を置き換えるための高速パスで、
+LLMは最高スコアが同点になった場合のタイブレークにのみ（有効時）使用する。
+
+スコア（高いほど良い）:
+    在庫カバー数 × COVERAGE_WEIGHT
+    − 料理間の食材重複数 × OVERLAP_WEIGHT
+    + 主菜が主要食材を使う場合 MAIN_INGREDIENT_BONUS
+
+同点の組み合わせは検索順位の合計が小さい順（同じなら主菜→副菜→汁物の順位順）に並べる。
+
+環境変数:
+    RAG_MENU_SOLVER_TOP_N=10            # カテゴリごとの候補数（組み合わせ数は最大 N^3）
+    RAG_MENU_SOLVER_LLM_TIEBREAK=false  # 同点時にLLMで選択する
+"""
+
+import os
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.loggers import GenericLogger
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+
+logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
+
+MENU_CATEGORIES = ("main_dish", "side_dish", "soup")
+
+DEFAULT_TOP_N = 10
+DEFAULT_LLM_TIEBREAK = False
+# スコアの重み
+COVERAGE_WEIGHT = 1.0
+OVERLAP_WEIGHT = 1.0
+MAIN_INGREDIENT_BONUS = 2.0
+# 同点とみなすスコア差
+TIE_EPSILON = 1e-9
+# LLMタイブレークに渡す同点候補の上限
+MAX_TIEBREAK_CANDIDATES = 5
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class MenuSolution:
+    """採点済みの献立（カテゴリ → 選択したレシピの検索順位、未選択は None）"""
+    ranks: Dict[str, Optional[int]]
+    menu: Dict[str, Dict[str, Any]]
+    score: float
+    coverage: int
+    overlap: int
+    uses_main_ingredient: bool
+    covered_items: List[str] = field(default_factory=list)
+
+
+class _Option:
+    """1カテゴリの候補レシピ（在庫カバー・食材をビットマスクで保持）"""
+
+    __slots__ = ("rank", "title", "ingredients", "ingredient_mask", "inventory_mask", "uses_main")
+
+    def __init__(self, rank, title, ingredients, ingredient_mask, inventory_mask, uses_main):
+        self.rank = rank
+        self.title = title
+        self.ingredients = ingredients
+        self.ingredient_mask = ingredient_mask
+        self.inventory_mask = inventory_mask
+        self.uses_main = uses_main
+
+
+class LocalMenuSolver:
+    """主菜・副菜・汁物の組み合わせを全探索する献立ソルバー"""
+
+    def __init__(self, top_n: Optional[int] = None, llm_tiebreak: Optional[bool] = None):
+        """
+        初期化
+
+        Args:
+            top_n: カテゴリごとの候補数。未指定時は RAG_MENU_SOLVER_TOP_N
+            llm_tiebreak: 同点時にLLMで選択するか。未指定時は RAG_MENU_SOLVER_LLM_TIEBREAK
+        """
+        if top_n is None:
+            top_n = int(os.getenv("RAG_MENU_SOLVER_TOP_N", DEFAULT_TOP_N))
+        if llm_tiebreak is None:
+            llm_tiebreak = _env_flag("RAG_MENU_SOLVER_LLM_TIEBREAK", DEFAULT_LLM_TIEBREAK)
+        self.top_n = max(1, top_n)
+        self.llm_tiebreak = llm_tiebreak
+
+    def _build_options(
+        self,
+        recipes: List[Dict[str, Any]],
+        extract_ingredients: Callable[[Dict[str, Any]], List[str]],
+        inventory_keys: List[str],
+        main_index: Optional[int],
+        vocabulary: Dict[str, int]
+    ) -> List[_Option]:
+        """カテゴリ上位N件の候補を作成（同じタイトルは上位のみ残す）"""
+        options = []
+        seen_titles = set()
+        for rank, recipe in enumerate(recipes):
+            if len(options) >= self.top_n:
+                break
+            title = recipe.get("title", "")
+            if not title or title in seen_titles:
+                continue
+            seen_titles.add(title)
+
+            ingredients = extract_ingredients(recipe)
+            ingredient_mask = 0
+            inventory_mask = 0
+            for key in {normalize_ingredient_key(ingredient) for ingredient in ingredients}:
+                if not key:
+                    continue
+                ingredient_mask |= 1 << vocabulary.setdefault(key, len(vocabulary))
+                # 在庫名とレシピ食材のどちらかがもう一方を含めばカバーとみなす（豚肉 / 豚バラ肉）
+                for i, inventory_key in enumerate(inventory_keys):
+                    if inventory_key and (inventory_key in key or key in inventory_key):
+                        inventory_mask |= 1 << i
+            uses_main = main_index is not None and bool(inventory_mask >> main_index & 1)
+            options.append(_Option(rank, title, ingredients, ingredient_mask, inventory_mask, uses_main))
+        return options
+
+    def solve(
+        self,
+        categorized_recipes: Dict[str, List[Dict[str, Any]]],
+        inventory_items: List[str],
+        extract_ingredients: Callable[[Dict[str, Any]], List[str]],
+        main_ingredient: Optional[str] = None,
+        limit: int = 3
+    ) -> List[MenuSolution]:
+        """
+        全組み合わせを採点して上位の献立を返す
+
+        Args:
+            categorized_recipes: カテゴリ（main_dish / side_dish / soup）→ 検索順のレシピリスト
+            inventory_items: 在庫食材リスト
+            extract_ingredients: レシピから食材リストを抽出する関数
+            main_ingredient: 主要食材（主菜で使われると加点）
+            limit: 返す献立数
+
+        Returns:
+            スコア降順（同点は検索順位順）の献立リスト（候補がない場合は空）
+        """
+        inventory_keys = [normalize_ingredient_key(item) for item in inventory_items]
+        main_index = None
+        if main_ingredient:
+            main_key = normalize_ingredient_key(main_ingredient)
+            if main_key in inventory_keys:
+                main_index = inventory_keys.index(main_key)
+            else:
+                # 在庫にない主要食材も主菜での使用判定に含める
+                inventory_keys.append(main_key)
+                main_index = len(inventory_keys) - 1
+        covered_mask_limit = (1 << len(inventory_items)) - 1
+
+        vocabulary: Dict[str, int] = {}
+        options = {
+            category: self._build_options(
+                categorized_recipes.get(category, []), extract_ingredients, inventory_keys, main_index, vocabulary
+            )
+            for category in MENU_CATEGORIES
+        }
+        if not any(options.values()):
+            return []
+
+        scored = []
+        # 候補がないカテゴリは未選択（None）として組み合わせる
+        for main, side, soup in itertools.product(*(options[c] or [None] for c in MENU_CATEGORIES)):
+            chosen = [option for option in (main, side, soup) if option is not None]
+            covered = 0
+            overlap = 0
+            for i, option in enumerate(chosen):
+                covered |= option.inventory_mask
+                for other in chosen[i + 1:]:
+                    overlap += bin(option.ingredient_mask & other.ingredient_mask).count("1")
+            coverage = bin(covered & covered_mask_limit).count("1")
+            uses_main = main is not None and main.uses_main
+            score = (
+                COVERAGE_WEIGHT * coverage
+                - OVERLAP_WEIGHT * overlap
+                + (MAIN_INGREDIENT_BONUS if uses_main else 0.0)
+            )
+            scored.append((score, coverage, overlap, uses_main, covered, (main, side, soup)))
+
+        scored.sort(key=lambda item: (-item[0], *self._rank_key(item[5])))
+        return [
+            self._to_solution(score, coverage, overlap, uses_main, covered, combination, inventory_items)
+            for score, coverage, overlap, uses_main, covered, combination in scored[:limit]
+        ]
+
+    @staticmethod
+    def _rank_key(combination) -> Tuple[int, ...]:
+        """同点時の並び順（順位の合計 → 主菜・副菜・汁物の順位）"""
+        ranks = [option.rank if option is not None else 0 for option in combination]
+        return (sum(ranks), *ranks)
+
+    @staticmethod
+    def _to_solution(score, coverage, overlap, uses_main, covered, combination, inventory_items) -> MenuSolution:
+        menu = {}
+        ranks = {}
+        for category, option in zip(MENU_CATEGORIES, combination):
+            if option is None:
+                menu[category] = {"title": "", "ingredients": []}
+                ranks[category] = None
+            else:
+                menu[category] = {"title": option.title, "ingredients": option.ingredients}
+                ranks[category] = option.rank
+        return MenuSolution(
+            ranks=ranks,
+            menu=menu,
+            score=score,
+            coverage=coverage,
+            overlap=overlap,
+            uses_main_ingredient=uses_main,
+            covered_items=[item for i, item in enumerate(inventory_items) if covered >> i & 1]
+        )
+
+    async def select(
+        self,
+        solutions: List[MenuSolution],
+        inventory_items: List[str],
+        menu_type: str,
+        llm_solver=None
+    ) -> Optional[MenuSolution]:
+        """
+        最適な献立を選択（同点時のみ、有効ならLLMでタイブレーク）
+
+        Args:
+            solutions: solve の結果
+            inventory_items: 在庫食材リスト
+            menu_type: 献立のタイプ
+            llm_solver: LLMConstraintSolver（タイブレーク無効時は未使用）
+
+        Returns:
+            選択した献立（候補がない場合は None）
+        """
+        if not solutions:
+            return None
+        best = solutions[0]
+        tied = [solution for solution in solutions if best.score - solution.score <= TIE_EPSILON]
+        if len(tied) < 2 or not self.llm_tiebreak or llm_solver is None:
+            return best
+
+        tied = tied[:MAX_TIEBREAK_CANDIDATES]
+        logger.info(f"🤖 [RAG] 同点の献立 {len(tied)}件をLLMでタイブレーク")
+        llm_selected = await llm_solver.solve_menu_constraints_with_llm(
+            [solution.menu for solution in tied], inventory_items, menu_type
+        )
+        # LLMが同点候補のいずれかをそのまま選んだ場合のみ採用
+        for solution in tied:
+            if all(
+                llm_selected.get(category, {}).get("title", "") == solution.menu[category]["title"]
+                for category in MENU_CATEGORIES
+            ):
+                return solution
+        return best
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+検索クエリ計画
+
+在庫食材が多いユーザーでもクエリ文字列・語彙検索・スコア計算のコストが
+在庫数に比例して増えないよう、検索に使う食材を上限件数までに絞り込む。
+
+優先順位:
+    1. 主要食材
+    2. 調味料以外の食材（入力順 = 賞味期限の近い順）
+    3. 調味料（SEASONING_KEYWORDS に該当する食材）
+
+上限を超えた食材は二次食材として、スコア計算時の小さなボーナスにのみ使う。
+"""
+
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional
+from config.constants import SEASONING_KEYWORDS
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+
+# 検索クエリに使う食材の上限件数（環境変数で上書き可能）
+DEFAULT_MAX_QUERY_INGREDIENTS = 12
+
+_SEASONING_KEYS = tuple(normalize_ingredient_key(keyword) for keyword in SEASONING_KEYWORDS)
+
+
+@lru_cache(maxsize=4096)
+def is_seasoning(name: str) -> bool:
+    """調味料かどうか（SEASONING_KEYWORDS を正規化キーで部分一致判定）"""
+    key = normalize_ingredient_key(name)
+    return any(keyword in key for keyword in _SEASONING_KEYS)
+
+
+@dataclass
+class QueryPlan:
+    """検索クエリ計画"""
+    primary_items: List[str]  # クエリ・スコア計算に使う食材（優先順）
+    secondary_items: List[str] = field(default_factory=list)  # スコアのボーナスにのみ使う食材
+
+
+def plan_query(
+    ingredients: List[str],
+    main_ingredient: Optional[str] = None,
+    max_items: Optional[int] = None
+) -> QueryPlan:
+    """
+    検索に使う食材を優先順に上限件数まで選ぶ
+
+    Args:
+        ingredients: 在庫食材リスト（賞味期限の近い順を想定）
+        main_ingredient: 主要食材
+        max_items: 上限件数（未指定時は RAG_MAX_QUERY_INGREDIENTS、既定12件）
+
+    Returns:
+        QueryPlan
+    """
+    if max_items is None:
+        max_items = int(os.getenv("RAG_MAX_QUERY_INGREDIENTS", DEFAULT_MAX_QUERY_INGREDIENTS))
+
+    # 入力順を保ったまま重複除去
+    unique_items = list(dict.fromkeys(item for item in ingredients if item))
+
+    main_items = []
+    if main_ingredient:
+        main_key = normalize_ingredient_key(main_ingredient)
+        main_items = [item for item in unique_items if normalize_ingredient_key(item) == main_key]
+    non_seasonings = [item for item in unique_items if item not in main_items and not is_seasoning(item)]
+    seasonings = [item for item in unique_items if item not in main_items and is_seasoning(item)]
+
+    ordered = main_items + non_seasonings + seasonings
+    if max_items <= 0 or len(ordered) <= max_items:
+        return QueryPlan(primary_items=ordered)
+    return QueryPlan(primary_items=ordered[:max_items], secondary_items=ordered[max_items:])
@@ -5,38 +5,117 @@
 ChromaDBを使用したレシピの類似検索と部分マッチング機能を提供
 """
 
-from typing import List, Dict, Any
+import asyncio
+import os
+from typing import List, Dict, Any, Optional, Set, Tuple
+from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from config.loggers import GenericLogger
-import unicodedata
+from mcp_servers.ingredient_normalizer import to_katakana
+from .query_planner import plan_query
+from .embedding_batcher import EmbeddingBatcher
+from .vector_index import FULL_PRECISION_FILENAME, QuantizedVectorIndex, get_vector_index_dtype
+from .ingredient_index import (
+    IngredientTokenIndex,
+    InventoryMatcher,
+    MAIN_INGREDIENT_WEIGHT,
+    normalize_title,
+    extract_recipe_ingredients,
+)
 
 logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
 
+# ハイブリッド検索（語彙検索 + ベクトル検索）の取得件数係数（limitに対する倍率）
+HYBRID_MAIN_VECTOR_K = 5
+HYBRID_INVENTORY_VECTOR_K = 3
+HYBRID_LEXICAL_K = 10
+HYBRID_CANDIDATE_LIMIT = 20
+# Reciprocal Rank Fusion の定数
+RRF_K = 60
+# フィルタ後の件数不足時に取得件数を拡大する上限（limitに対する倍率）
+ADAPTIVE_K_MAX_SCALE = 4
 
-def normalize_ingredient(ingredient):
-    """食材名を正規化（カタカナに統一）"""
-    if not ingredient:
-        return ""
+# 除外レシピタイトルに付くカテゴリプレフィックス
+EXCLUDED_TITLE_PREFIXES = ("主菜: ", "副菜: ", "汁物: ", "その他: ")
+
+
+def normalize_excluded_titles(excluded_recipes: Optional[List[str]]) -> Set[str]:
+    """
+    除外レシピタイトルを正規化した集合を作成（プレフィックス除去・大文字小文字無視）
     
-    # ひらがなをカタカナに変換
-    result = ""
-    for char in ingredient:
-        if 'ぁ' <= char <= 'ん':
-            # ひらがなをカタカナに変換
-            katakana_char = chr(ord(char) - ord('ぁ') + ord('ァ'))
-            result += katakana_char
-        else:
-            result += char
-    return result
+    Args:
+        excluded_recipes: 除外するレシピタイトル
+    
+    Returns:
+        正規化タイトルの集合
+    """
+    excluded_titles = set()
+    for excluded in excluded_recipes or []:
+        for prefix in EXCLUDED_TITLE_PREFIXES:
+            excluded = excluded.replace(prefix, "")
+        excluded_titles.add(normalize_title(excluded))
+    return excluded_titles
 
 
 class RecipeSearchEngine:
     """レシピ検索エンジン"""
     
-    def __init__(self, vectorstore: Chroma):
-        """初期化"""
+    def __init__(
+        self,
+        vectorstore: Chroma,
+        embedding_batcher: Optional[EmbeddingBatcher] = None,
+        persist_directory: Optional[str] = None
+    ):
+        """
+        初期化
+        
+        Args:
+            vectorstore: Chromaベクトルストア
+            embedding_batcher: クエリ埋め込みのバッチディスパッチャ（未指定時はベクトルストアが個別に埋め込み）
+            persist_directory: ベクトルDBのディレクトリ（再ランキング用float32ベクトルの保存先）
+        """
         self.vectorstore = vectorstore
+        self.persist_directory = persist_directory
+        self.embedding_batcher = embedding_batcher
+        self._token_index = IngredientTokenIndex()
+        # 量子化ベクトルインデックス（RAG_VECTOR_INDEX_DTYPE 指定時のみ）
+        vector_index_dtype = get_vector_index_dtype()
+        self._vector_index = QuantizedVectorIndex(vector_index_dtype) if vector_index_dtype else None
+        self._vector_ids: List[str] = []
+    
+    def load_index(self) -> int:
+        """
+        食材トークンインデックス（と量子化ベクトルインデックス）を事前構築（起動時に1回呼び出す）
+        
+        Returns:
+            インデックスに登録したドキュメント数
+        """
+        if self._vector_index is None:
+            return self._token_index.load_from_vectorstore(self.vectorstore)
+        
+        data = self.vectorstore.get(include=["documents", "metadatas", "embeddings"])
+        count = self._token_index.load_from_data(data)
+        embeddings = data.get("embeddings")
+        if embeddings is not None and len(embeddings) == count:
+            full_precision_path = (
+                os.path.join(self.persist_directory, FULL_PRECISION_FILENAME) if self.persist_directory else None
+            )
+            self._vector_index.build(embeddings, full_precision_path=full_precision_path)
+            self._vector_ids = list(data.get("ids") or [])
+            logger.info(
+                f"🧮 [RAG] 量子化ベクトルインデックスを構築: {count}件 "
+                f"({self._vector_index.dtype}, {self._vector_index.nbytes / 1024 / 1024:.1f} MB, "
+                f"再ランキング: {'memmap' if self._vector_index.has_full_precision else 'Chroma'})"
+            )
+        else:
+            logger.warning("⚠️ [RAG] 埋め込みを取得できないため量子化ベクトルインデックスを無効化します")
+            self._vector_index = None
+        return count
+    
+    def get_indexed_documents(self) -> List[Document]:
+        """食材トークンインデックスに登録済みの全ドキュメント（タイトルインデックスの構築用）"""
+        return [self._token_index.get_document(doc_id) for doc_id in range(self._token_index.document_count)]
     
     async def search_similar_recipes(
         self,
@@ -93,6 +172,207 @@ class RecipeSearchEngine:
             logger.error(f"類似レシピ検索エラー: {e}")
             raise
     
+    def _build_where_filter(
+        self,
+        category_detail_keyword: Optional[str],
+        excluded_titles: Set[str]
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        ベクトル検索に渡すメタデータフィルタ（Chroma where句）を作成
+        
+        category_detailの部分一致と除外タイトルは、食材インデックスが保持する
+        メタデータの値から完全一致条件（$in / $nin）に変換する
+        
+        Returns:
+            (where句（不要な場合はNone）, 該当レシピが存在しうるか)
+        """
+        if not self._token_index.is_loaded:
+            return None, True
+        
+        conditions = []
+        if category_detail_keyword:
+            category_details = self._token_index.matching_category_details(category_detail_keyword)
+            if not category_details:
+                return None, False
+            conditions.append({"category_detail": {"$in": category_details}})
+        if excluded_titles:
+            titles = self._token_index.titles_for_keys(excluded_titles)
+            if titles:
+                conditions.append({"title": {"$nin": titles}})
+        
+        if not conditions:
+            return None, True
+        if len(conditions) == 1:
+            return conditions[0], True
+        return {"$and": conditions}, True
+    
+    async def _similarity_search(
+        self,
+        query: str,
+        k: int,
+        where: Optional[Dict[str, Any]] = None,
+        category_detail_keyword: Optional[str] = None,
+        excluded_titles: Optional[Set[str]] = None
+    ) -> List[Document]:
+        """
+        ベクトル類似検索（埋め込みは同時実行中の他の検索とまとめて取得）
+        
+        量子化ベクトルインデックスが構築済みの場合はプロセス内で検索する。
+        where句と同じ条件（category_detail・除外タイトル）をマスクとして適用する。
+        全件走査と再ランキング用ベクトルの読み込みはイベントループを止めないようスレッドで実行する
+        """
+        if self._vector_index is not None and self._vector_index.size > 0:
+            if self.embedding_batcher is None:
+                embedding = await self.vectorstore.embeddings.aembed_query(query)
+            else:
+                embedding = await self.embedding_batcher.embed_query(query)
+            mask = self._token_index.build_mask(category_detail_keyword, excluded_titles)
+            hits = await asyncio.to_thread(
+                self._vector_index.search, embedding, k, mask=mask, fetch_full_precision=self._fetch_full_precision
+            )
+            return [self._token_index.get_document(row) for row, _ in hits]
+        
+        if self.embedding_batcher is None:
+            return await self.vectorstore.asimilarity_search(query, k=k, filter=where)
+        embedding = await self.embedding_batcher.embed_query(query)
+        return self.vectorstore.similarity_search_by_vector(embedding, k=k, filter=where)
+    
+    def _fetch_full_precision(self, rows: List[int]) -> List[List[float]]:
+        """再ランキング用にfloat32の埋め込みをChromaから取得（行番号順、memmapを書き出せなかった場合のみ）"""
+        ids = [self._vector_ids[row] for row in rows]
+        data = self.vectorstore.get(ids=ids, include=["embeddings"])
+        embeddings_by_id = dict(zip(data["ids"], data["embeddings"]))
+        return [embeddings_by_id[doc_id] for doc_id in ids]
+    
+    async def _vector_search(
+        self,
+        normalized_ingredients: List[str],
+        menu_type: str,
+        limit: int,
+        main_ingredient: str = None,
+        category_query_part: str = "",
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """ベクトル検索のみで候補を取得（食材インデックス未構築時のフォールバック）"""
+        # 主要食材がある場合は2段階検索を実行
+        if main_ingredient:
+            # 主要食材の表記をカタカナに統一
+            normalized_main = to_katakana(main_ingredient)
+            
+            # 第1段階: 主要食材のみでの検索（多めに取得）
+            main_query = f"{category_query_part}{normalized_main} {normalized_main} {normalized_main} {menu_type}"
+            
+            # 第2段階: 在庫食材込みでの検索
+            inventory_query = f"{category_query_part}{normalized_main} {normalized_main} {' '.join(normalized_ingredients)} {menu_type}"
+            
+            # 2つの検索の埋め込みは1回のリクエストにまとめる
+            main_results, inventory_results = await asyncio.gather(
+                self._similarity_search(main_query, k=limit * 15, where=where),
+                self._similarity_search(inventory_query, k=limit * 10, where=where)
+            )
+            
+            # 結果をマージ（重複除去）
+            all_results = main_results + inventory_results
+            seen_titles = set()
+            results = []
+            for result in all_results:
+                title = result.metadata.get('title', '')
+                if title not in seen_titles:
+                    seen_titles.add(title)
+                    results.append(result)
+                    if len(results) >= limit * 20:  # 十分な数を確保
+                        break
+            return results
+        
+        # 主要食材指定なしの場合は従来通り
+        query = f"{category_query_part}{' '.join(normalized_ingredients)} {menu_type}"
+        return await self._similarity_search(query, k=limit * 4, where=where)
+    
+    async def _hybrid_search(
+        self,
+        normalized_ingredients: List[str],
+        menu_type: str,
+        limit: int,
+        main_ingredient: str = None,
+        category_query_part: str = "",
+        where: Optional[Dict[str, Any]] = None,
+        category_detail_keyword: Optional[str] = None,
+        excluded_titles: Optional[Set[str]] = None
+    ) -> List[Document]:
+        """
+        語彙検索（食材の転置インデックス）とベクトル検索をRRFで融合して候補を取得
+        
+        語彙検索で食材が強くマッチするレシピを拾うため、ベクトル検索の取得件数は
+        従来の過剰取得（limit*15 + limit*10）より小さくしている
+        """
+        # 語彙検索: 在庫食材（主要食材は重み付け）
+        weighted_terms = {item: 1.0 for item in normalized_ingredients}
+        ranked_lists = []
+        
+        if main_ingredient:
+            normalized_main = to_katakana(main_ingredient)
+            weighted_terms[main_ingredient] = MAIN_INGREDIENT_WEIGHT
+            ranked_lists.append(self._token_index.lexical_search(
+                weighted_terms, k=limit * HYBRID_LEXICAL_K,
+                category_detail_keyword=category_detail_keyword, excluded_titles=excluded_titles
+            ))
+            
+            # ベクトル検索: 主要食材のみ / 在庫食材込み
+            main_query = f"{category_query_part}{normalized_main} {normalized_main} {normalized_main} {menu_type}"
+            inventory_query = f"{category_query_part}{normalized_main} {normalized_main} {' '.join(normalized_ingredients)} {menu_type}"
+            ranked_lists.extend(await asyncio.gather(
+                self._similarity_search(
+                    main_query, k=limit * HYBRID_MAIN_VECTOR_K, where=where,
+                    category_detail_keyword=category_detail_keyword, excluded_titles=excluded_titles
+                ),
+                self._similarity_search(
+                    inventory_query, k=limit * HYBRID_INVENTORY_VECTOR_K, where=where,
+                    category_detail_keyword=category_detail_keyword, excluded_titles=excluded_titles
+                )
+            ))
+        else:
+            ranked_lists.append(self._token_index.lexical_search(
+                weighted_terms, k=limit * 4,
+                category_detail_keyword=category_detail_keyword, excluded_titles=excluded_titles
+            ))
+            query = f"{category_query_part}{' '.join(normalized_ingredients)} {menu_type}"
+            ranked_lists.append(await self._similarity_search(
+                query, k=limit * 4, where=where,
+                category_detail_keyword=category_detail_keyword, excluded_titles=excluded_titles
+            ))
+        
+        return self._reciprocal_rank_fusion(ranked_lists, max_results=limit * HYBRID_CANDIDATE_LIMIT)
+    
+    def _reciprocal_rank_fusion(
+        self,
+        ranked_lists: List[List[Document]],
+        max_results: int
+    ) -> List[Document]:
+        """
+        複数の順位付きリストをReciprocal Rank Fusionで統合（タイトルで重複除去）
+        
+        Args:
+            ranked_lists: 順位付きドキュメントリストのリスト
+            max_results: 最大件数
+        
+        Returns:
+            融合スコア順のドキュメントリスト
+        """
+        fused_scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        first_seen: Dict[str, int] = {}
+        
+        for ranked in ranked_lists:
+            for rank, document in enumerate(ranked):
+                key = document.metadata.get('title', '') or document.page_content
+                fused_scores[key] = fused_scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+                if key not in documents:
+                    documents[key] = document
+                    first_seen[key] = len(first_seen)
+        
+        ordered = sorted(fused_scores, key=lambda key: (-fused_scores[key], first_seen[key]))
+        return [documents[key] for key in ordered[:max_results]]
+    
     async def search_recipes_by_partial_match(
         self,
         ingredients: List[str],
@@ -119,138 +399,59 @@ class RecipeSearchEngine:
             検索結果のリスト（マッチングスコア付き）
         """
         try:
-            # 在庫食材の重複を除去して正規化
-            normalized_ingredients = list(set(ingredients))
+            # 検索に使う食材を優先順に上限件数まで選ぶ（在庫数が多くてもコストを一定に保つ）
+            query_plan = plan_query(ingredients, main_ingredient)
+            normalized_ingredients = query_plan.primary_items
+            if query_plan.secondary_items:
+                logger.debug(f"🔍 [RAG] クエリ食材を{len(normalized_ingredients)}件に制限（二次食材{len(query_plan.secondary_items)}件）")
             
             # category_detail_keywordがある場合、検索クエリに追加
             category_query_part = ""
             if category_detail_keyword:
                 category_query_part = f"{category_detail_keyword} "
             
-            # 主要食材がある場合は2段階検索を実行
-            if main_ingredient:
-                # 主要食材を正規化
-                normalized_main = normalize_ingredient(main_ingredient)
-                
-                # 第1段階: 主要食材のみでの検索（多めに取得）
-                main_query = f"{category_query_part}{normalized_main} {normalized_main} {normalized_main} {menu_type}"
-                main_results = self.vectorstore.similarity_search(main_query, k=limit * 15)
-                
-                # 第2段階: 在庫食材込みでの検索
-                inventory_query = f"{category_query_part}{normalized_main} {normalized_main} {' '.join(normalized_ingredients)} {menu_type}"
-                inventory_results = self.vectorstore.similarity_search(inventory_query, k=limit * 10)
-                
-                # 結果をマージ（重複除去）
-                all_results = main_results + inventory_results
-                seen_titles = set()
-                results = []
-                for result in all_results:
-                    title = result.metadata.get('title', '')
-                    if title not in seen_titles:
-                        seen_titles.add(title)
-                        results.append(result)
-                        if len(results) >= limit * 20:  # 十分な数を確保
-                            break
-            else:
-                # 主要食材指定なしの場合は従来通り
-                query = f"{category_query_part}{' '.join(normalized_ingredients)} {menu_type}"
-                results = self.vectorstore.similarity_search(query, k=limit * 4)
-            
-            # 部分マッチングでフィルタリングとスコアリング
-            scored_results = []
+            # 除外タイトルはクエリごとに1回だけ正規化
+            excluded_titles = normalize_excluded_titles(excluded_recipes)
             
-            for i, result in enumerate(results):
-                try:
-                    metadata = result.metadata
-                    content = result.page_content
-                    
-                    # タイトルを取得
-                    title = metadata.get('title', '')
-                    if not title:
-                        # page_contentからタイトルを抽出
-                        parts = content.split(' | ')
-                        if len(parts) >= 1:
-                            title = parts[0].strip()
-                    
-                    # 除外レシピチェック
-                    if excluded_recipes:
-                        # タイトルを正規化（大文字小文字を無視、空白を除去）
-                        normalized_title = title.strip().lower()
-                        is_excluded = False
-                        for excluded in excluded_recipes:
-                            # プレフィックスを除去して正規化
-                            normalized_excluded = excluded.replace("主菜: ", "").replace("副菜: ", "").replace("汁物: ", "").replace("その他: ", "").strip().lower()
-                            # 完全一致のみで判定（部分一致は使用しない）
-                            if normalized_title == normalized_excluded:
-                                is_excluded = True
-                                break
-                        if is_excluded:
-                            continue
-                    
-                    # レシピの食材部分を抽出
-                    parts = content.split(' | ')
-                    recipe_ingredients = parts[0] if len(parts) > 0 else ""
-                    
-                    # 部分マッチングスコアを計算
-                    match_score, matched_ingredients = self._calculate_match_score(
-                        recipe_ingredients, normalized_ingredients, main_ingredient
-                    )
-                    
-                    # category_detail_keywordがある場合、category_detailでフィルタリング
-                    if category_detail_keyword:
-                        category_detail = metadata.get('category_detail', '')
-                        if category_detail_keyword not in category_detail:
-                            continue
-                    
-                    # 最小スコア以上のレシピのみを追加
-                    if match_score >= min_match_score:
-                        formatted_result = {
-                            "title": title,
-                            "category": metadata.get('recipe_category', ''),
-                            "category_detail": metadata.get('category_detail', ''),
-                            "main_ingredients": metadata.get('main_ingredients', ''),
-                            "original_index": metadata.get('original_index', 0),
-                            "content": content,
-                            "url": metadata.get('url', ''),  # メタデータからURLを取得（Google Search削減のため）
-                            "match_score": match_score,
-                            "matched_ingredients": matched_ingredients,
-                            "recipe_ingredients": recipe_ingredients
-                        }
-                        scored_results.append(formatted_result)
-                        
-                except Exception as e:
-                    logger.warning(f"結果処理エラー: {e}")
-                    continue
+            # 在庫食材の正規化はクエリごとに1回だけ行う
+            matcher = self._token_index.create_matcher(
+                normalized_ingredients, main_ingredient, secondary_items=query_plan.secondary_items
+            )
             
-            # マッチングスコア順にソート（タイトルで二次ソートして安定化）
-            scored_results.sort(key=lambda x: (-x['match_score'], x['title']))
+            # category_detail・除外タイトルのフィルタを検索側に渡す
+            where, has_candidates = self._build_where_filter(category_detail_keyword, excluded_titles)
+            if not has_candidates:
+                logger.debug(f"🔍 [RAG] category_detailに '{category_detail_keyword}' を含むレシピがありません")
+                return []
             
-            # 主要食材がある場合は、主要食材を含むレシピを優先
-            if main_ingredient:
-                # 主要食材を含むレシピと含まないレシピに分類
-                recipes_with_main = []
-                recipes_without_main = []
-                
-                for result in scored_results:
-                    # 主要食材のマッチング判定
-                    recipe_ingredients = result.get('recipe_ingredients', '')
-                    matched_ingredients = result.get('matched_ingredients', [])
-                    
-                    # 正規化による主要食材判定
-                    has_main_ingredient = self._has_main_ingredient_normalized(
-                        main_ingredient, recipe_ingredients, matched_ingredients
+            # フィルタ後の件数がlimitに満たない場合のみ取得件数を拡大
+            search_limit = limit
+            previous_count = -1
+            while True:
+                if self._token_index.is_loaded:
+                    # 語彙検索（転置インデックス）とベクトル検索をRRFで融合
+                    results = await self._hybrid_search(
+                        normalized_ingredients, menu_type, search_limit, main_ingredient, category_query_part,
+                        where=where, category_detail_keyword=category_detail_keyword, excluded_titles=excluded_titles
+                    )
+                else:
+                    # インデックス未構築の場合はベクトル検索のみ
+                    results = await self._vector_search(
+                        normalized_ingredients, menu_type, search_limit, main_ingredient, category_query_part,
+                        where=where
                     )
-                    
-                    if has_main_ingredient:
-                        recipes_with_main.append(result)
-                    else:
-                        recipes_without_main.append(result)
                 
-                # 主要食材ありのレシピのみを返す（主要食材なしは除外）
-                final_results = recipes_with_main[:limit]
-            else:
-                # 主要食材指定なしの場合は従来通り
-                final_results = scored_results[:limit]
+                final_results = self._score_candidates(
+                    results, matcher, excluded_titles, category_detail_keyword, min_match_score, limit
+                )
+                
+                if (len(final_results) >= limit
+                        or len(results) <= previous_count
+                        or search_limit >= limit * ADAPTIVE_K_MAX_SCALE):
+                    break
+                previous_count = len(results)
+                search_limit *= 2
+                logger.debug(f"🔍 [RAG] フィルタ後の件数不足のため取得件数を拡大: {len(final_results)}/{limit}件")
             
             return final_results
             
@@ -258,87 +459,111 @@ class RecipeSearchEngine:
             logger.error(f"部分マッチング検索エラー: {e}")
             raise
     
-    def _has_main_ingredient_normalized(self, main_ingredient, recipe_ingredients, matched_ingredients):
-        """正規化による主要食材判定"""
-        normalized_main = normalize_ingredient(main_ingredient)
-        
-        # レシピ食材を正規化してチェック
-        recipe_words = recipe_ingredients.split()
-        for word in recipe_words:
-            normalized_word = normalize_ingredient(word)
-            # 完全一致または部分一致
-            if normalized_main == normalized_word or normalized_main in normalized_word:
-                return True
-        
-        # マッチした食材を正規化してチェック
-        for matched in matched_ingredients:
-            if normalized_main in normalize_ingredient(matched):
-                return True
-        
-        return False
-    
-    def _calculate_match_score(
-        self, 
-        recipe_ingredients: str, 
-        normalized_ingredients: List[str],
-        main_ingredient: str = None
-    ) -> tuple[float, List[str]]:
+    def _score_candidates(
+        self,
+        results: List[Document],
+        matcher: InventoryMatcher,
+        excluded_titles: Set[str],
+        category_detail_keyword: Optional[str],
+        min_match_score: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
         """
-        マッチングスコアを計算
+        候補レシピをフィルタリング・スコアリングして上位limit件を返す
         
         Args:
-            recipe_ingredients: レシピの食材文字列
-            normalized_ingredients: 正規化された在庫食材リスト
-            main_ingredient: 主要食材
+            results: 候補ドキュメント
+            matcher: 在庫食材マッチャー
+            excluded_titles: 除外する正規化タイトルの集合
+            category_detail_keyword: category_detailのキーワード（otherカテゴリ用）
+            min_match_score: 最小マッチングスコア
+            limit: 検索結果の最大件数
         
         Returns:
-            (マッチングスコア, マッチした食材リスト)
+            検索結果のリスト（マッチングスコア付き）
         """
-        if not recipe_ingredients or not normalized_ingredients:
-            return 0.0, []
+        main_ingredient = matcher.main_ingredient
         
-        recipe_words = recipe_ingredients.split()
-        matched_count = 0
-        total_inventory = len(normalized_ingredients)
-        matched_items = []
+        # 部分マッチングでフィルタリングとスコアリング
+        scored_results = []
         
-        # 主要食材の重み付け
-        main_ingredient_weight = 5.0  # 主要食材の重み
+        for result in results:
+            try:
+                metadata = result.metadata
+                content = result.page_content
+                
+                # タイトルを取得
+                title = metadata.get('title', '')
+                if not title:
+                    # page_contentからタイトルを抽出
+                    parts = content.split(' | ')
+                    if len(parts) >= 1:
+                        title = parts[0].strip()
+                
+                # 除外レシピチェック（完全一致のみで判定、部分一致は使用しない）
+                if excluded_titles and normalize_title(title) in excluded_titles:
+                    continue
+                
+                # category_detail_keywordがある場合、category_detailでフィルタリング
+                if category_detail_keyword:
+                    category_detail = metadata.get('category_detail', '')
+                    if category_detail_keyword not in category_detail:
+                        continue
+                
+                # レシピの食材部分を抽出
+                recipe_ingredients = extract_recipe_ingredients(content)
+                
+                # 部分マッチングスコアを計算
+                match_score, matched_ingredients = matcher.score(recipe_ingredients)
+                
+                # 最小スコア以上のレシピのみを追加
+                if match_score >= min_match_score:
+                    formatted_result = {
+                        "title": title,
+                        "category": metadata.get('recipe_category', ''),
+                        "category_detail": metadata.get('category_detail', ''),
+                        "main_ingredients": metadata.get('main_ingredients', ''),
+                        "original_index": metadata.get('original_index', 0),
+                        "content": content,
+                        "url": metadata.get('url', ''),  # メタデータからURLを取得（Google Search削減のため）
+                        "match_score": match_score,
+                        "matched_ingredients": matched_ingredients,
+                        "recipe_ingredients": recipe_ingredients
+                    }
+                    scored_results.append(formatted_result)
+                    
+            except Exception as e:
+                logger.warning(f"結果処理エラー: {e}")
+                continue
+        
+        # マッチングスコア順にソート（タイトルで二次ソートして安定化）
+        scored_results.sort(key=lambda x: (-x['match_score'], x['title']))
         
-        for inventory_item in normalized_ingredients:
-            normalized_inventory = normalize_ingredient(inventory_item)
-            is_main_ingredient = main_ingredient and normalize_ingredient(inventory_item) == normalize_ingredient(main_ingredient)
+        # 主要食材がある場合は、主要食材を含むレシピを優先
+        if main_ingredient:
+            # 主要食材を含むレシピと含まないレシピに分類
+            recipes_with_main = []
+            recipes_without_main = []
             
-            # 完全マッチ（正規化後）
-            matched = False
-            for word in recipe_words:
-                normalized_word = normalize_ingredient(word)
-                if normalized_inventory == normalized_word:
-                    weight = main_ingredient_weight if is_main_ingredient else 1.0
-                    matched_count += weight
-                    matched_items.append(inventory_item)
-                    matched = True
-                    break
+            for result in scored_results:
+                # 主要食材のマッチング判定
+                recipe_ingredients = result.get('recipe_ingredients', '')
+                matched_ingredients = result.get('matched_ingredients', [])
+                
+                # 正規化による主要食材判定
+                has_main_ingredient = matcher.has_main_ingredient(
+                    recipe_ingredients, matched_ingredients
+                )
+                
+                if has_main_ingredient:
+                    recipes_with_main.append(result)
+                else:
+                    recipes_without_main.append(result)
             
-            # 部分マッチ（正規化後）
-            if not matched:
-                for word in recipe_words:
-                    normalized_word = normalize_ingredient(word)
-                    if normalized_inventory in normalized_word or normalized_word in normalized_inventory:
-                        weight = main_ingredient_weight * 0.5 if is_main_ingredient else 0.5
-                        matched_count += weight
-                        matched_items.append(inventory_item)
-                        break
-        
-        # スコア計算: マッチした食材数 / 在庫食材数
-        # 主要食材がある場合は、主要食材の重みを考慮した正規化
-        if main_ingredient and main_ingredient in normalized_ingredients:
-            # 主要食材がある場合: (主要食材の重み + その他の食材数) / (主要食材の重み + その他の食材数)
-            other_ingredients_count = len(normalized_ingredients) - 1
-            max_possible_score = main_ingredient_weight + other_ingredients_count
-            match_score = matched_count / max_possible_score if max_possible_score > 0 else 0.0
+            # 主要食材ありのレシピのみを返す（主要食材なしは除外）
+            final_results = recipes_with_main[:limit]
         else:
-            # 主要食材がない場合: 従来の計算
-            match_score = matched_count / total_inventory if total_inventory > 0 else 0.0
+            # 主要食材指定なしの場合は従来通り
+            final_results = scored_results[:limit]
         
-        return match_score, matched_items
+        return final_results
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+レシピタイトル → URL のインメモリインデックス
+
+4つのベクトルDBのメタデータ（タイトル・URL）から構築し、LLMが生成した料理名に
+コーパス内の同じ（またはほぼ同じ）レシピがあれば、そのURLを返す。
+Web検索（Google / Perplexity）の前に参照し、課金対象の検索呼び出しを減らす。
+
+照合は2段階:
+    1. 正規化タイトルの完全一致
+    2. 文字トライグラム集合のDice係数による曖昧一致（閾値以上で最も類似度の高いもの）
+
+曖昧一致の候補は、閾値に必要な共有数から決まる出現頻度の低いトライグラム
+（プレフィックスフィルタ）の転置リストからのみ集めるため、「の炒め」のような
+頻出トライグラムの長い転置リストは走査しない。
+
+環境変数:
+    RAG_TITLE_MATCH_THRESHOLD=0.75  # 曖昧一致の類似度の下限（1.0で完全一致のみ）
+"""
+
+import os
+import re
+import math
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from langchain_core.documents import Document
+
+DEFAULT_MATCH_THRESHOLD = 0.75
+NGRAM_SIZE = 3
+
+# 【簡単】・（5分）・★ などの装飾
+_DECORATION_PATTERN = re.compile(r'【[^】]*】|\[[^\]]*\]|\([^)]*\)|「|」|『|』')
+# 空白と記号（文字・数字以外）
+_SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+# カタカナ → ひらがな（「みそ」「ミソ」を同一視）
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+
+def normalize_recipe_title(title: str) -> str:
+    """
+    タイトルを照合用キーに正規化
+
+    NFKCで全角・半角を統一し、小文字化・カタカナのひらがな化・装飾と記号の除去を行う。
+    """
+    if not title:
+        return ""
+    normalized = unicodedata.normalize("NFKC", title).lower()
+    normalized = _DECORATION_PATTERN.sub('', normalized)
+    normalized = normalized.translate(_KATAKANA_TO_HIRAGANA)
+    return _SEPARATOR_PATTERN.sub('', normalized)
+
+
+def _trigrams(key: str) -> Set[str]:
+    """境界記号付きの文字トライグラム集合"""
+    padded = f"\x02{key}\x03"
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+@dataclass
+class TitleMatch:
+    """タイトルインデックスの照合結果"""
+    title: str
+    url: str
+    category: str
+    category_detail: str
+    similarity: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """RecipeService の rag_results と同じ形式の辞書"""
+        return {
+            "title": self.title,
+            "url": self.url,
+            "category": self.category,
+            "category_detail": self.category_detail,
+            "similarity": self.similarity,
+        }
+
+
+class RecipeTitleIndex:
+    """正規化タイトルの完全一致とトライグラムの曖昧一致によるURL検索"""
+
+    def __init__(self, threshold: Optional[float] = None):
+        """
+        初期化
+
+        Args:
+            threshold: 曖昧一致の類似度の下限。未指定時は RAG_TITLE_MATCH_THRESHOLD
+        """
+        if threshold is None:
+            threshold = float(os.getenv("RAG_TITLE_MATCH_THRESHOLD", DEFAULT_MATCH_THRESHOLD))
+        self.threshold = threshold
+        # 登録順のエントリ（タイトル, URL, カテゴリ, category_detail）
+        self._entries: List[Tuple[str, str, str, str]] = []
+        # エントリ番号 → 正規化タイトル / トライグラム数
+        self._keys: List[str] = []
+        self._gram_counts: List[int] = []
+        # 正規化タイトル → エントリ番号（URLのある最初のレシピ）
+        self._by_key: Dict[str, int] = {}
+        # トライグラム → エントリ番号リスト
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, title: str, url: str, category: str = "", category_detail: str = "") -> bool:
+        """
+        レシピを登録（URLがない・正規化タイトルが登録済みの場合は登録しない）
+
+        Returns:
+            登録したかどうか
+        """
+        key = normalize_recipe_title(title)
+        if not key or not url or key in self._by_key:
+            return False
+        entry_id = len(self._entries)
+        self._entries.append((title, url, category, category_detail))
+        self._by_key[key] = entry_id
+        self._keys.append(key)
+        grams = _trigrams(key)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry_id)
+        return True
+
+    def add_documents(self, documents: List[Document], category: str) -> int:
+        """
+        ベクトルストアのドキュメント（メタデータの title / url）を登録
+
+        Returns:
+            登録したレシピ数
+        """
+        added = 0
+        for document in documents:
+            metadata = document.metadata or {}
+            if self.add(
+                metadata.get("title", ""),
+                metadata.get("url", ""),
+                category,
+                metadata.get("category_detail", "") or ""
+            ):
+                added += 1
+        return added
+
+    def lookup(self, title: str) -> Optional[TitleMatch]:
+        """
+        タイトルに一致するレシピを検索
+
+        Args:
+            title: 料理名（LLMの生成結果など）
+
+        Returns:
+            完全一致、または類似度が閾値以上で最も高いレシピ（見つからない場合は None）
+        """
+        key = normalize_recipe_title(title)
+        if not key:
+            return None
+        entry_id = self._by_key.get(key)
+        if entry_id is not None:
+            return self._to_match(entry_id, 1.0)
+        if self.threshold >= 1.0:
+            return None
+
+        query_grams = _trigrams(key)
+        query_count = len(query_grams)
+        # Dice係数が閾値以上になりうるトライグラム数の範囲（長さが大きく異なる候補を除外）
+        min_count = query_count * self.threshold / (2.0 - self.threshold)
+        max_count = query_count * (2.0 - self.threshold) / self.threshold
+        # 閾値に必要な最小共有数。候補は出現頻度の低い順に (query_count - min_overlap + 1) 個の
+        # トライグラムのいずれかを必ず含む
+        min_overlap = max(1, math.ceil(self.threshold * (query_count + min_count) / 2.0 - 1e-9))
+        prefix = sorted(query_grams, key=lambda gram: len(self._postings.get(gram, ())))
+        candidates: Set[int] = set()
+        for gram in prefix[:query_count - min_overlap + 1]:
+            candidates.update(self._postings.get(gram, ()))
+
+        best_id = None
+        best_similarity = 0.0
+        for candidate in candidates:
+            candidate_count = self._gram_counts[candidate]
+            if candidate_count < min_count or candidate_count > max_count:
+                continue
+            overlap = len(query_grams & _trigrams(self._keys[candidate]))
+            similarity = 2.0 * overlap / (query_count + candidate_count)
+            # 同じ類似度なら登録順（カテゴリ順 → 検索DBの並び順）を優先
+            if similarity > best_similarity or (similarity == best_similarity and best_id is not None and candidate < best_id):
+                best_id = candidate
+                best_similarity = similarity
+
+        if best_id is None or best_similarity < self.threshold:
+            return None
+        return self._to_match(best_id, best_similarity)
+
+    def _to_match(self, entry_id: int, similarity: float) -> TitleMatch:
+        title, url, category, category_detail = self._entries[entry_id]
+        return TitleMatch(
+            title=title,
+            url=url,
+            category=category,
+            category_detail=category_detail,
+            similarity=similarity
+        )
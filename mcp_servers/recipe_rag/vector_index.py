@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+量子化ベクトルインデックス（プロセス内）
+
+レシピの埋め込みベクトルを float32 / float16 / int8（ベクトルごとのスケール）で保持し、
+内積（正規化済みベクトルのコサイン類似度）で全件走査する。
+float16 / int8 の場合は上位候補を float32 のベクトルで再ランキングして順位を安定させる。
+再ランキング用の float32 ベクトルはベクトルDBの隣のファイル（np.memmap）に書き出し、
+候補行のみをページ単位で読み込む（プロセスの匿名メモリには float32 の全件を保持しない）。
+
+保存形式は環境変数 RAG_VECTOR_INDEX_DTYPE で選択する（未設定の場合はインデックスを作らず
+Chromaの検索をそのまま使う）。
+"""
+
+import os
+import tempfile
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+from config.loggers import GenericLogger
+
+logger = GenericLogger("mcp", "recipe_rag", initialize_logging=False)
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+# 再ランキング対象の候補数（kに対する倍率）
+DEFAULT_RERANK_FACTOR = 4
+# float16 / int8 のスコア計算でfloat32に変換する行ブロックサイズ
+SCORE_BLOCK_ROWS = 4096
+# 再ランキング用float32ベクトルのファイル名（ベクトルDBのディレクトリに置く）
+FULL_PRECISION_FILENAME = "vector_index_float32.npy"
+
+# 行番号リスト → float32ベクトル行列（再ランキング用）
+FullPrecisionFetcher = Callable[[List[int]], np.ndarray]
+
+
+def get_vector_index_dtype() -> Optional[str]:
+    """環境変数からベクトルインデックスの保存形式を取得（無効の場合はNone）"""
+    dtype = os.getenv("RAG_VECTOR_INDEX_DTYPE", "").strip().lower()
+    if not dtype:
+        return None
+    if dtype not in SUPPORTED_DTYPES:
+        logger.warning(f"⚠️ [RAG] 未対応のRAG_VECTOR_INDEX_DTYPEです: {dtype}（{', '.join(SUPPORTED_DTYPES)}）")
+        return None
+    return dtype
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """行ベクトルをL2正規化"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class QuantizedVectorIndex:
+    """量子化ベクトルインデックス"""
+
+    def __init__(self, dtype: str = "float32", rerank_factor: int = DEFAULT_RERANK_FACTOR):
+        """
+        初期化
+
+        Args:
+            dtype: "float32", "float16", "int8"
+            rerank_factor: float32で再ランキングする候補数（kに対する倍率）
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        self.dtype = dtype
+        self.rerank_factor = max(rerank_factor, 1)
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None  # int8のみ（ベクトルごとのスケール）
+        self._full_precision: Optional[np.ndarray] = None  # 再ランキング用float32（np.memmap、読み取り専用）
+
+    @property
+    def size(self) -> int:
+        """登録済みベクトル数"""
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """インデックスが保持するメモリ量（バイト）"""
+        total = 0 if self._vectors is None else self._vectors.nbytes
+        if self._scales is not None:
+            total += self._scales.nbytes
+        return total
+
+    @property
+    def has_full_precision(self) -> bool:
+        """再ランキング用のfloat32ベクトル（memmap）を保持しているか"""
+        return self._full_precision is not None
+
+    def build(self, embeddings: Sequence[Sequence[float]], full_precision_path: Optional[str] = None) -> None:
+        """
+        埋め込みベクトルからインデックスを構築
+
+        Args:
+            embeddings: 埋め込みベクトルのリスト（行番号が検索結果の番号になる）
+            full_precision_path: 再ランキング用float32ベクトルの書き出し先（float16/int8のみ使用）
+        """
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        self._full_precision = None
+        if self.dtype == "float32":
+            self._vectors = vectors
+            self._scales = None
+            return
+        if full_precision_path:
+            self._full_precision = self._write_full_precision(vectors, full_precision_path)
+        if self.dtype == "float16":
+            self._vectors = vectors.astype(np.float16)
+            self._scales = None
+        else:
+            # int8: ベクトルごとに最大絶対値を127に合わせる
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales = scales.astype(np.float32)
+
+    @staticmethod
+    def _write_full_precision(vectors: np.ndarray, path: str) -> Optional[np.ndarray]:
+        """
+        float32ベクトルをファイルに書き出し、読み取り専用のmemmapとして開く
+
+        他プロセスが開いているファイルを壊さないよう、一時ファイルに書いてから置き換える
+        （失敗した場合はNone。呼び出し元の取得関数による再ランキングにフォールバック）
+        """
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=".vector_index_", suffix=".npy", dir=os.path.dirname(os.path.abspath(path))
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, vectors)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return np.load(path, mmap_mode="r")
+        except OSError as e:
+            logger.warning(f"⚠️ [RAG] 再ランキング用ベクトルを書き出せません: {path}: {e}")
+            return None
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """保存形式のままの近似スコア（内積）"""
+        if self.dtype == "float32":
+            return self._vectors @ query
+        # float16 / int8 の行列積はBLASを使えないため、行ブロックごとにfloat32へ変換して計算
+        # （一時的なfloat32配列はブロック分のみ）
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, SCORE_BLOCK_ROWS):
+            block = self._vectors[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + SCORE_BLOCK_ROWS] = block @ query
+        if self._scales is not None:
+            scores *= self._scales
+        return scores
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        k: int,
+        mask: Optional[np.ndarray] = None,
+        fetch_full_precision: Optional[FullPrecisionFetcher] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        内積で上位k件を検索
+
+        Args:
+            query_embedding: クエリの埋め込みベクトル
+            k: 取得件数
+            mask: 検索対象の行（Trueのみ対象）。Noneの場合は全件
+            fetch_full_precision: 再ランキング用にfloat32ベクトルを取得する関数
+                （float16/int8かつmemmapを保持していない場合のみ使用）
+
+        Returns:
+            (行番号, スコア) のリスト（スコア降順）
+        """
+        if self._vectors is None or self.size == 0 or k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm > 0:
+            query = query / query_norm
+
+        scores = self._approximate_scores(query).astype(np.float32)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            available = int(mask.sum())
+        else:
+            available = self.size
+        if available == 0:
+            return []
+
+        if self._full_precision is not None:
+            fetch_full_precision = self._read_full_precision
+        needs_rerank = self.dtype != "float32" and fetch_full_precision is not None
+        candidate_count = min(k * self.rerank_factor if needs_rerank else k, available)
+        candidates = np.argpartition(-scores, candidate_count - 1)[:candidate_count]
+
+        if needs_rerank:
+            full_vectors = _normalize_rows(np.asarray(fetch_full_precision(candidates.tolist()), dtype=np.float32))
+            candidate_scores = full_vectors @ query
+        else:
+            candidate_scores = scores[candidates]
+
+        order = np.argsort(-candidate_scores, kind="stable")[:k]
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in order]
+
+    def _read_full_precision(self, rows: List[int]) -> np.ndarray:
+        """memmapから候補行のfloat32ベクトルを読み込む（書き出し時に正規化済み）"""
+        return np.asarray(self._full_precision[rows])
@@ -6,12 +6,15 @@ This module provides web search functionality for recipe retrieval using Google
 
 import os
 import re
+import asyncio
 from typing import List, Dict, Any, Optional
+import httplib2
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
 from config.loggers import GenericLogger
 from mcp_servers.recipe_web_constants import RECIPE_SITES, MOCK_RECIPES
 from mcp_servers.recipe_web_utils import identify_site, build_recipe_image_url
+from mcp_servers.resilience import get_provider_guard
 
 # 環境変数の読み込み
 load_dotenv()
@@ -26,6 +29,9 @@ class GoogleSearchClient:
     # モック機能の切り替えフラグ（課金回避用）
     # 環境変数 USE_MOCK_SEARCH で制御（デフォルト: True）
     USE_MOCK_SEARCH = os.getenv('USE_MOCK_SEARCH', 'True').lower() in ('true', '1', 'yes')
+    # API障害時（前回の結果もない場合）にモックデータを返すか
+    # 環境変数 RESILIENCE_MOCK_SEARCH_FALLBACK で制御（デフォルト: False。本番で実在しない検索結果を見せないため）
+    MOCK_SEARCH_FALLBACK = os.getenv('RESILIENCE_MOCK_SEARCH_FALLBACK', 'False').lower() in ('true', '1', 'yes')
     
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_SEARCH_API_KEY')
@@ -35,6 +41,8 @@ class GoogleSearchClient:
             raise ValueError("GOOGLE_SEARCH_API_KEY and GOOGLE_SEARCH_ENGINE_ID are required")
         
         self.service = build("customsearch", "v1", developerKey=self.api_key)
+        # 同時実行数・適応タイムアウト・サーキットブレーカー（プロセス共通）
+        self.guard = get_provider_guard("google_search", max_concurrency=4, min_timeout=2.0, max_timeout=10.0)
     
     async def search_recipes(self, recipe_title: str, num_results: int = 5) -> List[Dict[str, Any]]:
         """
@@ -63,15 +71,13 @@ class GoogleSearchClient:
             # 検索クエリを構築
             query = self._build_recipe_query(recipe_title)
             
-            result = self.service.cse().list(
-                q=query,
-                cx=self.engine_id,
-                num=num_results,
-                lr='lang_ja'  # 日本語に限定
-            ).execute()
-            
-            # 結果を解析・整形
-            recipes = self._parse_search_results(result.get('items', []))
+            # 障害時は前回の同じ検索の結果 → モックデータの順にフォールバック
+            recipes = await self.guard.call(
+                "cse.list",
+                lambda: self._execute_search(query, num_results),
+                fallback=lambda: self._fallback_recipes(recipe_title, num_results),
+                cache_key=f"{query}|{num_results}"
+            )
             
             logger.debug(f"✅ [WEB] Found recipes")
             logger.debug(f"📊 [WEB] Found {len(recipes)} recipes")
@@ -81,6 +87,27 @@ class GoogleSearchClient:
             logger.error(f"❌ [WEB] 検索エラー: {e}")
             return []
     
+    async def _execute_search(self, query: str, num_results: int) -> List[Dict[str, Any]]:
+        """Custom Search APIを呼び出して結果を整形（同期APIのためスレッドで実行）"""
+        request = self.service.cse().list(
+            q=query,
+            cx=self.engine_id,
+            num=num_results,
+            lr='lang_ja'  # 日本語に限定
+        )
+        # httplib2.Http はスレッドセーフではないため呼び出しごとに作成
+        http = httplib2.Http(timeout=self.guard.max_timeout)
+        result = await asyncio.to_thread(request.execute, http=http)
+        return self._parse_search_results(result.get('items', []))
+    
+    def _fallback_recipes(self, recipe_title: str, num_results: int) -> List[Dict[str, Any]]:
+        """API障害時のフォールバック（モックデータ、無効時は空）"""
+        if not self.MOCK_SEARCH_FALLBACK:
+            return []
+        logger.warning(f"🎭 [WEB] Google Search APIが利用できないためモックデータを返します")
+        # 実際の検索結果と区別できるようモックであることを明示
+        return [{**recipe, 'is_mock': True} for recipe in self._filter_mock_recipes(recipe_title, num_results)]
+    
     def _filter_mock_recipes(self, recipe_title: str, num_results: int) -> List[Dict[str, Any]]:
         """
         モックレシピをランダムに選択（タイトルチェックなし）
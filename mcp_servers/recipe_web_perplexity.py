@@ -8,13 +8,14 @@ import os
 import re
 import asyncio
 from typing import List, Dict, Any, Optional
-from urllib.parse import urljoin
-import requests
+from urllib.parse import urljoin, urlsplit
+import httpx
 from dotenv import load_dotenv
 from config.loggers import GenericLogger
 from bs4 import BeautifulSoup
 from mcp_servers.recipe_web_constants import RECIPE_SITES
 from mcp_servers.recipe_web_utils import identify_site
+from mcp_servers.resilience import get_provider_guard
 
 # 環境変数の読み込み
 load_dotenv()
@@ -22,6 +23,13 @@ load_dotenv()
 # ロガーの初期化
 logger = GenericLogger("mcp", "recipe_web_perplexity", initialize_logging=False)
 
+# HTTP接続プール（Perplexity API・レシピページ取得で共有）
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 4
+DEFAULT_IMAGE_FETCH_TIMEOUT = 5.0
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
 
 class PerplexitySearchClient:
     """Perplexity APIを使用したレシピ検索クライアント"""
@@ -33,6 +41,46 @@ class PerplexitySearchClient:
             raise ValueError("PERPLEXITY_API_KEY is required")
         
         self.api_url = "https://api.perplexity.ai/chat/completions"
+        # 同時実行数・適応タイムアウト・サーキットブレーカー（プロセス共通）
+        self.guard = get_provider_guard("perplexity", max_concurrency=4, min_timeout=5.0, max_timeout=30.0)
+        
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("RECIPE_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+            max_keepalive_connections=int(os.getenv("RECIPE_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS))
+        )
+        self.max_connections_per_host = max(
+            1, int(os.getenv("RECIPE_HTTP_MAX_CONNECTIONS_PER_HOST", DEFAULT_MAX_CONNECTIONS_PER_HOST))
+        )
+        self.image_fetch_timeout = float(os.getenv("RECIPE_IMAGE_FETCH_TIMEOUT", DEFAULT_IMAGE_FETCH_TIMEOUT))
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """共有の非同期HTTPクライアント（接続を再利用する）"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=httpx.Timeout(self.guard.max_timeout, connect=5.0),
+                follow_redirects=True,
+                headers={'User-Agent': USER_AGENT}
+            )
+        return self._http_client
+    
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """ホストごとの同時接続数を制限するセマフォ"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+    
+    async def aclose(self) -> None:
+        """HTTPクライアントを閉じる"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
     
     async def search_recipes(self, recipe_title: str, num_results: int = 5) -> List[Dict[str, Any]]:
         """レシピ検索を実行（Perplexity API使用）"""
@@ -65,22 +113,13 @@ class PerplexitySearchClient:
                 "temperature": 0.2
             }
             
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=30
+            # 障害時は前回の同じ検索の結果を使用（ない場合は空の結果）
+            result = await self.guard.call(
+                "chat.completions",
+                lambda: self._post_search(headers, payload),
+                cache_key=query
             )
             
-            # エラーレスポンスの詳細を取得
-            if response.status_code != 200:
-                error_detail = response.text
-                logger.error(f"❌ [PERPLEXITY] APIエラー {response.status_code}: {error_detail}")
-                logger.error(f"❌ [PERPLEXITY] リクエストペイロード: {payload}")
-                response.raise_for_status()
-            
-            result = response.json()
-            
             # レスポンスからURLを抽出（非同期で画像も取得）
             recipes = await self._parse_perplexity_response(result, recipe_title, num_results)
             
@@ -92,6 +131,20 @@ class PerplexitySearchClient:
             logger.error(f"❌ [PERPLEXITY] 検索エラー: {e}")
             return []
     
+    async def _post_search(self, headers: Dict[str, str], payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Perplexity APIを呼び出し"""
+        async with self._host_semaphore(self.api_url):
+            response = await self.http_client.post(self.api_url, headers=headers, json=payload)
+        
+        # エラーレスポンスの詳細を取得
+        if response.status_code != 200:
+            error_detail = response.text
+            logger.error(f"❌ [PERPLEXITY] APIエラー {response.status_code}: {error_detail}")
+            logger.error(f"❌ [PERPLEXITY] リクエストペイロード: {payload}")
+            response.raise_for_status()
+        
+        return response.json()
+    
     def _build_recipe_query(self, recipe_title: str) -> str:
         """レシピ検索用のクエリを構築"""
         # 複数サイトを対象とした検索クエリ
@@ -260,6 +313,9 @@ class PerplexitySearchClient:
         """
         レシピページから画像URLを取得
         
+        ページの取得は共有の接続プールで非同期に行い、HTMLの解析はワーカースレッドで実行する
+        （イベントループを止めないため、複数ページの取得・解析が並行して進む）
+        
         Args:
             url: レシピページのURL
         
@@ -268,58 +324,56 @@ class PerplexitySearchClient:
         """
         try:
             # HTMLを取得
-            response = requests.get(
-                url, 
-                timeout=5, 
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                }
-            )
+            async with self._host_semaphore(url):
+                response = await self.http_client.get(url, timeout=self.image_fetch_timeout)
             response.raise_for_status()
             
-            # BeautifulSoupでパース
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # デバッグ: HTMLの一部をログ出力（最初の1000文字）
-            logger.debug(f"🔍 [PERPLEXITY] HTML preview for {url}: {response.text[:1000]}")
-            
-            # 1. OGP画像を優先的に取得
-            image_url = self._fetch_ogp_image(soup, url)
-            if image_url:
-                return image_url
-            
-            # 2. Twitter Card画像
-            image_url = self._fetch_twitter_image(soup, url)
-            if image_url:
-                return image_url
-            
-            # 3. クラシル専用画像
-            if 'kurashiru.com' in url:
-                image_url = self._fetch_kurashiru_image(soup, url)
-                if image_url:
-                    return image_url
+            return await asyncio.to_thread(self._extract_image_url, response.text, url)
             
-            # 4. デリッシュキッチン専用画像
-            if 'delishkitchen.tv' in url:
-                image_url = self._fetch_delishkitchen_image(soup, url)
-                if image_url:
-                    return image_url
-            
-            # 5. フォールバック画像
-            image_url = self._fetch_fallback_image(soup, url)
-            if image_url:
-                return image_url
-            
-            logger.warning(f"⚠️ [PERPLEXITY] No image found for {url}")
-            return None
-            
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.warning(f"⚠️ [PERPLEXITY] Timeout while fetching image from {url}")
             return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.warning(f"⚠️ [PERPLEXITY] 画像取得中のリクエストエラー ({url}): {e}")
             return None
         except Exception as e:
             logger.warning(f"⚠️ [PERPLEXITY] 画像の取得に失敗しました ({url}): {e}")
             return None
-
+    
+    def _extract_image_url(self, html: str, url: str) -> Optional[str]:
+        """HTMLから画像URLを抽出（同期、ワーカースレッドで実行）"""
+        # BeautifulSoupでパース
+        soup = BeautifulSoup(html, 'lxml')
+        
+        # デバッグ: HTMLの一部をログ出力（最初の1000文字）
+        logger.debug(f"🔍 [PERPLEXITY] HTML preview for {url}: {html[:1000]}")
+        
+        # 1. OGP画像を優先的に取得
+        image_url = self._fetch_ogp_image(soup, url)
+        if image_url:
+            return image_url
+        
+        # 2. Twitter Card画像
+        image_url = self._fetch_twitter_image(soup, url)
+        if image_url:
+            return image_url
+        
+        # 3. クラシル専用画像
+        if 'kurashiru.com' in url:
+            image_url = self._fetch_kurashiru_image(soup, url)
+            if image_url:
+                return image_url
+        
+        # 4. デリッシュキッチン専用画像
+        if 'delishkitchen.tv' in url:
+            image_url = self._fetch_delishkitchen_image(soup, url)
+            if image_url:
+                return image_url
+        
+        # 5. フォールバック画像
+        image_url = self._fetch_fallback_image(soup, url)
+        if image_url:
+            return image_url
+        
+        logger.warning(f"⚠️ [PERPLEXITY] No image found for {url}")
+        return None
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+外部API呼び出しの耐障害レイヤー（プロバイダー別）
+
+OpenAI・Google Custom Search・Perplexity の呼び出しをプロバイダーごとの ProviderGuard で包み、
+プロバイダーの遅延・障害時にリクエストが積み上がってワーカーを使い切らないようにする。
+
+- 同時実行数の上限（セマフォ）。枠の待ち時間もタイムアウトの対象
+- 適応タイムアウト: 操作ごとの直近レイテンシのパーセンタイル × 倍率（最小値・最大値で制限）
+- サーキットブレーカー: 連続失敗で open（即時に失敗させる）→ 一定時間後に half-open で
+  1件だけ試行（プローブ）→ 成功で closed / 失敗で再び open
+- 高速フォールバック: 前回成功時の結果（cache_key 指定時）→ 呼び出し元のフォールバック
+
+    guard = get_provider_guard("google_search")
+    items = await guard.call(
+        "cse.list",
+        lambda: asyncio.to_thread(request.execute),
+        cache_key=query,
+        fallback=lambda: mock_results(),
+    )
+
+状態とカウンターは get_resilience_metrics() で取得できる（プロセスごと）。
+
+環境変数（<PROVIDER> は OPENAI / GOOGLE_SEARCH / PERPLEXITY など）:
+    RESILIENCE_<PROVIDER>_MAX_CONCURRENCY=8     # 同時実行数の上限
+    RESILIENCE_<PROVIDER>_MIN_TIMEOUT=2         # 適応タイムアウトの最小値（秒）
+    RESILIENCE_<PROVIDER>_MAX_TIMEOUT=30        # 適応タイムアウトの最大値（秒、計測が少ない間はこの値）
+    RESILIENCE_<PROVIDER>_FAILURE_THRESHOLD=5   # open にする連続失敗数
+    RESILIENCE_<PROVIDER>_RESET_TIMEOUT=30      # open から half-open までの秒数
+"""
+
+import os
+import copy
+import time
+import asyncio
+import inspect
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from config.loggers import GenericLogger
+
+logger = GenericLogger("mcp", "resilience", initialize_logging=False)
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MIN_TIMEOUT = 2.0
+DEFAULT_MAX_TIMEOUT = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+# 適応タイムアウトの計算（直近 LATENCY_WINDOW 件の TIMEOUT_PERCENTILE × TIMEOUT_MULTIPLIER）
+LATENCY_WINDOW = 200
+TIMEOUT_PERCENTILE = 95
+TIMEOUT_MULTIPLIER = 3.0
+# この件数以上の計測がたまるまでは最大値を使用
+MIN_SAMPLES = 20
+# フォールバック用に保持する前回成功時の結果
+FALLBACK_CACHE_SIZE = 256
+FALLBACK_CACHE_MAX_AGE = 24 * 3600.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailableError(Exception):
+    """サーキットが open、または同時実行の枠を待てなかったため呼び出さなかった"""
+
+
+class ProviderTimeoutError(Exception):
+    """適応タイムアウトを超えた"""
+
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """プロバイダー側の障害か（リクエスト不正などの4xxはサーキットの判定に含めない）"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500 and status_code not in (408, 429):
+        return False
+    return True
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class AdaptiveTimeout:
+    """操作1つ分のレイテンシ分布に基づくタイムアウト"""
+
+    def __init__(self, min_timeout: float, max_timeout: float):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    @property
+    def timeout(self) -> float:
+        """現在のタイムアウト（秒）"""
+        if len(self.latencies) < MIN_SAMPLES:
+            return self.max_timeout
+        adaptive = _percentile(self.latencies, TIMEOUT_PERCENTILE) * TIMEOUT_MULTIPLIER
+        return min(self.max_timeout, max(self.min_timeout, adaptive))
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        return {
+            "timeout_s": round(self.timeout, 3),
+            "samples": len(latencies),
+            "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        }
+
+
+class CircuitBreaker:
+    """連続失敗で open、一定時間後に half-open で1件ずつ試行するサーキットブレーカー"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """呼び出してよいか（half-open では同時に1件のみ）"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != OPEN:
+                self.times_opened += 1
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """結果を判定しなかった呼び出し（呼び出し元のキャンセルなど）のプローブ枠を戻す"""
+        self.probe_in_flight = False
+
+    def _transition(self, state: str) -> None:
+        previous, self.state = self.state, state
+        if state == OPEN:
+            logger.warning(
+                f"🔌 [Resilience] {self.name}: サーキットを open にしました "
+                f"（連続失敗 {self.consecutive_failures}件、{self.reset_timeout:.0f}秒後に再試行）"
+            )
+        else:
+            logger.info(f"🔌 [Resilience] {self.name}: サーキット {previous} → {state}")
+
+
+class ProviderGuard:
+    """プロバイダー1つ分の同時実行数制限・適応タイムアウト・サーキットブレーカー・フォールバック"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_timeout: float = DEFAULT_MIN_TIMEOUT,
+        max_timeout: float = DEFAULT_MAX_TIMEOUT,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT
+    ):
+        """
+        初期化
+
+        Args:
+            name: プロバイダー名
+            max_concurrency: 同時実行数の上限
+            min_timeout: 適応タイムアウトの最小値（秒）
+            max_timeout: 適応タイムアウトの最大値（秒）
+            failure_threshold: open にする連続失敗数
+            reset_timeout: open から half-open までの秒数
+        """
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_timeout = min_timeout
+        self.max_timeout = max(min_timeout, max_timeout)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._timeouts: Dict[str, AdaptiveTimeout] = {}
+        self._fallback_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.in_flight = 0
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "client_errors": 0,
+            "timeouts": 0,
+            "short_circuited": 0,
+            "rejected": 0,
+            "cache_fallbacks": 0,
+            "fallbacks": 0,
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _timeout_for(self, operation: str) -> AdaptiveTimeout:
+        timeout = self._timeouts.get(operation)
+        if timeout is None:
+            timeout = self._timeouts[operation] = AdaptiveTimeout(self.min_timeout, self.max_timeout)
+        return timeout
+
+    def timeout_for(self, operation: str) -> float:
+        """操作の現在のタイムアウト（秒）"""
+        return self._timeout_for(operation).timeout
+
+    @asynccontextmanager
+    async def slot(self, operation: str) -> AsyncIterator[None]:
+        """
+        サーキットの確認と同時実行の枠の確保（ストリーミングなど、呼び出し全体を包む場合に使用）
+
+        ブロック内の例外は失敗（4xxのリクエスト不正を除く）、正常終了は成功として記録する。
+
+        Raises:
+            ProviderUnavailableError: サーキットが open、または枠をタイムアウトまでに確保できない
+        """
+        self.counters["calls"] += 1
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise ProviderUnavailableError(f"{self.name}: サーキットが open のため呼び出しを省略しました")
+
+        semaphore = self._get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.timeout_for(operation))
+        except asyncio.TimeoutError:
+            self.breaker.release()
+            self.counters["rejected"] += 1
+            raise ProviderUnavailableError(f"{self.name}: 同時実行の枠を確保できませんでした")
+
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # 呼び出し元のキャンセル・ストリーミングの途中終了は成否を判定しない
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if not _is_provider_failure(e):
+                self.counters["client_errors"] += 1
+                self.breaker.release()
+                raise
+            if isinstance(e, ProviderTimeoutError):
+                self.counters["timeouts"] += 1
+            self.counters["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        else:
+            self.counters["successes"] += 1
+            self._timeout_for(operation).observe(time.monotonic() - start)
+            self.breaker.record_success()
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def call(
+        self,
+        operation: str,
+        func: Callable[[], Awaitable[Any]],
+        fallback: Optional[Callable[[], Any]] = None,
+        cache_key: Optional[str] = None
+    ) -> Any:
+        """
+        外部呼び出しを実行
+
+        Args:
+            operation: 操作名（適応タイムアウトの集計単位）
+            func: 呼び出すコルーチン関数（引数なし）。同期APIは asyncio.to_thread で包む
+            fallback: 失敗時に呼ぶ関数（同期・非同期どちらも可）
+            cache_key: 指定時は成功結果を保持し、失敗時に前回の結果を返す
+
+        Returns:
+            func の結果（失敗時は前回の結果またはフォールバックの結果）
+
+        Raises:
+            ProviderUnavailableError / ProviderTimeoutError / func の例外（フォールバックがない場合）
+        """
+        try:
+            async with self.slot(operation):
+                timeout = self.timeout_for(operation)
+                try:
+                    result = await asyncio.wait_for(func(), timeout)
+                except asyncio.TimeoutError:
+                    raise ProviderTimeoutError(f"{self.name}: {operation} が {timeout:.1f}秒以内に完了しませんでした")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return await self._fallback(operation, e, fallback, cache_key)
+
+        if cache_key is not None:
+            self._remember(cache_key, result)
+        return result
+
+    async def _fallback(
+        self,
+        operation: str,
+        error: Exception,
+        fallback: Optional[Callable[[], Any]],
+        cache_key: Optional[str]
+    ) -> Any:
+        if cache_key is not None:
+            entry = self._fallback_cache.get(cache_key)
+            if entry is not None and time.time() - entry[0] <= FALLBACK_CACHE_MAX_AGE:
+                self.counters["cache_fallbacks"] += 1
+                logger.warning(f"⚠️ [Resilience] {self.name}: {operation} に失敗したため前回の結果を返します: {error}")
+                return copy.deepcopy(entry[1])
+        if fallback is None:
+            raise error
+        self.counters["fallbacks"] += 1
+        logger.warning(f"⚠️ [Resilience] {self.name}: {operation} に失敗したためフォールバックします: {error}")
+        result = fallback()
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _remember(self, cache_key: str, value: Any) -> None:
+        self._fallback_cache[cache_key] = (time.time(), value)
+        self._fallback_cache.move_to_end(cache_key)
+        while len(self._fallback_cache) > FALLBACK_CACHE_SIZE:
+            self._fallback_cache.popitem(last=False)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """サーキットの状態・同時実行数・カウンター・操作別のタイムアウトとレイテンシ"""
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "times_opened": self.breaker.times_opened,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            **self.counters,
+            "operations": {operation: timeout.to_dict() for operation, timeout in self._timeouts.items()},
+        }
+
+
+# プロバイダー名 → ProviderGuard（プロセスで1つずつ）
+_provider_guards: Dict[str, ProviderGuard] = {}
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"⚠️ [Resilience] {name} を解析できないため既定値 {default} を使用します")
+        return default
+
+
+def get_provider_guard(name: str, **defaults: Any) -> ProviderGuard:
+    """
+    プロバイダーの ProviderGuard を取得（初回は環境変数 → defaults → 既定値で作成）
+
+    Args:
+        name: プロバイダー名（openai / google_search / perplexity など）
+        **defaults: ProviderGuard の引数の既定値（呼び出し元ごとの推奨値）
+    """
+    guard = _provider_guards.get(name)
+    if guard is None:
+        prefix = f"RESILIENCE_{name.upper()}_"
+        guard = ProviderGuard(
+            name,
+            max_concurrency=int(_env_number(prefix + "MAX_CONCURRENCY", defaults.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))),
+            min_timeout=_env_number(prefix + "MIN_TIMEOUT", defaults.get("min_timeout", DEFAULT_MIN_TIMEOUT)),
+            max_timeout=_env_number(prefix + "MAX_TIMEOUT", defaults.get("max_timeout", DEFAULT_MAX_TIMEOUT)),
+            failure_threshold=int(_env_number(prefix + "FAILURE_THRESHOLD", defaults.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD))),
+            reset_timeout=_env_number(prefix + "RESET_TIMEOUT", defaults.get("reset_timeout", DEFAULT_RESET_TIMEOUT)),
+        )
+        _provider_guards[name] = guard
+    return guard
+
+
+def get_resilience_metrics() -> Dict[str, Dict[str, Any]]:
+    """プロバイダー名 → 状態とカウンター（このプロセスで使用したプロバイダーのみ）"""
+    return {name: guard.get_metrics() for name, guard in _provider_guards.items()}
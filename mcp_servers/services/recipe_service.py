@@ -6,25 +6,140 @@ MCPツール層からビジネスロジックを分離し、再利用性とテ
 """
 
 import asyncio
+import hashlib
+import json
+import os
 import re
+import time
 import traceback
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 from supabase import Client
 
-from mcp_servers.recipe_llm import RecipeLLM
-from mcp_servers.recipe_rag import RecipeRAGClient
+from mcp_servers.recipe_llm import get_recipe_llm
+from mcp_servers.recipe_rag import get_recipe_rag_client
 from mcp_servers.recipe_web import get_search_client, prioritize_recipes, filter_recipe_results
 from mcp_servers.models.recipe_models import RecipeProposal, MenuResult, WebSearchResult
 from config.loggers import GenericLogger
 
+# 段階的提案の高速モード（PROPOSAL_FAST_MODE=true で有効）: プラン別のレイテンシ予算（秒）
+# RAG候補は揃い次第返し、LLM候補は予算内に完成した分だけ含める（0以下で予算なし＝LLMの完了を待つ）
+DEFAULT_PROPOSAL_LATENCY_BUDGETS = {
+    "free": 3.0,
+    "pro": 5.0,
+    "ultimate": 8.0,
+}
+# 予算に間に合わなかったLLM候補を「もっと見る」用に保持する期間（秒）と件数
+DEFAULT_LATE_PROPOSAL_TTL = 1800
+DEFAULT_LATE_PROPOSAL_MAX_ENTRIES = 256
+DEFAULT_PROPOSAL_FAST_MODE = False
+# RAG候補がない場合（LLM候補のみ）に予算を超えて待つ上限（秒、提案開始から）
+LLM_ONLY_MAX_WAIT = 20.0
+
+
+def get_proposal_latency_budget(plan_type: Optional[str]) -> Optional[float]:
+    """
+    プランに応じた提案のレイテンシ予算を取得
+    
+    環境変数 PROPOSAL_FAST_MODE=true で有効（既定は無効）、PROPOSAL_LATENCY_BUDGET_<PLAN> で上書き
+    
+    Args:
+        plan_type: プランタイプ（free, pro, ultimate。不明な場合はfreeとして扱う）
+    
+    Returns:
+        予算（秒）。予算なし（LLMの完了を待つ）の場合は None
+    """
+    fast_mode = os.getenv("PROPOSAL_FAST_MODE", "").strip().lower()
+    if not (fast_mode in ("1", "true", "yes", "on") if fast_mode else DEFAULT_PROPOSAL_FAST_MODE):
+        return None
+    plan = plan_type if plan_type in DEFAULT_PROPOSAL_LATENCY_BUDGETS else "free"
+    budget = DEFAULT_PROPOSAL_LATENCY_BUDGETS[plan]
+    value = os.getenv(f"PROPOSAL_LATENCY_BUDGET_{plan.upper()}")
+    if value:
+        try:
+            budget = float(value)
+        except ValueError:
+            pass
+    return budget if budget > 0 else None
+
+
+class LateProposalStore:
+    """
+    レイテンシ予算に間に合わなかったLLM候補の保持先
+    
+    生成中のタスクをそのまま保持し、同じセッション・条件の次の提案（「もっと見る」）で
+    完了済みならその候補を、生成中なら残りの予算内で完了を待って使う。
+    """
+    
+    def __init__(self, ttl: float = DEFAULT_LATE_PROPOSAL_TTL, max_entries: int = DEFAULT_LATE_PROPOSAL_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[asyncio.Future, float]]" = OrderedDict()
+    
+    def put(self, key: Tuple, task: "asyncio.Future") -> None:
+        """生成中（または完了済み）のLLMタスクを保持（期限切れのエントリは生成を打ち切って削除）"""
+        self._sweep_expired()
+        self._entries.pop(key, None)
+        self._entries[key] = (task, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            old_task, _ = self._entries.popitem(last=False)[1]
+            old_task.cancel()
+    
+    def pop(self, key: Tuple) -> Optional["asyncio.Future"]:
+        """保持しているLLMタスクを取り出す（期限切れ・失敗済みは None）"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        task, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            task.cancel()
+            return None
+        if task.done() and (task.cancelled() or task.exception() is not None):
+            return None
+        return task
+    
+    def _sweep_expired(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (_, stored_at) in self._entries.items() if now - stored_at > self.ttl]
+        for key in expired:
+            task, _ = self._entries.pop(key)
+            task.cancel()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def build_late_proposal_key(
+    session_key: str,
+    category: str,
+    main_ingredient: Optional[str],
+    menu_type: str,
+    category_detail_keyword: Optional[str],
+    inventory_items: Optional[List[str]],
+    used_ingredients: Optional[List[str]]
+) -> Tuple:
+    """
+    LateProposalStore のキーを作成
+    
+    在庫・使用済み食材は並び順に依存しないダイジェストにする（在庫が変われば別のキー）
+    """
+    payload = json.dumps(
+        [sorted(inventory_items or []), sorted(used_ingredients or [])],
+        ensure_ascii=False
+    )
+    ingredients_digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return (session_key, category, main_ingredient, menu_type, category_detail_keyword, ingredients_digest)
+
 
 class RecipeService:
     """レシピ関連のビジネスロジックを扱うサービス層"""
     
     def __init__(self):
         """初期化"""
-        self.llm_client = RecipeLLM()
-        self.rag_client = RecipeRAGClient()
+        # レシピMCPサーバーと同じインスタンスを共有（ベクトルストアの二重読み込みを防ぐ）
+        self.llm_client = get_recipe_llm()
+        self.rag_client = get_recipe_rag_client()
+        self.late_proposals = LateProposalStore()
         self.logger = GenericLogger("mcp", "recipe_service", initialize_logging=False)
     
     # ============================================================================
@@ -130,7 +245,7 @@ class RecipeService:
         use_perplexity: bool = None
     ) -> Dict[str, Any]:
         """
-        単一の料理名でレシピ検索（RAG検索結果のURLを優先）
+        単一の料理名でレシピ検索（RAG検索結果・タイトルインデックスのURLを優先）
         
         Args:
             title: レシピタイトル
@@ -147,8 +262,11 @@ class RecipeService:
         web_search_results = []
         
         # RAG検索結果からURLを取得（既に取得済みの場合）
-        if rag_results and title in rag_results:
-            rag_result = rag_results[title]
+        rag_result = rag_results.get(title) if rag_results else None
+        if not (rag_result and rag_result.get('url')):
+            # LLMが生成した料理名も、コーパスに同じ（またはほぼ同じ）レシピがあればそのURLを使う
+            rag_result = self.rag_client.lookup_recipe_by_title(title)
+        if rag_result:
             rag_url = rag_result.get('url', '')
             if rag_url:
                 # CookpadのURLの場合、OGP画像URLを構築
@@ -218,6 +336,40 @@ class RecipeService:
             "count": len(web_search_results)
         }
     
+    @staticmethod
+    def _to_proposal(candidate: Dict[str, Any], source: str) -> RecipeProposal:
+        """LLM・RAGの候補をRecipeProposalに変換"""
+        return RecipeProposal(
+            title=candidate.get("title", ""),
+            ingredients=candidate.get("ingredients", []),
+            source=source,
+            url=candidate.get("url"),
+            description=candidate.get("description")
+        )
+    
+    async def _emit_candidate(
+        self,
+        on_candidate: Callable[[Dict[str, Any]], Awaitable[None]],
+        candidate: Dict[str, Any],
+        source: str
+    ) -> None:
+        """完成した候補を逐次送信（送信の失敗は提案処理に影響させない）"""
+        try:
+            await on_candidate(self._to_proposal(candidate, source).to_dict())
+        except Exception as e:
+            self.logger.warning(f"⚠️ [RECIPE] 候補の逐次送信に失敗しました: {e}")
+    
+    async def _emit_rag_candidates_when_ready(
+        self,
+        rag_task: Awaitable[List[Dict[str, Any]]],
+        on_candidate: Callable[[Dict[str, Any]], Awaitable[None]]
+    ) -> List[Dict[str, Any]]:
+        """RAG検索の完了時点で（LLMの完了を待たずに）RAG候補を送信"""
+        rag_result = await rag_task
+        for r in rag_result or []:
+            await self._emit_candidate(on_candidate, r, "rag")
+        return rag_result
+    
     # ============================================================================
     # ビジネスロジックメソッド
     # ============================================================================
@@ -231,7 +383,11 @@ class RecipeService:
         main_ingredient: Optional[str] = None,
         used_ingredients: List[str] = None,
         excluded_recipes: List[str] = None,
-        category_detail_keyword: Optional[str] = None
+        category_detail_keyword: Optional[str] = None,
+        on_candidate: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        latency_budget: Optional[float] = None,
+        late_result_key: Optional[str] = None,
+        fresh: bool = False
     ) -> Dict[str, Any]:
         """
         汎用提案メソッド（主菜・副菜・汁物・その他対応）
@@ -245,6 +401,13 @@ class RecipeService:
             used_ingredients: 使用済み食材
             excluded_recipes: 除外レシピ
             category_detail_keyword: カテゴリ詳細キーワード
+            on_candidate: 指定時は候補が揃うたびに（RAGは検索完了時、LLMはストリーミングで
+                          1件完成するごとに）候補の辞書を渡して呼ぶ
+            latency_budget: 指定時は高速モード。RAG候補が揃い次第、予算（秒）内に完成した
+                            LLM候補のみを含めて返す（None の場合はLLMとRAGの両方の完了を待つ）
+            late_result_key: 高速モードで予算に間に合わなかったLLM候補の保持キー（セッションID）。
+                             同じキー・条件の次の提案（「もっと見る」）で使用する
+            fresh: Trueの場合はLLMのレスポンスキャッシュを使わずに再生成（追加提案）
         
         Returns:
             Dict[str, Any]: 提案結果
@@ -257,23 +420,17 @@ class RecipeService:
         if category == "other":
             used_ingredients = None
         
-        # LLMとRAGを並列実行（汎用メソッドを使用）
-        try:
-            llm_task = self.llm_client.generate_candidates(
-                inventory_items=inventory_items,
-                menu_type=menu_type,
-                category=category,
-                main_ingredient=main_ingredient,
-                used_ingredients=used_ingredients,
-                excluded_recipes=all_excluded,
-                count=2,
-                category_detail_keyword=category_detail_keyword
-            )
-        except Exception as e:
-            self.logger.error(f"❌ [RECIPE] LLMタスクの作成に失敗しました: {e}")
-            self.logger.error(f"❌ [RECIPE] LLMタスク作成エラータイプ: {type(e).__name__}")
-            self.logger.error(f"❌ [RECIPE] LLMタスク作成トレースバック: {traceback.format_exc()}")
-            raise
+        llm_kwargs = {
+            "inventory_items": inventory_items,
+            "menu_type": menu_type,
+            "category": category,
+            "main_ingredient": main_ingredient,
+            "used_ingredients": used_ingredients,
+            "excluded_recipes": all_excluded,
+            "count": 2,
+            "category_detail_keyword": category_detail_keyword,
+            "fresh": fresh
+        }
         
         try:
             rag_task = self.rag_client.search_candidates(
@@ -286,20 +443,48 @@ class RecipeService:
                 limit=3,
                 category_detail_keyword=category_detail_keyword
             )
+            if on_candidate is not None:
+                rag_task = self._emit_rag_candidates_when_ready(rag_task, on_candidate)
         except Exception as e:
             self.logger.error(f"❌ [RECIPE] RAGタスクの作成に失敗しました: {e}")
             self.logger.error(f"❌ [RECIPE] RAGタスク作成エラータイプ: {type(e).__name__}")
             self.logger.error(f"❌ [RECIPE] RAGタスク作成トレースバック: {traceback.format_exc()}")
             raise
         
-        # 両方の結果を待つ（並列実行）
-        try:
-            llm_result, rag_result = await asyncio.gather(llm_task, rag_task)
-        except Exception as e:
-            self.logger.error(f"❌ [RECIPE] asyncio.gather が失敗しました: {e}")
-            self.logger.error(f"❌ [RECIPE] asyncio.gather エラータイプ: {type(e).__name__}")
-            self.logger.error(f"❌ [RECIPE] asyncio.gather トレースバック: {traceback.format_exc()}")
-            raise
+        llm_deferred = False
+        if latency_budget is not None:
+            # 高速モード: RAGを待ち、LLMはレイテンシ予算の残り時間だけ待つ
+            late_key = build_late_proposal_key(
+                late_result_key, category, main_ingredient, menu_type, category_detail_keyword,
+                inventory_items, used_ingredients
+            ) if late_result_key else None
+            llm_result, rag_result, llm_deferred = await self._gather_within_budget(
+                llm_kwargs, rag_task, latency_budget, on_candidate, late_key, all_excluded
+            )
+        else:
+            # LLMとRAGを並列実行（汎用メソッドを使用）
+            try:
+                llm_task = self.llm_client.generate_candidates(
+                    **llm_kwargs,
+                    on_candidate=(
+                        (lambda candidate: self._emit_candidate(on_candidate, candidate, "llm"))
+                        if on_candidate is not None else None
+                    )
+                )
+            except Exception as e:
+                self.logger.error(f"❌ [RECIPE] LLMタスクの作成に失敗しました: {e}")
+                self.logger.error(f"❌ [RECIPE] LLMタスク作成エラータイプ: {type(e).__name__}")
+                self.logger.error(f"❌ [RECIPE] LLMタスク作成トレースバック: {traceback.format_exc()}")
+                raise
+            
+            # 両方の結果を待つ（並列実行）
+            try:
+                llm_result, rag_result = await asyncio.gather(llm_task, rag_task)
+            except Exception as e:
+                self.logger.error(f"❌ [RECIPE] asyncio.gather が失敗しました: {e}")
+                self.logger.error(f"❌ [RECIPE] asyncio.gather エラータイプ: {type(e).__name__}")
+                self.logger.error(f"❌ [RECIPE] asyncio.gather トレースバック: {traceback.format_exc()}")
+                raise
         
         # 統合（sourceフィールドを追加）
         recipe_proposals = []
@@ -310,14 +495,7 @@ class RecipeService:
                 llm_candidates = llm_result["data"]["candidates"]
                 # LLM候補をRecipeProposalに変換
                 for candidate in llm_candidates:
-                    proposal = RecipeProposal(
-                        title=candidate.get("title", ""),
-                        ingredients=candidate.get("ingredients", []),
-                        source="llm",
-                        url=candidate.get("url"),
-                        description=candidate.get("description")
-                    )
-                    recipe_proposals.append(proposal)
+                    recipe_proposals.append(self._to_proposal(candidate, "llm"))
             except Exception as e:
                 self.logger.error(f"❌ [RECIPE] LLM結果の処理でエラーが発生しました: {e}")
                 self.logger.error(f"❌ [RECIPE] LLM結果処理エラータイプ: {type(e).__name__}")
@@ -330,14 +508,7 @@ class RecipeService:
             try:
                 # RAG候補をRecipeProposalに変換
                 for r in rag_result:
-                    proposal = RecipeProposal(
-                        title=r.get("title", ""),
-                        ingredients=r.get("ingredients", []),
-                        source="rag",
-                        url=r.get("url"),
-                        description=r.get("description")
-                    )
-                    recipe_proposals.append(proposal)
+                    recipe_proposals.append(self._to_proposal(r, "rag"))
             except Exception as e:
                 self.logger.error(f"❌ [RECIPE] RAG結果の処理でエラーが発生しました: {e}")
                 self.logger.error(f"❌ [RECIPE] RAG結果処理エラータイプ: {type(e).__name__}")
@@ -359,10 +530,111 @@ class RecipeService:
                 "main_ingredient": main_ingredient,
                 "excluded_count": len(all_excluded),
                 "llm_count": len(llm_result.get("data", {}).get("candidates", [])) if llm_result.get("success") else 0,
-                "rag_count": len(rag_result) if rag_result else 0
+                "rag_count": len(rag_result) if rag_result else 0,
+                "llm_deferred": llm_deferred
             }
         }
     
+    async def _gather_within_budget(
+        self,
+        llm_kwargs: Dict[str, Any],
+        rag_task: Awaitable[List[Dict[str, Any]]],
+        latency_budget: float,
+        on_candidate: Optional[Callable[[Dict[str, Any]], Awaitable[None]]],
+        late_key: Optional[Tuple],
+        excluded_recipes: List[str]
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], bool]:
+        """
+        RAGの完了を待ち、LLMはレイテンシ予算の残り時間だけ待つ
+        
+        予算内にストリーミングで完成したLLM候補は応答に含める。残りは生成を続け、
+        late_key があれば次の「もっと見る」用に保持する（なければ生成を打ち切る）。
+        
+        Returns:
+            (LLM結果, RAG結果, LLM候補の一部を後回しにしたか)
+        """
+        started = time.monotonic()
+        streamed: List[Dict[str, Any]] = []
+        responding = True
+        
+        async def collect(candidate: Dict[str, Any]) -> None:
+            # 応答後に完成した候補は送信しない（MCPの進捗通知はツールの応答までしか届かない）
+            # 除外レシピはSSEに送る前に除く
+            if not responding or candidate.get("title") in excluded_recipes:
+                return
+            streamed.append(candidate)
+            if on_candidate is not None:
+                await self._emit_candidate(on_candidate, candidate, "llm")
+        
+        llm_task = self.late_proposals.pop(late_key) if late_key else None
+        reused = llm_task is not None
+        if reused:
+            self.logger.info(f"⚡ [RECIPE] 前回の提案で予算に間に合わなかったLLM候補を使用します")
+        else:
+            llm_task = asyncio.ensure_future(self.llm_client.generate_candidates(**llm_kwargs, on_candidate=collect))
+        
+        try:
+            rag_result = await rag_task
+        except Exception as e:
+            llm_task.cancel()
+            self.logger.error(f"❌ [RECIPE] RAG検索が失敗しました: {e}")
+            self.logger.error(f"❌ [RECIPE] RAG検索トレースバック: {traceback.format_exc()}")
+            raise
+        
+        elapsed = time.monotonic() - started
+        remaining = latency_budget - elapsed
+        if not rag_result:
+            # RAG候補がなければLLM候補のみとなるため、予算を超えても上限まで完了を待つ
+            await asyncio.wait({llm_task}, timeout=max(LLM_ONLY_MAX_WAIT - elapsed, 0.0))
+        elif remaining > 0 and not llm_task.done():
+            await asyncio.wait({llm_task}, timeout=remaining)
+        responding = False
+        
+        if llm_task.done():
+            llm_result = llm_task.result()
+            if reused and on_candidate is not None and llm_result.get("success"):
+                for candidate in llm_result["data"]["candidates"]:
+                    if candidate.get("title") not in excluded_recipes:
+                        await self._emit_candidate(on_candidate, candidate, "llm")
+            deferred = False
+        else:
+            elapsed = time.monotonic() - started
+            self.logger.info(
+                f"⏱️ [RECIPE] LLM候補がレイテンシ予算（{latency_budget:.1f}秒）に間に合いませんでした: "
+                f"経過 {elapsed:.2f}秒、予算内の候補 {len(streamed)}件"
+            )
+            if late_key is not None and reused:
+                # 再利用したタスクは前回の応答に含めた候補を除外済み（この応答では何も含めていない）
+                self.late_proposals.put(late_key, llm_task)
+            elif late_key is not None:
+                included_titles = {candidate.get("title") for candidate in streamed}
+                self.late_proposals.put(late_key, asyncio.ensure_future(
+                    self._remaining_candidates(llm_task, included_titles)
+                ))
+            else:
+                llm_task.cancel()
+            llm_result = {"success": True, "data": {"candidates": list(streamed)}}
+            deferred = True
+        
+        if llm_result.get("success"):
+            llm_result["data"]["candidates"] = [
+                candidate for candidate in llm_result["data"]["candidates"]
+                if candidate.get("title") not in excluded_recipes
+            ]
+        return llm_result, rag_result, deferred
+    
+    @staticmethod
+    async def _remaining_candidates(
+        llm_task: "asyncio.Future",
+        included_titles: set
+    ) -> Dict[str, Any]:
+        """予算超過後に完成したLLM結果から、応答に含めた候補を除く"""
+        result = await llm_task
+        if not result.get("success"):
+            return result
+        candidates = [c for c in result["data"]["candidates"] if c.get("title") not in included_titles]
+        return {"success": True, "data": {"candidates": candidates}}
+    
     async def search_recipes_from_web(
         self,
         recipe_titles: List[str],
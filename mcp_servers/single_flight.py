@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+同一リクエストの同時実行の集約（single-flight）
+
+モバイルクライアントのリトライや複数タブから同じリクエストが同時に届いた場合、
+(操作, パラメータ, ユーザースコープ) の正規化ハッシュが一致する実行中の呼び出しがあれば、
+新たに実行せず同じFutureの結果を共有する。完了後は次の呼び出しから通常どおり実行する
+（結果のキャッシュはしない）。
+
+LLMゲートウェイ（chat.completions / embeddings）と ToolRouter.route_tool で使用する。
+進捗通知を出す呼び出し（提案候補の逐次配信など）は do_with_progress で集約し、
+通知を相乗りした全ての呼び出し元へ配信する（相乗り前の通知は再送する）。
+"""
+
+import copy
+import json
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from config.loggers import GenericLogger
+
+logger = GenericLogger("mcp", "single_flight", initialize_logging=False)
+
+T = TypeVar("T")
+
+ProgressHandler = Callable[..., Awaitable[None]]
+
+
+def build_flight_key(operation: str, params: Any, scope: str = "") -> str:
+    """
+    single-flightのキー（SHA-256）を作成
+
+    パラメータはキー順を揃えたJSONに正規化する（JSONにできない値は文字列表現）。
+
+    Args:
+        operation: 操作名（ツール名・APIなど）
+        params: パラメータ
+        scope: ユーザースコープ（異なるユーザーの呼び出しは集約しない）
+
+    Returns:
+        16進のハッシュ文字列
+    """
+    payload = json.dumps(
+        {"operation": operation, "params": params, "scope": scope},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ProgressFanout:
+    """集約した1回の実行の進捗通知を、相乗りした全ての呼び出し元へ配信"""
+
+    def __init__(self):
+        self.events: List[Tuple[Any, ...]] = []
+        self.handlers: List[ProgressHandler] = []
+
+    async def publish(self, *args: Any) -> None:
+        """進捗通知を記録して全ての購読者へ送る（送信の失敗は実行に影響させない）"""
+        self.events.append(args)
+        for handler in list(self.handlers):
+            await self._send(handler, args)
+
+    async def subscribe(self, handler: ProgressHandler) -> None:
+        """購読を開始し、それまでの通知を再送"""
+        backlog = list(self.events)
+        self.handlers.append(handler)
+        for args in backlog:
+            await self._send(handler, args)
+
+    def unsubscribe(self, handler: ProgressHandler) -> None:
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+
+    @staticmethod
+    async def _send(handler: ProgressHandler, args: Tuple[Any, ...]) -> None:
+        try:
+            await handler(*args)
+        except Exception as e:
+            logger.warning(f"⚠️ [SingleFlight] 進捗通知の送信に失敗しました: {e}")
+
+
+class SingleFlight:
+    """キーごとに実行中の呼び出しを1つに集約するグループ"""
+
+    def __init__(self, name: str, copy_results: bool = False):
+        """
+        初期化
+
+        Args:
+            name: グループ名（ログ用）
+            copy_results: Trueの場合、相乗りした呼び出しには結果のディープコピーを返す
+                          （呼び出し元が結果の辞書を書き換える場合）
+        """
+        self.name = name
+        self.copy_results = copy_results
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._fanouts: Dict[str, ProgressFanout] = {}
+        self.executions = 0
+        self.shared = 0
+
+    @property
+    def inflight_count(self) -> int:
+        """実行中のキー数"""
+        return len(self._inflight)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        キーが同じ実行中の呼び出しがあればその結果を共有し、なければ func を実行
+
+        呼び出し元のキャンセルは共有中の実行には伝播しない（他の呼び出し元が待っているため）。
+
+        Args:
+            key: build_flight_key で作成したキー
+            func: 実行するコルーチン関数（引数なし）
+
+        Returns:
+            func の結果（例外も共有される）
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+            logger.debug(f"🔗 [SingleFlight] {self.name}: 実行中の呼び出しに相乗り ({key[:12]})")
+            result = await asyncio.shield(task)
+            return copy.deepcopy(result) if self.copy_results else result
+
+        task = asyncio.ensure_future(func())
+        self._inflight[key] = task
+        self.executions += 1
+        task.add_done_callback(lambda _: self._release(key, task))
+        return await asyncio.shield(task)
+
+    async def do_with_progress(
+        self,
+        key: str,
+        func: Callable[[ProgressHandler], Awaitable[T]],
+        progress_handler: Optional[ProgressHandler] = None
+    ) -> T:
+        """
+        do と同じく集約し、進捗通知は相乗りした全ての呼び出し元へ配信
+
+        Args:
+            key: build_flight_key で作成したキー
+            func: 進捗通知の送信関数を受け取って実行するコルーチン関数
+            progress_handler: この呼び出し元の進捗通知の受け取り先（相乗り前の通知も受け取る）
+
+        Returns:
+            func の結果（例外も共有される）
+        """
+        fanout = self._fanouts.get(key) if key in self._inflight else None
+        if fanout is None:
+            fanout = ProgressFanout()
+
+        def start() -> Awaitable[T]:
+            self._fanouts[key] = fanout
+            return func(fanout.publish)
+
+        if progress_handler is not None:
+            await fanout.subscribe(progress_handler)
+        try:
+            return await self.do(key, start)
+        finally:
+            if progress_handler is not None:
+                fanout.unsubscribe(progress_handler)
+
+    def _release(self, key: str, task: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._fanouts.pop(key, None)
+        # 相乗りがなく失敗した場合に「未取得の例外」警告を出さない
+        if not task.cancelled():
+            task.exception()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """実行数・相乗り数・実行中のキー数"""
+        return {
+            "executions": self.executions,
+            "shared": self.shared,
+            "inflight": self.inflight_count,
+        }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+LLMの構造化出力（JSONスキーマ / JSONモード）
+
+chat.completions の response_format で応答形式を指定し、応答本文を
+mcp_servers.models.llm_output_models の型付きモデルに一度のJSONデコードで変換する。
+正規表現によるJSON抽出やテキストからの推測に頼らないため、解析失敗による
+フォールバック・再試行が発生せず、前後の説明文がない分だけ出力トークンも減る。
+
+    response_format = json_schema_response_format(CandidatesOutput)
+    content = ...  # chat.completions.create(..., response_format=response_format)
+    result = parse_structured(content, CandidatesOutput)
+
+スキーマを固定できない応答（タスク分解の parameters など任意のキーを持つもの）は
+JSONモード（JSON_OBJECT_RESPONSE_FORMAT）で有効なJSONのみを保証し、モデルで検証する。
+
+環境変数:
+    LLM_STRUCTURED_OUTPUT=true   # false で response_format を指定しない（従来のテキスト解析）
+"""
+
+import os
+import copy
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+from config.loggers import GenericLogger
+
+logger = GenericLogger("mcp", "structured_output", initialize_logging=False)
+
+M = TypeVar("M", bound=BaseModel)
+
+# JSONモード（有効なJSONオブジェクトのみを出力させる）
+JSON_OBJECT_RESPONSE_FORMAT: Dict[str, Any] = {"type": "json_object"}
+
+
+def structured_output_enabled() -> bool:
+    """構造化出力を使用するか（LLM_STRUCTURED_OUTPUT、既定は有効）"""
+    return os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() not in ("false", "0", "no", "off")
+
+
+def _make_strict(schema: Any) -> Any:
+    """オブジェクトの全プロパティを必須にし、追加プロパティを禁止する（strictモードの要件）"""
+    if isinstance(schema, dict):
+        schema.pop("default", None)
+        if "$ref" in schema:
+            # $ref と同列のキーワード（description など）は strict モードで使用できない
+            for key in [key for key in schema if key != "$ref"]:
+                del schema[key]
+            return schema
+        if schema.get("type") == "object" and "properties" in schema:
+            schema["required"] = list(schema["properties"].keys())
+            schema["additionalProperties"] = False
+        for value in schema.values():
+            _make_strict(value)
+    elif isinstance(schema, list):
+        for item in schema:
+            _make_strict(item)
+    return schema
+
+
+@lru_cache(maxsize=None)
+def _strict_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    return _make_strict(model.model_json_schema())
+
+
+def json_schema_response_format(model: Type[BaseModel], name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    モデルからstrictなJSONスキーマの response_format を作成
+
+    Args:
+        model: 応答のモデル（全フィールドがJSONスキーマで表現できること）
+        name: スキーマ名（未指定時はモデルのクラス名）
+
+    Returns:
+        chat.completions.create の response_format
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name or model.__name__,
+            "strict": True,
+            "schema": copy.deepcopy(_strict_json_schema(model)),
+        },
+    }
+
+
+def parse_structured(content: Optional[str], model: Type[M]) -> Optional[M]:
+    """
+    応答本文をモデルに変換
+
+    Args:
+        content: 応答本文（JSON）
+        model: 応答のモデル
+
+    Returns:
+        モデルのインスタンス（JSONでない・形式が合わない場合は None）
+    """
+    if not content:
+        return None
+    try:
+        return model.model_validate_json(content)
+    except ValidationError as e:
+        logger.warning(f"⚠️ [Structured] {model.__name__} の検証に失敗しました: {e.error_count()}件のエラー")
+        logger.debug(f"🔍 [Structured] 応答内容: {content[:1000]}")
+        return None
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+トークン計測とコスト集計
+
+LLMゲートウェイを通る全てのチャット補完・埋め込み呼び出しについて、
+呼び出し前にトークナイザー（tiktoken）でプロンプトのトークン数を数え、
+呼び出し後にAPIレスポンスの usage（実際の課金トークン数）を記録する。
+用途（purpose）・モデル・リクエストパターン（RequestAnalyzer）・ユーザー・MCPツール別に
+集計し（get_metrics）、1呼び出しごとにJSON形式の構造化ログを出力する。
+usage.prompt_tokens_details.cached_tokens（自動プロンプトキャッシュで再利用された入力トークン）も
+集計し、入力トークンに占める割合（cached_ratio）でプロンプトの静的プレフィックスの効果を確認できる。
+
+パターン・ユーザーは contextvars で呼び出し元から引き継ぐ:
+
+    set_token_attribution(pattern="main", user_id=user_id)   # リクエストの残りの処理に適用
+    with token_attribution(operation="generate_proposals"):  # ブロック内のみ適用
+        ...
+
+MCPツールは別プロセス（stdio）で実行されるため、パターンはツール呼び出しのメタデータ
+（attribution_meta → MCPリクエストの _meta）で渡し、ツール側（logged_tool）で attribution_from_meta により
+復元する。集計（get_metrics）はプロセスごとのため、プロセスをまたいだ合計は 💰 [Tokens] ログで集計する。
+
+tiktoken はエンコーディングファイルを初回にダウンロードする。イベントループ上では読み込みを
+待たずにバックグラウンドのスレッドで読み込み、それまでは概算（ASCIIは4文字で1トークン、
+それ以外は1文字1トークン）で計測する。起動時に preload_encodings() で事前に読み込める。
+オフライン環境では TIKTOKEN_CACHE_DIR に事前に配置する（ない場合は常に概算）。
+
+ユーザー別の集計は件数に上限があり（LLM_TOKEN_LEDGER_MAX_USERS）、超えた分は
+コストの低いユーザーから "(other)" にまとめる。
+
+環境変数:
+    LLM_TOKEN_PRICES=    # モデル別単価の上書き（USD / 100万トークン）
+                         # 例: {"gpt-4o-mini": [0.15, 0.60, 0.075]}  ※ [入力, 出力, キャッシュ済み入力（省略時は入力と同額）]
+    LLM_TOKEN_LEDGER_MAX_USERS=1000    # ユーザー別集計の最大件数
+"""
+
+import os
+import asyncio
+import json
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config.loggers import GenericLogger
+
+logger = GenericLogger("mcp", "token_accounting", initialize_logging=False)
+
+# モデルが tiktoken に登録されていない場合のエンコーディング
+DEFAULT_ENCODING = "o200k_base"
+# チャット形式のオーバーヘッド（メッセージごと / 応答の開始）
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+# モデル別単価（USD / 100万トークン: 入力, 出力, キャッシュ済み入力）。モデル名の最長一致で参照する
+DEFAULT_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60, 0.075),
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "gpt-4.1-mini": (0.40, 1.60, 0.10),
+    "gpt-4.1": (2.00, 8.00, 0.50),
+    "text-embedding-3-small": (0.02, 0.0, 0.02),
+    "text-embedding-3-large": (0.13, 0.0, 0.13),
+}
+# 集計の単位
+DIMENSIONS = ("purpose", "model", "pattern", "user", "operation")
+# MCPツール呼び出しの _meta で集計先を渡すキーと、渡す項目
+ATTRIBUTION_META_KEY = "morizo/token_attribution"
+PROPAGATED_FIELDS = ("pattern",)
+UNATTRIBUTED = "-"
+# ユーザー別集計の最大件数（超えた分は OTHER_USERS にまとめる）
+DEFAULT_MAX_USERS = 1000
+OTHER_USERS = "(other)"
+
+# モデル名 → tiktoken のエンコーディング（利用できない場合は None）
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+_loading_models: set = set()
+_tiktoken_unavailable = False
+
+_attribution: ContextVar[Dict[str, str]] = ContextVar("token_attribution", default={})
+
+
+def _load_encoding(model: str):
+    """エンコーディングを読み込む（初回はダウンロードが発生しうるためイベントループ上では呼ばない）"""
+    global _tiktoken_unavailable
+    encoding = None
+    if not _tiktoken_unavailable:
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+        except Exception as e:
+            # 未インストール・エンコーディングのダウンロード失敗
+            _tiktoken_unavailable = True
+            logger.warning(f"⚠️ [Tokens] tiktoken を使用できないため概算で計測します: {e}")
+    with _encodings_lock:
+        _encodings[model] = encoding
+        _loading_models.discard(model)
+    return encoding
+
+
+def _load_encoding_in_background(model: str) -> None:
+    with _encodings_lock:
+        if model in _encodings or model in _loading_models:
+            return
+        _loading_models.add(model)
+    threading.Thread(target=_load_encoding, args=(model,), name=f"tiktoken-{model}", daemon=True).start()
+
+
+def _get_encoding(model: str):
+    """
+    モデルのエンコーディングを取得（tiktoken が使えない場合は None）
+
+    イベントループ上で未読み込みの場合は読み込みを待たずに None を返し（概算で計測）、
+    バックグラウンドのスレッドで読み込む。
+    """
+    if model in _encodings:
+        return _encodings[model]
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _load_encoding(model)
+    _load_encoding_in_background(model)
+    return None
+
+
+def preload_encodings(models: List[str]) -> None:
+    """
+    エンコーディングを事前に読み込む（起動時のウォームアップ用、同期）
+
+    Args:
+        models: モデル名のリスト
+    """
+    for model in models:
+        if model not in _encodings:
+            _load_encoding(model)
+
+
+def _estimate_tokens(text: str) -> int:
+    """トークナイザーなしの概算（ASCIIは4文字で1トークン、日本語などは1文字1トークン）"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """
+    テキストのトークン数
+
+    Args:
+        text: テキスト
+        model: モデル名（エンコーディングの選択に使用）
+
+    Returns:
+        トークン数
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model or "")
+    if encoding is None:
+        return _estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: str = "") -> int:
+    """
+    チャット補完のプロンプトのトークン数（メッセージ形式のオーバーヘッドを含む）
+
+    画像などテキスト以外のコンテンツは数えない。
+    """
+    total = TOKENS_PER_REPLY
+    for message in messages or []:
+        total += TOKENS_PER_MESSAGE
+        content = message.get("content")
+        if isinstance(content, str):
+            total += count_tokens(content, model)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "text":
+                    total += count_tokens(part.get("text", ""), model)
+        if message.get("name"):
+            total += count_tokens(message["name"], model) + 1
+    return total
+
+
+def count_input_tokens(inputs: Any, model: str = "") -> int:
+    """埋め込みの入力（文字列または文字列のリスト）のトークン数"""
+    if isinstance(inputs, str):
+        return count_tokens(inputs, model)
+    if isinstance(inputs, list):
+        return sum(count_tokens(item, model) for item in inputs if isinstance(item, str))
+    return 0
+
+
+def set_token_attribution(**fields: Optional[str]) -> None:
+    """
+    現在のコンテキスト（リクエスト処理中のタスク）の集計先を設定
+
+    Args:
+        **fields: pattern / user_id / operation（None の項目は変更しない）
+    """
+    current = dict(_attribution.get())
+    current.update({key: str(value) for key, value in fields.items() if value})
+    _attribution.set(current)
+
+
+@contextmanager
+def token_attribution(**fields: Optional[str]) -> Iterator[None]:
+    """ブロック内の呼び出しの集計先を設定"""
+    current = dict(_attribution.get())
+    current.update({key: str(value) for key, value in fields.items() if value})
+    token = _attribution.set(current)
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def get_token_attribution() -> Dict[str, str]:
+    """現在のコンテキストの集計先"""
+    return dict(_attribution.get())
+
+
+def attribution_meta() -> Dict[str, Any]:
+    """
+    MCPツール呼び出しの _meta に載せる集計先（別プロセスのツール内のLLM呼び出しに引き継ぐ）
+
+    Returns:
+        {ATTRIBUTION_META_KEY: {"pattern": ...}}（引き継ぐ項目がない場合は空）
+    """
+    current = _attribution.get()
+    fields = {key: current[key] for key in PROPAGATED_FIELDS if current.get(key)}
+    return {ATTRIBUTION_META_KEY: fields} if fields else {}
+
+
+def attribution_from_meta(meta: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """MCPリクエストの _meta から集計先を取り出す（attribution_meta の逆）"""
+    fields = (meta or {}).get(ATTRIBUTION_META_KEY)
+    if not isinstance(fields, dict):
+        return {}
+    return {key: str(fields[key]) for key in PROPAGATED_FIELDS if fields.get(key)}
+
+
+def _load_prices() -> Dict[str, Tuple[float, float, float]]:
+    prices = dict(DEFAULT_PRICES)
+    override = os.getenv("LLM_TOKEN_PRICES", "")
+    if override.strip():
+        try:
+            for model, values in json.loads(override).items():
+                input_price, output_price = float(values[0]), float(values[1])
+                cached_price = float(values[2]) if len(values) > 2 else input_price
+                prices[model] = (input_price, output_price, cached_price)
+        except (ValueError, TypeError, IndexError, KeyError) as e:
+            logger.warning(f"⚠️ [Tokens] LLM_TOKEN_PRICES を解析できないため既定の単価を使用します: {e}")
+    return prices
+
+
+class TokenTotals:
+    """集計単位1つ分のトークン数とコスト"""
+
+    def __init__(self):
+        self.calls = 0
+        self.estimated_prompt_tokens = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+
+    def add(
+        self,
+        estimated_prompt_tokens: int,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: float,
+        cached_tokens: int = 0
+    ) -> None:
+        self.calls += 1
+        self.estimated_prompt_tokens += estimated_prompt_tokens
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost_usd
+
+    def merge(self, other: "TokenTotals") -> None:
+        self.calls += other.calls
+        self.estimated_prompt_tokens += other.estimated_prompt_tokens
+        self.prompt_tokens += other.prompt_tokens
+        self.cached_tokens += other.cached_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cost_usd += other.cost_usd
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "estimated_prompt_tokens": self.estimated_prompt_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 8),
+        }
+
+
+class TokenLedger:
+    """呼び出しごとのトークン数・コストを用途・モデル・パターン・ユーザー・ツール別に集計"""
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, ...]]] = None):
+        """
+        初期化
+
+        Args:
+            prices: モデル別単価（USD / 100万トークン）。未指定時は既定値 + LLM_TOKEN_PRICES
+        """
+        self.prices = prices if prices is not None else _load_prices()
+        self.max_users = max(1, int(os.getenv("LLM_TOKEN_LEDGER_MAX_USERS", DEFAULT_MAX_USERS)))
+        self._totals: Dict[str, Dict[str, TokenTotals]] = {dimension: {} for dimension in DIMENSIONS}
+        self._overall = TokenTotals()
+        self._lock = threading.Lock()
+
+    def price_for(self, model: str) -> Tuple[float, float, float]:
+        """モデル名の最長一致で単価（入力, 出力, キャッシュ済み入力）を取得（未登録は0）"""
+        matches = [name for name in self.prices if model.startswith(name)]
+        if not matches:
+            return (0.0, 0.0, 0.0)
+        price = tuple(self.prices[max(matches, key=len)])
+        return price if len(price) > 2 else (price[0], price[1], price[0])
+
+    def record(
+        self,
+        purpose: str,
+        model: str,
+        estimated_prompt_tokens: int,
+        usage: Any = None
+    ) -> Dict[str, Any]:
+        """
+        1回の呼び出しを記録して構造化ログを出力
+
+        Args:
+            purpose: 用途（LLMゲートウェイの purpose）
+            model: モデル名
+            estimated_prompt_tokens: 呼び出し前にトークナイザーで数えたプロンプトのトークン数
+            usage: APIレスポンスの usage（ない場合は推定値でコストを計算）
+
+        Returns:
+            記録した内容
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        # 自動プロンプトキャッシュで再利用された入力トークン（prompt_tokens の内数）
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+        usage_reported = prompt_tokens is not None
+        if not usage_reported:
+            prompt_tokens = estimated_prompt_tokens
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        input_price, output_price, cached_price = self.price_for(model)
+        cost_usd = (
+            (prompt_tokens - cached_tokens) * input_price
+            + cached_tokens * cached_price
+            + completion_tokens * output_price
+        ) / 1_000_000
+
+        attribution = get_token_attribution()
+        keys = {
+            "purpose": purpose,
+            "model": model or UNATTRIBUTED,
+            "pattern": attribution.get("pattern", UNATTRIBUTED),
+            "user": attribution.get("user_id", UNATTRIBUTED),
+            "operation": attribution.get("operation", UNATTRIBUTED),
+        }
+        with self._lock:
+            self._overall.add(estimated_prompt_tokens, prompt_tokens, completion_tokens, cost_usd, cached_tokens)
+            users = self._totals["user"]
+            if keys["user"] not in users and len(users) >= self.max_users:
+                self._fold_users()
+            for dimension, key in keys.items():
+                self._totals[dimension].setdefault(key, TokenTotals()).add(
+                    estimated_prompt_tokens, prompt_tokens, completion_tokens, cost_usd, cached_tokens
+                )
+
+        record = {
+            **keys,
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "usage_reported": usage_reported,
+            "cost_usd": round(cost_usd, 8),
+        }
+        logger.info(f"💰 [Tokens] {json.dumps(record, ensure_ascii=False)}")
+        return record
+
+    def _fold_users(self) -> None:
+        """ユーザー別集計が上限に達したら、コストの低い半分を OTHER_USERS にまとめる（ロック内で呼ぶ）"""
+        users = self._totals["user"]
+        other = users.pop(OTHER_USERS, None) or TokenTotals()
+        ranked = sorted(users.items(), key=lambda item: item[1].cost_usd)
+        for key, totals in ranked[:max(1, len(ranked) // 2)]:
+            other.merge(totals)
+            del users[key]
+        users[OTHER_USERS] = other
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """全体と集計単位別（by_purpose / by_model / by_pattern / by_user / by_operation）のトークン数・コスト"""
+        with self._lock:
+            metrics: Dict[str, Any] = {"total": self._overall.to_dict()}
+            for dimension, totals in self._totals.items():
+                metrics[f"by_{dimension}"] = {key: value.to_dict() for key, value in totals.items()}
+        return metrics
+
+    def top(self, dimension: str = "pattern", limit: int = 10) -> List[Tuple[str, Dict[str, Any]]]:
+        """コストの高い順の集計（プロンプト削減の優先順位付け用）"""
+        with self._lock:
+            ranked = sorted(self._totals[dimension].items(), key=lambda item: item[1].cost_usd, reverse=True)
+            return [(key, value.to_dict()) for key, value in ranked[:limit]]
+
+
+# グローバルインスタンス（プロセスで1つ）
+_token_ledger: Optional[TokenLedger] = None
+
+
+def get_token_ledger() -> TokenLedger:
+    """トークン集計のシングルトンを取得"""
+    global _token_ledger
+    if _token_ledger is None:
+        _token_ledger = TokenLedger()
+    return _token_ledger
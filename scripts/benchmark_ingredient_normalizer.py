@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+食材名正規化のベンチマークスクリプト
+
+従来の正規化（RAGのひらがな→カタカナ文字ループ、IngredientMapperComponentの
+カタカナ→ひらがな変換 + 正規表現）と共通モジュール ingredient_normalizer の
+1秒あたりの正規化回数を比較する。共通モジュールはLRUキャッシュなし（初回）と
+キャッシュあり（2回目以降）の両方を計測する。
+
+使い方:
+    python scripts/benchmark_ingredient_normalizer.py [--names 2000] [--repeat 20]
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをPythonのモジュール検索パスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key, clean_product_name
+
+BASE_NAMES = [
+    "鶏もも肉", "鶏モモ肉", "とりもも肉", "豚バラ肉", "合挽肉", "玉ねぎ", "タマネギ", "新玉ねぎ", "人参", "にんじん",
+    "ジャガイモ", "じゃが芋", "長ねぎ", "長葱", "キャベツ", "ほうれん草", "小松菜", "しいたけ", "椎茸", "卵",
+    "玉子", "牛乳", "ＢＰ 牛乳", "国産 豚ロース", "もっちり 食パン", "ピーマン", "トマト（大）", "ﾆﾝｼﾞﾝ", "ｷｬﾍﾞﾂ", "醤油",
+]
+
+
+def legacy_rag_normalize(ingredient):
+    """従来のRAG正規化（比較用にそのまま残したもの）"""
+    if not ingredient:
+        return ""
+    result = ""
+    for char in ingredient:
+        if 'ぁ' <= char <= 'ん':
+            result += chr(ord(char) - ord('ぁ') + ord('ァ'))
+        else:
+            result += char
+    return result
+
+
+def legacy_mapper_normalize(name):
+    """従来のIngredientMapperComponent正規化（比較用にそのまま残したもの）"""
+    normalized = name.translate(str.maketrans('０１２３４５６７８９ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ', '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'))
+    result = []
+    for char in normalized:
+        if 'ァ' <= char <= 'ヶ':
+            result.append(chr(ord(char) - 0x60))
+        else:
+            result.append(char)
+    normalized = ''.join(result)
+    normalized = re.sub(r'[\s　\-－\(\)（）・，、。．]+', '', normalized)
+    return normalized.lower()
+
+
+def measure(func, names, repeat):
+    """1秒あたりの正規化回数を計測"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name in names:
+            func(name)
+    elapsed = time.perf_counter() - start
+    return len(names) * repeat / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="食材名正規化のベンチマーク")
+    parser.add_argument("--names", type=int, default=2000, help="正規化する食材名の種類数")
+    parser.add_argument("--repeat", type=int, default=20, help="繰り返し回数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # 食材名の種類数を揃えるため、ベース名に番号を付けて生成
+    names = [f"{rng.choice(BASE_NAMES)}{i % 97}" for i in range(args.names)]
+
+    print(f"食材名: {len(names)}種類 × {args.repeat}回")
+    print(f"従来（RAG）:           {measure(legacy_rag_normalize, names, args.repeat):,.0f} 回/秒")
+    print(f"従来（IngredientMapper）: {measure(legacy_mapper_normalize, names, args.repeat):,.0f} 回/秒")
+
+    normalize_ingredient_key.cache_clear()
+    print(f"共通（キャッシュなし）: {measure(normalize_ingredient_key.__wrapped__, names, args.repeat):,.0f} 回/秒")
+    print(f"共通（キャッシュあり）: {measure(normalize_ingredient_key, names, args.repeat):,.0f} 回/秒")
+
+    clean_product_name.cache_clear()
+    print(f"OCR商品名（キャッシュなし）: {measure(clean_product_name.__wrapped__, names, args.repeat):,.0f} 回/秒")
+    print(f"OCR商品名（キャッシュあり）: {measure(clean_product_name, names, args.repeat):,.0f} 回/秒")
+
+    print("\n正規化例:")
+    for name in BASE_NAMES:
+        print(f"  {name} → {normalize_ingredient_key(name)} / 商品名: {clean_product_name(name)}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+マッチングスコア計算のベンチマークスクリプト
+
+従来の _calculate_match_score（在庫×レシピ単語の二重ループ）と
+食材トークンインデックス（IngredientTokenIndex）によるスコア計算を比較し、
+結果が一致することと処理時間を確認する。
+
+使い方:
+    python scripts/benchmark_match_score.py [--candidates 1000] [--inventory 30] [--repeat 20]
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをPythonのモジュール検索パスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key as normalize_ingredient
+from mcp_servers.recipe_rag.ingredient_index import IngredientTokenIndex
+
+# 合成データ用の食材語彙（ひらがな・カタカナ表記揺れと部分一致を含む）
+VOCABULARY = [
+    "豚肉", "豚バラ肉", "鶏肉", "鶏もも肉", "牛肉", "ひき肉", "合いびき肉", "ベーコン", "ハム", "ソーセージ",
+    "鮭", "さば", "サバ", "えび", "いか", "たら", "卵", "豆腐", "油揚げ", "納豆",
+    "キャベツ", "にんじん", "ニンジン", "たまねぎ", "玉ねぎ", "じゃがいも", "ジャガイモ", "ほうれん草", "小松菜", "白菜",
+    "大根", "きゅうり", "トマト", "なす", "ピーマン", "しめじ", "えのき", "もやし", "ねぎ", "長ねぎ",
+    "ごぼう", "れんこん", "かぼちゃ", "ブロッコリー", "アスパラ", "わかめ", "ひじき", "牛乳", "チーズ", "バター",
+    "醤油", "みりん", "砂糖", "塩", "こしょう", "酒", "味噌", "ごま油", "サラダ油", "片栗粉",
+]
+
+
+def legacy_calculate_match_score(recipe_ingredients, normalized_ingredients, main_ingredient=None):
+    """従来実装（比較用にそのまま残したもの）"""
+    if not recipe_ingredients or not normalized_ingredients:
+        return 0.0, []
+
+    recipe_words = recipe_ingredients.split()
+    matched_count = 0
+    total_inventory = len(normalized_ingredients)
+    matched_items = []
+    main_ingredient_weight = 5.0
+
+    for inventory_item in normalized_ingredients:
+        normalized_inventory = normalize_ingredient(inventory_item)
+        is_main_ingredient = main_ingredient and normalize_ingredient(inventory_item) == normalize_ingredient(main_ingredient)
+
+        matched = False
+        for word in recipe_words:
+            normalized_word = normalize_ingredient(word)
+            if normalized_inventory == normalized_word:
+                weight = main_ingredient_weight if is_main_ingredient else 1.0
+                matched_count += weight
+                matched_items.append(inventory_item)
+                matched = True
+                break
+
+        if not matched:
+            for word in recipe_words:
+                normalized_word = normalize_ingredient(word)
+                if normalized_inventory in normalized_word or normalized_word in normalized_inventory:
+                    weight = main_ingredient_weight * 0.5 if is_main_ingredient else 0.5
+                    matched_count += weight
+                    matched_items.append(inventory_item)
+                    break
+
+    if main_ingredient and main_ingredient in normalized_ingredients:
+        other_ingredients_count = len(normalized_ingredients) - 1
+        max_possible_score = main_ingredient_weight + other_ingredients_count
+        match_score = matched_count / max_possible_score if max_possible_score > 0 else 0.0
+    else:
+        match_score = matched_count / total_inventory if total_inventory > 0 else 0.0
+
+    return match_score, matched_items
+
+
+def legacy_has_main_ingredient(main_ingredient, recipe_ingredients, matched_ingredients):
+    """従来実装（比較用にそのまま残したもの）"""
+    normalized_main = normalize_ingredient(main_ingredient)
+    for word in recipe_ingredients.split():
+        normalized_word = normalize_ingredient(word)
+        if normalized_main == normalized_word or normalized_main in normalized_word:
+            return True
+    for matched in matched_ingredients:
+        if normalized_main in normalize_ingredient(matched):
+            return True
+    return False
+
+
+def build_corpus(rng: random.Random, count: int):
+    """合成レシピ食材文字列を生成"""
+    return [" ".join(rng.sample(VOCABULARY, rng.randint(5, 15))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="マッチングスコア計算のベンチマーク")
+    parser.add_argument("--candidates", type=int, default=1000, help="1クエリあたりの候補レシピ数")
+    parser.add_argument("--inventory", type=int, default=30, help="在庫食材数")
+    parser.add_argument("--repeat", type=int, default=20, help="クエリの繰り返し回数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = build_corpus(rng, args.candidates)
+    queries = []
+    for _ in range(args.repeat):
+        inventory = rng.sample(VOCABULARY, min(args.inventory, len(VOCABULARY)))
+        queries.append((inventory, rng.choice(inventory)))
+
+    # インデックス構築（起動時の処理に相当）
+    index = IngredientTokenIndex()
+    start = time.perf_counter()
+    for recipe_ingredients in corpus:
+        index.get_tokens(recipe_ingredients)
+    build_time = time.perf_counter() - start
+
+    # 従来実装
+    start = time.perf_counter()
+    legacy_results = []
+    for inventory, main_ingredient in queries:
+        for recipe_ingredients in corpus:
+            score, matched = legacy_calculate_match_score(recipe_ingredients, inventory, main_ingredient)
+            has_main = legacy_has_main_ingredient(main_ingredient, recipe_ingredients, matched)
+            legacy_results.append((score, matched, has_main))
+    legacy_time = time.perf_counter() - start
+
+    # インデックス実装
+    start = time.perf_counter()
+    indexed_results = []
+    for inventory, main_ingredient in queries:
+        matcher = index.create_matcher(inventory, main_ingredient)
+        for recipe_ingredients in corpus:
+            score, matched = matcher.score(recipe_ingredients)
+            has_main = matcher.has_main_ingredient(recipe_ingredients, matched)
+            indexed_results.append((score, matched, has_main))
+    indexed_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(legacy_results, indexed_results) if a != b)
+    total = len(legacy_results)
+
+    print(f"候補レシピ数: {args.candidates} / 在庫食材数: {args.inventory} / クエリ数: {args.repeat}")
+    print(f"インデックス構築: {build_time * 1000:.1f} ms（語彙 {index.vocabulary_size} 件）")
+    print(f"従来実装:         {legacy_time * 1000:.1f} ms（{legacy_time / args.repeat * 1000:.2f} ms/クエリ）")
+    print(f"インデックス実装: {indexed_time * 1000:.1f} ms（{indexed_time / args.repeat * 1000:.2f} ms/クエリ）")
+    if indexed_time > 0:
+        print(f"高速化倍率: {legacy_time / indexed_time:.1f}x")
+    print(f"結果の不一致: {mismatches} / {total}")
+
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
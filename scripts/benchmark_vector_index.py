@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+量子化ベクトルインデックスのベンチマークスクリプト
+
+float32 / float16 / int8（ベクトルごとのスケール）で保持した QuantizedVectorIndex の
+メモリ使用量・クエリレイテンシ・float32に対する上位k件の一致率を比較する。
+float16 / int8 は float32 による再ランキング（memmapファイルから読み込み）の有無の両方を計測する。
+
+メモリはインデックスの配列サイズに加えて、形式ごとに別プロセスで構築・検索した後の
+プロセスRSSの増加量（匿名メモリ / memmapなどのファイルページ）を表示する。
+
+埋め込みはクラスタ構造を持つ合成ベクトル（OpenAI埋め込みと同じ1536次元・正規化済み）を使う。
+
+使い方:
+    python scripts/benchmark_vector_index.py [--vectors 20000] [--dim 1536] [--queries 200] [--k 50]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+
+# プロジェクトルートをPythonのモジュール検索パスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcp_servers.recipe_rag.vector_index import FULL_PRECISION_FILENAME, QuantizedVectorIndex, SUPPORTED_DTYPES
+
+
+def build_vectors(rng: np.random.Generator, count: int, dim: int, clusters: int) -> np.ndarray:
+    """クラスタ構造を持つ正規化済みの合成ベクトルを生成"""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignments = rng.integers(0, clusters, size=count)
+    vectors = centers[assignments] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def read_rss_mb():
+    """プロセスRSSの内訳（匿名メモリ, ファイルページ）をMBで取得（取得できない場合は0.0）"""
+    values = {"RssAnon": 0.0, "RssFile": 0.0}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in values:
+                    values[name] = int(value.split()[0]) / 1024
+    except (OSError, ValueError):
+        pass
+    return values["RssAnon"], values["RssFile"]
+
+
+def run_variant(args, dtype, rerank):
+    """
+    1つの形式でインデックスを構築して全クエリを検索（形式ごとに別プロセスで実行）
+
+    元の埋め込み配列は構築後に解放し、インデックスと再ランキング用memmapだけが残る状態でRSSを計測する
+    """
+    anon_before, file_before = read_rss_mb()
+    rng = np.random.default_rng(args.seed)
+    vectors = build_vectors(rng, args.vectors, args.dim, args.clusters)
+    queries = build_vectors(rng, args.queries, args.dim, args.clusters)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = QuantizedVectorIndex(dtype)
+        index.build(vectors, full_precision_path=os.path.join(directory, FULL_PRECISION_FILENAME) if rerank else None)
+        del vectors
+
+        results = []
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            hits = index.search(query, args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([row for row, _ in hits])
+        rss_anon, rss_file = read_rss_mb()
+        rss_anon -= anon_before
+        rss_file -= file_before
+        nbytes = index.nbytes
+        del index
+    return results, latencies, nbytes, rss_anon, rss_file
+
+
+def overlap(results, baseline, k):
+    """float32の上位k件との平均一致率"""
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(results, baseline)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量子化ベクトルインデックスのベンチマーク")
+    parser.add_argument("--vectors", type=int, default=20000, help="登録するベクトル数")
+    parser.add_argument("--dim", type=int, default=1536, help="次元数")
+    parser.add_argument("--clusters", type=int, default=200, help="合成データのクラスタ数")
+    parser.add_argument("--queries", type=int, default=200, help="クエリ数")
+    parser.add_argument("--k", type=int, default=50, help="取得件数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"ベクトル数: {args.vectors} / 次元数: {args.dim} / クエリ数: {args.queries} / k: {args.k}")
+    print(
+        f"{'形式':<18}{'メモリ(MB)':>12}{'RSS匿名(MB)':>13}{'RSSファイル(MB)':>16}"
+        f"{'p50(ms)':>10}{'p95(ms)':>10}{'一致率':>10}"
+    )
+
+    # 解放した一時配列をOSへ返すよう、大きな確保は常にmmapで行う（glibcのみ有効、spawnした子プロセスに適用）
+    os.environ.setdefault("MALLOC_MMAP_THRESHOLD_", str(128 * 1024))
+    mp_context = multiprocessing.get_context("spawn")
+
+    baseline = None
+    for dtype in SUPPORTED_DTYPES:
+        variants = [("", False)] if dtype == "float32" else [("", False), ("+再ランキング", True)]
+        for suffix, rerank in variants:
+            # 形式ごとに新しいプロセスで計測（前の形式の確保メモリをRSSに含めない）
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as pool:
+                results, latencies, nbytes, rss_anon, rss_file = pool.submit(run_variant, args, dtype, rerank).result()
+            if baseline is None:
+                baseline = results
+            print(
+                f"{dtype + suffix:<18}{nbytes / 1024 / 1024:>12.1f}{rss_anon:>13.1f}{rss_file:>16.1f}"
+                f"{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 95):>10.2f}"
+                f"{overlap(results, baseline, args.k):>10.3f}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+文字n-gram埋め込みのベクトルDB構築スクリプト
+
+既存の各ベクトルDB（OpenAI埋め込み）に登録済みのドキュメントとメタデータを読み込み、
+文字n-gram TF-IDF（CharNgramEmbeddings）のIDFを学習して同じディレクトリに保存する。
+ベクトルは同じディレクトリの別コレクション（recipes_char_ngram）に同じIDで登録する。
+埋め込みはローカルで計算するため、OpenAI APIキーは不要。
+
+構築後、RAG_EMBEDDING_BACKEND_<CATEGORY>=char_ngram（または RAG_EMBEDDING_BACKEND）で
+カテゴリごとに切り替えられる。
+
+使用方法:
+    python scripts/build_lexical_vector_db.py [--categories main,sub,soup,other] [--dimensions 4096]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+import chromadb
+
+# プロジェクトルートをPythonのモジュール検索パスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcp_servers.recipe_rag.lexical_embeddings import (
+    CharNgramEmbeddings,
+    DEFAULT_DIMENSIONS,
+    LEXICAL_COLLECTION_NAME,
+)
+
+# ログ設定
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# OpenAI埋め込みで構築済みのコレクション名（Chroma.from_texts の既定値）
+SOURCE_COLLECTION_NAME = "langchain"
+BATCH_SIZE = 500
+
+# カテゴリ → (環境変数, 既定パス)（RecipeRAGClient と同じ）
+VECTOR_DB_PATHS = {
+    "main": ("CHROMA_PERSIST_DIRECTORY_MAIN", "./recipe_vector_db_main"),
+    "sub": ("CHROMA_PERSIST_DIRECTORY_SUB", "./recipe_vector_db_sub"),
+    "soup": ("CHROMA_PERSIST_DIRECTORY_SOUP", "./recipe_vector_db_soup"),
+    "other": ("CHROMA_PERSIST_DIRECTORY_OTHER", "./recipe_vector_db_other_2"),
+}
+
+
+def build_lexical_collection(path: str, dimensions: int) -> int:
+    """
+    1つのベクトルDBに文字n-gram埋め込みのコレクションを構築
+
+    Returns:
+        登録したドキュメント数
+    """
+    client = chromadb.PersistentClient(path=path)
+    source = client.get_collection(SOURCE_COLLECTION_NAME)
+    data = source.get(include=["documents", "metadatas"])
+    ids = data["ids"]
+    documents = [document or "" for document in data["documents"]]
+    metadatas = data["metadatas"]
+
+    embeddings = CharNgramEmbeddings(dimensions=dimensions).fit(documents)
+    embeddings.save(path)
+
+    # 作り直す（元のコレクションと同じ内容にそろえる）
+    try:
+        client.delete_collection(LEXICAL_COLLECTION_NAME)
+    except Exception:
+        pass
+    target = client.create_collection(LEXICAL_COLLECTION_NAME)
+    for start in range(0, len(ids), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        target.add(
+            ids=ids[start:end],
+            embeddings=embeddings.embed_documents(documents[start:end]),
+            documents=documents[start:end],
+            metadatas=metadatas[start:end]
+        )
+    return len(ids)
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="文字n-gram埋め込みのベクトルDB構築")
+    parser.add_argument("--categories", default=",".join(VECTOR_DB_PATHS), help="対象カテゴリ（カンマ区切り）")
+    parser.add_argument("--dimensions", type=int, default=DEFAULT_DIMENSIONS, help="ベクトルの次元数")
+    args = parser.parse_args()
+
+    env_path = project_root / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+
+    logger.info("=== 文字n-gram埋め込みのベクトルDB構築開始 ===")
+    for category in [c.strip() for c in args.categories.split(",") if c.strip()]:
+        if category not in VECTOR_DB_PATHS:
+            logger.warning(f"不明なカテゴリです。スキップします: {category}")
+            continue
+        env_name, default_path = VECTOR_DB_PATHS[category]
+        path = os.getenv(env_name, default_path)
+        if not Path(path).exists():
+            logger.warning(f"{category}: ベクトルDBが見つかりません。スキップします: {path}")
+            continue
+
+        start = time.perf_counter()
+        count = build_lexical_collection(path, args.dimensions)
+        logger.info(f"{category}: {count}件を登録（{time.perf_counter() - start:.1f}秒） → {path}/{LEXICAL_COLLECTION_NAME}")
+
+    logger.info("=== 文字n-gram埋め込みのベクトルDB構築完了 ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,8 +17,9 @@
 import json
 import os
 import sys
+import argparse
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 from dotenv import load_dotenv
 
@@ -26,29 +27,20 @@ from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 
+# プロジェクトルートをPythonのモジュール検索パスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 食材名の抽出・調味料除外・結合テキスト作成（並列前処理ステージと共通）
+from recipe_preprocess import (
+    normalize_ingredient_lines,
+    create_combined_text,
+    load_processed_recipes,
+)
+
 # ログ設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 調味料キーワードリスト（検索対象外）
-SEASONING_KEYWORDS = [
-    # 基本調味料
-    '醤油', 'しょうゆ', '砂糖', '塩', '胡椒', 'こしょう', '酒', 'みりん', '酢',
-    # 油類
-    '油', 'ごま油', 'サラダ油', 'バター', 'マーガリン', 'オリーブオイル',
-    # 発酵調味料
-    '味噌', 'みそ', 'だし', 'コンソメ', 'ブイヨン',
-    # ソース類
-    'ケチャップ', 'マヨネーズ', 'マスタード', 'ウスターソース', 'オイスターソース',
-    # 香辛料
-    'わさび', 'からし', 'しょうが', 'にんにく', 'ねぎ', 'みつば', 'しそ', '大葉',
-    # その他
-    '片栗粉', '小麦粉', 'パン粉', 'ベーキングパウダー', '重曹',
-    # 追加の調味料
-    '薄力粉', 'グラニュー糖', '中華スープのもと', '白ワイン', '赤ワイン',
-    '一味唐辛子', '鶏がらスープの素', '鶏がらスープのもと', '鶏がらスープ',
-    'ウェイパー', '合わせ調味料'
-]
 
 def load_recipe_data(file_path: str) -> List[Dict[str, Any]]:
     """
@@ -97,6 +89,51 @@ def extract_recipe_info(recipe_data: Dict[str, Any]) -> Dict[str, Any]:
         'url': recipe_data.get('url', '')
     }
 
+def preprocess_recipe(recipe: Dict[str, Any], index: int) -> Optional[Dict[str, Any]]:
+    """
+    レシピ1件を前処理してベクトル化用のデータに変換する（並列前処理ステージと共通）
+    
+    Args:
+        recipe: 新フォーマットのレシピデータ
+        index: 元データでのインデックス
+        
+    Returns:
+        前処理済みレシピデータ（タイトルまたは分類が空の場合はNone）。
+        カテゴリ内インデックス（category_index）は呼び出し側で設定する
+    """
+    # レシピ情報を抽出
+    recipe_info = extract_recipe_info(recipe)
+    
+    # 基本的な検証
+    if not recipe_info['title'] or not recipe_info['category']:
+        logger.warning(f"レシピ {index+1}: タイトルまたは分類が空です")
+        return None
+    
+    # 食材リストを正規化（配列を受け取る）
+    ingredients = normalize_ingredients(recipe_info['ingredients'])
+    
+    # 結合テキストを作成（ベクトル化用）
+    combined_text = create_combined_text(
+        recipe_info['title'],
+        ingredients,
+        recipe_info['category']
+    )
+    
+    return {
+        'id': recipe_info.get('id', f"recipe_{index+1:04d}"),
+        'title': recipe_info['title'],
+        'ingredients': ingredients,
+        'combined_text': combined_text,
+        'metadata': {
+            'title': recipe_info['title'],
+            'recipe_category': recipe_info['category'],
+            'category_detail': recipe_info.get('category_detail', ''),
+            'main_ingredients': ', '.join(recipe_info.get('main_ingredients', [])[:3]) if recipe_info.get('main_ingredients') else '',
+            'url': recipe_info.get('url', ''),  # URLをメタデータに追加
+            'original_index': index
+        }
+    }
+
 def preprocess_recipes(recipes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     レシピデータを前処理してベクトル化用のデータに変換する（新フォーマット対応）
@@ -111,52 +148,23 @@ def preprocess_recipes(recipes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     
     for i, recipe in enumerate(recipes):
         try:
-            # レシピ情報を抽出
-            recipe_info = extract_recipe_info(recipe)
-            
-            # 基本的な検証
-            if not recipe_info['title'] or not recipe_info['category']:
-                logger.warning(f"レシピ {i+1}: タイトルまたは分類が空です")
+            processed_recipe = preprocess_recipe(recipe, i)
+            if processed_recipe is None:
                 continue
-            
-            # 食材リストを正規化（配列を受け取る）
-            ingredients = normalize_ingredients(recipe_info['ingredients'])
-            
-            # 結合テキストを作成（ベクトル化用）
-            combined_text = create_combined_text(
-                recipe_info['title'],
-                ingredients,
-                recipe_info['category']
-            )
-            
-            # 前処理済みデータを作成
-            processed_recipe = {
-                'id': recipe_info.get('id', f"recipe_{i+1:04d}"),
-                'title': recipe_info['title'],
-                'ingredients': ingredients,
-                'combined_text': combined_text,
-                'metadata': {
-                    'title': recipe_info['title'],
-                    'recipe_category': recipe_info['category'],
-                    'category_detail': recipe_info.get('category_detail', ''),
-                    'main_ingredients': ', '.join(recipe_info.get('main_ingredients', [])[:3]) if recipe_info.get('main_ingredients') else '',
-                    'url': recipe_info.get('url', ''),  # URLをメタデータに追加
-                    'original_index': i,
-                    'category_index': len(processed_recipes)
-                }
-            }
+            processed_recipe['metadata']['category_index'] = len(processed_recipes)
             
             # デバッグ出力（最初の10件のみ）
             if i < 10:
+                metadata = processed_recipe['metadata']
                 print(f"=== レシピ {i+1} の処理 ===")
-                print(f"ID: {recipe_info.get('id', 'N/A')}")
-                print(f"タイトル: {recipe_info['title']}")
-                print(f"カテゴリ: {recipe_info['category']}")
-                print(f"カテゴリ詳細: {recipe_info.get('category_detail', '')}")
-                print(f"URL: {recipe_info.get('url', 'N/A')}")
-                print(f"元の食材配列: {recipe_info['ingredients'][:5]}...")
-                print(f"正規化後食材: {ingredients}")
-                print(f"結合テキスト: {combined_text}")
+                print(f"ID: {processed_recipe['id'] or 'N/A'}")
+                print(f"タイトル: {processed_recipe['title']}")
+                print(f"カテゴリ: {metadata['recipe_category']}")
+                print(f"カテゴリ詳細: {metadata['category_detail']}")
+                print(f"URL: {metadata['url'] or 'N/A'}")
+                print(f"元の食材配列: {recipe.get('ingredients', [])[:5]}...")
+                print(f"正規化後食材: {processed_recipe['ingredients']}")
+                print(f"結合テキスト: {processed_recipe['combined_text']}")
                 print()
             
             processed_recipes.append(processed_recipe)
@@ -176,138 +184,13 @@ def normalize_ingredients(ingredients_list: List[str]) -> List[str]:
         ingredients_list: 食材配列（例: ["かぼちゃ大なら1/4個", "醤油・酒・砂糖各大2"]）
         
     Returns:
-        正規化された食材リスト（調味料除外済み）
+        正規化された食材リスト（出現順で重複除去・調味料除外済み）
     """
     if not ingredients_list:
         return []
     
-    normalized = []
-    
     # 各食材文字列に対してノイズ除去処理を適用
-    for ingredient_text in ingredients_list:
-        ingredient = extract_ingredient_name(ingredient_text)
-        if ingredient:
-            normalized.append(ingredient)
-    
-    # 重複を除去
-    normalized = list(set(normalized))
-    
-    # 調味料を除外（既存の処理を維持）
-    normalized = filter_seasonings(normalized)
-    
-    return normalized
-
-def extract_ingredient_name(ingredient_line: str) -> str:
-    """
-    食材行から食材名を抽出する（改善版）
-    
-    Args:
-        ingredient_line: 食材行（例: "◎牛乳50ｃｃ（67ｃｃ）"）
-        
-    Returns:
-        食材名（例: "牛乳"）
-    """
-    import re
-    
-    # より慎重なノイズ除去
-    ingredient = ingredient_line
-    
-    # 1. 括弧内の内容を除去（分量情報）
-    ingredient = re.sub(r'[（(][^）)]*[）)]', '', ingredient)
-    
-    # 2. 数字と単位を除去
-    ingredient = re.sub(r'\d+[a-zA-Zａ-ｚＡ-Ｚ]*', '', ingredient)
-    
-    # 3. 記号を除去
-    ingredient = re.sub(r'[◎★●※【】]', '', ingredient)
-    
-    # 4. よくあるノイズ語を除去
-    noise_words = [
-        '小さじ', '大さじ', '大匙', '小匙', '約', '適量', '適宜', '少々', '少量',
-        'お好みにより', '好みで', 'なんでも', 'または', 'ＯＫ', '好きなだけ',
-        'カット', 'カップ', '切れ', '切り', '位', '丁', '㏄', '㌘', 'グラム',
-        '㎝', 'ｍｌ', 'センチ', 'チューブ', 'パック', '缶缶', 'でも', 'くらい',
-        'たっぷり', 'あるもの', 'あれば', 'なくても', '何でも', '無くても可',
-        'OK', '各', '又は', 'など', 'ほど', 'ふり', 'ひとつまみ', '握り',
-        '人分', '人数分', '半分', '私は', 'タップリ', '×', '一', '○',
-        # 追加の単位
-        '本', '節', '袋', '個', '枚', '束', '滴', '片', 'かけ', 'カケ',
-    # 追加の不要語
-    '仕上げ', '黄金比率の煮汁', '大なら', '小なら', '大きめ'
-    # 注: '個'は残す（「個」は食材名に含まれにくい）
-    # 注: 'コ'と'大'は削除（食材名の一部として使われるため）
-    ]
-    
-    for word in noise_words:
-        ingredient = ingredient.replace(word, '')
-    
-    # 5. 余分な記号を除去（改善）
-    ingredient = re.sub(r'[～/／・！？▲✿◆☆）））]', '', ingredient)
-    
-    # 6. 複数食材の結合を防止（新規追加）
-    # 「・」で分割して最初の食材のみを取得
-    if '・' in ingredient:
-        ingredient = ingredient.split('・')[0]
-    
-    # 7. 文字化けの修正（新規追加）
-    ingredient = re.sub(r'[ｸﾞﾗﾑ]', '', ingredient)
-    
-    ingredient = ingredient.strip()
-    
-    # 空文字列のみ除外
-    if len(ingredient) == 0:
-        return ''
-    
-    return ingredient
-
-def filter_seasonings(ingredients: List[str]) -> List[str]:
-    """
-    調味料を除外して食材のみを抽出する
-    
-    Args:
-        ingredients: 食材リスト
-        
-    Returns:
-        調味料を除外した食材リスト
-    """
-    filtered = []
-    for ingredient in ingredients:
-        # 調味料かどうかをチェック
-        is_seasoning = any(keyword in ingredient for keyword in SEASONING_KEYWORDS)
-        if not is_seasoning:
-            filtered.append(ingredient)
-    
-    logger.info(f"調味料除外: {len(ingredients)} → {len(filtered)} (除外: {len(ingredients) - len(filtered)})")
-    return filtered
-
-def create_combined_text(title: str, ingredients: List[str], category: str) -> str:
-    """
-    ベクトル化用の結合テキストを作成する（食材のみ）（改善版）
-    
-    Args:
-        title: レシピタイトル（使用しない）
-        ingredients: 食材リスト（調味料除外済み）
-        category: レシピ分類（使用しない）
-        
-    Returns:
-        食材のみの結合テキスト
-    """
-    # 食材リストの前処理（新規追加）
-    cleaned_ingredients = []
-    for ingredient in ingredients:
-        # 不要な文字を除去
-        cleaned = ingredient.strip()
-        # 空文字列や不要な文字のみの場合は除外
-        if cleaned and cleaned not in ['）', '））', '仕上げ', '黄金比率の煮汁']:
-            cleaned_ingredients.append(cleaned)
-    
-    # 食材リストを文字列に変換（調味料は既に除外済み）
-    ingredients_str = ' '.join(cleaned_ingredients)
-    
-    # 余分なスペースを除去
-    ingredients_str = ' '.join(ingredients_str.split())
-    
-    return ingredients_str
+    return normalize_ingredient_lines(ingredients_list)
 
 def filter_recipes_by_category(processed_recipes: List[Dict[str, Any]], category_type: str) -> List[Dict[str, Any]]:
     """
@@ -378,6 +261,10 @@ def build_vector_database(processed_recipes: List[Dict[str, Any]], output_dir: s
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="レシピベクトルDB構築")
+    parser.add_argument("--preprocessed", help="recipe_preprocess.py の出力ディレクトリ（指定時は前処理を省略）")
+    args = parser.parse_args()
+    
     # .envファイルの読み込み
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
@@ -400,13 +287,18 @@ def main():
     logger.info("=== レシピベクトルDB構築開始（分類別版・新フォーマット対応） ===")
     logger.info(f"元データ: {recipe_data_path}")
     
-    # 1. レシピデータの読み込み
-    logger.info("ステップ1: レシピデータの読み込み")
-    recipes = load_recipe_data(str(recipe_data_path))
-    
-    # 2. 前処理
-    logger.info("ステップ2: レシピデータの前処理")
-    processed_recipes = preprocess_recipes(recipes)
+    if args.preprocessed:
+        # 1-2. 前処理ステージの出力を読み込み
+        logger.info("ステップ1-2: 前処理済みレシピデータの読み込み")
+        processed_recipes = load_processed_recipes(project_root / args.preprocessed)
+    else:
+        # 1. レシピデータの読み込み
+        logger.info("ステップ1: レシピデータの読み込み")
+        recipes = load_recipe_data(str(recipe_data_path))
+        
+        # 2. 前処理
+        logger.info("ステップ2: レシピデータの前処理")
+        processed_recipes = preprocess_recipes(recipes)
     
     # 3. 分類別フィルタリング + ベクトルDB構築
     logger.info("ステップ3: 分類別ベクトルDB構築")
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+レシピベクトルDB 差分構築スクリプト（再開可能・並列埋め込み）
+
+build_vector_db_by_category.py / build_vector_db_by_category_2.py と同じ前処理・分類で
+レシピを読み込み、既存のChromaDBに差分だけを反映する。
+
+    - 各レシピの結合テキストとメタデータのハッシュをマニフェストに記録し、変更のないレシピはスキップ
+    - 結合テキストが変わったレシピのみ再埋め込み（メタデータのみの変更は埋め込みなしで更新）
+    - 埋め込みはバッチ単位で同時実行数を制限し、レート制限・一時エラーは指数バックオフで再試行
+    - バッチごとにupsertしてマニフェストをチェックポイントとして保存（失敗後は続きから再開）
+    - 元データから消えたレシピはベクトルDBから削除
+
+マニフェストは各ベクトルDBディレクトリの build_manifest.json に保存する。
+マニフェストがない既存DB（from_textsで構築済み）は、初回実行時に登録済みドキュメントを
+タイトル・URLで照合して取り込むため、全件の再埋め込みは発生しない。
+
+使用方法:
+    python scripts/build_vector_db_incremental.py [--source sara|jsonl] [--batch-size 100] [--concurrency 4]
+    python scripts/build_vector_db_incremental.py --dry-run   # 差分件数の確認のみ
+
+前提条件:
+    - 元データ（me2you/vector_data_sara.json または me2you/recipe_data.jsonl）が存在すること
+    - OpenAI APIキーが設定されていること
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+import importlib
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Tuple
+from dotenv import load_dotenv
+
+# LangChain関連のインポート
+from langchain_openai import OpenAIEmbeddings
+from langchain_community.vectorstores import Chroma
+
+# プロジェクトルートをPythonのモジュール検索パスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 前処理ステージの出力の読み込み
+from recipe_preprocess import load_processed_recipes
+
+# ログ設定
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "build_manifest.json"
+MANIFEST_VERSION = 1
+
+# 元データごとの前処理モジュール・データファイル・出力先
+SOURCES = {
+    "sara": {
+        "module": "build_vector_db_by_category_2",
+        "data_path": "me2you/vector_data_sara.json",
+        "categories": [
+            ('main', 'recipe_vector_db_main_2', '主菜'),
+            ('sub', 'recipe_vector_db_sub_2', '副菜'),
+            ('soup', 'recipe_vector_db_soup_2', '汁物'),
+            ('other', 'recipe_vector_db_other_2', 'その他'),
+        ],
+    },
+    "jsonl": {
+        "module": "build_vector_db_by_category",
+        "data_path": "me2you/recipe_data.jsonl",
+        "categories": [
+            ('main', 'recipe_vector_db_main', '主菜'),
+            ('sub', 'recipe_vector_db_sub', '副菜'),
+            ('soup', 'recipe_vector_db_soup', '汁物'),
+        ],
+    },
+}
+
+# 埋め込みAPIの再試行設定
+MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+def hash_text(text: str) -> str:
+    """文字列のハッシュ（SHA-256）"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def hash_metadata(metadata: Dict[str, Any]) -> str:
+    """メタデータのハッシュ（キー順に依存しない）"""
+    return hash_text(json.dumps(metadata, ensure_ascii=False, sort_keys=True))
+
+
+def recipe_key(metadata: Dict[str, Any]) -> str:
+    """レシピの識別キー（タイトル + URL。既存DBのメタデータからも再現できる値を使う）"""
+    return f"{metadata.get('title', '')}|{metadata.get('url', '')}"
+
+
+def assign_keys(items: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+    """
+    (テキスト, メタデータ) のリストに一意なキーを割り当てる
+
+    同じタイトル・URLのレシピは出現順に "#2", "#3" ... を付けて区別する
+    """
+    counts: Dict[str, int] = {}
+    keys = []
+    for _, metadata in items:
+        base = recipe_key(metadata)
+        counts[base] = counts.get(base, 0) + 1
+        keys.append(base if counts[base] == 1 else f"{base}#{counts[base]}")
+    return keys
+
+
+def document_id(key: str) -> str:
+    """レシピキーからChromaのドキュメントIDを作成（再構築しても同じIDになる）"""
+    return f"recipe-{hash_text(key)[:32]}"
+
+
+class BuildManifest:
+    """差分構築のマニフェスト（レシピキー → ドキュメントID・テキストハッシュ・メタデータハッシュ）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, str]] = {}
+
+    def load(self) -> bool:
+        """マニフェストを読み込む（存在しない・壊れている場合はFalse）"""
+        if not self.path.exists():
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"マニフェストの読み込みに失敗したため作り直します: {self.path} ({e})")
+            return False
+        if data.get("version") != MANIFEST_VERSION:
+            logger.warning(f"マニフェストのバージョンが異なるため作り直します: {self.path}")
+            return False
+        self.entries = data.get("entries", {})
+        return True
+
+    def save(self) -> None:
+        """マニフェストを保存（一時ファイルに書き込んでから置き換え、中断しても壊れないようにする）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class BuildPlan:
+    """1つのベクトルDBに対する差分"""
+    to_embed: List[Tuple[str, str, Dict[str, Any]]] = field(default_factory=list)  # (キー, テキスト, メタデータ)
+    to_update_metadata: List[Tuple[str, str, Dict[str, Any]]] = field(default_factory=list)
+    to_delete: List[str] = field(default_factory=list)  # キー
+    unchanged: int = 0
+
+
+def bootstrap_manifest(vectorstore: Chroma, manifest: BuildManifest) -> int:
+    """
+    マニフェストがない既存DBの登録済みドキュメントをマニフェストに取り込む
+
+    Returns:
+        取り込んだドキュメント数
+    """
+    data = vectorstore.get(include=["documents", "metadatas"])
+    ids = data.get("ids") or []
+    documents = data.get("documents") or []
+    metadatas = data.get("metadatas") or [{}] * len(ids)
+    keys = assign_keys([(document or "", metadata or {}) for document, metadata in zip(documents, metadatas)])
+
+    for doc_id, key, document, metadata in zip(ids, keys, documents, metadatas):
+        manifest.entries[key] = {
+            "id": doc_id,
+            "text_hash": hash_text(document or ""),
+            "metadata_hash": hash_metadata(metadata or {}),
+        }
+    return len(ids)
+
+
+def plan_build(recipes: List[Dict[str, Any]], manifest: BuildManifest) -> BuildPlan:
+    """前処理済みレシピとマニフェストを比較して差分を作成"""
+    plan = BuildPlan()
+    items = [(recipe['combined_text'], recipe['metadata']) for recipe in recipes]
+    keys = assign_keys(items)
+
+    for key, (text, metadata) in zip(keys, items):
+        entry = manifest.entries.get(key)
+        if entry is None or entry.get("text_hash") != hash_text(text):
+            plan.to_embed.append((key, text, metadata))
+        elif entry.get("metadata_hash") != hash_metadata(metadata):
+            plan.to_update_metadata.append((key, text, metadata))
+        else:
+            plan.unchanged += 1
+
+    current_keys = set(keys)
+    plan.to_delete = [key for key in manifest.entries if key not in current_keys]
+    return plan
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """レート制限エラーかどうか"""
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status_code == 429 or type(error).__name__ == "RateLimitError"
+
+
+async def embed_with_backoff(embeddings: OpenAIEmbeddings, texts: List[str], batch_label: str) -> List[List[float]]:
+    """埋め込みを取得（レート制限・一時エラーは指数バックオフ + ジッタで再試行）"""
+    attempt = 0
+    while True:
+        try:
+            return await embeddings.aembed_documents(texts)
+        except Exception as e:
+            if attempt >= MAX_RETRIES:
+                raise
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+            if is_rate_limit_error(e):
+                # レート制限時は長めに待つ
+                delay = min(BACKOFF_MAX_SECONDS, delay * 2)
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning(f"{batch_label}: 埋め込み失敗（{attempt + 1}/{MAX_RETRIES}回目、{delay:.1f}秒後に再試行）: {e}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def apply_plan(
+    vectorstore: Chroma,
+    embeddings: OpenAIEmbeddings,
+    manifest: BuildManifest,
+    plan: BuildPlan,
+    batch_size: int,
+    concurrency: int
+) -> None:
+    """差分をベクトルDBに反映（バッチごとにupsertしてマニフェストを保存）"""
+    collection = vectorstore._collection
+
+    # 削除
+    if plan.to_delete:
+        ids = [manifest.entries[key]["id"] for key in plan.to_delete]
+        for start in range(0, len(ids), batch_size):
+            collection.delete(ids=ids[start:start + batch_size])
+        for key in plan.to_delete:
+            del manifest.entries[key]
+        manifest.save()
+        logger.info(f"削除: {len(plan.to_delete)}件")
+
+    # メタデータのみの更新（埋め込み不要）
+    for start in range(0, len(plan.to_update_metadata), batch_size):
+        batch = plan.to_update_metadata[start:start + batch_size]
+        collection.update(
+            ids=[manifest.entries[key]["id"] for key, _, _ in batch],
+            metadatas=[metadata for _, _, metadata in batch]
+        )
+        for key, _, metadata in batch:
+            manifest.entries[key]["metadata_hash"] = hash_metadata(metadata)
+        manifest.save()
+    if plan.to_update_metadata:
+        logger.info(f"メタデータ更新: {len(plan.to_update_metadata)}件")
+
+    # 埋め込み + upsert（同時実行数を制限）
+    batches = [plan.to_embed[start:start + batch_size] for start in range(0, len(plan.to_embed), batch_size)]
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    completed = 0
+
+    async def process_batch(index: int, batch: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        nonlocal completed
+        label = f"バッチ {index + 1}/{len(batches)}"
+        async with semaphore:
+            vectors = await embed_with_backoff(embeddings, [text for _, text, _ in batch], label)
+
+        ids = [manifest.entries.get(key, {}).get("id") or document_id(key) for key, _, _ in batch]
+        collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[text for _, text, _ in batch],
+            metadatas=[metadata for _, _, metadata in batch]
+        )
+        for doc_id, (key, text, metadata) in zip(ids, batch):
+            manifest.entries[key] = {
+                "id": doc_id,
+                "text_hash": hash_text(text),
+                "metadata_hash": hash_metadata(metadata),
+            }
+        # チェックポイント（upsert済みのバッチは再開時にスキップされる）
+        manifest.save()
+        completed += len(batch)
+        logger.info(f"{label}: {len(batch)}件を登録（{completed}/{len(plan.to_embed)}）")
+
+    await asyncio.gather(*(process_batch(index, batch) for index, batch in enumerate(batches)))
+
+
+def build_category(
+    recipes: List[Dict[str, Any]],
+    output_dir: Path,
+    embeddings: OpenAIEmbeddings,
+    batch_size: int,
+    concurrency: int,
+    dry_run: bool
+) -> BuildPlan:
+    """1つのベクトルDBを差分構築"""
+    vectorstore = Chroma(persist_directory=str(output_dir), embedding_function=embeddings)
+    manifest = BuildManifest(output_dir / MANIFEST_FILE_NAME)
+    if not manifest.load():
+        bootstrapped = bootstrap_manifest(vectorstore, manifest)
+        if bootstrapped:
+            logger.info(f"既存DBの登録済みドキュメントをマニフェストに取り込み: {bootstrapped}件")
+
+    plan = plan_build(recipes, manifest)
+    logger.info(
+        f"差分: 埋め込み {len(plan.to_embed)}件 / メタデータ更新 {len(plan.to_update_metadata)}件 / "
+        f"削除 {len(plan.to_delete)}件 / 変更なし {plan.unchanged}件"
+    )
+    if dry_run:
+        return plan
+
+    asyncio.run(apply_plan(vectorstore, embeddings, manifest, plan, batch_size, concurrency))
+    manifest.save()
+    return plan
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="レシピベクトルDBの差分構築")
+    parser.add_argument("--source", choices=sorted(SOURCES), default="sara", help="元データの形式")
+    parser.add_argument("--batch-size", type=int, default=100, help="1回の埋め込みAPI呼び出しの件数")
+    parser.add_argument("--concurrency", type=int, default=4, help="埋め込みAPIの同時実行数")
+    parser.add_argument("--dry-run", action="store_true", help="差分件数の確認のみ（埋め込み・書き込みなし）")
+    parser.add_argument("--preprocessed", help="recipe_preprocess.py の出力ディレクトリ（指定時は前処理を省略）")
+    args = parser.parse_args()
+
+    # .envファイルの読み込み
+    env_path = project_root / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+        logger.info(f".envファイルを読み込みました: {env_path}")
+    else:
+        logger.warning(f".envファイルが見つかりません: {env_path}")
+
+    # OpenAI APIキーの確認
+    if not os.getenv("OPENAI_API_KEY") and not args.dry_run:
+        logger.error("OPENAI_API_KEYが設定されていません。.envファイルを確認してください。")
+        sys.exit(1)
+
+    # 前処理・分類は既存の構築スクリプトと共通
+    source = SOURCES[args.source]
+    builder = importlib.import_module(source["module"])
+    recipe_data_path = project_root / source["data_path"]
+
+    logger.info("=== レシピベクトルDB差分構築開始 ===")
+    logger.info(f"元データ: {recipe_data_path}")
+    start = time.perf_counter()
+
+    if args.preprocessed:
+        processed_recipes = load_processed_recipes(project_root / args.preprocessed)
+    else:
+        recipes = builder.load_recipe_data(str(recipe_data_path))
+        processed_recipes = builder.preprocess_recipes(recipes)
+
+    embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+    embeddings = OpenAIEmbeddings(model=embedding_model, api_key=os.getenv("OPENAI_API_KEY") or "dry-run")
+
+    total_embedded = 0
+    for category_type, output_dir_name, category_name in source["categories"]:
+        logger.info(f"=== {category_name}用ベクトルDB差分構築 ===")
+        filtered_recipes = builder.filter_recipes_by_category(processed_recipes, category_type)
+        logger.info(f"{category_name}用レシピ: {len(filtered_recipes)}件")
+        if not filtered_recipes:
+            logger.warning(f"{category_name}用レシピが見つかりません。スキップします。")
+            continue
+
+        plan = build_category(
+            filtered_recipes,
+            project_root / output_dir_name,
+            embeddings,
+            args.batch_size,
+            args.concurrency,
+            args.dry_run
+        )
+        total_embedded += len(plan.to_embed)
+
+    elapsed = time.perf_counter() - start
+    logger.info("=== レシピベクトルDB差分構築完了 ===")
+    logger.info(f"処理件数: {len(processed_recipes)}件 / 埋め込み: {total_embedded}件 / 所要時間: {elapsed:.1f}秒")
+
+
+if __name__ == "__main__":
+    main()
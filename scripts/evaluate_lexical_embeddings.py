@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+文字n-gram埋め込みとOpenAI埋め込みの検索品質比較スクリプト
+
+固定のクエリセット（在庫食材 + 主要食材）で各ベクトルDBをベクトル検索し、
+正解集合に対する recall@k とクエリ埋め込みのレイテンシを比較する。
+
+正解集合は、最終的なスコア計算と同じ InventoryMatcher でコレクション全件を採点した
+上位 --relevant 件とする（ベクトル検索で取りこぼすと最終結果に入らないレシピ）。
+
+使用方法:
+    python scripts/evaluate_lexical_embeddings.py [--categories main,sub] [--relevant 10] [--k 10,50]
+
+前提条件:
+    - scripts/build_lexical_vector_db.py で文字n-gram埋め込みを構築済みであること
+    - OpenAI埋め込みの評価には OPENAI_API_KEY が必要（未設定の場合は文字n-gramのみ評価）
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from dotenv import load_dotenv
+
+# プロジェクトルートをPythonのモジュール検索パスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_community.vectorstores import Chroma
+from langchain_openai import OpenAIEmbeddings
+from mcp_servers.recipe_rag.ingredient_index import IngredientTokenIndex
+from mcp_servers.recipe_rag.lexical_embeddings import CharNgramEmbeddings, LEXICAL_COLLECTION_NAME
+from build_lexical_vector_db import VECTOR_DB_PATHS
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# 固定クエリセット: (在庫食材, 主要食材)
+QUERIES = [
+    (["豚肉", "キャベツ", "玉ねぎ", "にんじん"], "豚肉"),
+    (["鶏もも肉", "じゃがいも", "にんじん", "玉ねぎ"], "鶏もも肉"),
+    (["鮭", "ほうれん草", "しめじ", "バター"], "鮭"),
+    (["牛肉", "ピーマン", "たけのこ", "長ねぎ"], "牛肉"),
+    (["卵", "トマト", "ねぎ"], "卵"),
+    (["豆腐", "ひき肉", "長ねぎ", "にら"], "豆腐"),
+    (["さば", "大根", "しょうが"], "さば"),
+    (["えび", "ブロッコリー", "にんにく"], "えび"),
+    (["なす", "ピーマン", "豚バラ肉"], "なす"),
+    (["白菜", "豚肉", "しいたけ", "春雨"], "白菜"),
+    (["かぼちゃ", "玉ねぎ", "牛乳"], "かぼちゃ"),
+    (["わかめ", "豆腐", "ねぎ"], None),
+    (["ごぼう", "にんじん", "こんにゃく"], None),
+    (["きゅうり", "ツナ", "コーン"], None),
+    (["小松菜", "油揚げ", "しめじ"], None),
+    (["キャベツ", "ベーコン", "じゃがいも"], None),
+]
+
+
+def build_query(inventory, main_ingredient):
+    """検索エンジンの在庫食材込みクエリと同じ形のクエリ文字列"""
+    if main_ingredient:
+        return f"{main_ingredient} {main_ingredient} {' '.join(inventory)}"
+    return " ".join(inventory)
+
+
+def relevant_titles(index: IngredientTokenIndex, documents, inventory, main_ingredient, count):
+    """InventoryMatcherのスコア上位のタイトル（正解集合）"""
+    matcher = index.create_matcher(inventory, main_ingredient)
+    scored = []
+    for document in documents:
+        score, _ = matcher.score(document.page_content)
+        if score > 0:
+            scored.append((score, document.metadata.get("title", "")))
+    scored.sort(key=lambda item: -item[0])
+    return {title for _, title in scored[:count]}
+
+
+def evaluate(vectorstore: Chroma, golden, k_values):
+    """各クエリの recall@k と埋め込みレイテンシ（ms）を計測"""
+    max_k = max(k_values)
+    recalls = {k: [] for k in k_values}
+    latencies = []
+    for (inventory, main_ingredient), relevant in golden:
+        if not relevant:
+            continue
+        query = build_query(inventory, main_ingredient)
+        start = time.perf_counter()
+        embedding = vectorstore.embeddings.embed_query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results = vectorstore.similarity_search_by_vector(embedding, k=max_k)
+        titles = [document.metadata.get("title", "") for document in results]
+        for k in k_values:
+            recalls[k].append(len(relevant & set(titles[:k])) / len(relevant))
+    return {k: statistics.mean(values) if values else 0.0 for k, values in recalls.items()}, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文字n-gram埋め込みとOpenAI埋め込みの検索品質比較")
+    parser.add_argument("--categories", default="main,sub,soup", help="対象カテゴリ（カンマ区切り）")
+    parser.add_argument("--relevant", type=int, default=10, help="正解集合の件数")
+    parser.add_argument("--k", default="10,50", help="recall@k のk（カンマ区切り）")
+    args = parser.parse_args()
+
+    env_path = project_root / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+    k_values = [int(k) for k in args.k.split(",")]
+    use_openai = bool(os.getenv("OPENAI_API_KEY"))
+    if not use_openai:
+        print("OPENAI_API_KEY が未設定のため、文字n-gram埋め込みのみ評価します")
+
+    header = f"{'カテゴリ':<8}{'埋め込み':<12}" + "".join(f"{'recall@' + str(k):>12}" for k in k_values) + f"{'埋め込みp50(ms)':>18}"
+    print(header)
+    for category in [c.strip() for c in args.categories.split(",") if c.strip()]:
+        env_name, default_path = VECTOR_DB_PATHS[category]
+        path = os.getenv(env_name, default_path)
+        if not CharNgramEmbeddings.exists(path):
+            print(f"{category}: 文字n-gram埋め込みが未構築です（{path}）")
+            continue
+
+        backends = {
+            "char_ngram": Chroma(
+                persist_directory=path,
+                collection_name=LEXICAL_COLLECTION_NAME,
+                embedding_function=CharNgramEmbeddings.load(path)
+            )
+        }
+        if use_openai:
+            backends["openai"] = Chroma(
+                persist_directory=path,
+                embedding_function=OpenAIEmbeddings(model=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"))
+            )
+
+        # 正解集合（コレクション全件をスコア計算）
+        index = IngredientTokenIndex()
+        index.load_from_vectorstore(backends["char_ngram"])
+        documents = [index.get_document(doc_id) for doc_id in range(index.document_count)]
+        golden = [
+            ((inventory, main_ingredient), relevant_titles(index, documents, inventory, main_ingredient, args.relevant))
+            for inventory, main_ingredient in QUERIES
+        ]
+
+        for name, vectorstore in backends.items():
+            recalls, latencies = evaluate(vectorstore, golden, k_values)
+            print(
+                f"{category:<8}{name:<12}" + "".join(f"{recalls[k]:>12.3f}" for k in k_values)
+                + f"{statistics.median(latencies) if latencies else 0.0:>18.2f}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+レシピデータ前処理ステージ（並列版）
+
+ベクトルDB構築スクリプトの前処理（食材名の抽出・調味料除外・結合テキスト作成）を
+プリコンパイル済みの正規表現で行い、元データをチャンク単位で ProcessPoolExecutor に
+分配して並列に処理する。結果は JSONL シャード（processed-00000.jsonl ...）と
+manifest.json として書き出し、各構築スクリプトから --preprocessed で再利用できる。
+
+食材名の抽出処理（extract_ingredient_name など）は各構築スクリプトからも共通で使う。
+
+使用方法:
+    python scripts/recipe_preprocess.py [--source sara|jsonl] [--output-dir processed_recipes]
+                                        [--workers 4] [--chunk-size 2000] [--shard-size 5000]
+"""
+
+import re
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import importlib
+from itertools import islice
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+# プロジェクトルートをPythonのモジュール検索パスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 調味料キーワードリスト（検索対象外、RAG検索のクエリ計画と共通）
+from config.constants import SEASONING_KEYWORDS
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_MANIFEST_FILE_NAME = "manifest.json"
+
+# 元データごとの構築スクリプト（レシピ1件の前処理 preprocess_recipe を持つ）とデータファイル
+SOURCES = {
+    "sara": {"module": "build_vector_db_by_category_2", "data_path": "me2you/vector_data_sara.json"},
+    "jsonl": {"module": "build_vector_db_by_category", "data_path": "me2you/recipe_data.jsonl"},
+}
+
+# 食材行のノイズ除去パターン（プリコンパイル）
+_PAREN_PATTERN = re.compile(r'[（(][^）)]*[）)]')  # 括弧内の内容（分量情報）
+_NUMBER_UNIT_PATTERN = re.compile(r'\d+[a-zA-Zａ-ｚＡ-Ｚ]*')  # 数字と単位
+_MARK_PATTERN = re.compile(r'[◎★●※【】]')  # 記号
+_EXTRA_MARK_PATTERN = re.compile(r'[～/／・！？▲✿◆☆）））]')  # 余分な記号
+_GARBLED_PATTERN = re.compile(r'[ｸﾞﾗﾑ]')  # 文字化け
+
+# よくあるノイズ語（順番に除去する）
+NOISE_WORDS = (
+    '小さじ', '大さじ', '大匙', '小匙', '約', '適量', '適宜', '少々', '少量',
+    'お好みにより', '好みで', 'なんでも', 'または', 'ＯＫ', '好きなだけ',
+    'カット', 'カップ', '切れ', '切り', '位', '丁', '㏄', '㌘', 'グラム',
+    '㎝', 'ｍｌ', 'センチ', 'チューブ', 'パック', '缶缶', 'でも', 'くらい',
+    'たっぷり', 'あるもの', 'あれば', 'なくても', '何でも', '無くても可',
+    'OK', '各', '又は', 'など', 'ほど', 'ふり', 'ひとつまみ', '握り',
+    '人分', '人数分', '半分', '私は', 'タップリ', '×', '一', '○',
+    # 追加の単位
+    '本', '節', '袋', '個', '枚', '束', '滴', '片', 'かけ', 'カケ',
+    # 追加の不要語
+    '仕上げ', '黄金比率の煮汁', '大なら', '小なら', '大きめ',
+)
+# ノイズ語を1つも含まない食材行は除去ループを省略する
+_NOISE_PATTERN = re.compile('|'.join(re.escape(word) for word in NOISE_WORDS))
+
+_SEASONING_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in SEASONING_KEYWORDS))
+
+# 結合テキストから除外する不要な文字列
+_COMBINED_TEXT_STOP_WORDS = frozenset(['）', '））', '仕上げ', '黄金比率の煮汁'])
+
+
+def extract_ingredient_name(ingredient_line: str) -> str:
+    """
+    食材行から食材名を抽出する
+
+    Args:
+        ingredient_line: 食材行（例: "◎牛乳50ｃｃ（67ｃｃ）"）
+
+    Returns:
+        食材名（例: "牛乳"）。抽出できない場合は空文字列
+    """
+    ingredient = _PAREN_PATTERN.sub('', ingredient_line)
+    ingredient = _NUMBER_UNIT_PATTERN.sub('', ingredient)
+    ingredient = _MARK_PATTERN.sub('', ingredient)
+
+    # ノイズ語の除去（順番に除去した結果が従来と一致するよう、含まれる場合のみ全語を順に処理）
+    if _NOISE_PATTERN.search(ingredient):
+        for word in NOISE_WORDS:
+            ingredient = ingredient.replace(word, '')
+
+    # 「・」もここで除去されるため、複数食材の結合は1つの名前として残る（従来と同じ）
+    ingredient = _EXTRA_MARK_PATTERN.sub('', ingredient)
+    ingredient = _GARBLED_PATTERN.sub('', ingredient)
+    return ingredient.strip()
+
+
+def is_seasoning_name(ingredient: str) -> bool:
+    """調味料かどうか（SEASONING_KEYWORDS のいずれかを含む）"""
+    return _SEASONING_PATTERN.search(ingredient) is not None
+
+
+def filter_seasonings(ingredients: List[str]) -> List[str]:
+    """
+    調味料を除外して食材のみを抽出する
+
+    Args:
+        ingredients: 食材リスト
+
+    Returns:
+        調味料を除外した食材リスト
+    """
+    filtered = [ingredient for ingredient in ingredients if not is_seasoning_name(ingredient)]
+    logger.debug(f"調味料除外: {len(ingredients)} → {len(filtered)} (除外: {len(ingredients) - len(filtered)})")
+    return filtered
+
+
+def normalize_ingredient_lines(ingredient_lines: Iterable[str]) -> List[str]:
+    """
+    食材行のリストを正規化する（食材名抽出・重複除去・調味料除外）
+
+    重複除去は出現順を保つ（プロセスごとに順序が変わらず、結合テキストのハッシュが安定する）
+
+    Args:
+        ingredient_lines: 食材行のリスト
+
+    Returns:
+        正規化された食材リスト
+    """
+    names = (extract_ingredient_name(line.strip()) for line in ingredient_lines if line and line.strip())
+    unique_names = list(dict.fromkeys(name for name in names if name))
+    return filter_seasonings(unique_names)
+
+
+def create_combined_text(title: str, ingredients: List[str], category: str) -> str:
+    """
+    ベクトル化用の結合テキストを作成する（食材のみ）
+
+    Args:
+        title: レシピタイトル（使用しない）
+        ingredients: 食材リスト（調味料除外済み）
+        category: レシピ分類（使用しない）
+
+    Returns:
+        食材のみの結合テキスト
+    """
+    cleaned_ingredients = [
+        cleaned for cleaned in (ingredient.strip() for ingredient in ingredients)
+        if cleaned and cleaned not in _COMBINED_TEXT_STOP_WORDS
+    ]
+    # 余分なスペースを除去
+    return ' '.join(' '.join(cleaned_ingredients).split())
+
+
+def _chunked(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """イテラブルをchunk_size件ずつのリストに分割"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_source_records(data_path: Path) -> Iterator[Any]:
+    """
+    元データをレコード単位で読み出す
+
+    JSONLは行をそのまま返し（JSON解析はワーカーで行う）、JSON配列は要素を返す
+    """
+    if data_path.suffix == ".jsonl":
+        with open(data_path, 'r', encoding='utf-8') as f:
+            yield from f
+    else:
+        with open(data_path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+
+
+def _process_chunk(args: Tuple[str, int, List[Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    ワーカー: チャンク内のレシピを前処理
+
+    Args:
+        args: (構築スクリプトのモジュール名, チャンク先頭の元インデックス, レコードのリスト)
+
+    Returns:
+        (前処理済みレシピのリスト, スキップ件数)
+    """
+    module_name, start_index, records = args
+    builder = importlib.import_module(module_name)
+    processed = []
+    skipped = 0
+    for offset, record in enumerate(records):
+        index = start_index + offset
+        try:
+            recipe = json.loads(record) if isinstance(record, str) else record
+            processed_recipe = builder.preprocess_recipe(recipe, index)
+        except Exception:
+            processed_recipe = None
+        if processed_recipe is None:
+            skipped += 1
+        else:
+            processed.append(processed_recipe)
+    return processed, skipped
+
+
+class ShardWriter:
+    """前処理済みレシピをJSONLシャードに書き出す"""
+
+    def __init__(self, output_dir: Path, shard_size: int):
+        self.output_dir = output_dir
+        self.shard_size = max(shard_size, 1)
+        self.shards: List[str] = []
+        self.count = 0
+        self._file = None
+        self._shard_count = 0
+
+    def write(self, recipe: Dict[str, Any]) -> None:
+        if self._file is None or self._shard_count >= self.shard_size:
+            self._open_next()
+        self._file.write(json.dumps(recipe, ensure_ascii=False))
+        self._file.write('\n')
+        self._shard_count += 1
+        self.count += 1
+
+    def _open_next(self) -> None:
+        self.close()
+        name = f"processed-{len(self.shards):05d}.jsonl"
+        self.shards.append(name)
+        self._file = open(self.output_dir / name, 'w', encoding='utf-8')
+        self._shard_count = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def run_preprocess(
+    source: str,
+    data_path: Path,
+    output_dir: Path,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    shard_size: int = 5000
+) -> Dict[str, Any]:
+    """
+    元データを並列に前処理してJSONLシャードに書き出す
+
+    Returns:
+        manifest.json の内容（件数・シャード・処理時間）
+    """
+    module_name = SOURCES[source]["module"]
+    # 親プロセスで読み込んでおき、fork したワーカーでの再インポート（LangChain等）を避ける
+    importlib.import_module(module_name)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for old_shard in output_dir.glob("processed-*.jsonl"):
+        old_shard.unlink()
+
+    writer = ShardWriter(output_dir, shard_size)
+    total = 0
+    skipped = 0
+    start = time.perf_counter()
+
+    def tasks() -> Iterator[Tuple[str, int, List[Any]]]:
+        nonlocal total
+        for chunk in _chunked(_iter_source_records(data_path), chunk_size):
+            yield module_name, total, chunk
+            total += len(chunk)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # executor.map は入力順に結果を返すため、カテゴリ内インデックスは逐次処理と同じになる
+            for processed, chunk_skipped in executor.map(_process_chunk, tasks()):
+                skipped += chunk_skipped
+                for recipe in processed:
+                    recipe['metadata']['category_index'] = writer.count
+                    writer.write(recipe)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    manifest = {
+        "source": source,
+        "data_path": str(data_path),
+        "total": total,
+        "processed": writer.count,
+        "skipped": skipped,
+        "shards": writer.shards,
+        "elapsed_seconds": round(elapsed, 3),
+        "recipes_per_second": round(total / elapsed, 1) if elapsed > 0 else None,
+    }
+    with open(output_dir / PROCESSED_MANIFEST_FILE_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_processed_recipes(processed_dir: Path) -> List[Dict[str, Any]]:
+    """
+    前処理ステージの出力（JSONLシャード）を読み込む
+
+    Args:
+        processed_dir: run_preprocess の出力ディレクトリ
+
+    Returns:
+        前処理済みレシピデータのリスト（元データの順）
+    """
+    with open(processed_dir / PROCESSED_MANIFEST_FILE_NAME, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    recipes = []
+    for shard in manifest["shards"]:
+        with open(processed_dir / shard, 'r', encoding='utf-8') as f:
+            recipes.extend(json.loads(line) for line in f if line.strip())
+    logger.info(f"前処理済みレシピ読み込み完了: {len(recipes)}件（{processed_dir}）")
+    return recipes
+
+
+def main():
+    """メイン処理"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="レシピデータの並列前処理")
+    parser.add_argument("--source", choices=sorted(SOURCES), default="sara", help="元データの形式")
+    parser.add_argument("--input", help="元データのパス（未指定時は形式ごとの既定パス）")
+    parser.add_argument("--output-dir", default="processed_recipes", help="出力ディレクトリ（プロジェクトルートからの相対パス）")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数（未指定時はCPU数）")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="ワーカーに渡す1チャンクのレシピ数")
+    parser.add_argument("--shard-size", type=int, default=5000, help="1シャードのレシピ数")
+    args = parser.parse_args()
+
+    data_path = Path(args.input) if args.input else project_root / SOURCES[args.source]["data_path"]
+    if not data_path.exists():
+        logger.error(f"ファイルが見つかりません: {data_path}")
+        sys.exit(1)
+    output_dir = project_root / args.output_dir
+
+    logger.info("=== レシピデータ前処理開始 ===")
+    logger.info(f"元データ: {data_path} / ワーカー: {args.workers or os.cpu_count()}")
+    manifest = run_preprocess(args.source, data_path, output_dir, args.workers, args.chunk_size, args.shard_size)
+
+    logger.info("=== レシピデータ前処理完了 ===")
+    logger.info(
+        f"処理件数: {manifest['processed']}/{manifest['total']}件（スキップ {manifest['skipped']}件） / "
+        f"{manifest['elapsed_seconds']}秒 / {manifest['recipes_per_second']} recipes/sec"
+    )
+    logger.info(f"出力先: {output_dir}（{len(manifest['shards'])}シャード）")
+
+
+if __name__ == "__main__":
+    main()
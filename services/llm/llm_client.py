@@ -7,10 +7,12 @@ OpenAI API呼び出しとフォールバック処理を担当
 """
 
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
 from config.loggers import GenericLogger, log_prompt_with_tokens
+from mcp_servers.llm_gateway import get_llm_gateway
+from mcp_servers.structured_output import JSON_OBJECT_RESPONSE_FORMAT, structured_output_enabled
+from .prompt_manager.utils import PLANNER_SYSTEM_MESSAGE, PromptParts
 
 # 環境変数を読み込み
 load_dotenv()
@@ -27,23 +29,29 @@ class LLMClient:
         
         # OpenAI設定を環境変数から取得
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        gateway = get_llm_gateway()
+        self.openai_model = gateway.model_for("planner", os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
         self.openai_temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.8"))
+        # タスク分解の応答はJSONモードで受け取る（parameters は任意のキーを持つためスキーマは固定しない）
+        self.structured_output = structured_output_enabled()
         
-        # OpenAIクライアントを初期化
+        # OpenAIクライアントを初期化（プロセス共通のLLMゲートウェイを使用）
         if self.openai_api_key:
-            self.openai_client = AsyncOpenAI(api_key=self.openai_api_key)
+            self.openai_client = gateway.client_for("planner")
             self.logger.debug(f"✅ [LLMClient] OpenAIクライアントを初期化しました: モデル={self.openai_model}")
         else:
             self.openai_client = None
             self.logger.warning("⚠️ [LLMClient] OPENAI_API_KEYが見つかりません。LLM呼び出しは無効になります")
     
-    async def call_openai_api(self, prompt: str) -> str:
+    async def call_openai_api(self, prompt: Union[str, PromptParts]) -> str:
         """
         OpenAI APIを呼び出してレスポンスを取得
         
+        メッセージは「共通のシステムメッセージ → 静的プレフィックス → リクエスト情報」の順に並べ、
+        先頭をリクエスト間で同一に保つ（OpenAIの自動プロンプトキャッシュの対象にする）。
+        
         Args:
-            prompt: 送信するプロンプト
+            prompt: 送信するプロンプト（PromptParts または組み立て済みの文字列）
         
         Returns:
             LLMからのレスポンス
@@ -52,19 +60,26 @@ class LLMClient:
             if not self.openai_client:
                 raise Exception("OpenAI client not initialized")
             
+            if isinstance(prompt, PromptParts):
+                prompt = prompt.render()
+            
             self.logger.debug(f"🔧 [LLMClient] OpenAI APIを呼び出し中: モデル={self.openai_model}")
             
             # プロンプトとトークン数をログ出力（5行省略表示）
-            log_prompt_with_tokens(prompt, max_tokens=self.MAX_TOKENS, logger_name="service.llm")
+            log_prompt_with_tokens(prompt, max_tokens=self.MAX_TOKENS, logger_name="service.llm", model=self.openai_model)
             
+            params = {}
+            if self.structured_output:
+                params["response_format"] = JSON_OBJECT_RESPONSE_FORMAT
             response = await self.openai_client.chat.completions.create(
                 model=self.openai_model,
                 messages=[
-                    {"role": "system", "content": "あなたは優秀なタスク分解アシスタントです。ユーザーの要求を適切なサービスクラスのメソッド呼び出しに分解してください。"},
+                    {"role": "system", "content": PLANNER_SYSTEM_MESSAGE},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=self.openai_temperature,
-                max_tokens=self.MAX_TOKENS
+                max_tokens=self.MAX_TOKENS,
+                **params
             )
             
             content = response.choices[0].message.content
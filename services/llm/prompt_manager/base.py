@@ -6,6 +6,7 @@ PromptManager 基本クラス
 """
 
 from typing import Dict, Any
+from .utils import PromptParts
 from .patterns.inventory import build_inventory_prompt
 from .patterns.menu import build_menu_prompt
 from .patterns.main_proposal import build_main_proposal_prompt
@@ -80,6 +81,28 @@ class PromptManager:
         Returns:
             構築されたプロンプト
         """
+        return self.build_prompt_parts(analysis_result, user_id, sse_session_id).render()
+    
+    def build_prompt_parts(
+        self, 
+        analysis_result: Dict[str, Any], 
+        user_id: str, 
+        sse_session_id: str = None
+    ) -> PromptParts:
+        """
+        分析結果に基づいてプロンプトを静的プレフィックスとリクエスト情報に分けて構築
+        
+        静的プレフィックスはパターンごとにユーザー・リクエストによらず同一のため、
+        OpenAI の自動プロンプトキャッシュの対象になる。
+        
+        Args:
+            analysis_result: RequestAnalyzer の分析結果
+            user_id: ユーザーID
+            sse_session_id: SSEセッションID
+        
+        Returns:
+            構築されたプロンプト（静的プレフィックス + リクエスト情報）
+        """
         pattern = analysis_result["pattern"]
         params = analysis_result["params"]
         
@@ -133,7 +156,7 @@ class PromptManager:
                 sse_session_id,
                 "soup"
             ),
-            "greeting": lambda: self._build_default_prompt(),
+            "greeting": lambda: PromptParts(self._build_default_prompt()),
         }
         
         builder = pattern_map.get(pattern)
@@ -141,7 +164,7 @@ class PromptManager:
             return builder()
         
         # デフォルトプロンプト（その他の未定義パターン）
-        return self._build_default_prompt()
+        return PromptParts(self._build_default_prompt())
     
     def _build_default_prompt(self) -> str:
         """デフォルトプロンプト"""
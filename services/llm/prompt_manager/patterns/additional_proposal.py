@@ -3,22 +3,18 @@
 追加提案プロンプトビルダー（主菜・副菜・汁物共通）
 """
 
-from ..utils import build_base_prompt
+from ..utils import PromptParts, build_base_prompt, build_request_suffix
 
 
-def build_additional_proposal_prompt(user_request: str, user_id: str, sse_session_id: str, category: str) -> str:
-    """追加提案用のプロンプトを構築（主菜・副菜・汁物・その他共通）"""
+def build_additional_proposal_prompt(user_request: str, user_id: str, sse_session_id: str, category: str) -> PromptParts:
+    """追加提案用のプロンプトを構築（主菜・副菜・汁物・その他共通、静的プレフィックス + リクエスト情報）"""
     base = build_base_prompt()
     
     category_name = {"main": "主菜", "sub": "副菜", "soup": "汁物", "other": "その他"}.get(category, "レシピ")
     
-    return f"""
+    static_prefix = f"""
 {base}
 
-ユーザー要求: "{user_request}"
-
-現在のSSEセッションID: {sse_session_id}
-
 **{category_name}追加提案の4段階タスク構成**:
 
 ユーザーの要求に「もう5件」「もっと」「他の提案」等の追加提案キーワードが含まれる場合、以下の4段階のタスク構成を使用してください。
@@ -29,10 +25,10 @@ def build_additional_proposal_prompt(user_request: str, user_id: str, sse_sessio
 
 **タスク構成**:
 a. **task1**: `history_service.history_get_recent_titles(user_id, "{category}", 14)` を呼び出し、14日間の{category_name}履歴を取得する。
-   - user_id: "{user_id}"
+   - user_id: リクエスト情報のユーザーID
 
 b. **task2**: `session_service.session_get_proposed_titles(sse_session_id, "{category}")` を呼び出し、セッション内で提案済みのタイトルを取得する。
-   - **重要**: sse_session_idパラメータには、上記の「現在のSSEセッションID」の値を使用してください。決して固定値（例: "session123"）を使用しないでください。
+   - **重要**: sse_session_idパラメータには、リクエスト情報の「現在のSSEセッションID」の値を使用してください。決して固定値（例: "session123"）を使用しないでください。
 
 c. **task3**: `recipe_service.generate_proposals(category="{category}")` を呼び出す。その際:
    - `inventory_items`: 文字列リテラルとして "session.context.inventory_items" と指定（システムが自動的にセッションから取得）
@@ -47,7 +43,7 @@ d. **task4**: `recipe_service.search_recipes_from_web()` を呼び出す。そ
 
 **重要**: 
 - 追加提案の場合、在庫取得タスク（inventory_service.get_inventory）は生成しないでください。セッション内に保存された在庫情報を再利用してください。
-- session_get_proposed_titlesのsse_session_idパラメータには、必ずプロンプトに示された「現在のSSEセッションID」を使用してください。
+- session_get_proposed_titlesのsse_session_idパラメータには、必ずリクエスト情報の「現在のSSEセッションID」を使用してください。
 
 **パラメータ注入のルール（追加提案対応）**:
 - 履歴除外リスト: `"excluded_recipes": "task1.result.data"`
@@ -55,4 +51,8 @@ d. **task4**: `recipe_service.search_recipes_from_web()` を呼び出す。そ
 - 在庫情報: セッションコンテキストから取得（タスクではなくコンテキスト参照）
 - 主要食材: セッションコンテキストから取得
 """
+    return PromptParts(static_prefix, build_request_suffix(user_request, [
+        ("ユーザーID", user_id),
+        ("現在のSSEセッションID", sse_session_id),
+    ]))
 
@@ -3,18 +3,16 @@
 在庫操作プロンプトビルダー
 """
 
-from ..utils import build_base_prompt
+from ..utils import PromptParts, build_base_prompt, build_request_suffix
 
 
-def build_inventory_prompt(user_request: str) -> str:
-    """在庫操作用のプロンプトを構築"""
+def build_inventory_prompt(user_request: str) -> PromptParts:
+    """在庫操作用のプロンプトを構築（静的プレフィックス + リクエスト情報）"""
     base = build_base_prompt()
     
-    return f"""
+    static_prefix = f"""
 {base}
 
-ユーザー要求: "{user_request}"
-
 **在庫操作のタスク生成ルール**:
 
 ユーザーの要求が「追加」「削除」「更新」「確認」等の在庫操作のみの場合、該当する在庫操作タスクのみを生成してください。
@@ -59,4 +57,5 @@ strategy判定の例:
 - 「変えて」要求で `delete_inventory` + `add_inventory` の組み合わせは絶対に生成しない
 - 「変えて」要求で複数タスクに分解しない（必ず1つの `update_inventory` タスクのみ）
 """
+    return PromptParts(static_prefix, build_request_suffix(user_request))
 
@@ -3,18 +3,16 @@
 献立生成プロンプトビルダー
 """
 
-from ..utils import build_base_prompt
+from ..utils import PromptParts, build_base_prompt, build_request_suffix
 
 
-def build_menu_prompt(user_request: str, user_id: str) -> str:
-    """献立生成用のプロンプトを構築"""
+def build_menu_prompt(user_request: str, user_id: str) -> PromptParts:
+    """献立生成用のプロンプトを構築（静的プレフィックス + リクエスト情報）"""
     base = build_base_prompt()
     
-    return f"""
+    static_prefix = f"""
 {base}
 
-ユーザー要求: "{user_request}"
-
 **献立生成の5段階タスク構成**:
 
 ユーザーの要求が「献立」「レシピ」「メニュー」等の献立提案に関する場合のみ、以下の5段階のタスク構成を使用してください。
@@ -64,7 +62,7 @@ e. **task5**: `recipe_service.search_recipes_from_web()` を呼び出す。そ
             "description": "在庫リストに基づき、LLMによる独創的な献立を提案する",
             "service": "recipe_service",
             "method": "generate_menu_plan",
-            "parameters": {{ "inventory_items": "task1.result", "user_id": "{user_id}" }},
+            "parameters": {{ "inventory_items": "task1.result", "user_id": "リクエスト情報のユーザーID" }},
             "dependencies": ["task1"]
         }},
         {{
@@ -72,7 +70,7 @@ e. **task5**: `recipe_service.search_recipes_from_web()` を呼び出す。そ
             "description": "在庫リストに基づき、RAGを使用して過去の献立履歴から類似献立を検索する",
             "service": "recipe_service",
             "method": "search_menu_from_rag",
-            "parameters": {{ "inventory_items": "task1.result", "user_id": "{user_id}" }},
+            "parameters": {{ "inventory_items": "task1.result", "user_id": "リクエスト情報のユーザーID" }},
             "dependencies": ["task1"]
         }},
         {{
@@ -105,4 +103,5 @@ e. **task5**: `recipe_service.search_recipes_from_web()` を呼び出す。そ
     ]
 }}
 """
+    return PromptParts(static_prefix, build_request_suffix(user_request, [("ユーザーID", user_id)]))
 
@@ -3,38 +3,33 @@
 汁物提案プロンプトビルダー
 """
 
-from ..utils import build_base_prompt
+from ..utils import PromptParts, build_base_prompt, build_request_suffix
 
 
-def build_soup_proposal_prompt(user_request: str, user_id: str, used_ingredients: list = None, menu_category: str = "japanese") -> str:
-    """汁物提案用のプロンプトを構築"""
+def build_soup_proposal_prompt(user_request: str, user_id: str, used_ingredients: list = None, menu_category: str = "japanese") -> PromptParts:
+    """汁物提案用のプロンプトを構築（静的プレフィックス + リクエスト情報）"""
     base = build_base_prompt()
     
     used_ingredients_str = ", ".join(used_ingredients) if used_ingredients else "なし"
     category_name = {"japanese": "和食", "western": "洋食", "chinese": "中華"}.get(menu_category, "和食")
     
-    return f"""
+    static_prefix = f"""
 {base}
 
-ユーザー要求: "{user_request}"
-
-主菜・副菜で使った食材: {used_ingredients_str}
-献立カテゴリ: {category_name} ({menu_category})
-
 **汁物提案の4段階タスク構成**:
 
 a. **task1**: `inventory_service.get_inventory()` を呼び出し、現在の在庫をすべて取得する。
 
 b. **task2**: `history_service.history_get_recent_titles(user_id, "soup", 14)` を呼び出し、14日間の汁物履歴を取得する。
-   - user_id: "{user_id}"
+   - user_id: リクエスト情報のユーザーID
 
 c. **task3**: `recipe_service.generate_proposals(category="soup")` を呼び出す。その際:
    - `inventory_items`: "task1.result"
    - `excluded_recipes`: "task2.result.data"
    - `category`: "soup"
-   - `used_ingredients`: {used_ingredients if used_ingredients else "[]"}
-   - `menu_category`: "{menu_category}"
-   - `user_id`: "{user_id}"
+   - `used_ingredients`: リクエスト情報の used_ingredients
+   - `menu_category`: リクエスト情報の menu_category
+   - `user_id`: リクエスト情報のユーザーID
 
 d. **task4**: `recipe_service.search_recipes_from_web()` を呼び出す。その際:
    - `recipe_titles`: "task3.result.data.candidates"
@@ -44,4 +39,11 @@ d. **task4**: `recipe_service.search_recipes_from_web()` を呼び出す。そ
 **重要**: task3はtask2の結果（`excluded_recipes`）に依存するため、task2の完了後に実行してください。
 task2のdependenciesは["task1"]、task3のdependenciesは["task1", "task2"]、task4のdependenciesは["task3"]を指定してください。
 """
+    return PromptParts(static_prefix, build_request_suffix(user_request, [
+        ("ユーザーID", user_id),
+        ("主菜・副菜で使った食材", used_ingredients_str),
+        ("used_ingredients", str(used_ingredients) if used_ingredients else "[]"),
+        ("献立カテゴリ", category_name),
+        ("menu_category", f'"{menu_category}"'),
+    ]))
 
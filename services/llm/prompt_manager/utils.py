@@ -3,8 +3,53 @@
 PromptManager Utils - 共通ユーティリティ
 
 共通のベースプロンプトやヘルパー関数を提供
+
+プロンプトは「静的プレフィックス」（指示・ツール一覧・例。パターンごとに固定）と
+「動的サフィックス」（ユーザー要求・ユーザーID・食材などリクエストごとの値）に分けて組み立てる。
+静的プレフィックスをユーザー間でバイト単位で同一に保つことで、OpenAIの自動プロンプト
+キャッシュ（先頭1024トークン以上の一致）が効き、入力トークンの課金とレイテンシが下がる。
+静的プレフィックスにはリクエストごとの値を埋め込まないこと。
 """
 
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# タスク分解のシステムメッセージ（全リクエスト共通）
+PLANNER_SYSTEM_MESSAGE = "あなたは優秀なタスク分解アシスタントです。ユーザーの要求を適切なサービスクラスのメソッド呼び出しに分解してください。"
+
+
+@dataclass(frozen=True)
+class PromptParts:
+    """静的プレフィックス（パターンごとに固定）と動的サフィックス（リクエストごとの値）"""
+    static_prefix: str
+    dynamic_suffix: str = ""
+
+    def render(self) -> str:
+        """送信するプロンプト全文"""
+        return self.static_prefix + self.dynamic_suffix
+
+
+def build_request_suffix(user_request: str, details: Optional[List[Tuple[str, str]]] = None) -> str:
+    """
+    リクエストごとの値をまとめた動的サフィックスを構築
+
+    Args:
+        user_request: ユーザー要求
+        details: (項目名, 値) のリスト
+
+    Returns:
+        静的プレフィックスの後ろに連結する文字列
+    """
+    lines = [
+        "",
+        "**リクエスト情報**（上記の手順で「リクエスト情報」と書かれたパラメータにはここの値を使用してください）:",
+        f'- ユーザー要求: "{user_request}"',
+    ]
+    for label, value in details or []:
+        lines.append(f"- {label}: {value}")
+    return "\n".join(lines) + "\n"
+
+
 def build_base_prompt() -> str:
     """共通ベースプロンプトを構築"""
     return """
@@ -9,6 +9,8 @@ JSON解析、タスク形式変換、最終回答整形を担当
 import json
 from typing import Dict, Any, List, Optional
 from config.loggers import GenericLogger
+from mcp_servers.models.llm_output_models import PlannerResponse
+from mcp_servers.structured_output import parse_structured, structured_output_enabled
 from .utils import ResponseProcessorUtils
 from .response_formatters import ResponseFormatters
 from .menu_data_generator import MenuDataGenerator
@@ -16,6 +18,16 @@ from .service_handlers import InventoryServiceHandler, RecipeServiceHandler, Gen
 from .session_info_handler import SessionInfoHandler
 from .web_search_integrator import WebSearchResultIntegrator
 
+# パターン → generate_proposals にリクエスト情報の値で設定するパラメータ（値がない場合の既定値）
+# プロンプトの静的部分には値を含めないため、user_id と同様にLLMの記述ぶれを上書きする
+# （追加提案はセッションコンテキストから取得するため対象外）
+REQUEST_PROPOSAL_PARAMS = {
+    "main": {"main_ingredient": None},
+    "other": {"main_ingredient": None, "category_detail_keyword": None},
+    "sub": {"used_ingredients": []},
+    "soup": {"used_ingredients": [], "menu_category": "japanese"},
+}
+
 
 class ResponseProcessor:
     """レスポンス処理クラス"""
@@ -49,6 +61,14 @@ class ResponseProcessor:
         try:
             self.logger.debug(f"🔧 [ResponseProcessor] LLMレスポンスを解析中")
             
+            # JSONモードの応答: 1回のデコードと検証でタスクリストに変換
+            if structured_output_enabled():
+                parsed = parse_structured(response, PlannerResponse)
+                if parsed is not None:
+                    tasks = [task.model_dump(exclude_unset=True) for task in parsed.tasks]
+                    self.logger.debug(f"✅ [ResponseProcessor] LLMレスポンスから{len(tasks)}件のタスクを解析しました")
+                    return tasks
+            
             # JSON部分を抽出（```json```で囲まれている場合がある）
             if "```json" in response:
                 start = response.find("```json") + 7
@@ -89,13 +109,19 @@ class ResponseProcessor:
             self.logger.error(f"❌ [ResponseProcessor] LLMレスポンスの解析でエラー: {e}")
             return []
     
-    def convert_to_task_format(self, tasks: List[Dict[str, Any]], user_id: str) -> List[Dict[str, Any]]:
+    def convert_to_task_format(
+        self,
+        tasks: List[Dict[str, Any]],
+        user_id: str,
+        analysis_result: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
         LLMタスクをActionPlannerが期待する形式に変換
         
         Args:
             tasks: LLMから取得したタスクリスト
             user_id: ユーザーID
+            analysis_result: RequestAnalyzer の分析結果（generate_proposals のパラメータの上書きに使用）
         
         Returns:
             変換されたタスクリスト
@@ -103,12 +129,19 @@ class ResponseProcessor:
         try:
             self.logger.debug(f"🔧 [ResponseProcessor] {len(tasks)}件のタスクをActionPlanner形式に変換中")
             
+            request_params = self._request_proposal_params(analysis_result)
             converted_tasks = []
             for task in tasks:
-                # user_idをパラメータに追加
+                # user_idをパラメータに設定（プロンプトの静的部分には実IDを含めないため、LLMの記述ぶれを上書き）
                 parameters = task.get("parameters", {})
-                if "user_id" not in parameters:
-                    parameters["user_id"] = user_id
+                if parameters.get("user_id") not in (None, user_id):
+                    self.logger.debug(f"🔧 [ResponseProcessor] user_idを上書きしました: {parameters.get('user_id')} → {user_id}")
+                parameters["user_id"] = user_id
+                if task.get("service") == "recipe_service" and task.get("method") == "generate_proposals":
+                    for key, value in request_params.items():
+                        if parameters.get(key) != value:
+                            self.logger.debug(f"🔧 [ResponseProcessor] {key}を上書きしました: {parameters.get(key)} → {value}")
+                        parameters[key] = value
                 
                 converted_task = {
                     "service": task.get("service"),
@@ -125,6 +158,18 @@ class ResponseProcessor:
             self.logger.error(f"❌ [ResponseProcessor] タスクの変換でエラー: {e}")
             return []
     
+    @staticmethod
+    def _request_proposal_params(analysis_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """パターンに応じて generate_proposals に設定するリクエスト情報の値"""
+        if not analysis_result:
+            return {}
+        defaults = REQUEST_PROPOSAL_PARAMS.get(analysis_result.get("pattern"), {})
+        params = analysis_result.get("params") or {}
+        return {
+            key: params.get(key) if params.get(key) is not None else default
+            for key, default in defaults.items()
+        }
+    
     async def format_final_response(self, results: Dict[str, Any], sse_session_id: str = None) -> tuple[str, Optional[Dict[str, Any]]]:
         """
         最終回答整形（サービス・メソッドベース）
@@ -8,6 +8,7 @@ LLM呼び出しのコントロール専用サービス
 
 from typing import Dict, Any, List, Optional
 from config.loggers import GenericLogger
+from mcp_servers.token_accounting import set_token_attribution
 from .llm.prompt_manager import PromptManager
 from .llm.response_processor import ResponseProcessor
 from .llm.llm_client import LLMClient
@@ -64,6 +65,9 @@ class LLMService:
             
             self.logger.debug(f"🔍 [LLMService] 分析結果: pattern={analysis_result['pattern']}")
             
+            # 以降のこのリクエストのLLM呼び出しのトークン数をパターン・ユーザー別に集計
+            set_token_attribution(pattern=analysis_result["pattern"], user_id=user_id)
+            
             # 曖昧性がある場合、確認質問を返す
             if analysis_result["ambiguities"]:
                 self.logger.info(f"⚠️ [LLMService] 曖昧性を検出: {len(analysis_result['ambiguities'])}件の曖昧性")
@@ -75,7 +79,7 @@ class LLMService:
             new_prompt_manager = NewPromptManager()
             
             try:
-                prompt = new_prompt_manager.build_prompt(
+                prompt = new_prompt_manager.build_prompt_parts(
                     analysis_result=analysis_result,
                     user_id=user_id,
                     sse_session_id=sse_session_id
@@ -95,7 +99,7 @@ class LLMService:
             tasks = self.response_processor.parse_llm_response(response)
             
             # 4. タスク形式に変換
-            converted_tasks = self.response_processor.convert_to_task_format(tasks, user_id)
+            converted_tasks = self.response_processor.convert_to_task_format(tasks, user_id, analysis_result)
 
             # 5. 重要: パターンに基づきカテゴリ等を強制整合（LLMの記述ぶれ対策）
             try:
@@ -10,9 +10,10 @@ import base64
 import json
 import re
 from typing import Dict, Any, List, Optional
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from config.loggers import GenericLogger
+from mcp_servers.ingredient_normalizer import clean_product_name
+from mcp_servers.llm_gateway import get_llm_gateway
 
 load_dotenv()
 
@@ -23,13 +24,14 @@ class OCRService:
     def __init__(self):
         """初期化"""
         self.logger = GenericLogger("service", "ocr")
-        self.ocr_model = os.getenv("OPENAI_OCR_MODEL", "gpt-4o")
+        gateway = get_llm_gateway()
+        self.ocr_model = gateway.model_for("ocr", os.getenv("OPENAI_OCR_MODEL", "gpt-4o"))
         self.api_key = os.getenv("OPENAI_API_KEY")
         
         if not self.api_key:
             raise ValueError("OPENAI_API_KEYが設定されていません")
         
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        self.client = gateway.client_for("ocr")
         self.logger.info(f"✅ [OCR] OCRService initialized with model: {self.ocr_model}")
     
     async def analyze_receipt_image(
@@ -289,56 +291,7 @@ class OCRService:
         Returns:
             正規化された食材名
         """
-        if not item_name:
-            return item_name
-        
-        normalized = item_name.strip()
-        
-        # サイズ表記を削除（末尾）
-        size_patterns = [
-            r'\s*バラ\s*$',
-            r'\s*大\s*$',
-            r'\s*小\s*$',
-            r'\s*中\s*$',
-            r'\s*特大\s*$',
-            r'\s*特小\s*$',
-        ]
-        for pattern in size_patterns:
-            normalized = re.sub(pattern, '', normalized, flags=re.IGNORECASE)
-        
-        # 状態表記を削除（先頭・末尾）
-        state_patterns = [
-            r'^生\s*',
-            r'^国産\s*',
-            r'\s*国産\s*$',
-            r'^成分無調整\s*',
-            r'\s*成分無調整\s*$',
-        ]
-        for pattern in state_patterns:
-            normalized = re.sub(pattern, '', normalized, flags=re.IGNORECASE)
-        
-        # ブランド名を削除（先頭）
-        brand_patterns = [
-            r'^新ＢＰ\s*',
-            r'^ＢＰ\s*',
-            r'^新\s*',
-        ]
-        for pattern in brand_patterns:
-            normalized = re.sub(pattern, '', normalized, flags=re.IGNORECASE)
-        
-        # 商品説明を削除（中間・末尾）
-        description_patterns = [
-            r'\s*コクのある\s*',
-            r'\s*もっちり\s*',
-            r'\s*仕込み\s*',
-        ]
-        for pattern in description_patterns:
-            normalized = re.sub(pattern, '', normalized, flags=re.IGNORECASE)
-        
-        # 余分な空白を削除
-        normalized = re.sub(r'\s+', ' ', normalized).strip()
-        
-        return normalized
+        return clean_product_name(item_name)
     
     async def apply_item_mappings(
         self,
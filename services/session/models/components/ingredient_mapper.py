@@ -6,8 +6,8 @@ IngredientMapperComponent - 食材マッピングコンポーネント
 """
 
 from typing import Dict, Any, List
-import re
 from config.loggers import GenericLogger
+from mcp_servers.ingredient_normalizer import normalize_ingredient_key
 
 
 class IngredientMapperComponent:
@@ -30,24 +30,8 @@ class IngredientMapperComponent:
         Returns:
             str: 正規化された食材名
         """
-        # 全角・半角英数字を半角に統一
-        normalized = name.translate(str.maketrans('０１２３４５６７８９ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ', '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'))
-        # 全角カタカナをひらがなに変換（Unicode範囲を使用）
-        def katakana_to_hiragana(text):
-            result = []
-            for char in text:
-                if '\u30A1' <= char <= '\u30F6':  # カタカナ範囲
-                    hiragana = chr(ord(char) - 0x60)
-                    result.append(hiragana)
-                else:
-                    result.append(char)
-            return ''.join(result)
-        normalized = katakana_to_hiragana(normalized)
-        # 空白と記号を除去
-        normalized = re.sub(r'[\s　\-－\(\)（）・，、。．]+', '', normalized)
-        # 小文字に統一
-        normalized = normalized.lower()
-        return normalized
+        # RAG・OCR・APIルートと共通の正規化（NFKC・かな統一・記号除去・別名統一）
+        return normalize_ingredient_key(name)
     
     def map_recipe_ingredients_to_inventory(self, recipe_ingredients: List[str], inventory_items: List[str]) -> List[str]:
         """レシピの材料名を在庫名にマッピング
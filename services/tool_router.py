@@ -6,11 +6,59 @@ ToolRouter - MCPツールの自動ルーティング
 既存のmcp_servers/client.pyを内部で使用し、ツール名からMCPサーバーへの自動ルーティングを提供
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 from mcp_servers.client import MCPClient
+from mcp_servers.single_flight import SingleFlight, build_flight_key
 from config.loggers import GenericLogger
 
 
+# 同時実行中の同一呼び出しを集約するツール（読み取り・生成のみ。登録・更新・削除は対象外）
+SINGLE_FLIGHT_TOOLS = frozenset({
+    "inventory_list",
+    "inventory_list_by_name",
+    "inventory_get",
+    "generate_menu_plan_with_history",
+    "generate_menu_with_llm_constraints",
+    "get_recipe_history_for_user",
+    "search_menu_from_rag_with_history",
+    "search_recipe_from_web",
+    "generate_proposals",
+    "history_list",
+    "history_get_recent_titles",
+})
+
+# single-flightのキーでは値の代わりに軽量な指紋を使うパラメータ
+# （在庫・除外リストなど大きくなりうるもの。rag_results はタイトル→URL情報のため、キー（タイトル）のみで識別）
+SINGLE_FLIGHT_FINGERPRINT_PARAMS = frozenset({
+    "inventory_items",
+    "used_ingredients",
+    "excluded_recipes",
+    "rag_results",
+})
+
+# ToolRouterはリクエストごとに作成されるため、集約はプロセスで共有する
+# （呼び出し元が結果の辞書を書き換えるため、相乗りした呼び出しにはコピーを返す）
+_tool_single_flight = SingleFlight("tool_router", copy_results=True)
+
+
+def _fingerprint(value: Any) -> Any:
+    """大きなリスト・辞書の軽量な指紋（件数と、文字列のキャッシュ済みハッシュによるタプルのハッシュ）"""
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return ["list", len(value), hash(tuple(value))]
+    if isinstance(value, dict):
+        return ["dict", len(value), hash(tuple(sorted(str(key) for key in value)))]
+    return value
+
+
+def build_tool_flight_key(tool_name: str, parameters: Dict[str, Any], scope: str) -> str:
+    """ツール呼び出しのsingle-flightキー（大きなパラメータは指紋に置き換える）"""
+    identity = {
+        key: _fingerprint(value) if key in SINGLE_FLIGHT_FINGERPRINT_PARAMS else value
+        for key, value in parameters.items()
+    }
+    return build_flight_key(tool_name, identity, scope)
+
+
 class ToolNotFoundError(Exception):
     """ツールが見つからない場合の例外"""
     pass
@@ -65,7 +113,8 @@ class ToolRouter:
         self, 
         tool_name: str, 
         parameters: Dict[str, Any],
-        token: str
+        token: str,
+        progress_handler: Optional[Callable[[float, Optional[float], Optional[str]], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         ツールを適切なMCPサーバーにルーティング
@@ -74,6 +123,7 @@ class ToolRouter:
             tool_name: 呼び出すツール名
             parameters: ツールに渡すパラメータ
             token: 認証トークン
+            progress_handler: ツールの進捗通知を受け取る関数（提案候補の逐次配信など）
         
         Returns:
             ツール実行結果
@@ -93,8 +143,17 @@ class ToolRouter:
             # 3. パラメータマッピング処理
             mapped_parameters = self._map_parameters(tool_name, parameters)
             
-            # 4. 既存のMCPクライアントに処理を委譲
-            result = await self.mcp_client.call_tool(tool_name, mapped_parameters, token)
+            # 4. 既存のMCPクライアントに処理を委譲（同じユーザーの同一呼び出しが実行中なら結果を共有し、
+            #    進捗通知は相乗りした全ての呼び出し元へ配信）
+            if tool_name in SINGLE_FLIGHT_TOOLS:
+                flight_key = build_tool_flight_key(tool_name, mapped_parameters, token or "")
+                result = await _tool_single_flight.do_with_progress(
+                    flight_key,
+                    lambda publish: self.mcp_client.call_tool(tool_name, mapped_parameters, token, progress_handler=publish),
+                    progress_handler=progress_handler
+                )
+            else:
+                result = await self.mcp_client.call_tool(tool_name, mapped_parameters, token, progress_handler=progress_handler)
             
             # 4. 結果の検証とログ
             if result.get("success"):
@@ -117,7 +176,8 @@ class ToolRouter:
         service: str, 
         method: str, 
         parameters: Dict[str, Any], 
-        token: str
+        token: str,
+        progress_handler: Optional[Callable[[float, Optional[float], Optional[str]], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         サービス名・メソッド名からMCPツールをルーティング
@@ -127,6 +187,7 @@ class ToolRouter:
             method: メソッド名（例: "get_inventory"）
             parameters: ツールに渡すパラメータ
             token: 認証トークン
+            progress_handler: ツールの進捗通知を受け取る関数
         
         Returns:
             ツール実行結果
@@ -179,7 +240,7 @@ class ToolRouter:
             self.logger.debug(f"🔧 [ToolRouter] サービスメソッドをルーティング中: {service}.{method} → {tool_name}")
             
             # 5. 既存のroute_toolメソッドを使用してMCPツールを実行
-            result = await self.route_tool(tool_name, parameters, token)
+            result = await self.route_tool(tool_name, parameters, token, progress_handler=progress_handler)
             
             # 6. 結果にサービス情報を追加
             if isinstance(result, dict):
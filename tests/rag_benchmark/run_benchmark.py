@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+RAG検索ベンチマーク（固定コーパス・正解クエリセット・オフライン埋め込み）
+
+固定のコーパススナップショット（corpus_snapshot.jsonl）からカテゴリ別のChromaを
+メモリ上に構築し、正解クエリセット（golden_queries.json）で
+RecipeRAGClient.search_candidates / search_recipes_by_category を実行して、
+以下を報告する。
+
+    - ステージ別レイテンシ p50 / p95（埋め込み・ベクトル検索・語彙検索・スコア計算・整形・合計）
+    - recall@k / nDCG@k（正解タイトルに対する二値関連度）
+
+ステージ時間は並列実行中のコルーチンの合計のため、search_recipes_by_category では
+合計（total）を上回ることがある。埋め込みには EmbeddingBatcher の集約待ち時間も含まれる。
+
+埋め込みはコーパスで学習した文字n-gram埋め込み（CharNgramEmbeddings）をスタブとして使うため、
+OpenAI APIキーやネットワークなしで実行できる。
+
+実行:
+    python tests/rag_benchmark/run_benchmark.py [--k 5] [--iterations 5] [--distractors 0]
+    python tests/rag_benchmark/run_benchmark.py --min-recall 0.8   # recallが下回ったら終了コード1
+
+--distractors を指定すると、コーパスの食材から生成したダミーレシピを各カテゴリに追加する
+（実データに近い件数でのレイテンシ計測用。ダミーは正解に含まれない）。
+pytest は使用しない。
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# 埋め込みはスタブを使うため、クライアント初期化用のダミーキーのみ設定する
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+from langchain_community.vectorstores import Chroma
+from mcp_servers.recipe_rag.client import RecipeRAGClient
+from mcp_servers.recipe_rag.embedding_batcher import EmbeddingBatcher
+from mcp_servers.recipe_rag.lexical_embeddings import CharNgramEmbeddings, OPENAI_BACKEND
+
+BENCHMARK_DIR = Path(__file__).parent
+CORPUS_PATH = BENCHMARK_DIR / "corpus_snapshot.jsonl"
+GOLDEN_PATH = BENCHMARK_DIR / "golden_queries.json"
+CATEGORIES = ("main", "sub", "soup", "other")
+STAGES = ("embed", "vector_search", "lexical_search", "scoring", "formatting", "total")
+MENU_TYPE = "和食"
+
+
+def load_corpus(distractors: int, seed: int) -> Dict[str, List[Dict[str, Any]]]:
+    """コーパススナップショットを読み込み、指定件数のダミーレシピを各カテゴリに追加"""
+    corpus: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                corpus[record["category"]].append(record)
+
+    rng = random.Random(seed)
+    vocabulary = sorted({word for records in corpus.values() for record in records for word in record["content"].split()})
+    for category in CATEGORIES:
+        details = sorted({record["metadata"]["category_detail"] for record in corpus[category]})
+        for i in range(distractors):
+            corpus[category].append({
+                "category": category,
+                "content": " ".join(rng.sample(vocabulary, rng.randint(2, 6))),
+                "metadata": {
+                    "title": f"ダミー{category}{i:05d}",
+                    "recipe_category": category,
+                    "category_detail": rng.choice(details),
+                    "main_ingredients": "",
+                    "url": "",
+                    "original_index": 100000 + i,
+                },
+            })
+    return corpus
+
+
+class StageProfiler:
+    """検索処理の各ステージをラップして所要時間（ms）を積算"""
+
+    def __init__(self):
+        self.current: Dict[str, float] = defaultdict(float)
+
+    def reset(self) -> None:
+        self.current = defaultdict(float)
+
+    def wrap(self, stage: str, func):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.current[stage] += (time.perf_counter() - start) * 1000
+        return wrapper
+
+    def wrap_async(self, stage: str, func):
+        profiler = self
+
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiler.current[stage] += (time.perf_counter() - start) * 1000
+        return wrapper
+
+
+def build_client(corpus: Dict[str, List[Dict[str, Any]]], profiler: StageProfiler) -> RecipeRAGClient:
+    """スナップショットのChromaとスタブ埋め込みを使うクライアントを構築し、計測用にラップ"""
+    documents = [record["content"] for records in corpus.values() for record in records]
+    embeddings = CharNgramEmbeddings().fit(documents)
+
+    client = RecipeRAGClient()
+    client.embeddings = embeddings
+    client.embedding_batcher = EmbeddingBatcher(embeddings)
+    client._vectorstores = {
+        category: Chroma.from_texts(
+            [record["content"] for record in corpus[category]],
+            embeddings,
+            metadatas=[record["metadata"] for record in corpus[category]],
+            collection_name=f"rag_benchmark_{category}"
+        )
+        for category in CATEGORIES
+    }
+    client._embedding_backends = {category: OPENAI_BACKEND for category in CATEGORIES}
+    engines = client._get_search_engines()
+
+    client.embedding_batcher.embed_query = profiler.wrap_async("embed", client.embedding_batcher.embed_query)
+    client._attach_ingredients = profiler.wrap("formatting", client._attach_ingredients)
+    for engine in engines.values():
+        engine.vectorstore.similarity_search_by_vector = profiler.wrap(
+            "vector_search", engine.vectorstore.similarity_search_by_vector
+        )
+        engine._token_index.lexical_search = profiler.wrap("lexical_search", engine._token_index.lexical_search)
+        engine._score_candidates = profiler.wrap("scoring", engine._score_candidates)
+    return client
+
+
+def recall_at_k(titles: List[str], expected: List[str], k: int) -> float:
+    return len(set(titles[:k]) & set(expected)) / len(expected) if expected else 0.0
+
+
+def ndcg_at_k(titles: List[str], expected: List[str], k: int) -> float:
+    relevant = set(expected)
+    dcg = sum(1.0 / math.log2(rank + 2) for rank, title in enumerate(titles[:k]) if title in relevant)
+    ideal = sum(1.0 / math.log2(rank + 2) for rank in range(min(len(relevant), k)))
+    return dcg / ideal if ideal > 0 else 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def run_search_candidates(client, profiler, golden, k, iterations):
+    """search_candidates のステージ別レイテンシと品質を計測"""
+    timings: Dict[str, List[float]] = defaultdict(list)
+    quality = []
+    for query in golden:
+        for iteration in range(iterations):
+            # 候補キャッシュを使わない（毎回検索を実行）
+            client._candidate_cache.clear()
+            profiler.reset()
+            start = time.perf_counter()
+            results = await client.search_candidates(
+                ingredients=query["inventory"],
+                menu_type=MENU_TYPE,
+                category=query["category"],
+                main_ingredient=query.get("main_ingredient"),
+                limit=k,
+                category_detail_keyword=query.get("category_detail_keyword")
+            )
+            profiler.current["total"] = (time.perf_counter() - start) * 1000
+            for stage in STAGES:
+                timings[stage].append(profiler.current.get(stage, 0.0))
+            if iteration == 0:
+                titles = [result["title"] for result in results]
+                quality.append({
+                    "id": query["id"],
+                    "recall": recall_at_k(titles, query["expected_titles"], k),
+                    "ndcg": ndcg_at_k(titles, query["expected_titles"], k),
+                    "titles": titles,
+                })
+    return timings, quality
+
+
+async def run_search_by_category(client, profiler, golden, k, iterations):
+    """search_recipes_by_category（主菜・副菜・汁物の並列検索）のステージ別レイテンシを計測"""
+    timings: Dict[str, List[float]] = defaultdict(list)
+    for query in golden:
+        for _ in range(iterations):
+            profiler.reset()
+            start = time.perf_counter()
+            await client.search_recipes_by_category(query["inventory"], MENU_TYPE, None, k)
+            profiler.current["total"] = (time.perf_counter() - start) * 1000
+            for stage in STAGES:
+                timings[stage].append(profiler.current.get(stage, 0.0))
+    return timings
+
+
+def print_timings(name: str, timings: Dict[str, List[float]]) -> None:
+    print(f"\n[{name}] ステージ別レイテンシ（ms）")
+    print(f"  {'ステージ':<16}{'p50':>10}{'p95':>10}")
+    for stage in STAGES:
+        values = timings.get(stage, [])
+        print(f"  {stage:<16}{percentile(values, 50):>10.2f}{percentile(values, 95):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG検索ベンチマーク")
+    parser.add_argument("--k", type=int, default=5, help="recall@k / nDCG@k のk（検索件数）")
+    parser.add_argument("--iterations", type=int, default=5, help="クエリごとの繰り返し回数")
+    parser.add_argument("--distractors", type=int, default=0, help="各カテゴリに追加するダミーレシピ数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-recall", type=float, default=None, help="平均recall@kの下限（下回ると終了コード1）")
+    parser.add_argument("--json", help="結果をJSONで書き出すパス")
+    args = parser.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = json.load(f)
+    corpus = load_corpus(args.distractors, args.seed)
+    profiler = StageProfiler()
+    client = build_client(corpus, profiler)
+
+    print(f"コーパス: {', '.join(f'{c}={len(corpus[c])}' for c in CATEGORIES)} / クエリ: {len(golden)} / k: {args.k}")
+
+    candidate_timings, quality = asyncio.run(
+        run_search_candidates(client, profiler, golden, args.k, args.iterations)
+    )
+    category_timings = asyncio.run(run_search_by_category(client, profiler, golden, args.k, args.iterations))
+
+    print_timings("search_candidates", candidate_timings)
+    print_timings("search_recipes_by_category", category_timings)
+
+    print(f"\n[品質] recall@{args.k} / nDCG@{args.k}")
+    for item in quality:
+        print(f"  {item['id']:<24}{item['recall']:>8.2f}{item['ndcg']:>8.2f}  {', '.join(item['titles'][:args.k])}")
+    mean_recall = statistics.mean(item["recall"] for item in quality)
+    mean_ndcg = statistics.mean(item["ndcg"] for item in quality)
+    print(f"  {'平均':<24}{mean_recall:>8.3f}{mean_ndcg:>8.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "k": args.k,
+                "distractors": args.distractors,
+                "recall": mean_recall,
+                "ndcg": mean_ndcg,
+                "queries": quality,
+                "latency_ms": {
+                    name: {stage: {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+                           for stage, values in timings.items()}
+                    for name, timings in (("search_candidates", candidate_timings),
+                                          ("search_recipes_by_category", category_timings))
+                },
+            }, f, ensure_ascii=False, indent=2)
+
+    if args.min_recall is not None and mean_recall < args.min_recall:
+        print(f"\n❌ 平均recall@{args.k} {mean_recall:.3f} が下限 {args.min_recall} を下回りました")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+RAG候補キャッシュ（CandidateCache）の単体テスト
+
+実行: python tests/test_candidate_cache.py
+pytest は使用しない。
+"""
+
+import sys
+import os
+import time
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _candidates(*titles):
+    return [{"title": title, "match_score": 1.0 - i * 0.1} for i, title in enumerate(titles)]
+
+
+def test_cache_key_follows_query_plan():
+    """キーは実行するクエリ計画で決まる（計画が同じなら同じキー、計画が違えば別キー）"""
+    from mcp_servers.recipe_rag.cache import build_candidate_cache_key
+    from mcp_servers.recipe_rag.query_planner import plan_query
+
+    def key(category, ingredients, main_ingredient=None, max_items=12):
+        plan = plan_query(ingredients, main_ingredient, max_items=max_items)
+        return build_candidate_cache_key(category, plan, "和食", main_ingredient)
+
+    # 重複や主要食材の位置の違いは計画が同じになるため同じキー
+    base = key("main", ["玉ねぎ", "鶏もも肉"], "鶏もも肉")
+    assert base == key("main", ["鶏もも肉", "玉ねぎ", "玉ねぎ"], "鶏もも肉")
+    assert base != key("sub", ["玉ねぎ", "鶏もも肉"], "鶏もも肉")
+    assert base != key("main", ["玉ねぎ", "鶏もも肉"])
+
+    # 表記揺れはベクトル検索のクエリ文字列が異なるため別キー
+    assert base != key("main", ["たまねぎ", "鶏もも肉"], "鶏もも肉")
+
+    # 上限を超える在庫は並び順で検索に使う食材が変わるため別キー
+    ingredients = [f"食材{i}" for i in range(14)]
+    assert key("main", ingredients) != key("main", list(reversed(ingredients)))
+    assert key("main", ingredients) == key("main", list(ingredients))
+
+
+def test_excluded_titles_filtered_on_get():
+    """除外レシピは取得時に取り除く（除外後に件数不足なら全件取得済みの場合のみ返す）"""
+    from mcp_servers.recipe_rag.cache import CandidateCache
+
+    cache = CandidateCache(ttl_seconds=60, max_entries=8)
+    cache.put("partial", _candidates("A", "B", "C"), is_complete=False)
+    assert [c["title"] for c in cache.get("partial", set(), 2)] == ["A", "B"]
+    assert [c["title"] for c in cache.get("partial", {"a"}, 2)] == ["B", "C"]
+    # 下位にまだ候補があるかもしれないため再検索させる
+    assert cache.get("partial", {"a", "b"}, 2) is None
+
+    cache.put("complete", _candidates("A", "B", "C"), is_complete=True)
+    assert [c["title"] for c in cache.get("complete", {"a", "b"}, 2)] == ["C"]
+    assert cache.hits == 3 and cache.misses == 1
+
+
+def test_ttl_and_lru():
+    """期限切れのエントリは返さず削除、件数上限を超えると最も使われていないエントリを削除"""
+    from mcp_servers.recipe_rag.cache import CandidateCache
+
+    cache = CandidateCache(ttl_seconds=0.05, max_entries=8)
+    cache.put("k", _candidates("A"), is_complete=True)
+    assert "k" in cache
+    time.sleep(0.06)
+    assert "k" not in cache
+    assert cache.get("k", set(), 1) is None
+    assert len(cache) == 0
+
+    cache = CandidateCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", _candidates("A"), is_complete=True)
+    cache.put("b", _candidates("B"), is_complete=True)
+    assert cache.get("a", set(), 1) is not None
+    cache.put("c", _candidates("C"), is_complete=True)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+
+    disabled = CandidateCache(ttl_seconds=60, max_entries=0)
+    disabled.put("a", _candidates("A"), is_complete=True)
+    assert disabled.get("a", set(), 1) is None
+
+
+def test_copy_semantics():
+    """登録・取得した候補を変更してもキャッシュの内容は変わらない"""
+    from mcp_servers.recipe_rag.cache import CandidateCache
+
+    cache = CandidateCache(ttl_seconds=60, max_entries=8)
+    candidates = _candidates("A", "B")
+    cache.put("k", candidates, is_complete=True)
+    candidates[0]["title"] = "変更"
+    candidates.append({"title": "追加"})
+
+    results = cache.get("k", set(), 5)
+    assert [c["title"] for c in results] == ["A", "B"]
+    results[0]["match_score"] = 0.0
+    results[0]["url"] = "https://example.com"
+    again = cache.get("k", set(), 5)
+    assert again[0]["match_score"] == 1.0
+    assert "url" not in again[0]
+
+
+def run_all():
+    print("--- build_candidate_cache_key ---")
+    test_cache_key_follows_query_plan()
+    print("  test_cache_key_follows_query_plan OK")
+
+    print("--- CandidateCache ---")
+    test_excluded_titles_filtered_on_get()
+    print("  test_excluded_titles_filtered_on_get OK")
+    test_ttl_and_lru()
+    print("  test_ttl_and_lru OK")
+    test_copy_semantics()
+    print("  test_copy_semantics OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+提案候補の逐次配信（IncrementalCandidateParser・進捗通知メッセージ）の単体テスト
+
+実行: python tests/test_candidate_stream.py
+pytest は使用しない。
+"""
+
+import json
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CANDIDATES = [
+    {"title": "鶏もも肉の照り焼き", "ingredients": ["鶏もも肉", "醤油"]},
+    {"title": "豆腐ハンバーグ", "ingredients": ["豆腐", "合いびき肉"]},
+]
+
+
+def _feed_all(parser, deltas):
+    """断片を順に渡し、断片ごとに完成した候補のリストを返す"""
+    return [parser.feed(delta) for delta in deltas]
+
+
+def test_one_char_deltas():
+    """1文字ずつの断片でも、要素が閉じた断片で1件ずつ返す"""
+    from mcp_servers.candidate_stream import IncrementalCandidateParser
+
+    text = json.dumps({"candidates": CANDIDATES}, ensure_ascii=False)
+    parser = IncrementalCandidateParser()
+    emitted = _feed_all(parser, list(text))
+    assert [c for batch in emitted for c in batch] == CANDIDATES
+    # 各候補は閉じ括弧の断片で返す
+    first_close = text.index("}") + 1
+    assert emitted[first_close - 1] == [CANDIDATES[0]]
+    assert all(batch == [] for batch in emitted[:first_close - 1])
+
+
+def test_split_inside_strings_and_escapes():
+    """文字列・エスケープの途中で分割されても、文字列内の記号で要素を区切らない"""
+    from mcp_servers.candidate_stream import IncrementalCandidateParser
+
+    candidate = {"title": 'ささみの"梅"和え\\ポン酢 }]', "ingredients": ["ささみ"]}
+    text = json.dumps({"candidates": [candidate]}, ensure_ascii=False)
+    # エスケープの「\」の直後で分割
+    split = text.index('\\"') + 1
+    parser = IncrementalCandidateParser()
+    assert parser.feed(text[:split]) == []
+    assert parser.feed(text[split:]) == [candidate]
+
+    # 全ての位置で2分割しても同じ結果
+    for split in range(1, len(text)):
+        parser = IncrementalCandidateParser()
+        emitted = parser.feed(text[:split]) + parser.feed(text[split:])
+        assert emitted == [candidate], split
+
+
+def test_braces_inside_titles():
+    """タイトル内の { } [ ] は要素の区切りとして扱わない"""
+    from mcp_servers.candidate_stream import IncrementalCandidateParser
+
+    candidates = [
+        {"title": "{特製}オムライス", "ingredients": ["卵"]},
+        {"title": "[時短] 鮭のホイル焼き}", "ingredients": ["鮭", "{きのこ}"]},
+    ]
+    text = json.dumps({"candidates": candidates}, ensure_ascii=False)
+    parser = IncrementalCandidateParser()
+    emitted = _feed_all(parser, [text[i:i + 7] for i in range(0, len(text), 7)])
+    assert [c for batch in emitted for c in batch] == candidates
+
+
+def test_marker_missing_or_late():
+    """配列キーが届くまでは何も返さず、キー・"[" が後から届いた時点で走査を始める"""
+    from mcp_servers.candidate_stream import IncrementalCandidateParser
+
+    # 配列キーより前の要素（別キーのオブジェクト）は候補として扱わない
+    parser = IncrementalCandidateParser()
+    assert parser.feed('{"meta": {"title": "対象外"}, "candi') == []
+    assert parser.feed('dates"') == []
+    assert parser.feed(' : ') == []
+    assert parser.feed('[{"title": "肉じゃが"}') == [{"title": "肉じゃが"}]
+
+    # 配列キーがない出力からは候補を返さない
+    parser = IncrementalCandidateParser()
+    assert parser.feed('{"recipes": [{"title": "肉じゃが"}]}') == []
+
+    # 配列キーを指定できる
+    parser = IncrementalCandidateParser(array_key="recipes")
+    assert parser.feed('{"recipes": [{"title": "肉じゃが"}]}') == [{"title": "肉じゃが"}]
+
+
+def test_malformed_element_is_skipped():
+    """解析できない要素は飛ばし、後続の要素は返す"""
+    from mcp_servers.candidate_stream import IncrementalCandidateParser
+
+    parser = IncrementalCandidateParser()
+    emitted = parser.feed('{"candidates": [{"title": "壊れた" "候補"}, {"title": "肉じゃが"}')
+    assert emitted == [{"title": "肉じゃが"}]
+
+
+def test_stops_after_array_closes():
+    """配列が閉じた後の出力は無視する"""
+    from mcp_servers.candidate_stream import IncrementalCandidateParser
+
+    parser = IncrementalCandidateParser()
+    assert parser.feed('{"candidates": [{"title": "肉じゃが"}], ') == [{"title": "肉じゃが"}]
+    assert parser.feed('"extra": {"title": "対象外"}}') == []
+    assert parser.feed("") == []
+
+
+def test_event_round_trip():
+    """候補イベントのエンコードとデコード（候補以外のメッセージは None）"""
+    from mcp_servers.candidate_stream import decode_candidate_event, encode_candidate_event
+
+    message = encode_candidate_event(CANDIDATES[0])
+    assert "鶏もも肉" in message
+    assert decode_candidate_event(message) == CANDIDATES[0]
+    assert decode_candidate_event("進捗 50%") is None
+    assert decode_candidate_event(json.dumps({"event": "progress", "candidate": {}})) is None
+    assert decode_candidate_event(json.dumps({"event": "candidate", "candidate": "文字列"})) is None
+    assert decode_candidate_event(None) is None
+
+
+def run_all():
+    print("--- IncrementalCandidateParser ---")
+    test_one_char_deltas()
+    print("  test_one_char_deltas OK")
+    test_split_inside_strings_and_escapes()
+    print("  test_split_inside_strings_and_escapes OK")
+    test_braces_inside_titles()
+    print("  test_braces_inside_titles OK")
+    test_marker_missing_or_late()
+    print("  test_marker_missing_or_late OK")
+    test_malformed_element_is_skipped()
+    print("  test_malformed_element_is_skipped OK")
+    test_stops_after_array_closes()
+    print("  test_stops_after_array_closes OK")
+
+    print("--- encode/decode_candidate_event ---")
+    test_event_round_trip()
+    print("  test_event_round_trip OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+埋め込みリクエストのマイクロバッチ（EmbeddingBatcher）の単体テスト
+
+実行: python tests/test_embedding_batcher.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class FakeEmbeddings:
+    """呼び出しごとの入力を記録する埋め込み（文字列長をベクトルにする）"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    async def aembed_documents(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+
+
+async def _batches_and_dedups():
+    from mcp_servers.recipe_rag.embedding_batcher import EmbeddingBatcher
+
+    embeddings = FakeEmbeddings()
+    batcher = EmbeddingBatcher(embeddings, window_ms=10, max_batch_size=64)
+    queries = ["鶏もも肉", "キャベツ 和食", "鶏もも肉", "豆腐"]
+    vectors = await asyncio.gather(*(batcher.embed_query(query) for query in queries))
+
+    # 時間窓内のクエリは1回の呼び出しにまとめ、同じ文字列は1回だけ埋め込む
+    assert embeddings.calls == [["鶏もも肉", "キャベツ 和食", "豆腐"]], embeddings.calls
+    assert vectors[0] == vectors[2] == [4.0, 0.0]
+    assert vectors[1] == [7.0, 1.0]
+    assert vectors[3] == [2.0, 2.0]
+    assert batcher.batch_count == 1 and batcher.text_count == 4
+
+
+def test_batches_and_dedups():
+    """同時のクエリを1回の埋め込み呼び出しにまとめ、各呼び出し元に対応する結果を返す"""
+    run_async(_batches_and_dedups())
+
+
+async def _flushes_at_max_batch_size():
+    from mcp_servers.recipe_rag.embedding_batcher import EmbeddingBatcher
+
+    embeddings = FakeEmbeddings()
+    # 時間窓が長くても最大件数に達した時点で送信する
+    batcher = EmbeddingBatcher(embeddings, window_ms=10_000, max_batch_size=2)
+    vectors = await asyncio.wait_for(
+        asyncio.gather(*(batcher.embed_query(f"q{i}") for i in range(4))), timeout=1.0
+    )
+    assert embeddings.calls == [["q0", "q1"], ["q2", "q3"]], embeddings.calls
+    assert len(vectors) == 4
+
+
+def test_flushes_at_max_batch_size():
+    """最大件数に達したら時間窓を待たずに送信"""
+    run_async(_flushes_at_max_batch_size())
+
+
+async def _error_fans_out():
+    from mcp_servers.recipe_rag.embedding_batcher import EmbeddingBatcher
+
+    embeddings = FakeEmbeddings(error=RuntimeError("rate limited"))
+    batcher = EmbeddingBatcher(embeddings, window_ms=5, max_batch_size=64)
+    results = await asyncio.gather(
+        *(batcher.embed_query(query) for query in ("a", "b", "a")), return_exceptions=True
+    )
+    assert len(embeddings.calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results), results
+
+    # 失敗後も次のバッチは通常どおり送信する
+    embeddings.error = None
+    assert await batcher.embed_query("c") == [1.0, 0.0]
+
+
+def test_error_fans_out():
+    """埋め込みの失敗はバッチ内の全ての呼び出し元に伝える"""
+    run_async(_error_fans_out())
+
+
+async def _cancelled_waiter_does_not_break_batch():
+    from mcp_servers.recipe_rag.embedding_batcher import EmbeddingBatcher
+
+    embeddings = FakeEmbeddings()
+    batcher = EmbeddingBatcher(embeddings, window_ms=10, max_batch_size=64)
+    cancelled = asyncio.ensure_future(batcher.embed_query("a"))
+    kept = asyncio.ensure_future(batcher.embed_query("b"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await kept == [1.0, 1.0]
+    assert cancelled.cancelled()
+
+
+def test_cancelled_waiter_does_not_break_batch():
+    """待機中の呼び出し元がキャンセルされても同じバッチの他の呼び出し元には結果を返す"""
+    run_async(_cancelled_waiter_does_not_break_batch())
+
+
+def run_all():
+    print("--- EmbeddingBatcher ---")
+    test_batches_and_dedups()
+    print("  test_batches_and_dedups OK")
+    test_flushes_at_max_batch_size()
+    print("  test_flushes_at_max_batch_size OK")
+    test_error_fans_out()
+    print("  test_error_fans_out OK")
+    test_cancelled_waiter_does_not_break_batch()
+    print("  test_cancelled_waiter_does_not_break_batch OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+食材の語彙検索（BM25）とベクトル検索のRRF融合（ハイブリッド検索）の単体テスト
+
+実行: python tests/test_hybrid_search.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+RECIPES = [
+    ("鶏の照り焼き", "鶏もも肉 醤油 みりん 砂糖", "和食"),
+    ("豚の生姜焼き", "豚バラ肉 生姜 醤油 玉ねぎ", "和食"),
+    ("チキンソテー", "鶏もも肉 塩 こしょう にんにく", "洋食"),
+    ("野菜炒め", "キャベツ にんじん もやし ピーマン", "中華"),
+    ("肉じゃが", "牛肉 じゃがいも 玉ねぎ にんじん", "和食"),
+]
+
+
+def _data():
+    return {
+        "documents": [f"{ingredients} | {title}" for title, ingredients, _ in RECIPES],
+        "metadatas": [{"title": title, "category_detail": detail} for title, _, detail in RECIPES],
+    }
+
+
+def _document(title):
+    return Document(page_content=title, metadata={"title": title})
+
+
+def test_reciprocal_rank_fusion():
+    """複数のリストに現れる候補を上位に、同点は最初に現れた順、タイトルで重複除去"""
+    from mcp_servers.recipe_rag.search import RecipeSearchEngine
+
+    engine = RecipeSearchEngine(vectorstore=None)
+    lexical = [_document("A"), _document("B"), _document("C")]
+    vector = [_document("D"), _document("B"), _document("E")]
+    fused = engine._reciprocal_rank_fusion([lexical, vector], max_results=10)
+    titles = [document.metadata["title"] for document in fused]
+    assert titles == ["B", "A", "D", "C", "E"], titles
+
+    assert len(engine._reciprocal_rank_fusion([lexical, vector], max_results=2)) == 2
+    assert engine._reciprocal_rank_fusion([[], []], max_results=5) == []
+
+
+def test_lexical_search_bm25():
+    """語彙検索: 重みの大きい食材を含むレシピが上位、部分一致も展開、フィルタを適用"""
+    from mcp_servers.recipe_rag.ingredient_index import IngredientTokenIndex
+
+    index = IngredientTokenIndex()
+    assert index.load_from_data(_data()) == len(RECIPES)
+
+    def titles(documents):
+        return [document.metadata["title"] for document in documents]
+
+    # 主要食材（鶏もも肉）の重みが大きいため、玉ねぎのみのレシピより上位
+    ranked = titles(index.lexical_search({"鶏もも肉": 5.0, "玉ねぎ": 1.0}, k=10))
+    assert set(ranked[:2]) == {"鶏の照り焼き", "チキンソテー"}, ranked
+    assert set(ranked[2:]) == {"豚の生姜焼き", "肉じゃが"}, ranked
+
+    # 「豚」は「豚バラ肉」に部分一致、表記揺れ（たまねぎ）は正規化で一致
+    assert titles(index.lexical_search({"豚": 1.0}, k=10)) == ["豚の生姜焼き"]
+    assert set(titles(index.lexical_search({"たまねぎ": 1.0}, k=10))) == {"豚の生姜焼き", "肉じゃが"}
+
+    # 除外タイトル・category_detail のフィルタ
+    assert titles(index.lexical_search({"鶏もも肉": 1.0}, k=10, excluded_titles={"チキンソテー"})) == ["鶏の照り焼き"]
+    assert titles(index.lexical_search({"鶏もも肉": 1.0}, k=10, category_detail_keyword="洋")) == ["チキンソテー"]
+    assert index.lexical_search({"鶏もも肉": 1.0}, k=0) == []
+
+
+class FakeVectorStore:
+    """ベクトル検索は食材と関係のないレシピのみ返す"""
+
+    def __init__(self):
+        self.filters = []
+
+    def get(self, include=None):
+        return _data()
+
+    async def asimilarity_search(self, query, k, filter=None):
+        self.filters.append(filter)
+        return [Document(page_content="キャベツ にんじん もやし ピーマン | 野菜炒め", metadata={"title": "野菜炒め"})]
+
+
+async def _hybrid_search_finds_lexical_matches():
+    from mcp_servers.recipe_rag.search import RecipeSearchEngine
+
+    with patch.dict(os.environ, {"RAG_VECTOR_INDEX_DTYPE": ""}):
+        vectorstore = FakeVectorStore()
+        engine = RecipeSearchEngine(vectorstore)
+    engine.load_index()
+
+    results = await engine.search_recipes_by_partial_match(
+        ["鶏もも肉", "玉ねぎ"], "", excluded_recipes=["主菜: 鶏の照り焼き"], limit=3, main_ingredient="鶏もも肉"
+    )
+    titles = [result["title"] for result in results]
+    # ベクトル検索に現れなくても語彙検索で主要食材のレシピを取得し、除外レシピは返さない
+    assert titles[0] == "チキンソテー", titles
+    assert "鶏の照り焼き" not in titles
+    # 除外タイトルはベクトル検索にもメタデータフィルタとして渡す
+    assert vectorstore.filters[0] == {"title": {"$nin": ["鶏の照り焼き"]}}
+
+
+def test_hybrid_search_finds_lexical_matches():
+    """部分マッチ検索: 語彙検索とベクトル検索を融合して候補を取得"""
+    run_async(_hybrid_search_finds_lexical_matches())
+
+
+def run_all():
+    print("--- RecipeSearchEngine._reciprocal_rank_fusion ---")
+    test_reciprocal_rank_fusion()
+    print("  test_reciprocal_rank_fusion OK")
+
+    print("--- IngredientTokenIndex.lexical_search ---")
+    test_lexical_search_bm25()
+    print("  test_lexical_search_bm25 OK")
+
+    print("--- RecipeSearchEngine.search_recipes_by_partial_match ---")
+    test_hybrid_search_finds_lexical_matches()
+    print("  test_hybrid_search_finds_lexical_matches OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+食材トークンインデックス（IngredientTokenIndex / InventoryMatcher）の単体テスト
+
+従来の _calculate_match_score（scripts/benchmark_match_score.py に比較用に残した実装）と
+同じスコア・マッチした食材を返すことを確認する。
+
+実行: python tests/test_ingredient_index.py
+pytest は使用しない。
+"""
+
+import importlib.util
+import random
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def _load_benchmark():
+    """比較用の従来実装を scripts/benchmark_match_score.py から読み込む"""
+    path = os.path.join(PROJECT_ROOT, "scripts", "benchmark_match_score.py")
+    spec = importlib.util.spec_from_file_location("benchmark_match_score", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_scores_match_legacy():
+    """合成データでスコア・マッチした食材（順序を含む）・主要食材判定が従来実装と一致"""
+    from mcp_servers.recipe_rag.ingredient_index import IngredientTokenIndex
+
+    benchmark = _load_benchmark()
+    rng = random.Random(0)
+    corpus = benchmark.build_corpus(rng, 300)
+    index = IngredientTokenIndex()
+
+    for _ in range(20):
+        inventory = list(dict.fromkeys(rng.sample(benchmark.VOCABULARY, rng.randint(1, 20))))
+        main_ingredient = rng.choice([None, inventory[0], rng.choice(benchmark.VOCABULARY)])
+        matcher = index.create_matcher(inventory, main_ingredient)
+        for recipe in corpus:
+            expected = benchmark.legacy_calculate_match_score(recipe, inventory, main_ingredient)
+            actual = matcher.score(recipe)
+            assert actual == expected, (recipe, inventory, main_ingredient, actual, expected)
+            if main_ingredient:
+                assert matcher.has_main_ingredient(recipe, actual[1]) == \
+                    benchmark.legacy_has_main_ingredient(main_ingredient, recipe, actual[1])
+
+
+def test_score_weights():
+    """完全一致・部分一致（表記揺れを含む）と主要食材の重み"""
+    from mcp_servers.recipe_rag.ingredient_index import IngredientTokenIndex
+
+    index = IngredientTokenIndex()
+    # 「玉ねぎ」と「たまねぎ」は正規化で完全一致、「豚」は「豚バラ肉」に部分一致
+    matcher = index.create_matcher(["たまねぎ", "豚", "卵"])
+    score, matched = matcher.score("玉ねぎ 豚バラ肉 醤油")
+    assert matched == ["たまねぎ", "豚"]
+    assert score == (1.0 + 0.5) / 3
+
+    # 主要食材は重み5（最大スコア = 5 + その他の食材数）
+    matcher = index.create_matcher(["鶏もも肉", "キャベツ"], main_ingredient="鶏もも肉")
+    score, matched = matcher.score("鶏もも肉 塩")
+    assert matched == ["鶏もも肉"]
+    assert score == 5.0 / 6.0
+
+    assert matcher.score("") == (0.0, [])
+    assert index.create_matcher([]).score("鶏もも肉") == (0.0, [])
+
+
+def test_secondary_items_bonus():
+    """二次食材（クエリ計画で上限外）は小さなボーナスとしてのみ加点"""
+    from mcp_servers.recipe_rag.ingredient_index import IngredientTokenIndex, SECONDARY_BONUS_WEIGHT
+
+    index = IngredientTokenIndex()
+    base = index.create_matcher(["鶏もも肉", "キャベツ"])
+    with_secondary = index.create_matcher(["鶏もも肉", "キャベツ"], secondary_items=["にんじん", "ごぼう"])
+    score, matched = base.score("鶏もも肉 にんじん")
+    bonus_score, bonus_matched = with_secondary.score("鶏もも肉 にんじん")
+    assert bonus_matched == ["鶏もも肉", "にんじん"]
+    assert bonus_score == score + SECONDARY_BONUS_WEIGHT * 1.0 / 2
+
+
+def test_tokens_are_memoized():
+    """食材文字列のトークン化はインデックスで1回のみ"""
+    from mcp_servers.recipe_rag.ingredient_index import IngredientTokenIndex
+
+    index = IngredientTokenIndex()
+    tokens = index.get_tokens("玉ねぎ にんじん 玉ねぎ")
+    assert index.get_tokens("玉ねぎ にんじん 玉ねぎ") is tokens
+    assert len(tokens) == 2
+    assert index.recipe_count == 1
+
+
+def run_all():
+    print("--- InventoryMatcher ---")
+    test_scores_match_legacy()
+    print("  test_scores_match_legacy OK")
+    test_score_weights()
+    print("  test_score_weights OK")
+    test_secondary_items_bonus()
+    print("  test_secondary_items_bonus OK")
+
+    print("--- IngredientTokenIndex ---")
+    test_tokens_are_memoized()
+    print("  test_tokens_are_memoized OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
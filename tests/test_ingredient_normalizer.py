@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+食材名の正規化（ingredient_normalizer）の単体テスト
+
+実行: python tests/test_ingredient_normalizer.py
+pytest は使用しない。
+"""
+
+import logging
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_notation_variants_share_key():
+    """カタカナ・ひらがな・半角カナ・漢字の別名は同じキーになる"""
+    from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+
+    groups = [
+        ("鶏もも肉", "鶏モモ肉", "とりもも肉", "鶏腿肉", "鳥もも肉"),
+        ("たまねぎ", "玉ねぎ", "タマネギ", "玉葱"),
+        ("にんじん", "人参", "ニンジン", "ﾆﾝｼﾞﾝ"),
+        ("合いびき肉", "合挽肉", "合い挽き肉", "あいびき肉"),
+        ("卵", "玉子", "たまご", "タマゴ"),
+    ]
+    for names in groups:
+        keys = {normalize_ingredient_key(name) for name in names}
+        assert len(keys) == 1, (names, keys)
+    assert normalize_ingredient_key("鶏もも肉") != normalize_ingredient_key("鶏むね肉")
+
+
+def test_separators_and_width():
+    """全角英数字はNFKCで統一、空白と記号は除去、別名は部分文字列でも統一"""
+    from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+
+    assert normalize_ingredient_key("ＡＢＣ 牛乳") == "abc牛乳"
+    assert normalize_ingredient_key("トマト（大）") == "とまと大"
+    assert normalize_ingredient_key("豚 バラ・肉") == normalize_ingredient_key("豚バラ肉")
+    # 「新玉ねぎ」も代表表記（たまねぎ）を含むキーになり、部分一致で在庫と対応できる
+    assert normalize_ingredient_key("たまねぎ") in normalize_ingredient_key("新玉ねぎ")
+    assert normalize_ingredient_key("") == ""
+    assert normalize_ingredient_key(None) == ""
+
+
+def test_memoized():
+    """正規化結果はLRUキャッシュされる"""
+    from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+
+    normalize_ingredient_key("キャベツ（テスト）")
+    hits = normalize_ingredient_key.cache_info().hits
+    normalize_ingredient_key("キャベツ（テスト）")
+    assert normalize_ingredient_key.cache_info().hits == hits + 1
+
+
+def test_to_katakana():
+    """ベクトル検索クエリ用にひらがなのみカタカナへ変換"""
+    from mcp_servers.ingredient_normalizer import to_katakana
+
+    assert to_katakana("たまねぎ と 鶏") == "タマネギ ト 鶏"
+    assert to_katakana("") == ""
+
+
+def test_clean_product_name():
+    """OCR商品名からサイズ・状態・ブランド・説明の表記を除去（従来の適用順）"""
+    from mcp_servers.ingredient_normalizer import clean_product_name
+
+    cases = {
+        "新ＢＰ 牛乳": "牛乳",
+        "国産 豚ロース": "豚ロース",
+        "もっちり 食パン": "食パン",
+        "生 しいたけ 大": "しいたけ",
+        "成分無調整 牛乳": "牛乳",
+        "豚バラ": "豚",
+        "キャベツ": "キャベツ",
+        "": "",
+    }
+    for name, expected in cases.items():
+        assert clean_product_name(name) == expected, (name, clean_product_name(name))
+
+
+def test_callers_use_shared_key():
+    """セッションの食材マッピングは共通の正規化キーを使う"""
+    from mcp_servers.ingredient_normalizer import normalize_ingredient_key
+    from services.session.models.components.ingredient_mapper import IngredientMapperComponent
+
+    mapper = IngredientMapperComponent(logging.getLogger("test"))
+    for name in ("鶏モモ肉", "玉葱", "ＡＢＣ 牛乳"):
+        assert mapper.normalize_ingredient_name(name) == normalize_ingredient_key(name)
+
+
+def run_all():
+    print("--- normalize_ingredient_key ---")
+    test_notation_variants_share_key()
+    print("  test_notation_variants_share_key OK")
+    test_separators_and_width()
+    print("  test_separators_and_width OK")
+    test_memoized()
+    print("  test_memoized OK")
+    test_callers_use_shared_key()
+    print("  test_callers_use_shared_key OK")
+
+    print("--- to_katakana / clean_product_name ---")
+    test_to_katakana()
+    print("  test_to_katakana OK")
+    test_clean_product_name()
+    print("  test_clean_product_name OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+LLMゲートウェイ（プロセス共通のOpenAIクライアント）の単体テスト
+
+実行: python tests/test_llm_gateway.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _usage(prompt_tokens, completion_tokens):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, prompt_tokens_details=None)
+
+
+class FakeStream:
+    def __init__(self, deltas):
+        self.chunks = [
+            SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+            for delta in deltas
+        ]
+        self.chunks.append(SimpleNamespace(usage=_usage(10, len(deltas)), choices=[]))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        if kwargs.get("stream"):
+            return FakeStream(["主菜", "候補"])
+        return SimpleNamespace(
+            usage=_usage(12, 5),
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))]
+        )
+
+
+def _gateway():
+    from mcp_servers.llm_gateway import LLMGateway
+
+    gateway = LLMGateway(api_key="sk-test")
+    completions = FakeCompletions()
+    gateway._openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return gateway, completions
+
+
+def test_shared_clients_and_model_routing():
+    """HTTPクライアントとAsyncOpenAIはプロセスで共有、用途別にモデルを切り替え"""
+    from mcp_servers.llm_gateway import LLMGateway
+
+    gateway = LLMGateway(api_key="sk-test")
+    assert gateway.async_http_client is gateway.async_http_client
+    assert gateway.openai_client is gateway.openai_client
+    assert gateway.openai_client._client is gateway.async_http_client
+    run_async(gateway.aclose())
+    assert gateway._openai_client is None
+
+    with patch.dict(os.environ, {"LLM_MODEL_OCR": "gpt-4o"}):
+        assert gateway.model_for("ocr", "gpt-4o-mini") == "gpt-4o"
+        assert gateway.model_for("recipe", "gpt-4o-mini") == "gpt-4o-mini"
+
+
+async def _chat_completion_metrics_and_single_flight():
+    gateway, completions = _gateway()
+    client = gateway.client_for("recipe")
+    request = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "主菜を2件"}]}
+
+    # 同じ用途・同じ引数の同時呼び出しは1回のAPI呼び出しにまとめる
+    responses = await asyncio.gather(*(client.chat.completions.create(**request) for _ in range(3)))
+    assert completions.calls == 1
+    assert all(response.choices[0].message.content == "ok" for response in responses)
+
+    # 用途が違えば別の呼び出し
+    await gateway.client_for("planner").chat.completions.create(**request)
+    assert completions.calls == 2
+
+    completions.error = RuntimeError("boom")
+    try:
+        await client.chat.completions.create(**request)
+        raise AssertionError("例外が伝播していません")
+    except RuntimeError:
+        pass
+
+    metrics = gateway.get_metrics()
+    assert metrics["recipe"]["calls"] == 2 and metrics["recipe"]["errors"] == 1, metrics
+    assert metrics["recipe"]["prompt_tokens"] == 12 and metrics["recipe"]["completion_tokens"] == 5
+    assert metrics["planner"]["calls"] == 1
+
+
+def test_chat_completion_metrics_and_single_flight():
+    """chat_completion: 同時の同一呼び出しを集約し、用途別に統計を記録"""
+    run_async(_chat_completion_metrics_and_single_flight())
+
+
+async def _stream_chat_completion():
+    gateway, completions = _gateway()
+    request = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "主菜を2件"}]}
+    usages = []
+    deltas = [delta async for delta in gateway.stream_chat_completion("recipe", on_usage=usages.append, **request)]
+    assert deltas == ["主菜", "候補"]
+    # 受信完了後に最終チャンクの usage を呼び出し元へ渡す
+    assert len(usages) == 1 and usages[0].prompt_tokens == 10
+    metrics = gateway.get_metrics()["recipe"]
+    assert metrics["calls"] == 1
+    # 最終チャンクの usage を記録
+    assert metrics["prompt_tokens"] == 10 and metrics["completion_tokens"] == 2
+
+
+def test_stream_chat_completion():
+    """stream_chat_completion: 本文の差分を受信順に返し、最終チャンクの usage を記録"""
+    run_async(_stream_chat_completion())
+
+
+async def _create(client, request, user_id):
+    from mcp_servers.token_accounting import token_attribution
+
+    with token_attribution(user_id=user_id):
+        return await client.chat.completions.create(**request)
+
+
+async def _single_flight_scoped_by_user():
+    gateway, completions = _gateway()
+    client = gateway.client_for("recipe")
+    request = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "主菜を2件"}]}
+
+    # 同じユーザーの同時呼び出しは集約、別ユーザーの同一プロンプトは集約しない
+    await asyncio.gather(_create(client, request, "u1"), _create(client, request, "u1"))
+    assert completions.calls == 1
+    await asyncio.gather(_create(client, request, "u1"), _create(client, request, "u2"))
+    assert completions.calls == 3
+
+
+def test_single_flight_scoped_by_user():
+    """single-flight のキーはユーザー単位"""
+    run_async(_single_flight_scoped_by_user())
+
+
+def test_percentiles():
+    """レイテンシの p50/p95"""
+    from mcp_servers.llm_gateway import PurposeMetrics
+
+    metrics = PurposeMetrics()
+    for latency in range(1, 101):
+        metrics.record(float(latency))
+    result = metrics.to_dict()
+    assert result["calls"] == 100
+    assert result["latency_p50_ms"] in (50.0, 51.0)
+    assert result["latency_p95_ms"] in (95.0, 96.0)
+    assert PurposeMetrics().to_dict()["latency_p95_ms"] == 0.0
+
+
+def run_all():
+    print("--- LLMGateway ---")
+    test_shared_clients_and_model_routing()
+    print("  test_shared_clients_and_model_routing OK")
+    test_chat_completion_metrics_and_single_flight()
+    print("  test_chat_completion_metrics_and_single_flight OK")
+    test_stream_chat_completion()
+    print("  test_stream_chat_completion OK")
+    test_single_flight_scoped_by_user()
+    print("  test_single_flight_scoped_by_user OK")
+
+    print("--- PurposeMetrics ---")
+    test_percentiles()
+    print("  test_percentiles OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+LLMレスポンスキャッシュ（LLMResponseCache）と追加提案での再生成（fresh）の単体テスト
+
+実行: python tests/test_llm_response_cache.py
+pytest は使用しない。
+"""
+
+import asyncio
+import logging
+import sys
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# recipe_service の import 時に recipe_web が Google検索クライアントを作成するため、
+# 検索APIの設定がない環境でも読み込めるようダミー値を設定（実際の検索は行わない）
+os.environ.setdefault("GOOGLE_SEARCH_API_KEY", "test")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "test")
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_cache_key():
+    """キーはパラメータの順序に依存せず、メッセージ・生成パラメータが違えば別キー"""
+    from mcp_servers.llm_response_cache import build_response_cache_key
+
+    messages = [{"role": "user", "content": "主菜を2件"}]
+    key = build_response_cache_key("gpt-4o-mini", messages, temperature=0.7, max_tokens=1000)
+    assert key == build_response_cache_key("gpt-4o-mini", messages, max_tokens=1000, temperature=0.7)
+    assert key != build_response_cache_key("gpt-4o-mini", messages, temperature=0.2, max_tokens=1000)
+    assert key != build_response_cache_key(
+        "gpt-4o-mini", [{"role": "user", "content": "主菜をもう2件"}], temperature=0.7, max_tokens=1000
+    )
+
+
+def test_ttl_and_stale():
+    """期限切れのエントリは get では返さず、get_stale（APIの障害時）では返す"""
+    from mcp_servers.llm_response_cache import LLMResponseCache
+
+    cache = LLMResponseCache(ttl_seconds=0.05, max_entries=8, sqlite_path="")
+    cache.put("k", "content")
+    assert cache.get("k") == "content"
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert cache.get_stale("k") == "content"
+    assert cache.get_stale("missing") is None
+
+    metrics = cache.get_metrics()
+    assert metrics["memory_hits"] == 1 and metrics["misses"] == 1 and metrics["stale_hits"] == 1
+
+
+def test_lru_and_fresh():
+    """件数上限を超えると最も使われていないエントリを削除、fresh指定時は読み込まない"""
+    from mcp_servers.llm_response_cache import LLMResponseCache
+
+    cache = LLMResponseCache(ttl_seconds=60, max_entries=2, sqlite_path="")
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+
+    assert cache.get("a", fresh=True) is None
+    assert cache.get_metrics()["bypasses"] == 1
+    # 再生成した結果でエントリを更新する
+    cache.put("a", "A2")
+    assert cache.get("a") == "A2"
+
+    disabled = LLMResponseCache(ttl_seconds=60, max_entries=0, sqlite_path="")
+    disabled.put("a", "A")
+    assert disabled.get("a") is None
+
+
+def test_sqlite_shared_between_instances():
+    """SQLite（2段目）は別インスタンス（別プロセス相当）からも読める"""
+    from mcp_servers.llm_response_cache import LLMResponseCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm_cache.sqlite3")
+        writer = LLMResponseCache(ttl_seconds=60, max_entries=8, sqlite_path=path)
+        writer.put("k", "content")
+        reader = LLMResponseCache(ttl_seconds=60, max_entries=8, sqlite_path=path)
+        assert reader.get("k") == "content"
+        assert reader.get_metrics()["sqlite_hits"] == 1
+
+        writer.discard("k")
+        assert LLMResponseCache(ttl_seconds=60, max_entries=8, sqlite_path=path).get("k") is None
+
+
+def _streaming_gateway(usage):
+    """最終チャンクの usage として usage を渡すストリーミング"""
+    async def stream_chat_completion(purpose, on_usage=None, **kwargs):
+        for delta in ('{"candidates": [{"title": "肉じゃが", ', '"ingredients": ["じゃがいも"]}]}'):
+            yield delta
+        if on_usage is not None:
+            on_usage(usage)
+    return stream_chat_completion
+
+
+def _memory_cache():
+    from mcp_servers.llm_response_cache import LLMResponseCache
+
+    return LLMResponseCache(ttl_seconds=60, max_entries=8, sqlite_path="")
+
+
+async def _streamed_response_counts_tokens():
+    from mcp_servers.recipe_llm import RecipeLLM
+
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"}):
+        llm = RecipeLLM()
+    llm.response_cache = _memory_cache()
+
+    async def on_delta(delta):
+        pass
+
+    # 最終チャンクの usage をキャッシュに登録し、ヒット時に節約トークン数として数える
+    with patch.object(llm.gateway, "stream_chat_completion", _streaming_gateway(SimpleNamespace(total_tokens=42))):
+        await llm._complete("主菜を1件", max_tokens=100, on_delta=on_delta)
+    await llm._complete("主菜を1件", max_tokens=100, on_delta=on_delta)
+    assert llm.response_cache.tokens_saved == 42
+
+    # usage が返らない場合はプロンプトと本文のトークン数で代用
+    llm.response_cache = _memory_cache()
+    with patch.object(llm.gateway, "stream_chat_completion", _streaming_gateway(None)):
+        await llm._complete("主菜を1件", max_tokens=100, on_delta=on_delta)
+    await llm._complete("主菜を1件", max_tokens=100, on_delta=on_delta)
+    assert llm.response_cache.tokens_saved > 0
+
+
+def test_streamed_response_counts_tokens():
+    """RecipeLLM: ストリーミングの応答も usage 付きで登録し、ヒット時の節約トークン数に反映"""
+    run_async(_streamed_response_counts_tokens())
+
+
+class FakeLLM:
+    def __init__(self):
+        self.kwargs = []
+
+    async def generate_candidates(self, on_candidate=None, **kwargs):
+        self.kwargs.append(kwargs)
+        return {"success": True, "data": {"candidates": [{"title": "LLM候補1", "ingredients": ["鶏もも肉"]}]}}
+
+
+class FakeRAG:
+    async def search_candidates(self, **kwargs):
+        return []
+
+
+async def _service_passes_fresh():
+    from mcp_servers.services import recipe_service
+
+    llm = FakeLLM()
+    with patch.object(recipe_service, "get_recipe_llm", return_value=llm), \
+            patch.object(recipe_service, "get_recipe_rag_client", return_value=FakeRAG()):
+        service = recipe_service.RecipeService()
+    await service.generate_proposals(None, ["鶏もも肉"], "main")
+    await service.generate_proposals(None, ["鶏もも肉"], "main", excluded_recipes=["LLM候補1"], fresh=True)
+    assert [kwargs["fresh"] for kwargs in llm.kwargs] == [False, True]
+
+
+def test_service_passes_fresh():
+    """RecipeService: 追加提案（fresh=True）はLLMにキャッシュを使わないよう指定"""
+    run_async(_service_passes_fresh())
+
+
+class FakeSession:
+    def __init__(self, proposed):
+        self.proposed = proposed
+        self.context = {}
+
+    def set_context(self, key, value):
+        self.context[key] = value
+
+    def get_proposed_recipes(self, category):
+        return self.proposed.get(category, [])
+
+
+class FakeSessionService:
+    def __init__(self, session):
+        self.session = session
+
+    async def get_session(self, sse_session_id, user_id):
+        return self.session
+
+
+class FakeToolRouter:
+    def __init__(self):
+        self.parameters = []
+
+    async def route_service_method(self, service, method, parameters, token, progress_handler=None):
+        self.parameters.append(dict(parameters))
+        return {"success": True, "result": {"data": {"candidates": []}}}
+
+
+async def _coordinator_sets_fresh_for_additional():
+    from core.service_coordinator import ServiceCoordinator
+
+    router = FakeToolRouter()
+    coordinator = ServiceCoordinator.__new__(ServiceCoordinator)
+    coordinator.tool_router = router
+    coordinator.logger = logging.getLogger("test")
+
+    for proposed in ({}, {"main": ["肉じゃが"]}):
+        session_service = FakeSessionService(FakeSession(proposed))
+        with patch("services.session_service.session_service", session_service):
+            await coordinator.execute_service(
+                "recipe_service", "generate_proposals",
+                {"category": "main", "inventory_items": ["鶏もも肉"], "sse_session_id": "s1", "user_id": "u1"},
+                "token"
+            )
+    first, additional = router.parameters
+    assert "fresh" not in first
+    assert additional["fresh"] is True
+    assert additional["excluded_recipes"] == ["肉じゃが"]
+
+
+def test_coordinator_sets_fresh_for_additional():
+    """ServiceCoordinator: 同じカテゴリの提案済みがある追加提案では fresh=True を指定"""
+    run_async(_coordinator_sets_fresh_for_additional())
+
+
+def run_all():
+    print("--- LLMResponseCache ---")
+    test_cache_key()
+    print("  test_cache_key OK")
+    test_ttl_and_stale()
+    print("  test_ttl_and_stale OK")
+    test_lru_and_fresh()
+    print("  test_lru_and_fresh OK")
+    test_sqlite_shared_between_instances()
+    print("  test_sqlite_shared_between_instances OK")
+    test_streamed_response_counts_tokens()
+    print("  test_streamed_response_counts_tokens OK")
+
+    print("--- fresh（追加提案） ---")
+    test_service_passes_fresh()
+    print("  test_service_passes_fresh OK")
+    test_coordinator_sets_fresh_for_additional()
+    print("  test_coordinator_sets_fresh_for_additional OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
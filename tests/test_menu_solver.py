@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+献立制約のローカル厳密解（LocalMenuSolver）の単体テスト
+
+実行: python tests/test_menu_solver.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _recipe(title, *ingredients):
+    return {"title": title, "ingredients": list(ingredients)}
+
+
+def _extract(recipe):
+    return recipe["ingredients"]
+
+
+def _titles(solution):
+    return tuple(solution.menu[category]["title"] for category in ("main_dish", "side_dish", "soup"))
+
+
+def test_scoring():
+    """在庫カバー数 − 料理間の食材重複数 + 主菜の主要食材ボーナス"""
+    from mcp_servers.recipe_rag.menu_solver import LocalMenuSolver, MAIN_INGREDIENT_BONUS
+
+    solver = LocalMenuSolver(top_n=10, llm_tiebreak=False)
+    recipes = {
+        "main_dish": [_recipe("豚の生姜焼き", "豚バラ肉", "玉ねぎ"), _recipe("鶏の照り焼き", "鶏もも肉", "醤油")],
+        "side_dish": [_recipe("玉ねぎサラダ", "玉ねぎ"), _recipe("キャベツの浅漬け", "キャベツ")],
+        "soup": [_recipe("豆腐の味噌汁", "豆腐", "わかめ")],
+    }
+    inventory = ["鶏もも肉", "豚バラ", "キャベツ", "豆腐", "たまねぎ"]
+    solutions = solver.solve(recipes, inventory, _extract, main_ingredient="鶏もも肉", limit=10)
+    assert len(solutions) == 4
+
+    best, second = solutions[:2]
+    # 鶏もも肉・たまねぎ（表記揺れ）・豆腐をカバー（3）、重複なし、主菜が主要食材を使う（+2）
+    assert _titles(best) == ("鶏の照り焼き", "玉ねぎサラダ", "豆腐の味噌汁"), _titles(best)
+    assert (best.coverage, best.overlap, best.uses_main_ingredient) == (3, 0, True)
+    assert best.score == 3 + MAIN_INGREDIENT_BONUS
+    assert best.covered_items == ["鶏もも肉", "豆腐", "たまねぎ"]
+    assert best.ranks == {"main_dish": 1, "side_dish": 0, "soup": 0}
+    # 同点の副菜違いは検索順位の合計が大きいため2位
+    assert _titles(second) == ("鶏の照り焼き", "キャベツの浅漬け", "豆腐の味噌汁"), _titles(second)
+    assert second.score == best.score
+
+    # 主菜と副菜で玉ねぎが重複すると減点（在庫の豚バラはレシピの豚バラ肉に部分一致でカバー）
+    overlapping = next(s for s in solutions if _titles(s)[:2] == ("豚の生姜焼き", "玉ねぎサラダ"))
+    assert (overlapping.coverage, overlapping.overlap, overlapping.uses_main_ingredient) == (3, 1, False)
+    assert overlapping.score == 2.0
+
+    assert [s.score for s in solutions] == sorted((s.score for s in solutions), reverse=True)
+
+
+def test_tie_break_by_rank():
+    """同点の組み合わせは検索順位の合計が小さい順（同じなら主菜→副菜→汁物の順位順）"""
+    from mcp_servers.recipe_rag.menu_solver import LocalMenuSolver
+
+    solver = LocalMenuSolver(top_n=10, llm_tiebreak=False)
+    recipes = {
+        "main_dish": [_recipe("主菜A", "鶏もも肉"), _recipe("主菜B", "鶏もも肉")],
+        "side_dish": [_recipe("副菜A", "キャベツ"), _recipe("副菜B", "キャベツ")],
+        "soup": [],
+    }
+    solutions = solver.solve(recipes, ["鶏もも肉", "キャベツ"], _extract, limit=10)
+    assert len({s.score for s in solutions}) == 1
+    assert [_titles(s)[:2] for s in solutions] == [
+        ("主菜A", "副菜A"), ("主菜A", "副菜B"), ("主菜B", "副菜A"), ("主菜B", "副菜B")
+    ]
+    # 候補がないカテゴリは未選択
+    assert solutions[0].menu["soup"] == {"title": "", "ingredients": []}
+    assert solutions[0].ranks["soup"] is None
+
+    # 決定的（同じ入力なら同じ結果）
+    again = solver.solve(recipes, ["鶏もも肉", "キャベツ"], _extract, limit=10)
+    assert [_titles(s) for s in again] == [_titles(s) for s in solutions]
+
+
+def test_top_n_and_duplicates():
+    """カテゴリ上位N件のみ採点し、同じタイトルは上位のみ残す"""
+    from mcp_servers.recipe_rag.menu_solver import LocalMenuSolver
+
+    solver = LocalMenuSolver(top_n=2, llm_tiebreak=False)
+    recipes = {
+        "main_dish": [_recipe("主菜A", "鶏もも肉"), _recipe("主菜A", "キャベツ"), _recipe("主菜B"), _recipe("主菜C", "キャベツ")],
+    }
+    solutions = solver.solve(recipes, ["鶏もも肉", "キャベツ"], _extract, limit=10)
+    assert sorted(_titles(s)[0] for s in solutions) == ["主菜A", "主菜B"]
+    assert solver.solve({}, ["鶏もも肉"], _extract) == []
+
+
+class FakeLLMSolver:
+    def __init__(self, choice):
+        self.choice = choice
+        self.calls = 0
+
+    async def solve_menu_constraints_with_llm(self, candidates, inventory_items, menu_type):
+        self.calls += 1
+        return self.choice(candidates)
+
+
+async def _select_tiebreak():
+    from mcp_servers.recipe_rag.menu_solver import LocalMenuSolver
+
+    recipes = {
+        "main_dish": [_recipe("主菜A", "鶏もも肉"), _recipe("主菜B", "鶏もも肉")],
+        "side_dish": [_recipe("副菜A", "キャベツ")],
+    }
+    inventory = ["鶏もも肉", "キャベツ"]
+
+    # 無効時はLLMを呼ばずに1位を選ぶ
+    disabled = LocalMenuSolver(top_n=10, llm_tiebreak=False)
+    llm = FakeLLMSolver(lambda candidates: candidates[1])
+    solutions = disabled.solve(recipes, inventory, _extract)
+    assert _titles(await disabled.select(solutions, inventory, "和食", llm))[0] == "主菜A"
+    assert llm.calls == 0
+
+    # 有効時は同点候補からLLMが選んだ献立を採用
+    enabled = LocalMenuSolver(top_n=10, llm_tiebreak=True)
+    solutions = enabled.solve(recipes, inventory, _extract)
+    assert _titles(await enabled.select(solutions, inventory, "和食", llm))[0] == "主菜B"
+    assert llm.calls == 1
+
+    # LLMが同点候補以外を返した場合は1位のまま
+    invented = FakeLLMSolver(lambda candidates: {"main_dish": {"title": "存在しない料理"}})
+    assert _titles(await enabled.select(solutions, inventory, "和食", invented))[0] == "主菜A"
+
+    assert await enabled.select([], inventory, "和食", llm) is None
+
+
+def test_select_tiebreak():
+    """select: 同点かつ有効時のみLLMでタイブレーク"""
+    run_async(_select_tiebreak())
+
+
+def run_all():
+    print("--- LocalMenuSolver.solve ---")
+    test_scoring()
+    print("  test_scoring OK")
+    test_tie_break_by_rank()
+    print("  test_tie_break_by_rank OK")
+    test_top_n_and_duplicates()
+    print("  test_top_n_and_duplicates OK")
+
+    print("--- LocalMenuSolver.select ---")
+    test_select_tiebreak()
+    print("  test_select_tiebreak OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
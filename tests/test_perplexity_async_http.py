@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Perplexity検索・レシピ画像取得の非同期HTTP（接続プール）の単体テスト
+
+実行: python tests/test_perplexity_async_http.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+import time
+from unittest.mock import patch
+
+import httpx
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+PAGE_DELAY = 0.2
+
+URLS = [
+    "https://cookpad.com/recipe/1",
+    "https://www.kurashiru.com/recipes/2",
+    "https://recipe.rakuten.co.jp/recipe/3",
+    "https://delishkitchen.tv/recipes/4",
+]
+
+
+def _client(handler):
+    from mcp_servers.recipe_web_perplexity import PerplexitySearchClient
+
+    with patch.dict(os.environ, {"PERPLEXITY_API_KEY": "pplx-test"}):
+        client = PerplexitySearchClient()
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+    return client
+
+
+async def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "api.perplexity.ai":
+        content = "\n".join(URLS)
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+    await asyncio.sleep(PAGE_DELAY)
+    html = f'<html><head><meta property="og:image" content="/img{request.url.path}.jpg"></head></html>'
+    return httpx.Response(200, text=html)
+
+
+async def _search_fetches_images_concurrently():
+    client = _client(_handler)
+    started = time.monotonic()
+    recipes = await client.search_recipes("肉じゃが", num_results=4)
+    elapsed = time.monotonic() - started
+    await client.aclose()
+
+    assert [r["url"] for r in recipes] == URLS
+    assert recipes[0]["image_url"] == "https://cookpad.com/img/recipe/1.jpg", recipes[0]
+    # 4ページの取得が並行して進む（直列なら PAGE_DELAY × 4）
+    assert elapsed < PAGE_DELAY * 2, elapsed
+
+
+def test_search_fetches_images_concurrently():
+    """検索結果の画像取得が並行して実行される"""
+    run_async(_search_fetches_images_concurrently())
+
+
+async def _per_host_limit():
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return httpx.Response(200, text="<html></html>")
+
+    client = _client(handler)
+    client.max_connections_per_host = 2
+    await asyncio.gather(*(client._fetch_recipe_image(f"https://cookpad.com/recipe/{i}") for i in range(6)))
+    await client.aclose()
+    assert peak == 2, peak
+
+
+def test_per_host_limit():
+    """同一ホストへの同時接続数を制限する"""
+    run_async(_per_host_limit())
+
+
+async def _image_fetch_errors():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/timeout":
+            raise httpx.ReadTimeout("timeout", request=request)
+        return httpx.Response(404, text="not found")
+
+    client = _client(handler)
+    assert await client._fetch_recipe_image("https://cookpad.com/timeout") is None
+    assert await client._fetch_recipe_image("https://cookpad.com/missing") is None
+    await client.aclose()
+
+
+def test_image_fetch_errors():
+    """タイムアウト・HTTPエラーでは画像なし（None）"""
+    run_async(_image_fetch_errors())
+
+
+def run_all():
+    print("--- PerplexitySearchClient ---")
+    test_search_fetches_images_concurrently()
+    print("  test_search_fetches_images_concurrently OK")
+    test_per_host_limit()
+    print("  test_per_host_limit OK")
+    test_image_fetch_errors()
+    print("  test_image_fetch_errors OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
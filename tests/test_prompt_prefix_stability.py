@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+タスク分解プロンプトの静的プレフィックスの安定性テスト
+
+パターンごとの静的プレフィックスがユーザー・リクエストによらずバイト単位で同一であること
+（OpenAIの自動プロンプトキャッシュが効くこと）と、キャッシュ済みトークンの集計を確認する。
+
+実行: python tests/test_prompt_prefix_stability.py
+pytest は使用しない。
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PATTERNS = [
+    "inventory", "menu", "main", "sub", "soup", "other",
+    "main_additional", "sub_additional", "soup_additional", "other_additional", "greeting",
+]
+
+# 2人のユーザーのリクエスト（静的プレフィックスに含まれてはいけない値）
+REQUESTS = [
+    {
+        "user_id": "user-aaaa-1111",
+        "sse_session_id": "session-aaaa-1111",
+        "params": {
+            "user_request": "鶏もも肉を使った主菜を教えて",
+            "main_ingredient": "鶏もも肉",
+            "used_ingredients": ["鶏もも肉", "玉ねぎ"],
+            "menu_category": "western",
+            "category_detail_keyword": "グラタン",
+        },
+    },
+    {
+        "user_id": "user-bbbb-2222",
+        "sse_session_id": "session-bbbb-2222",
+        "params": {
+            "user_request": "豆腐で何か作りたい",
+            "main_ingredient": "豆腐",
+            "used_ingredients": ["豆腐", "長ねぎ"],
+            "menu_category": "chinese",
+            "category_detail_keyword": "ピラフ",
+        },
+    },
+]
+
+
+def _build(pattern: str, request: dict):
+    from services.llm.prompt_manager import PromptManager
+
+    analysis_result = {"pattern": pattern, "params": dict(request["params"])}
+    return PromptManager().build_prompt_parts(
+        analysis_result, request["user_id"], request["sse_session_id"]
+    )
+
+
+def _request_values(request: dict):
+    params = request["params"]
+    return [
+        request["user_id"],
+        request["sse_session_id"],
+        params["user_request"],
+        params["main_ingredient"],
+        params["category_detail_keyword"],
+        *params["used_ingredients"],
+    ]
+
+
+def test_static_prefix_is_identical_across_users():
+    """パターンごとの静的プレフィックスがユーザー間で同一"""
+    for pattern in PATTERNS:
+        first, second = (_build(pattern, request) for request in REQUESTS)
+        assert first.static_prefix == second.static_prefix, pattern
+        assert first.static_prefix.encode("utf-8") == second.static_prefix.encode("utf-8"), pattern
+
+
+def test_static_prefix_has_no_request_values():
+    """静的プレフィックスにリクエストごとの値が含まれず、サフィックスに含まれる"""
+    for pattern in PATTERNS:
+        for request in REQUESTS:
+            parts = _build(pattern, request)
+            for value in _request_values(request):
+                assert value not in parts.static_prefix, (pattern, value)
+            if pattern != "greeting":
+                assert request["params"]["user_request"] in parts.dynamic_suffix, pattern
+
+
+def test_user_id_is_rendered_uniformly():
+    """ユーザーIDはどのパターンでも同じ書式（引用符なし）でサフィックスに入る"""
+    for pattern in PATTERNS:
+        if pattern in ("inventory", "greeting"):
+            continue
+        request = REQUESTS[0]
+        parts = _build(pattern, request)
+        assert f"- ユーザーID: {request['user_id']}\n" in parts.dynamic_suffix, (pattern, parts.dynamic_suffix)
+
+
+def test_build_prompt_renders_prefix_then_suffix():
+    """build_prompt は静的プレフィックス + リクエスト情報の順の全文を返す"""
+    from services.llm.prompt_manager import PromptManager
+
+    for pattern in PATTERNS:
+        request = REQUESTS[0]
+        parts = _build(pattern, request)
+        analysis_result = {"pattern": pattern, "params": dict(request["params"])}
+        prompt = PromptManager().build_prompt(analysis_result, request["user_id"], request["sse_session_id"])
+        assert prompt == parts.static_prefix + parts.dynamic_suffix, pattern
+        assert prompt.startswith(parts.static_prefix), pattern
+
+
+def test_proposal_params_are_set_from_request():
+    """generate_proposals の主要食材・詳細カテゴリ等はLLMの記述によらずリクエスト情報の値を設定"""
+    from services.llm.response_processor import ResponseProcessor
+
+    processor = ResponseProcessor()
+    request = REQUESTS[0]
+
+    def convert(pattern, parameters):
+        tasks = [
+            {"service": "inventory_service", "method": "get_inventory", "parameters": {}},
+            {"service": "recipe_service", "method": "generate_proposals", "parameters": dict(parameters)},
+        ]
+        analysis_result = {"pattern": pattern, "params": dict(request["params"])}
+        converted = processor.convert_to_task_format(tasks, request["user_id"], analysis_result)
+        assert converted[0]["parameters"] == {"user_id": request["user_id"]}
+        return converted[1]["parameters"]
+
+    # LLMが書き写し損ねた値・プレースホルダーを上書き
+    params = convert("other", {"main_ingredient": "リクエスト情報の主要食材", "category_detail_keyword": None})
+    assert params["main_ingredient"] == "鶏もも肉"
+    assert params["category_detail_keyword"] == "グラタン"
+    params = convert("soup", {"used_ingredients": "[]"})
+    assert params["used_ingredients"] == ["鶏もも肉", "玉ねぎ"] and params["menu_category"] == "western"
+
+    # 指定なしは null（主要食材を推測しない）
+    tasks = [{"service": "recipe_service", "method": "generate_proposals", "parameters": {"main_ingredient": "キャベツ"}}]
+    converted = processor.convert_to_task_format(
+        tasks, request["user_id"], {"pattern": "main", "params": {"user_request": "主菜を教えて"}}
+    )
+    assert converted[0]["parameters"]["main_ingredient"] is None
+
+    # 追加提案はセッションコンテキストから取得するため上書きしない
+    params = convert("main_additional", {"main_ingredient": "session.context.main_ingredient"})
+    assert params["main_ingredient"] == "session.context.main_ingredient"
+
+
+def test_token_ledger_records_cached_tokens():
+    """usage.prompt_tokens_details.cached_tokens を集計し、キャッシュ済み入力の単価でコストを計算"""
+    from mcp_servers.token_accounting import TokenLedger
+
+    ledger = TokenLedger(prices={"gpt-4o-mini": (0.15, 0.60, 0.075)})
+    usage = SimpleNamespace(
+        prompt_tokens=2000,
+        completion_tokens=100,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1536),
+    )
+    record = ledger.record("planner", "gpt-4o-mini", 1990, usage)
+    assert record["cached_tokens"] == 1536
+    expected_cost = (464 * 0.15 + 1536 * 0.075 + 100 * 0.60) / 1_000_000
+    assert abs(record["cost_usd"] - expected_cost) < 1e-9, record
+
+    # 詳細のない usage（埋め込みなど）はキャッシュ0
+    ledger.record("planner", "gpt-4o-mini", 2000, SimpleNamespace(prompt_tokens=2000, completion_tokens=100))
+    total = ledger.get_metrics()["total"]
+    assert total["cached_tokens"] == 1536
+    assert total["cached_ratio"] == round(1536 / 4000, 4), total
+
+
+def run_all():
+    print("--- PromptManager.build_prompt_parts ---")
+    test_static_prefix_is_identical_across_users()
+    print("  test_static_prefix_is_identical_across_users OK")
+    test_static_prefix_has_no_request_values()
+    print("  test_static_prefix_has_no_request_values OK")
+    test_user_id_is_rendered_uniformly()
+    print("  test_user_id_is_rendered_uniformly OK")
+    test_build_prompt_renders_prefix_then_suffix()
+    print("  test_build_prompt_renders_prefix_then_suffix OK")
+
+    print("--- ResponseProcessor.convert_to_task_format ---")
+    test_proposal_params_are_set_from_request()
+    print("  test_proposal_params_are_set_from_request OK")
+
+    print("--- TokenLedger（キャッシュ済みトークン） ---")
+    test_token_ledger_records_cached_tokens()
+    print("  test_token_ledger_records_cached_tokens OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+段階的提案の高速モード（レイテンシ予算）の単体テスト
+
+実行: python tests/test_proposal_latency_budget.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+import time
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# recipe_service の import 時に recipe_web が Google検索クライアントを作成するため、
+# 検索APIの設定がない環境でも読み込めるようダミー値を設定（実際の検索は行わない）
+os.environ.setdefault("GOOGLE_SEARCH_API_KEY", "test")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "test")
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class FakeLLM:
+    """候補を指定の時刻にストリーミングで完成させるLLM"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = 0
+
+    async def generate_candidates(self, on_candidate=None, **kwargs):
+        self.calls += 1
+        candidates = []
+        started = time.monotonic()
+        for i, delay in enumerate(self.delays):
+            await asyncio.sleep(max(0.0, delay - (time.monotonic() - started)))
+            candidate = {"title": f"LLM候補{i + 1}", "ingredients": ["鶏もも肉"]}
+            candidates.append(candidate)
+            if on_candidate is not None:
+                await on_candidate(candidate)
+        return {"success": True, "data": {"candidates": candidates}}
+
+
+class FakeRAG:
+    def __init__(self, delay, titles):
+        self.delay = delay
+        self.titles = titles
+
+    async def search_candidates(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return [{"title": title, "ingredients": ["鶏もも肉"], "url": "https://example.com"} for title in self.titles]
+
+
+def _service(llm, rag):
+    from mcp_servers.services import recipe_service
+
+    with patch.object(recipe_service, "get_recipe_llm", return_value=llm), \
+            patch.object(recipe_service, "get_recipe_rag_client", return_value=rag):
+        return recipe_service.RecipeService()
+
+
+def _titles(result, source):
+    return [c["title"] for c in result["data"]["candidates"] if c["source"] == source]
+
+
+async def _llm_within_budget():
+    service = _service(FakeLLM([0.01, 0.02]), FakeRAG(0.01, ["RAG候補1", "RAG候補2", "RAG候補3"]))
+    result = await service.generate_proposals(None, ["鶏もも肉"], "main", latency_budget=1.0)
+    assert _titles(result, "llm") == ["LLM候補1", "LLM候補2"]
+    assert result["data"]["rag_count"] == 3
+    assert result["data"]["llm_deferred"] is False
+
+
+def test_llm_within_budget():
+    """予算内に完成したLLM候補はすべて含める"""
+    run_async(_llm_within_budget())
+
+
+async def _excluded_not_streamed():
+    service = _service(FakeLLM([0.01, 0.02]), FakeRAG(0.01, ["RAG候補1"]))
+    sent = []
+
+    async def on_candidate(candidate):
+        sent.append(candidate["title"])
+
+    result = await service.generate_proposals(
+        None, ["鶏もも肉"], "main", excluded_recipes=["LLM候補1"],
+        on_candidate=on_candidate, latency_budget=1.0
+    )
+    assert _titles(result, "llm") == ["LLM候補2"]
+    assert "LLM候補1" not in sent, sent
+    assert "LLM候補2" in sent
+
+
+def test_excluded_not_streamed():
+    """除外レシピのLLM候補はストリーミングでも送信しない"""
+    run_async(_excluded_not_streamed())
+
+
+async def _late_llm_is_kept_for_more():
+    llm = FakeLLM([0.02, 0.4])
+    service = _service(llm, FakeRAG(0.01, ["RAG候補1", "RAG候補2", "RAG候補3"]))
+    sent = []
+
+    async def on_candidate(candidate):
+        sent.append(candidate["title"])
+
+    started = time.monotonic()
+    result = await service.generate_proposals(
+        None, ["鶏もも肉"], "main", main_ingredient="鶏もも肉",
+        on_candidate=on_candidate, latency_budget=0.1, late_result_key="session-1"
+    )
+    elapsed = time.monotonic() - started
+    assert elapsed < 0.3, elapsed
+    # RAG候補と予算内に完成したLLM候補のみ
+    assert _titles(result, "rag") == ["RAG候補1", "RAG候補2", "RAG候補3"]
+    assert _titles(result, "llm") == ["LLM候補1"]
+    assert result["data"]["llm_deferred"] is True
+    assert len(service.late_proposals) == 1
+
+    # 応答後に完成した候補は送信しない
+    await asyncio.sleep(0.4)
+    assert "LLM候補2" not in sent, sent
+
+    # 「もっと見る」（同じセッション・条件）では保持した候補を使い、LLMを呼び直さない
+    shown = [c["title"] for c in result["data"]["candidates"]]
+    more = await service.generate_proposals(
+        None, ["鶏もも肉"], "main", main_ingredient="鶏もも肉", excluded_recipes=shown,
+        on_candidate=on_candidate, latency_budget=0.1, late_result_key="session-1"
+    )
+    assert _titles(more, "llm") == ["LLM候補2"], _titles(more, "llm")
+    assert "LLM候補2" in sent
+    assert llm.calls == 1
+    assert len(service.late_proposals) == 0
+
+
+def test_late_llm_is_kept_for_more():
+    """予算超過のLLM候補は応答に含めず、次の「もっと見る」で使う"""
+    run_async(_late_llm_is_kept_for_more())
+
+
+async def _late_key_includes_ingredients():
+    llm = FakeLLM([0.02, 0.2])
+    service = _service(llm, FakeRAG(0.01, ["RAG候補1"]))
+    await service.generate_proposals(
+        None, ["鶏もも肉", "玉ねぎ"], "main", latency_budget=0.05, late_result_key="session-1"
+    )
+    await asyncio.sleep(0.2)
+
+    # 在庫が変わった場合は保持した候補を使わない
+    more = await service.generate_proposals(
+        None, ["豚バラ肉"], "main", latency_budget=1.0, late_result_key="session-1"
+    )
+    assert llm.calls == 2
+    assert _titles(more, "llm") == ["LLM候補1", "LLM候補2"]
+
+    # 在庫の並び順だけが違う場合は同じ条件とみなす
+    from mcp_servers.services.recipe_service import build_late_proposal_key
+    assert build_late_proposal_key("s", "main", None, "", None, ["a", "b"], None) == \
+        build_late_proposal_key("s", "main", None, "", None, ["b", "a"], None)
+    assert build_late_proposal_key("s", "sub", None, "", None, ["a"], ["a"]) != \
+        build_late_proposal_key("s", "sub", None, "", None, ["a"], ["b"])
+
+
+def test_late_key_includes_ingredients():
+    """在庫・使用済み食材が異なる提案では保持したLLM候補を使わない"""
+    run_async(_late_key_includes_ingredients())
+
+
+async def _reused_task_deferred_again():
+    llm = FakeLLM([0.02, 0.4])
+    service = _service(llm, FakeRAG(0.01, ["RAG候補1"]))
+    first = await service.generate_proposals(
+        None, ["鶏もも肉"], "main", latency_budget=0.05, late_result_key="session-1"
+    )
+    assert _titles(first, "llm") == ["LLM候補1"]
+
+    # 保持したタスクがまた予算に間に合わない場合は、そのまま保持し直す
+    second = await service.generate_proposals(
+        None, ["鶏もも肉"], "main", latency_budget=0.05, late_result_key="session-1"
+    )
+    assert _titles(second, "llm") == []
+    assert second["data"]["llm_deferred"] is True
+    await asyncio.sleep(0.4)
+
+    third = await service.generate_proposals(
+        None, ["鶏もも肉"], "main", latency_budget=0.05, late_result_key="session-1"
+    )
+    # 1回目の応答に含めた候補は再度返さない
+    assert _titles(third, "llm") == ["LLM候補2"], _titles(third, "llm")
+    assert llm.calls == 1
+
+
+def test_reused_task_deferred_again():
+    """再利用したLLMタスクが再び予算超過しても、応答済みの候補を返さない"""
+    run_async(_reused_task_deferred_again())
+
+
+async def _store_sweeps_expired():
+    from mcp_servers.services.recipe_service import LateProposalStore
+
+    store = LateProposalStore(ttl=0.05)
+    stale = asyncio.ensure_future(asyncio.sleep(10))
+    store.put(("a",), stale)
+    await asyncio.sleep(0.06)
+    fresh = asyncio.ensure_future(asyncio.sleep(10))
+    store.put(("b",), fresh)
+    await asyncio.sleep(0)
+    # 取り出されないまま期限切れのエントリは次の put で削除され、生成を打ち切る
+    assert len(store) == 1
+    assert stale.cancelled()
+    assert store.pop(("b",)) is fresh
+    fresh.cancel()
+
+
+def test_store_sweeps_expired():
+    """LateProposalStore: 期限切れのエントリを put 時に削除してタスクを打ち切る"""
+    run_async(_store_sweeps_expired())
+
+
+async def _waits_for_llm_without_rag():
+    service = _service(FakeLLM([0.05, 0.1]), FakeRAG(0.01, []))
+    result = await service.generate_proposals(None, ["鶏もも肉"], "main", latency_budget=0.02)
+    assert _titles(result, "llm") == ["LLM候補1", "LLM候補2"]
+    assert result["data"]["llm_deferred"] is False
+
+
+def test_waits_for_llm_without_rag():
+    """RAG候補がない場合は予算に関係なくLLMの完了を待つ"""
+    run_async(_waits_for_llm_without_rag())
+
+
+async def _llm_only_wait_is_capped():
+    from mcp_servers.services import recipe_service
+
+    service = _service(FakeLLM([0.02, 1.0]), FakeRAG(0.01, []))
+    started = time.monotonic()
+    with patch.object(recipe_service, "LLM_ONLY_MAX_WAIT", 0.1):
+        result = await service.generate_proposals(None, ["鶏もも肉"], "main", latency_budget=0.02)
+    assert time.monotonic() - started < 0.5
+    # 上限までに完成した候補のみ返す
+    assert _titles(result, "llm") == ["LLM候補1"]
+    assert result["data"]["llm_deferred"] is True
+
+
+def test_llm_only_wait_is_capped():
+    """RAG候補がない場合もLLMを待つのは上限（LLM_ONLY_MAX_WAIT）まで"""
+    run_async(_llm_only_wait_is_capped())
+
+
+def test_budget_per_plan():
+    """高速モードは PROPOSAL_FAST_MODE=true で有効、プラン別の予算と環境変数による上書き"""
+    from mcp_servers.services.recipe_service import DEFAULT_PROPOSAL_LATENCY_BUDGETS, get_proposal_latency_budget
+
+    with patch.dict(os.environ, {}, clear=False):
+        for key in ("PROPOSAL_FAST_MODE", "PROPOSAL_LATENCY_BUDGET_FREE", "PROPOSAL_LATENCY_BUDGET_PRO"):
+            os.environ.pop(key, None)
+        # 既定は無効（オプトイン）
+        assert get_proposal_latency_budget("pro") is None
+
+        os.environ["PROPOSAL_FAST_MODE"] = "true"
+        assert get_proposal_latency_budget("pro") == DEFAULT_PROPOSAL_LATENCY_BUDGETS["pro"]
+        # 不明なプランは free として扱う
+        assert get_proposal_latency_budget(None) == DEFAULT_PROPOSAL_LATENCY_BUDGETS["free"]
+
+        os.environ["PROPOSAL_LATENCY_BUDGET_PRO"] = "2.5"
+        assert get_proposal_latency_budget("pro") == 2.5
+        os.environ["PROPOSAL_LATENCY_BUDGET_PRO"] = "0"
+        assert get_proposal_latency_budget("pro") is None
+
+        os.environ["PROPOSAL_FAST_MODE"] = "false"
+        assert get_proposal_latency_budget("free") is None
+
+
+def run_all():
+    print("--- RecipeService.generate_proposals (latency_budget) ---")
+    test_llm_within_budget()
+    print("  test_llm_within_budget OK")
+    test_excluded_not_streamed()
+    print("  test_excluded_not_streamed OK")
+    test_late_llm_is_kept_for_more()
+    print("  test_late_llm_is_kept_for_more OK")
+    test_waits_for_llm_without_rag()
+    print("  test_waits_for_llm_without_rag OK")
+    test_llm_only_wait_is_capped()
+    print("  test_llm_only_wait_is_capped OK")
+    test_late_key_includes_ingredients()
+    print("  test_late_key_includes_ingredients OK")
+    test_reused_task_deferred_again()
+    print("  test_reused_task_deferred_again OK")
+
+    print("--- LateProposalStore ---")
+    test_store_sweeps_expired()
+    print("  test_store_sweeps_expired OK")
+
+    print("--- get_proposal_latency_budget ---")
+    test_budget_per_plan()
+    print("  test_budget_per_plan OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
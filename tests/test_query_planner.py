@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+検索クエリ計画（plan_query）の単体テスト
+
+実行: python tests/test_query_planner.py
+pytest は使用しない。
+"""
+
+import sys
+import os
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_priority_order():
+    """主要食材 → 調味料以外（入力順） → 調味料 の順に並べる"""
+    from mcp_servers.recipe_rag.query_planner import plan_query
+
+    plan = plan_query(["醤油", "キャベツ", "鶏モモ肉", "砂糖", "にんじん"], main_ingredient="鶏もも肉", max_items=10)
+    # 主要食材は表記揺れがあっても正規化キーで判定
+    assert plan.primary_items == ["鶏モモ肉", "キャベツ", "にんじん", "醤油", "砂糖"], plan
+    assert plan.secondary_items == []
+
+
+def test_cap_and_secondary():
+    """上限を超えた食材は二次食材に回す（調味料から先に外れる）"""
+    from mcp_servers.recipe_rag.query_planner import plan_query
+
+    ingredients = ["塩", "サラダ油"] + [f"食材{i}" for i in range(5)]
+    plan = plan_query(ingredients, max_items=4)
+    assert plan.primary_items == ["食材0", "食材1", "食材2", "食材3"]
+    assert plan.secondary_items == ["食材4", "塩", "サラダ油"]
+
+    # 上限0以下は制限なし
+    assert len(plan_query(ingredients, max_items=0).primary_items) == len(ingredients)
+
+
+def test_dedup_and_empty():
+    """重複・空の食材は除外し、入力順を保つ"""
+    from mcp_servers.recipe_rag.query_planner import plan_query
+
+    plan = plan_query(["キャベツ", "", "キャベツ", "にんじん"], max_items=10)
+    assert plan.primary_items == ["キャベツ", "にんじん"]
+    assert plan_query([]).primary_items == []
+
+
+def test_default_cap_from_env():
+    """上限の既定値は12件、RAG_MAX_QUERY_INGREDIENTS で上書き"""
+    from mcp_servers.recipe_rag.query_planner import DEFAULT_MAX_QUERY_INGREDIENTS, plan_query
+
+    ingredients = [f"食材{i}" for i in range(30)]
+    with patch.dict(os.environ, {}, clear=False):
+        os.environ.pop("RAG_MAX_QUERY_INGREDIENTS", None)
+        assert len(plan_query(ingredients).primary_items) == DEFAULT_MAX_QUERY_INGREDIENTS == 12
+        os.environ["RAG_MAX_QUERY_INGREDIENTS"] = "5"
+        plan = plan_query(ingredients)
+        assert len(plan.primary_items) == 5
+        assert len(plan.secondary_items) == 25
+
+
+def test_is_seasoning():
+    """調味料は正規化キーの部分一致で判定"""
+    from mcp_servers.recipe_rag.query_planner import is_seasoning
+
+    assert is_seasoning("しょうゆ")
+    assert is_seasoning("濃口醤油")
+    assert is_seasoning("ごま油")
+    assert not is_seasoning("キャベツ")
+
+
+def run_all():
+    print("--- plan_query ---")
+    test_priority_order()
+    print("  test_priority_order OK")
+    test_cap_and_secondary()
+    print("  test_cap_and_secondary OK")
+    test_dedup_and_empty()
+    print("  test_dedup_and_empty OK")
+    test_default_cap_from_env()
+    print("  test_default_cap_from_env OK")
+
+    print("--- is_seasoning ---")
+    test_is_seasoning()
+    print("  test_is_seasoning OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
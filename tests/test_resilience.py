@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+外部API呼び出しの耐障害レイヤー（ProviderGuard）の単体テスト
+
+実行: python tests/test_resilience.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+async def _fail():
+    raise ConnectionError("provider down")
+
+
+async def _ok(value="ok"):
+    return value
+
+
+async def _circuit_opens_and_recovers():
+    from mcp_servers.resilience import ProviderGuard, ProviderUnavailableError
+
+    guard = ProviderGuard("test", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        try:
+            await guard.call("op", _fail)
+        except ConnectionError:
+            pass
+    assert guard.breaker.state == "open"
+
+    # open の間は呼び出さずに即時失敗
+    called = []
+
+    async def _track():
+        called.append(True)
+        return "ok"
+
+    try:
+        await guard.call("op", _track)
+        raise AssertionError("ProviderUnavailableError が発生しませんでした")
+    except ProviderUnavailableError:
+        pass
+    assert called == []
+    assert guard.counters["short_circuited"] == 1
+
+    # reset_timeout 後は half-open で1件試行し、成功で closed
+    await asyncio.sleep(0.06)
+    assert await guard.call("op", _ok) == "ok"
+    assert guard.breaker.state == "closed"
+
+    # half-open の試行が失敗すると再び open
+    for _ in range(3):
+        try:
+            await guard.call("op", _fail)
+        except ConnectionError:
+            pass
+    await asyncio.sleep(0.06)
+    try:
+        await guard.call("op", _fail)
+    except ConnectionError:
+        pass
+    assert guard.breaker.state == "open"
+    assert guard.breaker.times_opened == 3
+
+
+def test_circuit_opens_and_recovers():
+    """連続失敗で open、open 中は即時失敗、half-open の試行結果で closed / open"""
+    run_async(_circuit_opens_and_recovers())
+
+
+async def _fallbacks():
+    from mcp_servers.resilience import ProviderGuard
+
+    guard = ProviderGuard("test", failure_threshold=100)
+    result = await guard.call("search", lambda: _ok(["a", "b"]), cache_key="q")
+    assert result == ["a", "b"]
+
+    # 失敗時は前回の同じキーの結果（コピー）
+    cached = await guard.call("search", _fail, fallback=lambda: ["mock"], cache_key="q")
+    assert cached == ["a", "b"]
+    cached.append("c")
+    assert await guard.call("search", _fail, cache_key="q") == ["a", "b"]
+
+    # 前回の結果がなければフォールバック
+    assert await guard.call("search", _fail, fallback=lambda: ["mock"], cache_key="other") == ["mock"]
+    assert guard.counters["cache_fallbacks"] == 2
+    assert guard.counters["fallbacks"] == 1
+
+
+def test_fallbacks():
+    """失敗時は前回の結果 → フォールバックの順に返す"""
+    run_async(_fallbacks())
+
+
+async def _adaptive_timeout():
+    from mcp_servers import resilience
+    from mcp_servers.resilience import ProviderGuard, ProviderTimeoutError
+
+    guard = ProviderGuard("test", min_timeout=0.05, max_timeout=5.0, failure_threshold=100)
+    assert guard.timeout_for("op") == 5.0
+    for _ in range(resilience.MIN_SAMPLES):
+        await guard.call("op", _ok)
+    # 計測が十分たまると p95 × 倍率（最小値で制限）
+    assert guard.timeout_for("op") == 0.05, guard.timeout_for("op")
+
+    async def _slow():
+        await asyncio.sleep(1.0)
+
+    try:
+        await guard.call("op", _slow)
+        raise AssertionError("ProviderTimeoutError が発生しませんでした")
+    except ProviderTimeoutError:
+        pass
+    assert guard.counters["timeouts"] == 1
+    metrics = guard.get_metrics()
+    assert metrics["operations"]["op"]["samples"] == resilience.MIN_SAMPLES
+
+
+def test_adaptive_timeout():
+    """直近のレイテンシからタイムアウトを計算し、超えた呼び出しは打ち切る"""
+    run_async(_adaptive_timeout())
+
+
+async def _concurrency_and_client_errors():
+    from mcp_servers.resilience import ProviderGuard
+
+    guard = ProviderGuard("test", max_concurrency=2, failure_threshold=1)
+    peak = 0
+
+    async def _work():
+        nonlocal peak
+        peak = max(peak, guard.in_flight)
+        await asyncio.sleep(0.01)
+        return True
+
+    results = await asyncio.gather(*(guard.call("op", _work) for _ in range(6)))
+    assert all(results)
+    assert peak == 2, peak
+
+    # リクエスト不正（4xx）はサーキットの判定に含めない
+    async def _bad_request():
+        raise type("BadRequestError", (Exception,), {"status_code": 400})("bad")
+
+    try:
+        await guard.call("op", _bad_request)
+    except Exception:
+        pass
+    assert guard.breaker.state == "closed"
+    assert guard.counters["client_errors"] == 1
+
+
+def test_concurrency_and_client_errors():
+    """同時実行数の上限と、4xxをプロバイダー障害として数えないこと"""
+    run_async(_concurrency_and_client_errors())
+
+
+async def _recipe_llm_uses_stale_cache():
+    from unittest.mock import AsyncMock, patch
+    from mcp_servers.recipe_llm import RecipeLLM
+    from mcp_servers.resilience import ProviderUnavailableError
+
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"}):
+        llm = RecipeLLM()
+    llm.response_cache.clear()
+    content = '{"candidates": [{"title": "肉じゃが", "ingredients": ["じゃがいも"]}]}'
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=None,
+    )
+    with patch.object(llm.client.chat.completions, "create", AsyncMock(return_value=response)):
+        await llm.generate_candidates(["じゃがいも"], "和食", "main", count=1)
+
+    # 再生成（fresh）時にAPIが利用できなければ前回のレスポンスを使う
+    unavailable = AsyncMock(side_effect=ProviderUnavailableError("open"))
+    with patch.object(llm.client.chat.completions, "create", unavailable):
+        result = await llm.generate_candidates(["じゃがいも"], "和食", "main", count=1, fresh=True)
+    assert result["success"] is True, result
+    assert result["data"]["candidates"][0]["title"] == "肉じゃが"
+    assert llm.response_cache.get_metrics()["stale_hits"] == 1
+
+
+def test_recipe_llm_uses_stale_cache():
+    """RecipeLLM: API障害時はキャッシュ済みのレスポンスで応答する"""
+    run_async(_recipe_llm_uses_stale_cache())
+
+
+async def _google_search_failure_without_mock():
+    from unittest.mock import patch
+    from mcp_servers.recipe_web_google import GoogleSearchClient
+
+    with patch.dict(os.environ, {"GOOGLE_SEARCH_API_KEY": "test", "GOOGLE_SEARCH_ENGINE_ID": "test"}):
+        client = GoogleSearchClient()
+    client.USE_MOCK_SEARCH = False
+
+    async def _down(query, num_results):
+        raise ConnectionError("search down")
+
+    client._execute_search = _down
+    # 既定ではモックデータを実際の検索結果として返さない
+    assert client.MOCK_SEARCH_FALLBACK is False
+    assert await client.search_recipes("肉じゃが（障害テスト）", 2) == []
+
+    # 有効にした場合はモックであることを明示
+    client.MOCK_SEARCH_FALLBACK = True
+    recipes = await client.search_recipes("肉じゃが（障害テスト2）", 2)
+    assert recipes and all(recipe["is_mock"] is True for recipe in recipes), recipes
+
+
+def test_google_search_failure_without_mock():
+    """Google検索の障害時、既定では空の結果（モックを返す場合は is_mock 付き）"""
+    run_async(_google_search_failure_without_mock())
+
+
+def run_all():
+    print("--- ProviderGuard ---")
+    test_circuit_opens_and_recovers()
+    print("  test_circuit_opens_and_recovers OK")
+    test_fallbacks()
+    print("  test_fallbacks OK")
+    test_adaptive_timeout()
+    print("  test_adaptive_timeout OK")
+    test_concurrency_and_client_errors()
+    print("  test_concurrency_and_client_errors OK")
+
+    print("--- RecipeLLM ---")
+    test_recipe_llm_uses_stale_cache()
+    print("  test_recipe_llm_uses_stale_cache OK")
+
+    print("--- GoogleSearchClient ---")
+    test_google_search_failure_without_mock()
+    print("  test_google_search_failure_without_mock OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+同時実行の集約（SingleFlight）と ToolRouter での利用の単体テスト
+
+実行: python tests/test_single_flight.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+async def _collapses_concurrent_calls():
+    from mcp_servers.single_flight import SingleFlight, build_flight_key
+
+    flight = SingleFlight("test", copy_results=True)
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"items": [1, 2]}
+
+    key = build_flight_key("op", {"b": 1, "a": [1, 2]}, "user-1")
+    # パラメータのキー順に依存しない・スコープが違えば別キー
+    assert key == build_flight_key("op", {"a": [1, 2], "b": 1}, "user-1")
+    assert key != build_flight_key("op", {"a": [1, 2], "b": 1}, "user-2")
+
+    results = await asyncio.gather(*(flight.do(key, work) for _ in range(5)))
+    assert calls == 1
+    assert all(result == {"items": [1, 2]} for result in results)
+    # 相乗りした呼び出しにはコピーを返す
+    results[1]["items"].append(3)
+    assert results[2]["items"] == [1, 2]
+    assert flight.get_metrics() == {"executions": 1, "shared": 4, "inflight": 0}
+
+    # 完了後は次の呼び出しから通常どおり実行（結果はキャッシュしない）
+    await flight.do(key, work)
+    assert calls == 2
+
+
+def test_collapses_concurrent_calls():
+    """同じキーの同時呼び出しは1回だけ実行して結果を共有"""
+    run_async(_collapses_concurrent_calls())
+
+
+async def _shares_errors_and_isolates_cancellation():
+    from mcp_servers.single_flight import SingleFlight
+
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    # 1つの呼び出し元のキャンセルは共有中の実行に伝播しない
+    first = asyncio.ensure_future(flight.do("s", slow))
+    second = asyncio.ensure_future(flight.do("s", slow))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == "done"
+
+
+def test_shares_errors_and_isolates_cancellation():
+    """例外は全ての呼び出し元に共有、キャンセルは共有中の実行に伝播しない"""
+    run_async(_shares_errors_and_isolates_cancellation())
+
+
+async def _progress_fans_out_to_all_waiters():
+    from mcp_servers.single_flight import SingleFlight
+
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+
+    async def work(publish):
+        await publish(1, None, "first")
+        started.set()
+        await asyncio.sleep(0.02)
+        await publish(2, None, "second")
+        return "ok"
+
+    received = {"leader": [], "follower": []}
+
+    def handler(name):
+        async def on_progress(progress, total, message):
+            received[name].append(message)
+        return on_progress
+
+    leader = asyncio.ensure_future(flight.do_with_progress("k", work, handler("leader")))
+    await started.wait()
+    # 相乗りした呼び出し元は相乗り前の通知も受け取る
+    follower = await flight.do_with_progress("k", work, handler("follower"))
+    assert follower == "ok" and await leader == "ok"
+    assert received["leader"] == ["first", "second"]
+    assert received["follower"] == ["first", "second"]
+
+    # 次の実行では前回の通知を再送しない
+    again = []
+
+    async def on_again(progress, total, message):
+        again.append(message)
+
+    await flight.do_with_progress("k", work, on_again)
+    assert again == ["first", "second"]
+
+
+def test_progress_fans_out_to_all_waiters():
+    """do_with_progress: 進捗通知を相乗りした全ての呼び出し元へ配信"""
+    run_async(_progress_fans_out_to_all_waiters())
+
+
+def test_tool_flight_key_fingerprints_large_params():
+    """ToolRouter: 大きなパラメータは指紋でキーを作成（値が違えば別キー）"""
+    from services.tool_router import build_tool_flight_key
+
+    inventory = [f"食材{i}" for i in range(500)]
+    params = {"category": "main", "inventory_items": inventory, "rag_results": {"肉じゃが": {"url": "u"}}}
+    key = build_tool_flight_key("generate_proposals", params, "token")
+    assert key == build_tool_flight_key("generate_proposals", dict(params, inventory_items=list(inventory)), "token")
+    assert key != build_tool_flight_key("generate_proposals", dict(params, inventory_items=inventory + ["追加"]), "token")
+    assert key != build_tool_flight_key("generate_proposals", dict(params, category="sub"), "token")
+    assert key != build_tool_flight_key("generate_proposals", params, "other-token")
+
+
+class FakeMCPClient:
+    tool_server_mapping = {"generate_proposals": "recipe"}
+
+    def __init__(self):
+        self.calls = 0
+
+    async def call_tool(self, tool_name, parameters, token, progress_handler=None):
+        self.calls += 1
+        for i in range(2):
+            await asyncio.sleep(0.01)
+            if progress_handler is not None:
+                await progress_handler(i + 1, None, f"candidate-{i + 1}")
+        return {"success": True, "result": {"data": []}}
+
+
+async def _tool_router_streams_to_followers():
+    import services.tool_router as tool_router_module
+
+    fake = FakeMCPClient()
+    with patch.object(tool_router_module, "MCPClient", return_value=fake):
+        routers = [tool_router_module.ToolRouter(), tool_router_module.ToolRouter()]
+    received = [[], []]
+
+    def handler(index):
+        async def on_progress(progress, total, message):
+            received[index].append(message)
+        return on_progress
+
+    params = {"category": "main", "inventory_items": ["鶏もも肉"], "user_id": "u1"}
+    results = await asyncio.gather(*(
+        router.route_tool("generate_proposals", dict(params), "token", progress_handler=handler(i))
+        for i, router in enumerate(routers)
+    ))
+    assert fake.calls == 1
+    assert all(result["success"] for result in results)
+    assert received[0] == received[1] == ["candidate-1", "candidate-2"], received
+
+
+def test_tool_router_streams_to_followers():
+    """ToolRouter: 集約された提案ツールの部分結果を全ての呼び出し元へ配信"""
+    run_async(_tool_router_streams_to_followers())
+
+
+def run_all():
+    print("--- SingleFlight ---")
+    test_collapses_concurrent_calls()
+    print("  test_collapses_concurrent_calls OK")
+    test_shares_errors_and_isolates_cancellation()
+    print("  test_shares_errors_and_isolates_cancellation OK")
+    test_progress_fans_out_to_all_waiters()
+    print("  test_progress_fans_out_to_all_waiters OK")
+
+    print("--- ToolRouter ---")
+    test_tool_flight_key_fingerprints_large_params()
+    print("  test_tool_flight_key_fingerprints_large_params OK")
+    test_tool_router_streams_to_followers()
+    print("  test_tool_router_streams_to_followers OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+LLMの構造化出力（JSONスキーマ / JSONモード）の単体テスト
+
+実行: python tests/test_structured_output.py
+pytest は使用しない。
+"""
+
+import asyncio
+import json
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _walk(schema):
+    if isinstance(schema, dict):
+        yield schema
+        for value in schema.values():
+            yield from _walk(value)
+    elif isinstance(schema, list):
+        for item in schema:
+            yield from _walk(item)
+
+
+def test_json_schema_is_strict():
+    """全オブジェクトで全プロパティが必須・追加プロパティ禁止、$ref に同列のキーワードがない"""
+    from mcp_servers.models import CandidatesOutput, MenuSelectionOutput, MenuTitlesOutput
+    from mcp_servers.structured_output import json_schema_response_format
+
+    for model in (CandidatesOutput, MenuTitlesOutput, MenuSelectionOutput):
+        response_format = json_schema_response_format(model)
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
+        for node in _walk(response_format["json_schema"]["schema"]):
+            if "$ref" in node:
+                assert list(node.keys()) == ["$ref"], node
+            if node.get("type") == "object" and "properties" in node:
+                assert node["additionalProperties"] is False, node
+                assert sorted(node["required"]) == sorted(node["properties"].keys()), node
+            assert "default" not in node, node
+
+
+def _recipe_llm():
+    from mcp_servers.recipe_llm import RecipeLLM
+
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"}):
+        return RecipeLLM()
+
+
+def test_recipe_llm_parses_structured_responses():
+    """RecipeLLM: スキーマどおりの応答を型付きモデル経由で変換"""
+    llm = _recipe_llm()
+    assert llm.structured_output is True
+
+    candidates = llm._parse_candidate_response(json.dumps({
+        "candidates": [
+            {"title": "鶏もも肉の照り焼き", "ingredients": ["鶏もも肉", "醤油"]},
+            {"title": "鶏と玉ねぎの煮物", "ingredients": []},
+        ]
+    }, ensure_ascii=False))
+    assert [c["title"] for c in candidates] == ["鶏もも肉の照り焼き", "鶏と玉ねぎの煮物"]
+    assert candidates[1]["ingredients"] == []
+
+    menu = llm._parse_menu_response(json.dumps({
+        "main_dish": {"title": "豚の生姜焼き", "ingredients": ["豚肉", "生姜"]},
+        "side_dish": {"title": "ほうれん草の胡麻和え", "ingredients": ["ほうれん草"]},
+        "soup": {"title": "豆腐の味噌汁", "ingredients": ["豆腐"]},
+        "ingredients_used": ["豚肉", "生姜", "ほうれん草", "豆腐"],
+    }, ensure_ascii=False))
+    assert menu["main_dish"] == "豚の生姜焼き"
+    assert menu["soup_ingredients"] == ["豆腐"]
+
+    # スキーマに合わない応答は従来の解析にフォールバック
+    legacy = llm._parse_candidate_response('```json\n{"candidates": [{"title": "親子丼"}]}\n```')
+    assert legacy == [{"title": "親子丼", "ingredients": []}], legacy
+
+
+async def _generate_candidates_with_schema():
+    llm = _recipe_llm()
+    llm.response_cache.clear()
+    content = json.dumps({"candidates": [{"title": "肉じゃが", "ingredients": ["じゃがいも", "牛肉"]}]}, ensure_ascii=False)
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=None,
+    )
+    mock_create = AsyncMock(return_value=response)
+    with patch.object(llm.client.chat.completions, "create", mock_create):
+        result = await llm.generate_candidates(["じゃがいも", "牛肉"], "和食", "main", count=1)
+    return result, mock_create.call_args.kwargs
+
+
+def test_generate_candidates_sends_json_schema():
+    """generate_candidates は response_format に候補のJSONスキーマを指定する"""
+    result, kwargs = run_async(_generate_candidates_with_schema())
+    assert result["success"] is True
+    assert result["data"]["candidates"][0]["title"] == "肉じゃが"
+    assert kwargs["response_format"]["json_schema"]["name"] == "CandidatesOutput"
+
+
+def test_planner_response_json_mode():
+    """ResponseProcessor: JSONモードの応答を1回のデコードで変換（LLMが書いたキーのみ保持）"""
+    from services.llm.response_processor import ResponseProcessor
+
+    processor = ResponseProcessor()
+    tasks = processor.parse_llm_response(json.dumps({
+        "tasks": [
+            {"id": "task1", "service": "inventory_service", "method": "get_inventory", "parameters": {}, "dependencies": []},
+            {"service": "recipe_service", "method": "generate_proposals", "parameters": {"category": "main"}},
+        ]
+    }))
+    assert len(tasks) == 2
+    assert tasks[0]["id"] == "task1"
+    assert "id" not in tasks[1], tasks[1]
+    assert tasks[1]["parameters"] == {"category": "main"}
+
+    # コードブロック付きの応答（JSONモード無効時）も従来どおり解析
+    fenced = processor.parse_llm_response('```json\n{"tasks": []}\n```')
+    assert fenced == []
+
+
+def run_all():
+    print("--- structured_output.json_schema_response_format ---")
+    test_json_schema_is_strict()
+    print("  test_json_schema_is_strict OK")
+
+    print("--- RecipeLLM ---")
+    test_recipe_llm_parses_structured_responses()
+    print("  test_recipe_llm_parses_structured_responses OK")
+    test_generate_candidates_sends_json_schema()
+    print("  test_generate_candidates_sends_json_schema OK")
+
+    print("--- ResponseProcessor.parse_llm_response ---")
+    test_planner_response_json_mode()
+    print("  test_planner_response_json_mode OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+レシピタイトル → URL のインデックス（RecipeTitleIndex）と、Web検索前の参照の単体テスト
+
+実行: python tests/test_title_index.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# recipe_service の import 時に recipe_web が Google検索クライアントを作成するため、
+# 検索APIの設定がない環境でも読み込めるようダミー値を設定（実際の検索は行わない）
+os.environ.setdefault("GOOGLE_SEARCH_API_KEY", "test")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "test")
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _similarity(a, b):
+    """テスト用: 正規化タイトルのトライグラムDice係数"""
+    from mcp_servers.recipe_rag.title_index import _trigrams, normalize_recipe_title
+
+    grams_a = _trigrams(normalize_recipe_title(a))
+    grams_b = _trigrams(normalize_recipe_title(b))
+    return 2.0 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def test_exact_match():
+    """正規化タイトル（全角半角・カタカナ・装飾・記号）が同じなら完全一致（類似度1.0）"""
+    from mcp_servers.recipe_rag.title_index import RecipeTitleIndex
+
+    index = RecipeTitleIndex(threshold=1.0)
+    assert index.add("みそ汁", "https://cookpad.com/recipe/1", "soup", "味噌汁")
+    match = index.lookup("【簡単】ミソ汁！")
+    assert match is not None and match.similarity == 1.0
+    assert match.to_dict() == {
+        "title": "みそ汁",
+        "url": "https://cookpad.com/recipe/1",
+        "category": "soup",
+        "category_detail": "味噌汁",
+        "similarity": 1.0,
+    }
+    # 閾値1.0は完全一致のみ
+    assert index.lookup("みそ汁定食") is None
+    assert index.lookup("") is None
+
+    # URLのないレシピ・登録済みの正規化タイトルは登録しない（最初のレシピを優先）
+    assert not index.add("肉じゃが", "")
+    assert not index.add("ミソ汁", "https://cookpad.com/recipe/2")
+    assert len(index) == 1
+    assert index.lookup("みそ汁").url == "https://cookpad.com/recipe/1"
+
+
+def test_threshold_boundary():
+    """類似度が閾値ちょうどなら一致、閾値を超えなければ一致しない"""
+    from mcp_servers.recipe_rag.title_index import RecipeTitleIndex
+
+    stored, query = "鶏もも肉の照り焼き", "鶏もも肉の照焼き"
+    similarity = _similarity(stored, query)
+    assert 0.0 < similarity < 1.0
+
+    at_threshold = RecipeTitleIndex(threshold=similarity)
+    at_threshold.add(stored, "https://cookpad.com/recipe/1")
+    match = at_threshold.lookup(query)
+    assert match is not None and match.title == stored
+    assert abs(match.similarity - similarity) < 1e-9
+
+    above_threshold = RecipeTitleIndex(threshold=similarity + 1e-6)
+    above_threshold.add(stored, "https://cookpad.com/recipe/1")
+    assert above_threshold.lookup(query) is None
+
+
+def test_default_threshold_from_env():
+    """閾値の既定値は0.75、RAG_TITLE_MATCH_THRESHOLD で上書き"""
+    from mcp_servers.recipe_rag.title_index import DEFAULT_MATCH_THRESHOLD, RecipeTitleIndex
+
+    with patch.dict(os.environ, {}, clear=False):
+        os.environ.pop("RAG_TITLE_MATCH_THRESHOLD", None)
+        assert RecipeTitleIndex().threshold == DEFAULT_MATCH_THRESHOLD == 0.75
+        os.environ["RAG_TITLE_MATCH_THRESHOLD"] = "0.9"
+        assert RecipeTitleIndex().threshold == 0.9
+
+
+def test_tie_break_by_registration_order():
+    """類似度が同じ候補は登録順（カテゴリ順 → 検索DBの並び順）で先のものを返す"""
+    from mcp_servers.recipe_rag.title_index import RecipeTitleIndex
+
+    query = "豚肉の生姜焼き"
+    lower, first, second = "豚肉の生姜焼きAB", "豚肉の生姜焼きA", "豚肉の生姜焼きB"
+    assert _similarity(query, first) == _similarity(query, second) > _similarity(query, lower)
+
+    # 類似度が高い候補は登録順によらず優先し、同点なら先に登録した候補
+    index = RecipeTitleIndex(threshold=0.5)
+    for title in (lower, first, second):
+        index.add(title, f"https://cookpad.com/recipe/{title}", "main")
+    assert index.lookup(query).title == first
+
+    reversed_index = RecipeTitleIndex(threshold=0.5)
+    for title in (lower, second, first):
+        reversed_index.add(title, f"https://cookpad.com/recipe/{title}", "main")
+    assert reversed_index.lookup(query).title == second
+
+
+def test_add_documents():
+    """ベクトルストアのドキュメントのメタデータ（title / url / category_detail）から登録"""
+    from langchain_core.documents import Document
+    from mcp_servers.recipe_rag.title_index import RecipeTitleIndex
+
+    index = RecipeTitleIndex(threshold=1.0)
+    added = index.add_documents([
+        Document(page_content="", metadata={"title": "肉じゃが", "url": "https://cookpad.com/recipe/1", "category_detail": "煮物"}),
+        Document(page_content="", metadata={"title": "URLなし"}),
+        Document(page_content="", metadata={}),
+    ], "main")
+    assert added == 1
+    match = index.lookup("肉じゃが")
+    assert (match.category, match.category_detail) == ("main", "煮物")
+
+
+class FakeRAGClient:
+    def __init__(self, matches):
+        self.matches = matches
+        self.lookups = []
+
+    def lookup_recipe_by_title(self, title):
+        self.lookups.append(title)
+        return self.matches.get(title)
+
+
+class FakeSearchClient:
+    def __init__(self):
+        self.queries = []
+
+    async def search_recipes(self, title, num_results):
+        self.queries.append(title)
+        return [{"title": f"{title}（Web）", "url": "https://example.com/web", "source": "web"}]
+
+
+def _service(rag_client):
+    from mcp_servers.services import recipe_service
+
+    with patch.object(recipe_service, "get_recipe_llm", return_value=object()), \
+            patch.object(recipe_service, "get_recipe_rag_client", return_value=rag_client):
+        return recipe_service.RecipeService()
+
+
+async def _title_hit_skips_web_search():
+    from mcp_servers.services import recipe_service
+
+    rag_client = FakeRAGClient({
+        "鶏もも肉の照焼き": {
+            "title": "鶏もも肉の照り焼き",
+            "url": "https://cookpad.com/recipe/1",
+            "category": "main",
+            "category_detail": "照り焼き",
+            "similarity": 0.8,
+        }
+    })
+    service = _service(rag_client)
+    search_client = FakeSearchClient()
+
+    with patch.object(recipe_service, "get_search_client", return_value=search_client):
+        # タイトルインデックスにヒットした場合はWeb検索を呼ばずにコーパスのURLを使う
+        hit = await service._search_single_recipe_with_rag_fallback(
+            title="鶏もも肉の照焼き", index=0, rag_results={}, menu_source="llm",
+            recipe_titles=["鶏もも肉の照焼き"], num_results=3
+        )
+        assert search_client.queries == []
+        assert hit["success"] is True and hit["count"] == 1
+        assert hit["data"][0]["url"] == "https://cookpad.com/recipe/1"
+        assert hit["data"][0]["source"] == "vector_db"
+
+        # RAG検索結果にURLがあればタイトルインデックスも参照しない
+        rag_client.lookups.clear()
+        await service._search_single_recipe_with_rag_fallback(
+            title="肉じゃが", index=0,
+            rag_results={"肉じゃが": {"url": "https://cookpad.com/recipe/2"}},
+            menu_source="rag", recipe_titles=["肉じゃが"], num_results=3
+        )
+        assert rag_client.lookups == [] and search_client.queries == []
+
+        # ヒットしない場合のみWeb検索
+        miss = await service._search_single_recipe_with_rag_fallback(
+            title="創作カレー", index=0, rag_results={}, menu_source="llm",
+            recipe_titles=["創作カレー"], num_results=3
+        )
+        assert rag_client.lookups == ["創作カレー"]
+        assert search_client.queries == ["創作カレー"]
+        assert miss["success"] is True
+
+
+def test_title_hit_skips_web_search():
+    """RecipeService: タイトルインデックスのヒット時はWeb検索を呼ばない"""
+    run_async(_title_hit_skips_web_search())
+
+
+def run_all():
+    print("--- RecipeTitleIndex.lookup ---")
+    test_exact_match()
+    print("  test_exact_match OK")
+    test_threshold_boundary()
+    print("  test_threshold_boundary OK")
+    test_default_threshold_from_env()
+    print("  test_default_threshold_from_env OK")
+    test_tie_break_by_registration_order()
+    print("  test_tie_break_by_registration_order OK")
+    test_add_documents()
+    print("  test_add_documents OK")
+
+    print("--- RecipeService._search_single_recipe_with_rag_fallback ---")
+    test_title_hit_skips_web_search()
+    print("  test_title_hit_skips_web_search OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+トークン計測とコスト集計（TokenLedger）の単体テスト
+
+実行: python tests/test_token_accounting.py
+pytest は使用しない。
+"""
+
+import asyncio
+import json
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _usage(prompt_tokens, completion_tokens, cached_tokens=0):
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+    )
+
+
+def test_record_cost_and_attribution():
+    """usage から単価でコストを計算し、用途・パターン・ユーザー・ツール別に集計"""
+    from mcp_servers.token_accounting import TokenLedger, token_attribution
+
+    ledger = TokenLedger(prices={"gpt-4o-mini": (1.0, 2.0, 0.5)})
+    with token_attribution(pattern="main", user_id="user-1", operation="generate_proposals"):
+        record = ledger.record("recipe", "gpt-4o-mini-2024-07-18", 90, _usage(1000, 500, cached_tokens=400))
+    # (600 × 1.0 + 400 × 0.5 + 500 × 2.0) / 100万
+    assert record["cost_usd"] == 0.0018, record
+    assert record["usage_reported"] is True
+
+    # usage がない場合は推定値で計算し、集計先は "-"
+    ledger.record("planner", "unknown-model", 120)
+
+    metrics = ledger.get_metrics()
+    assert metrics["total"]["calls"] == 2
+    assert metrics["total"]["prompt_tokens"] == 1120
+    assert metrics["by_pattern"]["main"]["cached_ratio"] == 0.4
+    assert metrics["by_user"]["user-1"]["calls"] == 1
+    assert metrics["by_operation"]["-"]["cost_usd"] == 0.0
+    assert [key for key, _ in ledger.top("purpose")] == ["recipe", "planner"]
+
+
+def test_user_totals_are_capped():
+    """ユーザー別集計は上限を超えるとコストの低いユーザーを (other) にまとめる"""
+    from mcp_servers.token_accounting import OTHER_USERS, TokenLedger, token_attribution
+
+    with patch.dict(os.environ, {"LLM_TOKEN_LEDGER_MAX_USERS": "4"}):
+        ledger = TokenLedger(prices={"m": (1.0, 1.0, 1.0)})
+    for i in range(20):
+        with token_attribution(user_id=f"user-{i}"):
+            ledger.record("recipe", "m", 0, _usage(100 * (i + 1), 0))
+
+    users = ledger.get_metrics()["by_user"]
+    assert len(users) <= 4, list(users)
+    assert OTHER_USERS in users
+    # 合計は失われない
+    assert sum(totals["calls"] for totals in users.values()) == 20
+    # 最もコストの高いユーザーは個別に残る
+    assert "user-19" in users
+
+
+async def _pattern_reaches_mcp_tool():
+    from fastmcp import Client, FastMCP
+    from mcp_servers.decorators import logged_tool
+    from mcp_servers.token_accounting import attribution_meta, get_token_attribution, token_attribution
+
+    server = FastMCP("test")
+    seen = []
+
+    @server.tool()
+    @logged_tool
+    async def generate_proposals(user_id: str) -> dict:
+        seen.append(get_token_attribution())
+        return {"success": True}
+
+    async with Client(server) as client:
+        # APIプロセスでパターンを設定して呼び出すと、ツール側（別プロセス相当）で復元される
+        with token_attribution(pattern="main_additional", user_id="user-1"):
+            meta = attribution_meta()
+            await client.call_tool("generate_proposals", {"user_id": "user-1"}, meta=meta or None)
+        await client.call_tool("generate_proposals", {"user_id": "user-2"})
+
+    assert seen[0] == {"pattern": "main_additional", "operation": "generate_proposals", "user_id": "user-1"}, seen
+    assert "pattern" not in seen[1]
+    # ユーザーIDは _meta に載せない（ツールの引数から設定）
+    assert meta == {"morizo/token_attribution": {"pattern": "main_additional"}}
+
+
+def test_pattern_reaches_mcp_tool():
+    """リクエストパターンをMCPツール呼び出しの _meta で引き継ぐ"""
+    run_async(_pattern_reaches_mcp_tool())
+
+
+async def _health_has_no_user_totals():
+    from api.routes.health import _check_services_status
+    from mcp_servers.token_accounting import TokenLedger, token_attribution
+
+    ledger = TokenLedger(prices={"m": (1.0, 1.0, 1.0)})
+    with token_attribution(pattern="main", user_id="secret-user-id"):
+        ledger.record("recipe", "m", 0, _usage(100, 10))
+    with patch("mcp_servers.token_accounting.get_token_ledger", return_value=ledger):
+        status = await _check_services_status()
+    usage = status["llm_usage"]["usage"]
+    assert usage["total"]["calls"] == 1
+    assert "main" in usage["by_pattern"]
+    # 認証不要の /health にはユーザーIDとユーザー別のコストを含めない
+    assert "by_user" not in usage and "top_users" not in usage
+    assert "secret-user-id" not in json.dumps(status, ensure_ascii=False, default=str)
+
+
+def test_health_has_no_user_totals():
+    """ヘルスチェックの集計にユーザー別の値を含めない"""
+    run_async(_health_has_no_user_totals())
+
+
+async def _encoding_load_does_not_block_loop():
+    from mcp_servers import token_accounting
+
+    loaded = threading.Event()
+
+    def slow_load(model):
+        time.sleep(0.3)
+        with token_accounting._encodings_lock:
+            token_accounting._encodings[model] = None
+            token_accounting._loading_models.discard(model)
+        loaded.set()
+
+    with patch.object(token_accounting, "_load_encoding", slow_load):
+        started = time.monotonic()
+        # 未読み込みのモデルは読み込みを待たずに概算で数える
+        assert token_accounting.count_tokens("abcdefgh", "test-slow-model") == 2
+        assert token_accounting.count_tokens("abcdefgh", "test-slow-model") == 2
+        assert time.monotonic() - started < 0.1
+        await asyncio.to_thread(loaded.wait, 2)
+    assert "test-slow-model" in token_accounting._encodings
+
+
+def test_encoding_load_does_not_block_loop():
+    """イベントループ上ではエンコーディングの読み込みをバックグラウンドで行う"""
+    run_async(_encoding_load_does_not_block_loop())
+
+
+def run_all():
+    print("--- TokenLedger ---")
+    test_record_cost_and_attribution()
+    print("  test_record_cost_and_attribution OK")
+    test_user_totals_are_capped()
+    print("  test_user_totals_are_capped OK")
+    test_health_has_no_user_totals()
+    print("  test_health_has_no_user_totals OK")
+    test_pattern_reaches_mcp_tool()
+    print("  test_pattern_reaches_mcp_tool OK")
+
+    print("--- count_tokens ---")
+    test_encoding_load_does_not_block_loop()
+    print("  test_encoding_load_does_not_block_loop OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()
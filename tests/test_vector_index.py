@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+量子化ベクトルインデックス（QuantizedVectorIndex）と、それを使うRAG検索の単体テスト
+
+実行: python tests/test_vector_index.py
+pytest は使用しない。
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_async(coro):
+    """同期テストから async 関数を実行"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _vectors(count=500, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(count, dim)).astype(np.float32)
+
+
+def test_quantized_ranking_matches_float32():
+    """float16 / int8 は float32 で再ランキングすると float32 と同じ上位k件になる"""
+    from mcp_servers.recipe_rag.vector_index import QuantizedVectorIndex
+
+    vectors = _vectors()
+    queries = _vectors(count=20, seed=1)
+    exact = QuantizedVectorIndex("float32")
+    exact.build(vectors)
+    for dtype in ("float16", "int8"):
+        index = QuantizedVectorIndex(dtype)
+        index.build(vectors)
+        assert index.nbytes < exact.nbytes
+        for query in queries:
+            expected = [row for row, _ in exact.search(query, 5)]
+            actual = [row for row, _ in index.search(query, 5, fetch_full_precision=lambda rows: vectors[rows])]
+            assert actual == expected, (dtype, actual, expected)
+
+
+def test_mask_limits_candidates():
+    """マスクで除外した行は返さない"""
+    from mcp_servers.recipe_rag.vector_index import QuantizedVectorIndex
+
+    vectors = _vectors(count=50)
+    index = QuantizedVectorIndex("int8")
+    index.build(vectors)
+    mask = np.zeros(50, dtype=bool)
+    mask[[3, 7, 11]] = True
+    hits = index.search(vectors[0], 10, mask=mask)
+    assert sorted(row for row, _ in hits) == [3, 7, 11]
+    assert index.search(vectors[0], 10, mask=np.zeros(50, dtype=bool)) == []
+
+
+def test_full_precision_memmap():
+    """再ランキング用float32はファイルに書き出してmemmapで読み、取得関数を使わない"""
+    from mcp_servers.recipe_rag.vector_index import QuantizedVectorIndex
+
+    vectors = _vectors()
+    queries = _vectors(count=20, seed=1)
+    exact = QuantizedVectorIndex("float32")
+    exact.build(vectors)
+
+    def fetch_from_chroma(rows):
+        raise AssertionError("memmap保持時にChromaから取得しています")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "vector_index_float32.npy")
+        index = QuantizedVectorIndex("int8")
+        index.build(vectors, full_precision_path=path)
+        assert index.has_full_precision
+        assert isinstance(index._full_precision, np.memmap)
+        # memmapはインデックスのメモリ量に含めない
+        assert index.nbytes < vectors.nbytes / 3
+        for query in queries:
+            expected = [row for row, _ in exact.search(query, 5)]
+            actual = [row for row, _ in index.search(query, 5, fetch_full_precision=fetch_from_chroma)]
+            assert actual == expected, (actual, expected)
+
+        # 再構築時は開いているmemmapを壊さずにファイルを置き換える
+        old = index._full_precision
+        index.build(vectors[:10], full_precision_path=path)
+        assert old.shape[0] == 500 and index._full_precision.shape[0] == 10
+
+    # 書き出せない場合は取得関数による再ランキングにフォールバック
+    fallback = QuantizedVectorIndex("float16")
+    fallback.build(vectors, full_precision_path=os.path.join(directory, "missing", "vectors.npy"))
+    assert not fallback.has_full_precision
+
+
+class FakeEmbeddings:
+    """同期の embed_query はイベントループを止めるため呼ばれてはいけない"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        raise AssertionError("embed_query（同期）がイベントループ上で呼ばれました")
+
+    async def aembed_query(self, text):
+        return self.vectors[2].tolist()
+
+
+class FakeVectorStore:
+    def __init__(self, vectors, allow_fetch=True):
+        self.vectors = vectors
+        self.embeddings = FakeEmbeddings(vectors)
+        self.allow_fetch = allow_fetch
+
+    def get(self, ids=None, include=None):
+        all_ids = [f"id-{i}" for i in range(len(self.vectors))]
+        if ids is not None:
+            assert self.allow_fetch, "memmap保持時にChromaから再ランキング用ベクトルを取得しています"
+            rows = [all_ids.index(doc_id) for doc_id in ids]
+            return {"ids": ids, "embeddings": [self.vectors[row].tolist() for row in rows]}
+        return {
+            "ids": all_ids,
+            "documents": [f"レシピ{i}\n食材: 鶏もも肉" for i in range(len(self.vectors))],
+            "metadatas": [{"title": f"レシピ{i}"} for i in range(len(self.vectors))],
+            "embeddings": [vector.tolist() for vector in self.vectors],
+        }
+
+
+async def _similarity_search_uses_async_embeddings():
+    from mcp_servers.recipe_rag.search import RecipeSearchEngine
+
+    vectors = _vectors(count=30)
+    with patch.dict(os.environ, {"RAG_VECTOR_INDEX_DTYPE": "int8"}):
+        engine = RecipeSearchEngine(FakeVectorStore(vectors))
+    assert engine.load_index() == 30
+    documents = await engine._similarity_search("鶏もも肉", 3)
+    assert documents[0].metadata["title"] == "レシピ2"
+
+    # ベクトルDBのディレクトリを指定した場合はmemmapで再ランキング
+    with tempfile.TemporaryDirectory() as directory:
+        with patch.dict(os.environ, {"RAG_VECTOR_INDEX_DTYPE": "int8"}):
+            engine = RecipeSearchEngine(FakeVectorStore(vectors, allow_fetch=False), persist_directory=directory)
+        assert engine.load_index() == 30
+        assert os.path.exists(os.path.join(directory, "vector_index_float32.npy"))
+        documents = await engine._similarity_search("鶏もも肉", 3)
+        assert documents[0].metadata["title"] == "レシピ2"
+
+
+def test_similarity_search_uses_async_embeddings():
+    """量子化インデックス使用時（バッチャーなし）はクエリを非同期で埋め込み、検索はスレッドで実行"""
+    run_async(_similarity_search_uses_async_embeddings())
+
+
+def run_all():
+    print("--- QuantizedVectorIndex ---")
+    test_quantized_ranking_matches_float32()
+    print("  test_quantized_ranking_matches_float32 OK")
+    test_mask_limits_candidates()
+    print("  test_mask_limits_candidates OK")
+    test_full_precision_memmap()
+    print("  test_full_precision_memmap OK")
+
+    print("--- RecipeSearchEngine._similarity_search ---")
+    test_similarity_search_uses_async_embeddings()
+    print("  test_similarity_search_uses_async_embeddings OK")
+
+    print("\nすべてのテストが完了しました。")
+
+
+if __name__ == "__main__":
+    run_all()